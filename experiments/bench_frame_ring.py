@@ -0,0 +1,150 @@
+"""
+프레임 공급 경로 벤치마크: 현재 경로(VideoFrameReader, decode 스레드) vs 공유 메모리 프레임 링(디코더 프로세스).
+
+- reader:       VideoFrameReader 순차 (프레임마다 retrieve가 새 배열 할당)
+- reader_copy:  reader + 프레임 복사 (Ultralytics 로더 fallback처럼 orig_img.copy())
+- thread:       FramePipeline decode 스레드 (PIPELINED=1 경로, 디코딩이 같은 프로세스에서 GIL 경쟁)
+- ring:         FrameRing (디코더 프로세스 → 공유 메모리 슬롯, 복사 없는 view + release)
+
+모드마다 처리량(fps, 첫 프레임까지의 기동 시간 startup_s는 따로)과 프레임당 할당(tracemalloc peak 증가분 bytes, minor page fault 수)을 측정.
+--work-ms로 추론 쪽이 GIL을 잡고 일하는 시간을 흉내 내면 디코딩과 겹치는 정도를 비교할 수 있음.
+
+사용:
+  python experiments/bench_frame_ring.py --source experiments/bench_clip.mp4
+  python experiments/bench_frame_ring.py --source input.mp4 --frames 600 --work-ms 5 --mlflow
+"""
+import argparse
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import cv2
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.frame_ring import FrameRing
+from utils.video_pipeline import FramePipeline, VideoFrameReader
+
+EXPERIMENT_NAME = "benchmarks"
+MODES = ("reader", "reader_copy", "thread", "ring")
+
+
+def _spin(ms: float) -> None:
+    """GIL을 잡은 채로 ms만큼 CPU 사용 (Python 전처리·후처리 흉내)."""
+    end = time.perf_counter() + ms / 1000.0
+    while time.perf_counter() < end:
+        pass
+
+
+def open_frames(mode: str, source: str, frames: int, skip: int, slots: int) -> tuple[Iterator[tuple[int, Any]], Callable[[Any], None], Callable[[], None]]:
+    """모드별 (프레임 이터레이터, 프레임 반환 함수, 정리 함수)."""
+    if mode == "ring":
+        ring = FrameRing(source, frames, skip, slots=slots)
+        return iter(ring), ring.release, ring.close
+    cap = cv2.VideoCapture(source)
+    reader = VideoFrameReader(cap, frames, skip)
+    if mode == "thread":
+        pipe = FramePipeline(reader, lambda item: None)
+
+        def close() -> None:
+            pipe.close()
+            cap.release()
+        return iter(pipe), lambda frame: None, close
+    it: Iterator[tuple[int, Any]] = iter(reader)
+    if mode == "reader_copy":
+        it = ((idx, frame.copy()) for idx, frame in it)
+    return it, lambda frame: None, cap.release
+
+
+def run_mode(mode: str, source: str, frames: int, skip: int, slots: int, work_ms: float, trace: bool) -> dict[str, float]:
+    """모드 하나 실행. trace=True면 tracemalloc으로 프레임당 할당량 측정 (처리량 측정과 분리)."""
+    it, release, close = open_frames(mode, source, frames, skip, slots)
+    n = 0
+    alloc_bytes = 0
+    if trace:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+    faults0 = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    t_open = t0 = time.perf_counter()
+    startup_s = 0.0
+    try:
+        for _, frame in it:
+            if n == 0:  # 첫 프레임까지(ring: 디코더 프로세스 기동)는 처리량에서 제외
+                t0 = time.perf_counter()
+                startup_s = t0 - t_open
+            if trace:
+                cur, peak = tracemalloc.get_traced_memory()
+                alloc_bytes += max(0, peak - base)
+                tracemalloc.reset_peak()
+                base = cur
+            frame[0, 0, 0] ^= 1  # 프레임 메모리를 실제로 건드림 (전처리 대신)
+            if work_ms > 0:
+                _spin(work_ms)
+            release(frame)
+            n += 1
+    finally:
+        wall = time.perf_counter() - t0
+        steady = max(0, n - 1)
+        faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults0
+        close()
+        if trace:
+            tracemalloc.stop()
+    if trace:
+        return {"alloc_bytes_per_frame": alloc_bytes / n if n else 0.0}
+    return {
+        "frames": float(n),
+        "startup_s": startup_s,
+        "fps": steady / wall if wall > 0 else 0.0,
+        "ms_per_frame": wall * 1000.0 / steady if steady else 0.0,
+        "minor_faults_per_frame": faults / n if n else 0.0,
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="프레임 링(디코더 프로세스 + 공유 메모리) vs 현재 디코딩 경로")
+    p.add_argument("--source", type=Path, required=True, help="로컬 영상 (예: bench_inference.py가 만드는 experiments/bench_clip.mp4)")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--skip", type=int, default=1)
+    p.add_argument("--slots", type=int, default=8, help="ring 모드 슬롯 수")
+    p.add_argument("--work-ms", type=float, default=0.0, help="프레임마다 GIL을 잡고 일하는 시간 (추론 쪽 흉내)")
+    p.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    p.add_argument("--trace-frames", type=int, default=50, help="할당량 측정 프레임 수 (tracemalloc은 느려서 따로)")
+    p.add_argument("--mlflow", action="store_true", help=f"MLflow '{EXPERIMENT_NAME}' 실험에 기록")
+    args = p.parse_args()
+    if not args.source.exists():
+        raise SystemExit(f"영상이 없습니다: {args.source}")
+
+    results: dict[str, dict[str, float]] = {}
+    for mode in args.modes:
+        m = run_mode(mode, str(args.source), args.frames, args.skip, args.slots, args.work_ms, trace=False)
+        m.update(run_mode(mode, str(args.source), args.trace_frames, args.skip, args.slots, 0.0, trace=True))
+        results[mode] = m
+        print(
+            f"  {mode:<12} {m['fps']:8.1f} fps  {m['ms_per_frame']:7.2f} ms/frame  "
+            f"alloc {m['alloc_bytes_per_frame'] / 1024:9.1f} KiB/frame  faults {m['minor_faults_per_frame']:7.1f}/frame  "
+            f"startup {m['startup_s'] * 1000:6.1f} ms"
+        )
+    if "reader" in results and "ring" in results and results["reader"]["fps"] > 0:
+        print(f"✅ ring / reader 처리량: {results['ring']['fps'] / results['reader']['fps']:.2f}x")
+
+    if args.mlflow:
+        import mlflow
+
+        mlflow.set_experiment(EXPERIMENT_NAME)
+        with mlflow.start_run(run_name=f"frame-ring-{time.strftime('%Y%m%d-%H%M%S')}") as run:
+            mlflow.set_tag("benchmark", "frame_ring")
+            mlflow.log_params({
+                "source": str(args.source), "frames": args.frames, "skip": args.skip, "slots": args.slots,
+                "work_ms": args.work_ms,
+            })
+            mlflow.log_metrics({f"{mode}/{k}": v for mode, m in results.items() for k, v in m.items()})
+            print(f"✅ MLflow Run: {run.info.run_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+영상 추론 end-to-end 벤치마크 (고정 합성 클립 + 파라미터 sweep + baseline 회귀 판정).
+
+- 입력: --source 로컬 영상, 없으면 고정 시드 합성 클립을 생성해 재사용 (YouTube·네트워크 의존 없음)
+- sweep: imgsz × skip × batch × backend × tracking 조합마다 실제 진입점을 새 프로세스로 실행 (peak RSS·모델 상태 분리)
+  tracking=0 → experiments/run_yolo.py, tracking=1 → experiments/yolo11n_bytetrack.py (환경 변수로 조합 전달)
+- 조합별 nested Run에 진입점이 직접 기록 (stage/* 단계 ms, e2e/* — 처음 --warmup 프레임(배치 단위 올림) 이후 FPS)
+  + 벤치마크가 fps(= e2e/fps), peak_rss_mb 추가
+- MLflow "benchmarks" 실험: 부모 Run + 조합별 nested Run. --baseline-run-id(또는 baseline 태그가 붙은 최근 Run)와
+  같은 조합끼리 FPS 비교 → --threshold 이상 떨어지면 exit 1
+
+사용:
+  python experiments/bench_inference.py --imgsz 320 640 --batch 1 4 --backend pytorch onnx
+  python experiments/bench_inference.py --set-baseline              # 현재 결과를 baseline으로 태그
+  python experiments/bench_inference.py --threshold 0.1             # baseline 대비 10% 이상 FPS 하락 시 실패
+"""
+import os
+os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+
+import argparse
+import itertools
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import cv2
+import mlflow
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+EXPERIMENT_NAME = "benchmarks"
+DEFAULT_CLIP = Path("experiments") / "bench_clip.mp4"
+
+
+def make_synthetic_clip(path: Path, frames: int = 300, size: tuple[int, int] = (1280, 720), fps: float = 30.0, seed: int = 0) -> Path:
+    """고정 시드로 움직이는 사각형·원 클립 생성 (이미 있으면 재사용)."""
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    w, h = size
+    rng = np.random.default_rng(seed)
+    n_obj = 12
+    pos = rng.uniform([0, 0], [w - 120, h - 120], size=(n_obj, 2))
+    vel = rng.uniform(-6, 6, size=(n_obj, 2))
+    dims = rng.integers(40, 160, size=(n_obj, 2))
+    colors = rng.integers(40, 255, size=(n_obj, 3))
+    background = rng.integers(0, 60, size=(h, w, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for _ in range(frames):
+        frame = background.copy()
+        for (x, y), (bw, bh), c in zip(pos.astype(int), dims, colors.tolist()):
+            if bw > bh:
+                cv2.rectangle(frame, (x, y), (x + bw, y + bh), c, -1)
+            else:
+                cv2.circle(frame, (x + bw // 2, y + bh // 2), bw // 2, c, -1)
+        writer.write(frame)
+        pos += vel
+        bounce = (pos < 0) | (pos > [w - 160, h - 160])
+        vel[bounce] *= -1
+    writer.release()
+    return path
+
+
+def config_key(cfg: dict[str, Any]) -> str:
+    """조합 식별 문자열 (baseline Run과 매칭할 때 사용)."""
+    return f"entry={ENTRY_POINTS[cfg['tracking']].stem},imgsz={cfg['imgsz']},skip={cfg['skip']},batch={cfg['batch']},backend={cfg['backend']},tracking={int(cfg['tracking'])}"
+
+
+# tracking 조합 → 실제 진입점 (검출: run_yolo.py, 트래킹: yolo11n_bytetrack.py)
+ENTRY_POINTS = {False: PROJECT_ROOT / "experiments" / "run_yolo.py", True: PROJECT_ROOT / "experiments" / "yolo11n_bytetrack.py"}
+
+
+def entry_env(cfg: dict[str, Any]) -> dict[str, str]:
+    """조합 → 진입점 환경 변수. 나머지 설정(PIPELINED, STAGE_TIMING 등)은 스크립트 기본값 또는 현재 환경 그대로."""
+    return {
+        "VIDEO_SOURCE": cfg["source"],
+        "MODEL_WEIGHT": cfg["model"],
+        "IMGSZ": str(cfg["imgsz"]),
+        "SKIP_FRAMES": str(cfg["skip"]),
+        "BATCH_SIZE": str(cfg["batch"]),
+        "BACKEND": cfg["backend"],
+        "CONF": str(cfg["conf"]),
+        "MAX_FRAMES": str(cfg["max_frames"]),
+        "E2E_WARMUP_FRAMES": str(cfg["warmup"]),
+        "EXPORT_CACHE_DIR": cfg["cache_dir"],
+        # 측정과 무관한 부산물은 끔 (모델 등록, 검출 Parquet, 검출 캐시 재생)
+        "REGISTER_MODEL": "0",
+        "DETECTION_STORE": "0",
+        "DETECTION_CACHE": "0",
+    }
+
+
+def run_entry_point(script: Path, env: dict[str, str], run_id: str, experiment: str, workdir: Path) -> dict[str, float]:
+    """
+    진입점 스크립트를 새 프로세스로 실행 (MLFLOW_RUN_ID=run_id → 스크립트가 그 Run에 그대로 기록).
+    작업 디렉터리는 workdir (상대 경로 출력이 저장소를 덮지 않도록), 로그는 workdir/run.log.
+    반환: exit_code, peak_rss_mb (wait4로 그 자식 프로세스만).
+    """
+    child_env = {
+        **os.environ,
+        **env,
+        "MLFLOW_RUN_ID": run_id,
+        "MLFLOW_EXPERIMENT": experiment,
+        "MLFLOW_TRACKING_URI": mlflow.get_tracking_uri(),
+        "OUTPUT_VIDEO": str(workdir / "out.mp4"),
+    }
+    with open(workdir / "run.log", "w") as log:
+        proc = subprocess.Popen([sys.executable, str(script)], cwd=workdir, env=child_env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # Linux ru_maxrss는 KB 단위
+    return {"exit_code": float(proc.returncode), "peak_rss_mb": usage.ru_maxrss / 1024.0}
+
+
+def _find_baseline(experiment_id: str, run_id: str | None) -> str | None:
+    """baseline 부모 Run id: 지정값, 없으면 baseline=true 태그가 붙은 가장 최근 Run."""
+    if run_id:
+        return run_id
+    runs = mlflow.search_runs(
+        [experiment_id],
+        filter_string="tags.baseline = 'true'",
+        order_by=["start_time DESC"],
+        max_results=1,
+        output_format="list",
+    )
+    return runs[0].info.run_id if runs else None
+
+
+def _baseline_fps(experiment_id: str, parent_id: str) -> dict[str, float]:
+    """baseline 부모 Run의 nested Run들 → {config_key: fps}."""
+    children = mlflow.search_runs(
+        [experiment_id], filter_string=f"tags.mlflow.parentRunId = '{parent_id}'", output_format="list"
+    )
+    return {
+        r.data.tags["config_key"]: r.data.metrics["fps"]
+        for r in children
+        if "config_key" in r.data.tags and "fps" in r.data.metrics
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="영상 추론 end-to-end 벤치마크 + baseline 회귀 판정")
+    p.add_argument("--source", type=Path, default=None, help="로컬 영상 (기본: 합성 클립 생성/재사용)")
+    p.add_argument("--clip", type=Path, default=DEFAULT_CLIP, help="합성 클립 경로")
+    p.add_argument("--model", default="yolo11n.pt")
+    p.add_argument("--imgsz", type=int, nargs="+", default=[640])
+    p.add_argument("--skip", type=int, nargs="+", default=[1])
+    p.add_argument("--batch", type=int, nargs="+", default=[1])
+    p.add_argument("--backend", nargs="+", default=["pytorch"])
+    p.add_argument("--tracking", type=int, nargs="+", choices=[0, 1], default=[0])
+    p.add_argument("--conf", type=float, default=0.25)
+    p.add_argument("--max-frames", type=int, default=150)
+    p.add_argument("--warmup", type=int, default=10, help="통계에서 제외할 처음 프레임 수")
+    p.add_argument("--cache-dir", type=Path, default=None, help="export 캐시 (기본: utils.backends 기본값)")
+    p.add_argument("--baseline-run-id", default=None, help="비교할 baseline 부모 Run (기본: baseline 태그 최근 Run)")
+    p.add_argument("--threshold", type=float, default=0.05, help="허용 FPS 하락 비율")
+    p.add_argument("--set-baseline", action="store_true", help="이번 Run에 baseline=true 태그")
+    args = p.parse_args()
+
+    from utils.backends import DEFAULT_CACHE_DIR
+
+    source = args.source if args.source is not None else make_synthetic_clip(args.clip)
+    configs = [
+        {
+            "imgsz": imgsz, "skip": skip, "batch": batch, "backend": backend, "tracking": bool(tracking),
+            "model": str(Path(args.model).resolve()) if Path(args.model).exists() else args.model,
+            "source": str(Path(source).resolve()), "conf": args.conf, "max_frames": args.max_frames,
+            "warmup": args.warmup, "cache_dir": str(Path(args.cache_dir or DEFAULT_CACHE_DIR).resolve()),
+        }
+        for imgsz, skip, batch, backend, tracking in itertools.product(
+            args.imgsz, args.skip, args.batch, args.backend, args.tracking
+        )
+    ]
+
+    experiment = mlflow.set_experiment(EXPERIMENT_NAME)
+    baseline_id = _find_baseline(experiment.experiment_id, args.baseline_run_id)
+    baseline = _baseline_fps(experiment.experiment_id, baseline_id) if baseline_id else {}
+    regressions: list[str] = []
+    failures: list[str] = []
+    table: list[dict[str, Any]] = []
+
+    with mlflow.start_run(run_name=f"bench-{time.strftime('%Y%m%d-%H%M%S')}") as parent:
+        mlflow.log_params({
+            "model": args.model, "source": str(source), "max_frames": args.max_frames, "warmup": args.warmup,
+            "threshold": args.threshold, "num_configs": len(configs),
+            "baseline_run_id": baseline_id or "",
+        })
+        if args.set_baseline:
+            mlflow.set_tag("baseline", "true")
+        client = mlflow.MlflowClient()
+        # 조합마다 nested Run을 먼저 만들고, 진입점 프로세스가 MLFLOW_RUN_ID로 그 Run에 기록
+        for cfg in configs:
+            key = config_key(cfg)
+            script = ENTRY_POINTS[cfg["tracking"]]
+            child = client.create_run(
+                experiment.experiment_id,
+                run_name=key,
+                tags={"mlflow.parentRunId": parent.info.run_id, "config_key": key, "entry_point": script.name},
+            )
+            run_id = child.info.run_id
+            for k in ("skip", "batch", "tracking"):
+                client.log_param(run_id, k, cfg[k])
+            with tempfile.TemporaryDirectory(prefix="gaflow-bench-") as tmp:
+                proc = run_entry_point(script, entry_env(cfg), run_id, EXPERIMENT_NAME, Path(tmp))
+                log_tail = (Path(tmp) / "run.log").read_text(errors="replace").splitlines()[-20:]
+            # 진입점이 Run 이름을 자기 것으로 바꾸므로 조합 키로 되돌림
+            client.set_tag(run_id, "mlflow.runName", key)
+            if proc["exit_code"] != 0:
+                client.set_terminated(run_id, status="FAILED")
+                failures.append(f"{key}: exit {proc['exit_code']:.0f}")
+                print(f"⚠️ {key} 실패 (exit {proc['exit_code']:.0f}):")
+                print("\n".join(f"    {line}" for line in log_tail))
+                continue
+            child_metrics = client.get_run(run_id).data.metrics
+            metrics = {
+                "fps": child_metrics.get("e2e/fps", 0.0),
+                "peak_rss_mb": proc["peak_rss_mb"],
+                **{k: v for k, v in child_metrics.items() if k.startswith(("e2e/", "stage/"))},
+            }
+            row: dict[str, Any] = {"config": key, **metrics}
+            client.log_metric(run_id, "fps", metrics["fps"])
+            client.log_metric(run_id, "peak_rss_mb", metrics["peak_rss_mb"])
+            if key in baseline and baseline[key] > 0:
+                ratio = metrics["fps"] / baseline[key]
+                client.log_metric(run_id, "baseline_fps", baseline[key])
+                client.log_metric(run_id, "fps_vs_baseline", ratio)
+                row["fps_vs_baseline"] = ratio
+                if ratio < 1.0 - args.threshold:
+                    regressions.append(f"{key}: {metrics['fps']:.1f} FPS (baseline {baseline[key]:.1f}, {ratio:.2f}x)")
+                    client.set_tag(run_id, "regression", "true")
+            table.append(row)
+            print(
+                f"{key:<80} {metrics['fps']:>7.1f} FPS  "
+                f"model {metrics.get('stage/infer_mean_ms', metrics.get('stage/track_mean_ms', 0)):6.1f} ms  "
+                f"rss {metrics['peak_rss_mb']:7.0f} MB" + (f"  {row['fps_vs_baseline']:.2f}x" if "fps_vs_baseline" in row else "")
+            )
+        mlflow.log_dict({"rows": table}, "benchmarks/results.json")
+        mlflow.log_metrics({"regressions": float(len(regressions)), "failures": float(len(failures)), "configs_compared": float(sum("fps_vs_baseline" in r for r in table))})
+        print(f"✅ MLflow Run: {parent.info.run_id} (baseline: {baseline_id or '없음'})")
+
+    if failures:
+        print(f"⚠️ 실행 실패 {len(failures)}건:")
+        for f in failures:
+            print(f"  - {f}")
+    if regressions:
+        print(f"⚠️ FPS 회귀 {len(regressions)}건 (threshold {args.threshold:.0%}):")
+        for r in regressions:
+            print(f"  - {r}")
+    return 1 if failures or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
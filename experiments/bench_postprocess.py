@@ -0,0 +1,102 @@
+"""
+프레임별 검출 후처리 벤치마크: 박스 단위 루프(기존) vs 배열 단위(FrameDetections).
+모델 없이 합성 Boxes로 박스 수별 후처리 ms/frame 비교.
+
+사용:
+  python experiments/bench_postprocess.py
+  python experiments/bench_postprocess.py --boxes 10 100 500 --frames 200 --tracking
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.detections import ClassCounter, FrameDetections, label_of, write_mot_rows
+
+NAMES = {i: f"class{i}" for i in range(80)}
+
+
+def _make_result(n_boxes: int, tracking: bool, rng: np.random.Generator) -> Results:
+    """합성 Results: (N,6) 또는 트래킹이면 (N,7) 박스."""
+    xy = rng.uniform(0, 600, size=(n_boxes, 2))
+    wh = rng.uniform(5, 100, size=(n_boxes, 2))
+    cols = [xy, xy + wh]
+    if tracking:
+        cols.append(np.arange(1, n_boxes + 1)[:, None])
+    cols.append(rng.uniform(0.25, 1.0, size=(n_boxes, 1)))
+    cols.append(rng.integers(0, len(NAMES), size=(n_boxes, 1)))
+    boxes = torch.from_numpy(np.hstack(cols).astype(np.float32))
+    orig = np.zeros((640, 640, 3), dtype=np.uint8)
+    return Results(orig, path="bench.jpg", names=NAMES, boxes=boxes)
+
+
+def _legacy(result: Results, frame_id: int, mot_file, out) -> None:
+    """기존 run_yolo.py 박스 루프 (tolist/item/dict/f.write/print per box)."""
+    detections_per_class: dict[str, int] = {}
+    confidences: list[float] = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        conf_val = box.conf.item()
+        cls = box.cls.item()
+        label = result.names[int(cls)]
+        confidences.append(conf_val)
+        detections_per_class[label] = detections_per_class.get(label, 0) + 1
+        track_id = int(box.id) if getattr(box, "id", None) is not None else 0
+        mot_file.write(f"{frame_id},{track_id},{x1+1:.2f},{y1+1:.2f},{x2-x1:.2f},{y2-y1:.2f},{conf_val:.4f},-1,-1,-1\n")
+        print(f"🔍 검출: {label} (Conf: {conf_val:.2f})", file=out)
+    if confidences:
+        sum(confidences) / len(confidences)
+
+
+def _vectorized(result: Results, frame_id: int, mot_file, counter: ClassCounter) -> None:
+    """FrameDetections: 프레임당 1회 전송 + bincount + savetxt."""
+    det = FrameDetections.from_result(result)
+    counter.update(det.cls)
+    write_mot_rows(mot_file, frame_id, det)
+    det.mean_conf()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="검출 후처리 ms/frame 벤치마크 (기존 vs 벡터화)")
+    parser.add_argument("--boxes", type=int, nargs="+", default=[10, 50, 100, 300, 1000], help="프레임당 박스 수")
+    parser.add_argument("--frames", type=int, default=200, help="박스 수별 반복 프레임 수")
+    parser.add_argument("--tracking", action="store_true", help="트래킹 ID 포함 (N,7) 박스")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6} | {'legacy ms/frame':>16} | {'vectorized ms/frame':>20} | {'speedup':>8}")
+    print("-" * 60)
+    with open(os.devnull, "w") as devnull:
+        for n in args.boxes:
+            results = [_make_result(n, args.tracking, rng) for _ in range(args.frames)]
+            # 검증: 두 방식의 MOT 출력이 같은지
+            a, b = io.StringIO(), io.StringIO()
+            _legacy(results[0], 1, a, devnull)
+            _vectorized(results[0], 1, b, ClassCounter())
+            assert a.getvalue() == b.getvalue(), "MOT 출력 불일치"
+
+            t0 = time.perf_counter()
+            for i, r in enumerate(results):
+                _legacy(r, i + 1, io.StringIO(), devnull)
+            legacy_ms = (time.perf_counter() - t0) * 1000 / len(results)
+
+            counter = ClassCounter()
+            t0 = time.perf_counter()
+            for i, r in enumerate(results):
+                _vectorized(r, i + 1, io.StringIO(), counter)
+            vec_ms = (time.perf_counter() - t0) * 1000 / len(results)
+            print(f"{n:>6} | {legacy_ms:>16.3f} | {vec_ms:>20.3f} | {legacy_ms / vec_ms:>7.1f}x")
+    print(f"(라벨 예: {label_of(NAMES, 0)}; print는 devnull로 보내 터미널 비용 제외)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+학습 이미지 캐시 미리 빌드 + 읽기 벤치마크 (utils/image_cache.py).
+학습 시작 시에도 자동으로 열거나 빌드하지만, 큰 데이터셋은 학습 전에 따로 만들어 두면 여러 run·sweep trial이 바로 씀.
+
+- data yaml의 split(train/val)마다, --imgsz마다 저장소 하나 (학습 trainer가 쓰는 것과 같은 키)
+- 빌드 시간·초당 디코딩 수, 같은 이미지 샘플의 JPEG 디코딩+리사이즈 vs 저장소 읽기 초당 이미지 수를 출력
+- 이미 있는 저장소는 파일 지문(--validate mtime: 크기·mtime / hash: 내용)이 같으면 그대로, 바뀐 파일만 다시 디코딩
+
+사용:
+  python experiments/build_image_cache.py --data datasets/solesensei/solesensei_bdd100k --imgsz 640
+  python experiments/build_image_cache.py --data datasets/coco8/coco8.yaml --imgsz 320 640 --workers 8 --mlflow
+  python experiments/build_image_cache.py --data data.yaml --validate hash --bench 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.dataset_manifest import load_manifest, manifest_dataset, resolve_data_yaml
+from utils.image_cache import DEFAULT_CACHE_DIR, VALIDATE_MODES, open_image_store, read_benchmark, store_key
+
+EXPERIMENT_NAME = "benchmarks"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="학습 이미지 캐시(letterbox uint8 memmap) 빌드 + 읽기 벤치마크")
+    p.add_argument("--data", required=True, help="데이터셋 루트 또는 data yaml")
+    p.add_argument("--imgsz", type=int, nargs="+", default=[640])
+    p.add_argument("--splits", nargs="+", default=["train", "val"])
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    p.add_argument("--workers", type=int, default=0, help="빌드 워커 프로세스 수 (0이면 코어 수)")
+    p.add_argument("--validate", choices=VALIDATE_MODES, default="mtime")
+    p.add_argument("--bench", type=int, default=200, help="읽기 벤치마크 샘플 수 (0이면 생략)")
+    p.add_argument("--mlflow", action="store_true", help=f"MLflow '{EXPERIMENT_NAME}' 실험에 기록")
+    args = p.parse_args()
+
+    from ultralytics.data.utils import check_det_dataset
+
+    data_yaml = resolve_data_yaml(args.data, PROJECT_ROOT)
+    dataset_cls = manifest_dataset(load_manifest(data_yaml))
+    data = check_det_dataset(str(data_yaml))
+    results: dict[str, float] = {}
+    for split in args.splits:
+        # trainer와 같은 경로 문자열 → 같은 저장소 키 (val이 없으면 test)
+        img_path = data.get(split) or (data.get("test") if split == "val" else None)
+        if not img_path:
+            print(f"⚠️ {data_yaml}에 {split} split이 없습니다")
+            continue
+        for imgsz in args.imgsz:
+            labels = dataset_cls(img_path=img_path, imgsz=imgsz, augment=False, data=data, task="detect").labels
+            name = f"{split}-{imgsz}-{store_key(img_path, imgsz)}"
+            t0 = time.perf_counter()
+            store, stats = open_image_store(labels, imgsz, name, args.cache_dir, args.workers, args.validate)
+            stats["image_cache/open_s"] = time.perf_counter() - t0
+            if args.bench > 0:
+                stats.update(read_benchmark(store, imgsz, args.bench))
+            results.update({k.replace("image_cache/", f"image_cache/{split}_{imgsz}/"): v for k, v in stats.items()})
+            line = f"  {split:<5} imgsz {imgsz:<4} {len(store):>7}장  {stats['image_cache/size_gb']:7.2f} GB"
+            if "image_cache/build_s" in stats:
+                line += f"  빌드 {stats['image_cache/build_s']:7.1f}s ({stats['image_cache/build_ips']:6.0f} img/s, 재사용 {stats['image_cache/reused']:.0f})"
+            else:
+                line += "  변경 없음"
+            if "image_cache/cache_ips" in stats:
+                line += (
+                    f"  읽기 {stats['image_cache/cache_ips']:8.0f} vs JPEG {stats['image_cache/jpeg_ips']:6.0f} img/s"
+                    f" ({stats['image_cache/speedup']:.1f}x)"
+                )
+            print(line)
+            print(f"    → {store.path}")
+
+    if args.mlflow and results:
+        import mlflow
+
+        mlflow.set_experiment(EXPERIMENT_NAME)
+        with mlflow.start_run(run_name=f"image-cache-{time.strftime('%Y%m%d-%H%M%S')}") as run:
+            mlflow.set_tag("benchmark", "image_cache")
+            mlflow.log_params({
+                "data_yaml": str(data_yaml), "imgsz": ",".join(map(str, args.imgsz)), "splits": ",".join(args.splits),
+                "workers": args.workers, "validate": args.validate, "bench": args.bench,
+            })
+            mlflow.log_metrics(results)
+            print(f"✅ MLflow Run: {run.info.run_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+계층 샘플 부분집합 만들기 + 분포 비교 (utils/dataset_subset.py).
+학습 진입점(DATA_SUBSET=0.1)·sweep(--subset 0.1)도 없으면 자동으로 만들지만, 여러 비율을 미리 만들고
+클래스별 인스턴스 수·박스 크기 비중이 전체 데이터와 얼마나 같은지 확인할 때 따로 실행.
+
+- 비율마다 <data yaml 디렉터리>/subsets/<yaml 이름>-p<비율%>-s<seed>/data.yaml (이미지·라벨은 하드 링크)
+- 원본 데이터셋 버전·비율·seed가 같은 부분집합이 있으면 그대로 사용
+
+사용:
+  python experiments/build_subset.py --data datasets/solesensei/solesensei_bdd100k --fractions 0.05 0.1 0.25
+  python experiments/build_subset.py --data datasets/coco8/coco8.yaml --fractions 0.5 --seed 1 --classes
+  python experiments/build_subset.py --data data.yaml --fractions 0.1 --splits train val --mlflow
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.dataset_manifest import resolve_data_yaml
+from utils.dataset_subset import DATA_SUBSET_SEED, build_subset
+
+EXPERIMENT_NAME = "benchmarks"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="클래스·박스 크기 계층 샘플 부분집합 (하드 링크) + 전체 데이터 대비 분포")
+    p.add_argument("--data", required=True, help="데이터셋 루트 또는 data yaml")
+    p.add_argument("--fractions", type=float, nargs="+", default=[0.05, 0.1, 0.25])
+    p.add_argument("--seed", type=int, default=DATA_SUBSET_SEED)
+    p.add_argument("--splits", nargs="+", default=["train"], help="부분집합으로 만들 split (나머지는 원본 그대로)")
+    p.add_argument("--classes", action="store_true", help="클래스별 인스턴스 수 비교 출력")
+    p.add_argument("--mlflow", action="store_true", help=f"MLflow '{EXPERIMENT_NAME}' 실험에 기록")
+    args = p.parse_args()
+
+    data_yaml = resolve_data_yaml(args.data, PROJECT_ROOT)
+    if not data_yaml.exists():
+        raise SystemExit(f"데이터 YAML이 없습니다: {data_yaml}")
+    results: dict[str, float] = {}
+    for fraction in args.fractions:
+        t0 = time.perf_counter()
+        _, report = build_subset(data_yaml, fraction, args.seed, splits=tuple(args.splits))
+        prefix = f"subset/p{fraction * 100:g}"
+        results[f"{prefix}/build_s"] = time.perf_counter() - t0
+        for split, r in report.items():
+            results.update({
+                f"{prefix}/{split}_images": float(r["images"]),
+                f"{prefix}/{split}_instances": float(r["instances"]),
+                f"{prefix}/{split}_class_share_max_dev": r["class_share_max_dev"],
+                f"{prefix}/{split}_size_share_max_dev": r["size_share_max_dev"],
+                f"{prefix}/{split}_classes_missing": float(r["classes_missing"]),
+            })
+            sizes = "  ".join(f"{k} {v['full']:.1%}→{v['subset']:.1%}" for k, v in r["size_share"].items())
+            print(f"    크기 비중: {sizes}")
+            if args.classes:
+                for name, c in r["classes"].items():
+                    print(f"    {name:<20} {c['full']:>8} → {c['subset']:>7} ({c['ratio']:6.1%})")
+
+    if args.mlflow and results:
+        import mlflow
+
+        mlflow.set_experiment(EXPERIMENT_NAME)
+        with mlflow.start_run(run_name=f"subset-{time.strftime('%Y%m%d-%H%M%S')}") as run:
+            mlflow.set_tag("benchmark", "dataset_subset")
+            mlflow.log_params({
+                "data_yaml": str(data_yaml), "fractions": ",".join(map(str, args.fractions)),
+                "seed": args.seed, "splits": ",".join(args.splits),
+            })
+            mlflow.log_metrics(results)
+            print(f"✅ MLflow Run: {run.info.run_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+utils 검증: 합성 입력으로 기준 구현과의 일치·불변식 확인 (모델·데이터셋 없이, 수정 후 실행). 실패가 있으면 exit 1.
+
+- mot:    utils/mot_eval.py evaluate_files vs motmetrics_summary (motmetrics 필요). 무작위 GT·예측 시퀀스
+          (누락·오검출·ID 교체·새 ID·conf 0 GT 행·GT 없는 프레임)에서 motchallenge 지표가 같은지
+- shards: utils/sharding.py plan_shards. 프레임 수·구간 수·skip·overlap·keyframe 조합 전체에서
+          첫 구간 0 시작·마지막 구간 끝 = 프레임 수, 출력 구간 연속, skip 격자 프레임을 정확히 한 번 출력,
+          구간 경계는 keyframe, warm-up 처리 프레임 수 = overlap, 구간 수 ≤ 요청 수
+- subset: utils/dataset_subset.py stratified_sample. 잘못된 비율은 ValueError, seed 결정성,
+          인덱스 정렬·중복 없음·범위 안, 이미지 수 ≤ 목표, 희귀 클래스 유지, 클래스·크기 비중 편차,
+          배경 이미지 비율, 빈 목록·배경만·이미지 1장
+
+사용:
+  python experiments/check_utils.py
+  python experiments/check_utils.py mot --sequences 50
+  python experiments/check_utils.py shards subset
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.dataset_subset import distribution_report, stratified_sample
+from utils.detections import MOT_ROW_FMT
+from utils.mot_eval import MOTCHALLENGE_METRICS, evaluate_files, metrics_from_state, motmetrics_summary
+from utils.sharding import plan_shards
+
+CHECKS = ("mot", "shards", "subset")
+
+
+# ---------------------------------------------------------------- mot
+
+
+def _make_sequence(rng: np.random.Generator, frames: int, objects: int) -> tuple[np.ndarray, np.ndarray]:
+    """합성 GT (N,10)·예측 mot_rows (N,7). GT는 등속 이동 객체, 예측은 GT에 잡음·누락·ID 교체·오검출을 섞음."""
+    gt, pred = [], []
+    next_pred_id = objects + 1
+    id_map = {}
+    for oid in range(1, objects + 1):
+        first = int(rng.integers(1, frames))
+        last = int(rng.integers(first, frames + 1))
+        xy = rng.uniform(0, 800, size=2)
+        v = rng.normal(0, 4, size=2)
+        wh = rng.uniform(20, 120, size=2)
+        conf = 0.0 if rng.random() < 0.1 else 1.0  # conf 0 = 무시 영역 (GT에서 제외돼야 함)
+        id_map[oid] = oid
+        for f in range(first, last + 1):
+            box = np.concatenate([xy + v * (f - first), wh])
+            gt.append([f, oid, *box, conf, 1, 1, -1])
+            if rng.random() < 0.15:  # 누락
+                continue
+            if rng.random() < 0.02:  # 새 ID로 끊김 (fragmentation)
+                id_map[oid] = next_pred_id
+                next_pred_id += 1
+            pred.append([f, id_map[oid], *(box + rng.normal(0, 3, size=4)), rng.uniform(0.3, 1)])
+    # 같은 프레임의 두 객체 ID 교체
+    pred_arr = np.array(pred, dtype=np.float64).reshape(-1, 7)
+    for _ in range(objects // 3):
+        f = rng.integers(1, frames + 1)
+        rows = np.flatnonzero(pred_arr[:, 0] >= f)
+        ids = np.unique(pred_arr[rows, 1])
+        if len(ids) >= 2:
+            a, b = rng.choice(ids, size=2, replace=False)
+            ia, ib = rows[pred_arr[rows, 1] == a], rows[pred_arr[rows, 1] == b]
+            pred_arr[ia, 1], pred_arr[ib, 1] = b, a
+    # 오검출 (GT가 없는 프레임 포함)
+    n_fp = int(rng.integers(0, frames))
+    fp = np.column_stack([
+        rng.integers(1, frames + 6, size=n_fp), rng.integers(1000, 1000 + max(1, n_fp // 4), size=n_fp),
+        rng.uniform(0, 800, size=(n_fp, 2)), rng.uniform(20, 120, size=(n_fp, 2)), rng.uniform(0.3, 1, size=n_fp),
+    ])
+    pred_arr = np.vstack([pred_arr, fp])
+    gt_arr = np.array(gt, dtype=np.float64).reshape(-1, 10)
+    return gt_arr[np.argsort(gt_arr[:, 0], kind="stable")], pred_arr[np.argsort(pred_arr[:, 0], kind="stable")]
+
+
+def check_mot(sequences: int, seed: int, tol: float) -> list[str]:
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="check-mot-") as tmp:
+        gt_path, pred_path = Path(tmp) / "gt.txt", Path(tmp) / "pred.txt"
+        for s in range(sequences):
+            rng = np.random.default_rng(seed + s)
+            gt, pred = _make_sequence(rng, frames=int(rng.integers(5, 120)), objects=int(rng.integers(1, 15)))
+            np.savetxt(gt_path, gt, fmt="%d,%d,%.2f,%.2f,%.2f,%.2f,%d,%d,%d,%d")
+            np.savetxt(pred_path, pred, fmt=MOT_ROW_FMT)
+            ours = metrics_from_state(evaluate_files(gt_path, pred_path, hota=False))
+            ref = motmetrics_summary(gt_path, pred_path)
+            for name in MOTCHALLENGE_METRICS:
+                key = f"mot/{name}"
+                a, b = ours.get(key, np.nan), ref[key]
+                if not (abs(a - b) <= tol or (np.isnan(a) and np.isnan(b))):
+                    failures.append(f"mot seed={seed + s}: {key} {a} != motmetrics {b}")
+    return failures
+
+
+# ---------------------------------------------------------------- shards
+
+
+def _grid(lo: int, hi: int, skip: int) -> range:
+    return range(-(-lo // skip) * skip, hi, skip)
+
+
+def _check_plan(num_frames: int, num_shards: int, skip: int, overlap: int, keyframes: list[int] | None) -> list[str]:
+    shards = plan_shards(num_frames, num_shards, skip, overlap, keyframes)
+    case = f"plan_shards({num_frames}, {num_shards}, skip={skip}, overlap={overlap}, keyframes={keyframes})"
+    errors = []
+    if not shards or len(shards) > max(1, num_shards):
+        errors.append(f"구간 수 {len(shards)}")
+    if shards[0].start != 0 or shards[0].emit_start != 0 or shards[-1].stop != num_frames:
+        errors.append(f"처음·끝 {shards[0]} {shards[-1]}")
+    allowed = set(range(num_frames)) if keyframes is None else {k for k in keyframes if 0 < k < num_frames}
+    emitted: list[int] = []
+    for i, sh in enumerate(shards):
+        if sh.index != i or not sh.start <= sh.emit_start <= sh.stop:
+            errors.append(f"구간 {sh}")
+        if i + 1 < len(shards) and sh.stop != shards[i + 1].emit_start:
+            errors.append(f"출력 구간 불연속 {sh} → {shards[i + 1]}")
+        if i > 0:
+            if sh.start not in allowed or sh.start <= shards[i - 1].start:
+                errors.append(f"경계 {sh.start}가 keyframe이 아니거나 증가하지 않음")
+            if len(_grid(sh.start, sh.emit_start, skip)) != overlap:
+                errors.append(f"warm-up {len(_grid(sh.start, sh.emit_start, skip))} != overlap {overlap}: {sh}")
+        if num_frames and not len(_grid(sh.emit_start, sh.stop, skip)):
+            errors.append(f"출력 프레임 없는 구간 {sh}")
+        if sh.num_processed(skip) != len(_grid(sh.start, sh.stop, skip)):
+            errors.append(f"num_processed {sh.num_processed(skip)}: {sh}")
+        emitted.extend(_grid(sh.emit_start, sh.stop, skip))
+    if emitted != list(range(0, num_frames, skip)):
+        errors.append("skip 격자 프레임이 정확히 한 번씩 출력되지 않음")
+    return [f"{case}: {e}" for e in errors]
+
+
+def check_shards(seed: int) -> list[str]:
+    rng = np.random.default_rng(seed)
+    failures = []
+    for num_frames in (0, 1, 2, 3, 5, 10, 37, 100, 301, 1000):
+        keyframe_sets = [
+            None, [], [0, num_frames], list(range(0, num_frames, 10)), list(range(0, num_frames, 250)),
+            sorted(rng.choice(max(1, num_frames), size=min(num_frames, 8), replace=False).tolist()),
+            [num_frames - 1, num_frames // 2, num_frames // 2, -5, num_frames + 5],  # 정렬 안 됨·중복·범위 밖
+        ]
+        for num_shards in (0, 1, 2, 3, 4, 7, 16, 64):
+            for skip in (1, 2, 3, 5):
+                for overlap in (0, 1, 3):
+                    for keyframes in keyframe_sets:
+                        failures += _check_plan(num_frames, num_shards, skip, overlap, keyframes)
+    return failures
+
+
+# ---------------------------------------------------------------- subset
+
+
+def _make_strata(rng: np.random.Generator, n_images: int) -> list[dict[tuple[int, int], int]]:
+    """합성 이미지별 층: 클래스 빈도 Zipf, 10%는 배경, 클래스 9는 이미지 2장에만."""
+    p = 1.0 / np.arange(1, 10)
+    p /= p.sum()
+    strata = []
+    for _ in range(n_images):
+        s: dict[tuple[int, int], int] = {}
+        if rng.random() >= 0.1:
+            for _ in range(int(rng.integers(1, 9))):
+                key = (int(rng.choice(9, p=p)), int(rng.choice(3, p=(0.5, 0.35, 0.15))))
+                s[key] = s.get(key, 0) + 1
+        strata.append(s)
+    for i in rng.choice(n_images, size=2, replace=False):
+        strata[i][(9, 0)] = 1
+    return strata
+
+
+def check_subset(seed: int, max_share_dev: float) -> list[str]:
+    failures = []
+    for fraction in (0.0, 1.0, -0.1, 1.5):
+        try:
+            stratified_sample([{}], fraction)
+            failures.append(f"stratified_sample fraction={fraction}: ValueError 없음")
+        except ValueError:
+            pass
+    for strata, fraction, expected in (([], 0.1, []), ([{}] * 100, 0.1, 10), ([{(0, 0): 1}], 0.1, [0])):
+        got = stratified_sample(strata, fraction, seed)
+        if (len(got) if isinstance(expected, int) else got) != expected:
+            failures.append(f"stratified_sample(이미지 {len(strata)}장, {fraction}): {got}")
+
+    rng = np.random.default_rng(seed)
+    strata = _make_strata(rng, 10000)
+    backgrounds = [i for i, s in enumerate(strata) if not s]
+    for fraction in (0.05, 0.1, 0.25):
+        n_target = max(1, round(len(strata) * fraction))
+        for s in range(3):
+            selected = stratified_sample(strata, fraction, seed + s)
+            case = f"stratified_sample(fraction={fraction}, seed={seed + s})"
+            if selected != stratified_sample(strata, fraction, seed + s):
+                failures.append(f"{case}: 같은 seed에서 결과가 다름")
+            if selected != sorted(set(selected)) or (selected and not 0 <= selected[0] <= selected[-1] < len(strata)):
+                failures.append(f"{case}: 인덱스가 정렬·중복 없음·범위 안이 아님")
+            if not 0.9 * n_target <= len(selected) <= n_target:
+                failures.append(f"{case}: 이미지 {len(selected)}장 (목표 {n_target})")
+            report = distribution_report(strata, selected, {})
+            if report["classes_missing"]:
+                failures.append(f"{case}: 빠진 클래스 {report['classes_missing']}개")
+            for key in ("class_share_max_dev", "size_share_max_dev"):
+                if report[key] > max_share_dev:
+                    failures.append(f"{case}: {key} {report[key]:.4f} > {max_share_dev}")
+            n_bg = len(set(selected).intersection(backgrounds))
+            if n_bg != round(len(backgrounds) * fraction):
+                failures.append(f"{case}: 배경 이미지 {n_bg}장 (기대 {round(len(backgrounds) * fraction)})")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="utils 합성 입력 검증 (motmetrics 일치, plan_shards·stratified_sample 불변식)")
+    parser.add_argument("checks", nargs="*", metavar="CHECK", help=f"{'/'.join(CHECKS)} (기본: 전부)")
+    parser.add_argument("--sequences", type=int, default=20, help="mot: 합성 시퀀스 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tol", type=float, default=1e-9, help="mot: 지표 허용 오차")
+    parser.add_argument("--max-share-dev", type=float, default=0.02, help="subset: 클래스·크기 비중 최대 편차")
+    args = parser.parse_args()
+    unknown = [c for c in args.checks if c not in CHECKS]
+    if unknown:
+        parser.error(f"알 수 없는 check: {unknown} ({'/'.join(CHECKS)})")
+
+    failed = 0
+    for name in dict.fromkeys(args.checks or CHECKS):
+        if name == "mot":
+            failures = check_mot(args.sequences, args.seed, args.tol)
+        elif name == "shards":
+            failures = check_shards(args.seed)
+        else:
+            failures = check_subset(args.seed, args.max_share_dev)
+        if failures:
+            failed += 1
+            print(f"⚠️ {name}: {len(failures)}건 실패")
+            for f in failures[:20]:
+                print(f"   {f}")
+        else:
+            print(f"✅ {name}: 통과")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
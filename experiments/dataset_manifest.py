@@ -0,0 +1,50 @@
+"""
+데이터셋 manifest 갱신·확인 (utils/dataset_manifest.py).
+학습 진입점이 시작할 때 자동으로 열거나 갱신하지만, 이미지를 제자리에서 고친 뒤(--validate stat)나
+데이터셋 버전·클래스 분포를 확인할 때 따로 실행.
+
+사용:
+  python experiments/dataset_manifest.py --data datasets/solesensei/solesensei_bdd100k
+  python experiments/dataset_manifest.py --data datasets/coco8/coco8.yaml --validate stat
+  python experiments/dataset_manifest.py --data data.yaml --json > manifest_summary.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.dataset_manifest import DATASET_MANIFEST_VALIDATE, VALIDATE_MODES, load_manifest, resolve_data_yaml
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="데이터셋 manifest 갱신 + 요약 (버전 fingerprint, split별 이미지·인스턴스·클래스 분포)")
+    p.add_argument("--data", required=True, help="데이터셋 루트 또는 data yaml")
+    p.add_argument("--validate", choices=VALIDATE_MODES, default=DATASET_MANIFEST_VALIDATE)
+    p.add_argument("--json", action="store_true", help="요약을 JSON으로 출력")
+    args = p.parse_args()
+
+    data_yaml = resolve_data_yaml(args.data, PROJECT_ROOT)
+    if not data_yaml.exists():
+        raise SystemExit(f"데이터 YAML이 없습니다: {data_yaml}")
+    manifest = load_manifest(data_yaml, args.validate, verbose=not args.json)
+    summary = manifest.summary()
+    if args.json:
+        print(json.dumps({**summary, "stats": manifest.stats}, ensure_ascii=False, indent=2))
+        return 0
+    print(f"  manifest: {manifest.path}")
+    for name, split in summary["splits"].items():
+        print(
+            f"  {name:<5} {split['images']:>7}장  인스턴스 {split['instances']:>8}  라벨 없음 {split['missing_labels']:>6}"
+            f"  버전 {split['fingerprint'][:12]}"
+        )
+        total = max(1, split["instances"])
+        for cls, n in sorted(split["class_hist"].items(), key=lambda kv: -kv[1]):
+            print(f"      {cls:<20} {n:>8} ({n / total:6.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
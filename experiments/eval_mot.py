@@ -0,0 +1,107 @@
+"""
+MOT 예측 파일 일괄 평가 (스트리밍 평가기, 시퀀스별 프로세스 풀).
+CLEAR MOT(MOTA/MOTP/ID switch 등)·IDF1·HOTA를 시퀀스마다 계산하고 OVERALL(통계 합산)까지 출력.
+
+- --gt/--pred 쌍 여러 개 또는 MOTChallenge 배치: --gt-dir <seq>/gt/gt.txt + --pred-dir <seq>.txt
+- --check: motmetrics(pandas) 기준 구현과 CLEAR MOT·IDF1 값 비교 (검증용, 느림)
+- --mlflow: "mot-eval" 실험에 OVERALL은 mot/*, 시퀀스별은 <seq>/mot/*로 기록
+
+사용:
+  python experiments/eval_mot.py --gt gt/gt.txt --pred experiments/mot_predictions.txt
+  python experiments/eval_mot.py --gt-dir MOT17/train --pred-dir results/ --workers 8
+  python experiments/eval_mot.py --gt-dir MOT17/train --pred-dir results/ --no-hota --check
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.mot_eval import evaluate_many, motmetrics_summary
+
+EXPERIMENT_NAME = "mot-eval"
+TABLE_METRICS = ("mota", "motp", "idf1", "hota", "deta", "assa", "num_switches", "num_false_positives", "num_misses")
+
+
+def collect_pairs(args: argparse.Namespace) -> dict[str, tuple[Path, Path]]:
+    """평가할 (GT, 예측) 쌍. --gt-dir 배치에서는 예측 파일이 없는 시퀀스를 건너뜀."""
+    pairs: dict[str, tuple[Path, Path]] = {}
+    if args.gt_dir is not None:
+        if args.pred_dir is None:
+            raise SystemExit("--gt-dir에는 --pred-dir이 필요합니다")
+        for gt in sorted(args.gt_dir.glob("*/gt/gt.txt")):
+            seq = gt.parent.parent.name
+            pred = args.pred_dir / f"{seq}.txt"
+            if pred.exists():
+                pairs[seq] = (gt, pred)
+            else:
+                print(f"⚠️ 예측 없음, 건너뜀: {pred}")
+    if len(args.gt) != len(args.pred):
+        raise SystemExit("--gt와 --pred 개수가 같아야 합니다")
+    for gt, pred in zip(args.gt, args.pred):
+        pairs[pred.stem if pred.stem not in pairs else f"{pred.parent.name}/{pred.stem}"] = (gt, pred)
+    if not pairs:
+        raise SystemExit("평가할 시퀀스가 없습니다")
+    return pairs
+
+
+def print_table(results: dict[str, dict[str, float]], columns: tuple[str, ...]) -> None:
+    width = max(len(n) for n in results)
+    print(f"{'':<{width}}  " + "  ".join(f"{c:>12}" for c in columns))
+    for name, metrics in results.items():
+        print(f"{name:<{width}}  " + "  ".join(f"{metrics.get(f'mot/{c}', float('nan')):>12.4f}" for c in columns))
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="MOT 예측 파일 일괄 평가 (MOTA/IDF1/HOTA)")
+    p.add_argument("--gt", type=Path, action="append", default=[], help="Ground truth (MOT Challenge 텍스트)")
+    p.add_argument("--pred", type=Path, action="append", default=[], help="예측 파일 (--gt와 같은 순서)")
+    p.add_argument("--gt-dir", type=Path, default=None, help="MOTChallenge 배치: <seq>/gt/gt.txt")
+    p.add_argument("--pred-dir", type=Path, default=None, help="예측 디렉터리: <seq>.txt")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--no-hota", action="store_true", help="HOTA 계산 생략 (CLEAR MOT·IDF1만)")
+    p.add_argument("--check", action="store_true", help="motmetrics 기준 구현과 비교")
+    p.add_argument("--mlflow", action="store_true", help=f"MLflow '{EXPERIMENT_NAME}' 실험에 기록")
+    args = p.parse_args()
+
+    pairs = collect_pairs(args)
+    hota = not args.no_hota
+    print(f"🔍 {len(pairs)}개 시퀀스, workers={args.workers}, HOTA={'on' if hota else 'off'}")
+    t0 = time.perf_counter()
+    results = evaluate_many(pairs, workers=args.workers, hota=hota)
+    eval_s = time.perf_counter() - t0
+    columns = tuple(c for c in TABLE_METRICS if hota or c not in ("hota", "deta", "assa"))
+    print_table(results, columns)
+    print(f"✅ 평가 {eval_s:.2f}s")
+
+    mismatches = 0
+    if args.check:
+        t0 = time.perf_counter()
+        for name, (gt, pred) in pairs.items():
+            ref = motmetrics_summary(gt, pred)
+            for k, v in ref.items():
+                if abs(v - results[name][k]) > 1e-9:
+                    mismatches += 1
+                    print(f"⚠️ {name} {k}: motmetrics {v:.6f} vs streaming {results[name][k]:.6f}")
+        print(f"{'✅' if not mismatches else '⚠️'} motmetrics 비교: 불일치 {mismatches}개 ({time.perf_counter() - t0:.2f}s)")
+
+    if args.mlflow:
+        import mlflow
+
+        mlflow.set_experiment(EXPERIMENT_NAME)
+        with mlflow.start_run(run_name=f"eval-{time.strftime('%Y%m%d-%H%M%S')}") as run:
+            mlflow.log_params({"num_sequences": len(pairs), "hota": hota, "workers": args.workers})
+            mlflow.log_metrics({**results["OVERALL"], "eval_s": eval_s})
+            for name, metrics in results.items():
+                if name != "OVERALL":
+                    mlflow.log_metrics({f"{name}/{k}": v for k, v in metrics.items()})
+            mlflow.log_dict({n: {"gt": str(g), "pred": str(pr)} for n, (g, pr) in pairs.items()}, "mot_eval/pairs.json")
+            print(f"✅ MLflow Run: {run.info.run_id}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+저장된 검출 Parquet(run_yolo.py / yolo11n_bytetrack.py의 detection store) 분석.
+영상을 다시 돌리지 않고 클래스 히스토그램·신뢰도 분포·MOT export를 파일에서 바로 계산.
+
+사용:
+  python experiments/query_detections.py experiments/detections.parquet
+  python experiments/query_detections.py experiments/detections_tracked.parquet --mot experiments/mot_from_store.txt
+  python experiments/query_detections.py experiments/detections.parquet --min-conf 0.6
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow.compute as pc
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.detection_store import export_mot, read_detections
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="검출 Parquet 분석 (클래스·신뢰도·MOT export)")
+    p.add_argument("path", type=Path)
+    p.add_argument("--min-conf", type=float, default=None, help="이 신뢰도 이상만 집계 (row group pruning)")
+    p.add_argument("--source-id", default=None, help="특정 source_id만 (MOT export)")
+    p.add_argument("--mot", type=Path, default=None, help="MOT 텍스트로 export할 경로")
+    args = p.parse_args()
+
+    filters = [("conf", ">=", args.min_conf)] if args.min_conf is not None else None
+    t = read_detections(args.path, ["frame_idx", "track_id", "conf", "cls", "source_id", "model_hash"], filters)
+    conf = t["conf"].to_numpy()
+    print(f"📄 {args.path}: {t.num_rows} detections, {len(pc.unique(t['frame_idx']))} frames with detections")
+    print(f"   sources: {sorted(set(t['source_id'].to_pylist()))}")
+    print(f"   model_hash: {sorted(set(t['model_hash'].to_pylist()))}")
+    if t.num_rows:
+        q = np.quantile(conf, [0.05, 0.5, 0.95])
+        print(f"   confidence: mean {conf.mean():.3f}, p5 {q[0]:.3f}, p50 {q[1]:.3f}, p95 {q[2]:.3f}")
+        tracks = pc.drop_null(t["track_id"])
+        if len(tracks):
+            print(f"   tracks: {len(pc.unique(tracks))}")
+        print("   classes (id: count):")
+        counts = sorted(((c["values"].as_py(), c["counts"].as_py()) for c in pc.value_counts(t["cls"])), key=lambda p: -p[1])
+        for cls_id, n in counts:
+            print(f"     {cls_id}: {n}")
+    if args.mot is not None:
+        n = export_mot(args.path, args.mot, args.source_id)
+        print(f"✅ MOT export: {args.mot} ({n} rows)")
+
+
+if __name__ == "__main__":
+    main()
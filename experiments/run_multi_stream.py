@@ -0,0 +1,214 @@
+"""
+여러 영상 소스를 모델 하나로 동시에 추론 (스트림 간 공유 배치).
+
+- 모델은 한 번만 로드, 스케줄러(round_robin / priority)가 스트림들에서 프레임을 뽑아 한 번의 forward
+- 트래킹은 스트림마다 별도 tracker 상태 → 스트림별 MOT 파일 (<output-dir>/<stream_id>/mot_predictions.txt)
+- MLflow: 부모 Run(공유 배치·전체 처리량) + 스트림별 nested Run(프레임별 메트릭·MOT 아티팩트)
+
+사용:
+  python experiments/run_multi_stream.py cam0.mp4 cam1.mp4 --tracking
+  python experiments/run_multi_stream.py cam0.mp4@3 cam1.mp4 --schedule priority --batch-size 8
+  python experiments/run_multi_stream.py --sources-file streams.txt   # 한 줄에 "경로 [우선순위]"
+"""
+import os
+os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import mlflow
+import torch
+from mlflow.tracking import MlflowClient
+from ultralytics import YOLO
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.detections import ClassCounter, FrameDetections, write_mot_rows
+from utils.metric_sink import BufferedMetricSink
+from utils.multi_stream import StreamScheduler, StreamState, parse_sources
+from utils.tracking import apply_tracker, make_tracker
+from utils.video_pipeline import BatchThroughput, resolve_source
+
+EXPERIMENT_NAME = "yolo-video-inference"
+METRIC_FLUSH_SIZE = 500
+METRIC_FLUSH_INTERVAL_S = 5.0
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="멀티 스트림 YOLO 추론 (공유 배치 + 스트림별 트래킹)")
+    p.add_argument("sources", nargs="*", help="영상 경로/URL. 'path@N'으로 우선순위 N 지정")
+    p.add_argument("--sources-file", type=Path, default=None, help="한 줄에 '경로 [우선순위]'")
+    p.add_argument("--model", default="yolo11n.pt")
+    p.add_argument("--schedule", choices=StreamScheduler.POLICIES, default="round_robin")
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--conf", type=float, default=0.5)
+    p.add_argument("--max-frames", type=int, default=300, help="스트림당 최대 추론 프레임")
+    p.add_argument("--skip-frames", type=int, default=1, help="N장마다 1장만 디코딩·추론")
+    p.add_argument("--tracking", action="store_true", help="스트림별 tracker + MOT 출력")
+    p.add_argument("--tracker", default="bytetrack.yaml")
+    p.add_argument("--output-dir", type=Path, default=Path("experiments") / "multi_stream")
+    p.add_argument("--run-name", default="yolo11n-multi-stream")
+    return p.parse_args()
+
+
+def _open_streams(args: argparse.Namespace, client: MlflowClient, experiment_id: str, parent_id: str) -> list[StreamState]:
+    """스트림별 VideoCapture·tracker·MOT 파일·nested Run·sink 준비. 열 수 없는 소스는 건너뜀."""
+    streams: list[StreamState] = []
+    for i, (source, priority) in enumerate(parse_sources(args.sources, args.sources_file)):
+        stream_id = f"stream{i}"
+        out_dir = args.output_dir / stream_id
+        s = StreamState(stream_id=stream_id, source=source, priority=priority)
+        try:
+            s.source = resolve_source(source, out_dir / "input_video.mp4")
+        except RuntimeError as e:
+            print(f"⚠️ {stream_id} 소스 준비 실패 → 건너뜀: {e}")
+            continue
+        if not s.open(args.max_frames, args.skip_frames):
+            print(f"⚠️ {stream_id} 영상 열기 실패 → 건너뜀: {source}")
+            continue
+        if args.tracking:
+            s.tracker = make_tracker(args.tracker, frame_rate=round(s.fps / max(1, args.skip_frames)))
+            out_dir.mkdir(parents=True, exist_ok=True)
+            s.mot_file = open(out_dir / "mot_predictions.txt", "w")
+        run = client.create_run(
+            experiment_id,
+            run_name=f"{args.run_name}-{stream_id}",
+            tags={"mlflow.parentRunId": parent_id, "stream_id": stream_id},
+        )
+        s.run_id = run.info.run_id
+        for key, value in {"source": source, "priority": priority, "stream_id": stream_id}.items():
+            client.log_param(s.run_id, key, value)
+        s.sink = BufferedMetricSink(
+            s.run_id, flush_size=METRIC_FLUSH_SIZE, flush_interval_s=METRIC_FLUSH_INTERVAL_S, client=client
+        )
+        streams.append(s)
+        print(f"🎥 {stream_id}: {source} (priority={priority}, fps={s.fps:.1f})")
+    return streams
+
+
+def _finish_stream(
+    s: StreamState, client: MlflowClient, class_counter: ClassCounter, names, status: str = "FINISHED"
+) -> dict[str, float]:
+    """스트림 nested Run에 요약·MOT 아티팩트 로깅 후 status로 종료. 요약 dict 반환."""
+    s.close()
+    summary: dict[str, float] = {
+        "frames_processed": float(s.frames),
+        "total_detections": float(s.detections),
+        "detections_per_frame": s.detections / s.frames if s.frames else 0.0,
+    }
+    if s.reader is not None:
+        summary.update(s.reader.metrics())
+    if s.conf_stats.count:
+        summary.update(s.conf_stats.summary("confidence"))
+    s.sink.log_metrics(summary)
+    for label, count in class_counter.as_dict(names).items():
+        s.sink.log_metric(f"detections/{label}", count)
+    s.sink.close()
+    if s.mot_file is not None:
+        client.log_artifact(s.run_id, s.mot_file.name, "mot")
+    client.set_terminated(s.run_id, status=status)
+    return summary
+
+
+def main() -> int:
+    args = _parse_args()
+    if not args.sources and args.sources_file is None:
+        print("⚠️ 소스를 하나 이상 지정하세요 (positional 또는 --sources-file).")
+        return 1
+    device: int | str = 0 if torch.cuda.is_available() else "cpu"
+    print(f"🔍 Using device: {device}")
+
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    client = MlflowClient()
+    with (
+        mlflow.start_run(run_name=args.run_name) as parent,
+        BufferedMetricSink(
+            parent.info.run_id, flush_size=METRIC_FLUSH_SIZE, flush_interval_s=METRIC_FLUSH_INTERVAL_S
+        ) as sink,
+    ):
+        mlflow.log_params({
+            "model": args.model,
+            "schedule": args.schedule,
+            "batch_size": args.batch_size,
+            "imgsz": args.imgsz,
+            "conf": args.conf,
+            "max_frames": args.max_frames,
+            "skip_frames": args.skip_frames,
+            "use_tracking": args.tracking,
+            "tracker": args.tracker if args.tracking else "",
+            "device": str(device),
+        })
+        model = YOLO(args.model)  # 모든 스트림이 공유
+        streams = _open_streams(args, client, parent.info.experiment_id, parent.info.run_id)
+        mlflow.log_param("num_streams", len(streams))
+        if not streams:
+            print("⚠️ 열 수 있는 스트림이 없습니다.")
+            return 1
+
+        scheduler = StreamScheduler(streams, args.schedule)
+        throughput = BatchThroughput(sink)
+        class_counters = {s.stream_id: ClassCounter() for s in streams}
+        streams_per_batch = 0
+        t_start = time.perf_counter()
+        # 루프가 예외로 끝나면 스트림 Run도 FAILED로 (부분 요약·MOT는 그대로 남김)
+        status = "FAILED"
+        try:
+            while True:
+                batch = scheduler.next_batch(args.batch_size)
+                if not batch:
+                    break
+                imgs = [frame for _, _, frame in batch]
+                t0 = time.perf_counter()
+                results = model.predict(
+                    imgs, conf=args.conf, imgsz=args.imgsz, device=device, save=False, show=False, verbose=False
+                )
+                throughput.record(len(imgs), time.perf_counter() - t0)
+                streams_per_batch += len({s.stream_id for s, _, _ in batch})
+                # 배치 안에서도 스트림별 프레임 순서가 유지되므로 tracker에 순서대로 들어감
+                for (s, frame_idx, frame), result in zip(batch, results):
+                    result.orig_img = frame
+                    if s.tracker is not None:
+                        result = apply_tracker(s.tracker, result)
+                    s.frames += 1
+                    det = FrameDetections.from_result(result)
+                    s.detections += len(det)
+                    s.conf_stats.update_many(det.conf)
+                    class_counters[s.stream_id].update(det.cls)
+                    if s.mot_file is not None:
+                        write_mot_rows(s.mot_file, s.frames, det)
+                    s.sink.log_metric("detections_per_frame", len(det), step=s.frames)
+                    s.sink.log_metric("source_frame_idx", frame_idx, step=s.frames)
+                    if getattr(result, "speed", None):
+                        s.sink.log_metric("inference_ms", float(result.speed.get("inference", 0)), step=s.frames)
+            status = "FINISHED"
+        finally:
+            wall_s = time.perf_counter() - t_start
+            per_stream = {
+                s.stream_id: _finish_stream(s, client, class_counters[s.stream_id], model.names, status) for s in streams
+            }
+
+        total_frames = sum(s.frames for s in streams)
+        aggregate = {
+            "aggregate/frames": float(total_frames),
+            "aggregate/detections": float(sum(s.detections for s in streams)),
+            "aggregate/wall_s": wall_s,
+            "aggregate/throughput_fps": total_frames / wall_s if wall_s > 0 else 0.0,
+            "aggregate/streams_per_batch_mean": streams_per_batch / throughput.batches if throughput.batches else 0.0,
+        }
+        aggregate.update(throughput.metrics())
+        for stream_id, summary in per_stream.items():
+            aggregate[f"{stream_id}/frames_processed"] = summary["frames_processed"]
+        sink.log_metrics(aggregate)
+        print(
+            f"✅ {len(streams)} streams, {total_frames} frames, {wall_s:.1f}s → "
+            f"{aggregate['aggregate/throughput_fps']:.1f} FPS (batch={args.batch_size}, schedule={args.schedule})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
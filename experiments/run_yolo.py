@@ -1,42 +1,167 @@
 import os
 os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
 
+import shutil
+import sys
+import tempfile
+import time
 from contextlib import nullcontext
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 
 import cv2
 import mlflow
 import torch
 from ultralytics import YOLO
 
+# 프로젝트 루트를 Python 경로에 추가 (utils 패키지)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.backends import DEFAULT_CACHE_DIR, load_backend_model, parity_check
+from utils.cascade import CascadeDetector
+from utils.detection_cache import (
+    DEFAULT_CACHE_DIR as DEFAULT_DETECTION_CACHE_DIR,
+    DEFAULT_CONF_FLOOR,
+    DetectionCache,
+    cache_key,
+    cached_results,
+    video_hash,
+)
+from utils.detection_store import DetectionStoreWriter
+from utils.detections import ClassCounter, FrameDetections, label_of, write_mot_rows
+from utils.frame_ring import FrameRing
+from utils.metric_sink import BufferedMetricSink
+from utils.mot_eval import MOTSequence, StreamingMOTEvaluator
+from utils.sharding import ShardConfig, ShardedVideoRunner, concat_videos, mp4_keyframes, plan_shards
+from utils.slo_controller import LatencySLOController, imgsz_ladder
+from utils.stage_timer import EndToEndClock, StageTimers
+from utils.streaming_stats import StreamSummary
+from utils.system_sampler import SystemMetricsSampler
+from utils.tracking import make_tracker
+from utils.video_pipeline import (
+    AnnotatedVideoWriter,
+    BatchThroughput,
+    FramePipeline,
+    VideoFrameReader,
+    iter_batches,
+    resolve_source,
+)
+
 # System metrics: True면 GPU/CPU/메모리 수집 후 MLflow "System metrics"에 step별·요약 로깅
+# 샘플링은 별도 스레드가 SYSTEM_METRICS_INTERVAL_S초마다 (wall time) → 추론 루프는 최신 스냅샷만 읽음
 LOG_SYSTEM_METRICS = True
-SYSTEM_METRICS_EVERY_N_FRAMES = 10  # N프레임마다 샘플 (오버헤드 완화)
+SYSTEM_METRICS_INTERVAL_S = 1.0
+SYSTEM_METRICS_EVERY_N_FRAMES = 10  # N프레임마다 최신 스냅샷을 step 메트릭으로 로깅
+# step 메트릭은 버퍼에 모아 백그라운드에서 log_batch (N개 또는 N초마다 flush)
+METRIC_FLUSH_SIZE = 500
+METRIC_FLUSH_INTERVAL_S = 5.0
 
 OUTPUT_VIDEO = Path("experiments") / "yolo_output.mp4"
 FPS = 30.0
-MAX_FRAMES = 300  # OOM 방지: 처리할 최대 프레임 (약 10초)
-SKIP_FRAMES = 2   # N장마다 1장만 처리 (메모리·시간 절약)
-IMGSZ = 640       # 추론 해상도 (작을수록 VRAM 절약)
-CONF = 0.5
-MODEL_WEIGHT = "yolo11n.pt"
-VIDEO_SOURCE = "https://www.youtube.com/watch?v=Fb1e6ytEniA"
+# 입력·모델 설정 (bench_inference.py가 조합마다 환경 변수로 지정). 예: IMGSZ=320 SKIP_FRAMES=1 MAX_FRAMES=150
+MAX_FRAMES = int(os.environ.get("MAX_FRAMES", "300"))  # OOM 방지: 처리할 최대 프레임 (약 10초)
+SKIP_FRAMES = int(os.environ.get("SKIP_FRAMES", "2"))  # N장마다 1장만 처리 (건너뛴 프레임은 grab만 → BGR 변환·추론 생략)
+IMGSZ = int(os.environ.get("IMGSZ", "640"))  # 추론 해상도 (작을수록 VRAM 절약)
+CONF = float(os.environ.get("CONF", "0.5"))
+MODEL_WEIGHT = os.environ.get("MODEL_WEIGHT", "yolo11n.pt")
+# 추론 백엔드: pytorch | onnx | openvino | torchscript. 예: BACKEND=onnx
+# pytorch 외에는 (가중치 해시, 백엔드, imgsz, batch)별로 한 번만 export → EXPORT_CACHE_DIR에 캐시
+BACKEND = os.environ.get("BACKEND", "pytorch")
+EXPORT_CACHE_DIR = Path(os.environ.get("EXPORT_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+# export 백엔드일 때 처음 N프레임에서 PyTorch 출력과 비교 (parity/* 메트릭). 0이면 생략
+PARITY_CHECK_FRAMES = int(os.environ.get("PARITY_CHECK_FRAMES", "0"))
+VIDEO_SOURCE = os.environ.get("VIDEO_SOURCE", "https://www.youtube.com/watch?v=Fb1e6ytEniA")
+CACHE_VIDEO = Path("experiments") / "input_video.mp4"  # URL을 OpenCV로 못 열 때 yt-dlp 다운로드 위치
 # RTX 5080/5090 (Blackwell sm_120): PyTorch 나이틀리 cu128 필요
 # pip install --pre torch torchvision torchaudio --index-url https://download.pytorch.org/whl/nightly/cu128
 
+# 검출마다 콘솔 출력 (디버그용, 박스가 많으면 느려짐). 예: VERBOSE_DETECTIONS=1
+VERBOSE_DETECTIONS = os.environ.get("VERBOSE_DETECTIONS", "0") == "1"
+
+# Pipelined: decode 스레드 → 추론 → annotate/encode 스레드 (bounded queue). 예: PIPELINED=1
+# 멀티코어 CPU에서 디코딩·박스 그리기·인코딩을 모델 연산과 겹침. 스테이지별 큐 대기 시간을 pipeline/*로 로깅.
+PIPELINED = os.environ.get("PIPELINED", "0") == "1"
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "8"))
+# Micro-batch: BATCH_SIZE장(또는 BATCH_MAX_WAIT_S초)씩 모아 한 번의 forward. 오프라인 영상용. 예: BATCH_SIZE=8
+# 결과는 프레임 순서대로 풀어서 프레임별 로깅/MOT 출력 (트래킹도 프레임 순서대로 tracker에 들어감)
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "1"))
+BATCH_MAX_WAIT_S = float(os.environ.get("BATCH_MAX_WAIT_S", "0.5"))
+# Frame ring: 디코딩을 별도 프로세스로 → 공유 메모리 링 버퍼 슬롯에 직접 기록, 추론 쪽은 복사 없는 view로 읽고
+# encode 후 슬롯 반환 (프레임마다 배열 할당·복사 없음, 디코더가 GIL을 나눠 쓰지 않음). 예: FRAME_RING=1
+# 슬롯 수 0이면 batch·pipeline 큐에 동시에 머무를 수 있는 프레임 수로 자동
+FRAME_RING = os.environ.get("FRAME_RING", "0") == "1"
+FRAME_RING_SLOTS = int(os.environ.get("FRAME_RING_SLOTS", "0"))
+# Sharded: 로컬 영상을 keyframe 경계로 SHARDS개 구간으로 나눠 워커 프로세스(SHARD_WORKERS개, 각자 모델 인스턴스)에서
+# 병렬 처리 → 검출·메트릭·annotated 영상 구간을 프레임 순서대로 병합. 예: SHARDS=4
+# 트래킹이면 구간마다 SHARD_OVERLAP_FRAMES 처리 프레임을 겹쳐 처리하고 겹친 구간의 IoU로 경계 track ID를 이어 붙임
+SHARDS = int(os.environ.get("SHARDS", "1"))
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", str(SHARDS)))
+SHARD_OVERLAP_FRAMES = int(os.environ.get("SHARD_OVERLAP_FRAMES", "10"))
+# Latency SLO: 목표를 주면 IMGSZ·SKIP_FRAMES를 고정값 대신 실행 중 조절 (호스트마다 손으로 맞추지 않음)
+# SLO_TARGET_MS: 처리 프레임당 추론 지연 목표 / SLO_TARGET_FPS: 원본 영상 기준 처리 속도 목표 (예: 30 = 실시간)
+# 최근 SLO_WINDOW 프레임 지연의 SLO_QUANTILE 분위수로 판단, 목표 ±SLO_HYSTERESIS 안에서는 유지 (진동 방지)
+# imgsz는 SLO_IMGSZ_MIN~IMGSZ(SLO_IMGSZ_STEP 간격), stride는 SLO_STRIDE_MIN~SLO_STRIDE_MAX. 예: SLO_TARGET_FPS=30
+SLO_TARGET_MS = float(os.environ.get("SLO_TARGET_MS", "0"))
+SLO_TARGET_FPS = float(os.environ.get("SLO_TARGET_FPS", "0"))
+SLO_IMGSZ_MIN = int(os.environ.get("SLO_IMGSZ_MIN", "320"))
+SLO_IMGSZ_STEP = int(os.environ.get("SLO_IMGSZ_STEP", "64"))
+SLO_STRIDE_MIN = int(os.environ.get("SLO_STRIDE_MIN", "1"))
+SLO_STRIDE_MAX = int(os.environ.get("SLO_STRIDE_MAX", "8"))
+SLO_WINDOW = int(os.environ.get("SLO_WINDOW", "30"))
+SLO_QUANTILE = float(os.environ.get("SLO_QUANTILE", "0.9"))
+SLO_HYSTERESIS = float(os.environ.get("SLO_HYSTERESIS", "0.15"))
+# Cascade: MODEL_WEIGHT(작은 모델)는 매 프레임, CASCADE_LARGE_WEIGHT(큰 모델)는 작은 모델 결과가 애매한 프레임에서만
+# 애매함 = conf가 CASCADE_LOW_CONF~CASCADE_HIGH_CONF 사이이거나 같은 자리에 다른 클래스 박스가 겹침
+# CASCADE_MODE=crop: 애매한 박스 주변만 잘라 큰 모델(CASCADE_CROP_IMGSZ)로 확인 (CASCADE_MAX_CROPS개 초과면 그 프레임은 frame)
+# CASCADE_MODE=frame: 프레임 전체를 큰 모델로
+# CASCADE_AUDIT_EVERY=N: N 프레임마다 큰 모델을 전체 프레임에 돌려 두 모델 일치도만 측정. 예: CASCADE_LARGE_WEIGHT=yolo11x.pt
+CASCADE_LARGE_WEIGHT = os.environ.get("CASCADE_LARGE_WEIGHT", "")
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "crop")
+CASCADE_LOW_CONF = float(os.environ.get("CASCADE_LOW_CONF", "0.25"))
+CASCADE_HIGH_CONF = float(os.environ.get("CASCADE_HIGH_CONF", "0.6"))
+CASCADE_CROP_IMGSZ = int(os.environ.get("CASCADE_CROP_IMGSZ", "320"))
+CASCADE_MAX_CROPS = int(os.environ.get("CASCADE_MAX_CROPS", "8"))
+CASCADE_AUDIT_EVERY = int(os.environ.get("CASCADE_AUDIT_EVERY", "0"))
+
+# Stage timing: decode/infer/copy/postprocess/log/draw/encode 구간별 p50/p99·wall time 비중 → stage/* 메트릭
+# + Chrome trace(stats/stage_trace.json, chrome://tracing 또는 Perfetto에서 열기). 끄려면 STAGE_TIMING=0
+STAGE_TIMING = os.environ.get("STAGE_TIMING", "1") == "1"
+STAGE_TRACE_EVENTS = int(os.environ.get("STAGE_TRACE_EVENTS", "100000"))  # trace 이벤트 보관 상한 (0이면 trace 생략)
+# e2e/fps에서 뺄 처음 프레임 수 (배치 경계로 올림, 모델 첫 호출·cudnn 튜닝 등 제외). 예: E2E_WARMUP_FRAMES=10
+E2E_WARMUP_FRAMES = int(os.environ.get("E2E_WARMUP_FRAMES", "0"))
+
+# Detection store: 모든 검출을 Parquet(row group 단위, 백그라운드 writer)으로 저장 → detections/ 아티팩트
+# frame_idx, timestamp_s, track_id, x1..y2, conf, cls, source_id, model_hash. 클래스·신뢰도 분석과 MOT export는 utils/detection_store.py
+DETECTION_STORE = os.environ.get("DETECTION_STORE", "1") == "1"
+DETECTION_STORE_PATH = Path("experiments") / "detections.parquet"
+DETECTION_ROW_GROUP_SIZE = int(os.environ.get("DETECTION_ROW_GROUP_SIZE", "50000"))
+
 # MOT 평가: True면 model.track() + MOT 포맷 출력. 로컬 영상 권장 (URL은 OpenCV에서 실패할 수 있음).
 USE_TRACKING = False
+TRACKER = "botsort.yaml"  # Ultralytics model.track() 기본값
+
+# Detection cache: (영상 해시, 가중치 해시, imgsz, backend, skip, max_frames)가 같으면 검출기 대신 캐시 재생
+# 캐시는 DETECTION_CACHE_CONF_FLOOR 이상 원시 검출을 저장 → CONF·tracker·MOT 평가만 바꾼 재실행은 추론 없음
+# 캐시 사용 시 트래킹은 model.track 대신 검출 결과에 tracker를 직접 적용 (hit/miss 결과 동일)
+# 기본 꺼짐: 켜면 miss에도 floor conf로 추론하고 트래킹 경로가 바뀌므로 반복 실험에서만 명시적으로
+# 예: DETECTION_CACHE=1
+DETECTION_CACHE = os.environ.get("DETECTION_CACHE", "0") == "1"
+DETECTION_CACHE_DIR = Path(os.environ.get("DETECTION_CACHE_DIR", str(DEFAULT_DETECTION_CACHE_DIR)))
+DETECTION_CACHE_MAX_GB = float(os.environ.get("DETECTION_CACHE_MAX_GB", "5"))
+DETECTION_CACHE_CONF_FLOOR = float(os.environ.get("DETECTION_CACHE_CONF_FLOOR", str(DEFAULT_CONF_FLOOR)))
 MOT_PREDICTIONS_PATH = Path("experiments") / "mot_predictions.txt"
-# Ground truth (MOT 포맷) 경로 지정 시 motmetrics로 MOTA/IDF1 등 계산 후 MLflow 로깅. 예: MOT_GT_PATH=./gt/gt.txt
+# Ground truth (MOT 포맷) 경로 지정 시 프레임마다 스트리밍 평가(MOTA/IDF1/HOTA 등) 후 MLflow 로깅. 예: MOT_GT_PATH=./gt/gt.txt
 MOT_GT_PATH = os.environ.get("MOT_GT_PATH", "")
+# 스트리밍 평가 중간 값(mot_step/*)을 N 프레임마다 step 메트릭으로 (0이면 최종 값만)
+MOT_EVAL_LOG_EVERY = int(os.environ.get("MOT_EVAL_LOG_EVERY", "100"))
 
 DEVICE: int | str = 0 if torch.cuda.is_available() else "cpu"
 print(f"🔍 Using device: {DEVICE}")
 
-EXPERIMENT_NAME = "yolo-video-inference"
-# Model Registry: True면 Run 종료 시 모델을 "Models"에 등록 (yolo-video-inference)
-REGISTER_MODEL = True
+EXPERIMENT_NAME = os.environ.get("MLFLOW_EXPERIMENT", "yolo-video-inference")
+# Model Registry: 1이면 Run 종료 시 모델을 "Models"에 등록 (yolo-video-inference). 예: REGISTER_MODEL=0
+REGISTER_MODEL = os.environ.get("REGISTER_MODEL", "1") == "1"
 REGISTERED_MODEL_NAME = "yolo-video-inference"
 # Traces: True면 MLflow Traces 탭에 load_model / inference_loop / write_output / mot_evaluation span 기록
 ENABLE_TRACES = True
@@ -56,111 +181,96 @@ def _start_span(name: str):
             return nullcontext()
 
 
-def _iter_frames_and_results(
+def _infer_frames(
     model: YOLO,
-    source: str,
-    max_frames: int,
-    skip_frames: int,
+    frames: Iterable[tuple[int, object]],
     conf: float,
     imgsz: int,
     device: int | str,
     use_tracking: bool,
+    batch_size: int = 1,
+    max_wait_s: float | None = None,
+    throughput: BatchThroughput | None = None,
+    timers: StageTimers | None = None,
+    slo: LatencySLOController | None = None,
 ) -> Iterator[tuple[object, object]]:
-    """프레임과 YOLO 결과를 스트리밍. use_tracking이면 track(persist=True), 아니면 predict(stream=True)."""
+    """
+    디코딩된 (frame_idx, frame)을 batch_size장씩 묶어 track(persist=True) 또는 predict 한 번에 실행,
+    결과를 프레임 순서대로 (frame, result)로 반환. 트래킹은 단일 tracker에 배치 내 순서대로 들어감.
+    slo가 있으면 배치마다 그 시점의 slo.imgsz로 추론. result.frame_idx = 원본 프레임 인덱스.
+    """
+    call = model.track if use_tracking else model.predict
+    kwargs = {"persist": True} if use_tracking else {}
+    infer_span = timers.stage("infer") if timers is not None else nullcontext()
     if use_tracking:
-        cap = cv2.VideoCapture(source)
-        if not cap.isOpened():
-            print("⚠️ 트래킹 모드: 영상 열기 실패(로컬 파일 경로 권장). detection 모드로 진행.")
-            use_tracking = False
-        else:
-            frame_idx = 0
-            while frame_idx < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                if frame_idx % skip_frames == 0:
-                    result = model.track(
-                        frame,
-                        persist=True,
-                        conf=conf,
-                        save=False,
-                        show=False,
-                        imgsz=imgsz,
-                        device=device,
-                    )
-                    if result and len(result) > 0:
-                        result[0].orig_img = frame
-                        yield frame, result[0]
-                frame_idx += 1
-            cap.release()
-            return
-    if not use_tracking:
-        results = model.predict(
-            source=source,
-            stream=True,
-            conf=conf,
-            save=False,
-            show=False,
-            imgsz=imgsz,
-            device=device,
-        )
-        count = 0
-        for idx, result in enumerate(results):
-            if count >= max_frames:
-                break
-            if idx % skip_frames != 0:
-                continue
-            count += 1
-            yield result.orig_img.copy(), result
-
-
-def _get_system_metrics(device_id: int = 0) -> dict[str, float]:
-    """GPU(pynvml)·프로세스(psutil) 메트릭 수집. sys/* 키로 반환."""
-    out: dict[str, float] = {}
-    try:
-        import psutil
-        p = psutil.Process()
-        out["sys/cpu_percent"] = p.cpu_percent() or 0.0
-        out["sys/memory_rss_mb"] = p.memory_info().rss / (1024 * 1024)
-        out["sys/memory_vms_mb"] = p.memory_info().vms / (1024 * 1024)
-    except Exception:
-        pass
-    if not torch.cuda.is_available():
-        return out
-    try:
-        import pynvml
-        try:
-            pynvml.nvmlInit()
-        except Exception:
-            pass  # 이미 초기화됨
-        handle = pynvml.nvmlDeviceGetHandleByIndex(device_id)
-        mem = pynvml.nvmlDeviceGetMemoryInfo(handle)
-        util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-        out["sys/gpu_memory_used_mb"] = mem.used / (1024 * 1024)
-        out["sys/gpu_memory_total_mb"] = mem.total / (1024 * 1024)
-        out["sys/gpu_utilization_pct"] = float(util.gpu)
-        try:
-            out["sys/gpu_temperature_c"] = float(pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU))
-        except Exception:
-            pass
-        try:
-            out["sys/gpu_power_w"] = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0  # mW → W
-        except Exception:
-            pass
-    except Exception:
-        pass
-    return out
+        kwargs["tracker"] = TRACKER
+    for batch in iter_batches(frames, batch_size, max_wait_s):
+        imgs = [frame for _, frame in batch]
+        t0 = time.perf_counter()
+        with infer_span:
+            results = call(
+                imgs if len(imgs) > 1 else imgs[0],
+                conf=conf,
+                save=False,
+                show=False,
+                imgsz=slo.imgsz if slo is not None else imgsz,
+                device=device,
+                **kwargs,
+            )
+        if throughput is not None:
+            throughput.record(len(imgs), time.perf_counter() - t0)
+        for (frame_idx, frame), result in zip(batch, results or []):
+            result.orig_img = frame
+            result.frame_idx = frame_idx
+            yield frame, result
 
 
-def _write_mot_line(f: object, frame_id: int, track_id: int, x1: float, y1: float, w: float, h: float, conf: float) -> None:
-    """MOT Challenge 포맷: frame,id,x,y,w,h,conf,-1,-1,-1. motmetrics load 시 (1,1) 보정하므로 x,y는 1-based."""
-    f.write(f"{frame_id},{track_id},{x1+1:.2f},{y1+1:.2f},{w:.2f},{h:.2f},{conf:.4f},-1,-1,-1\n")
+def _predict_images(model, images: list, conf: float, imgsz: int, device) -> list:
+    """이미지 묶음 추론 (cascade 큰 모델). export 백엔드는 batch 1로 export되므로 한 장씩."""
+    if not images:
+        return []
+    if BACKEND == "pytorch":
+        return model.predict(images, conf=conf, imgsz=imgsz, device=device, verbose=False)
+    return [r for image in images for r in model.predict(image, conf=conf, imgsz=imgsz, device=device, verbose=False)]
+
+
+def _iter_frames_and_results(
+    model: YOLO,
+    source: str,
+    max_frames: int,
+    skip_frames: int,
+    conf: float,
+    imgsz: int,
+    device: int | str,
+) -> Iterator[tuple[object, object]]:
+    """OpenCV로 열 수 없는 source용 fallback: Ultralytics 로더로 predict(stream=True).
+    vid_stride로 로더 단계에서 프레임을 건너뛰므로 skip 프레임은 추론하지 않음."""
+    results = model.predict(
+        source=source,
+        stream=True,
+        conf=conf,
+        save=False,
+        show=False,
+        imgsz=imgsz,
+        device=device,
+        vid_stride=skip_frames,
+    )
+    for count, result in enumerate(results):
+        if count >= max_frames:
+            break
+        yield result.orig_img.copy(), result
 
 
 mlflow.set_experiment(EXPERIMENT_NAME)
 
 # log_system_metrics=True → MLflow 내장 수집기가 system/* 메트릭을 "System metrics" 탭에 표시
-with mlflow.start_run(run_name="yolo11n-youtube-inference", log_system_metrics=True):
+# step 메트릭은 BufferedMetricSink로 → 블록 종료(예외 포함) 시 남은 메트릭 flush
+with (
+    mlflow.start_run(run_name="yolo11n-youtube-inference", log_system_metrics=True) as run,
+    BufferedMetricSink(
+        run.info.run_id, flush_size=METRIC_FLUSH_SIZE, flush_interval_s=METRIC_FLUSH_INTERVAL_S
+    ) as sink,
+):
     mlflow.log_params({
         "model": MODEL_WEIGHT,
         "source": VIDEO_SOURCE,
@@ -171,182 +281,512 @@ with mlflow.start_run(run_name="yolo11n-youtube-inference", log_system_metrics=T
         "fps": FPS,
         "device": str(DEVICE),
         "use_tracking": USE_TRACKING,
+        "pipelined": PIPELINED,
+        "batch_size": BATCH_SIZE,
+        "batch_max_wait_s": BATCH_MAX_WAIT_S,
+        "frame_ring": FRAME_RING,
+        "shards": SHARDS,
+        "slo_target_ms": SLO_TARGET_MS,
+        "slo_target_fps": SLO_TARGET_FPS,
+        "cascade_large_weight": CASCADE_LARGE_WEIGHT or "none",
+        "e2e_warmup_frames": E2E_WARMUP_FRAMES,
+        "export_cache_dir": str(EXPORT_CACHE_DIR),
+        "system_metrics_interval_s": SYSTEM_METRICS_INTERVAL_S,
+        "metric_flush_size": METRIC_FLUSH_SIZE,
+        "metric_flush_interval_s": METRIC_FLUSH_INTERVAL_S,
     })
 
     print("🚀 데이터셋 준비 중...")
+    timers = StageTimers(enabled=STAGE_TIMING, trace_events=STAGE_TRACE_EVENTS)
+    video_out = AnnotatedVideoWriter(OUTPUT_VIDEO, FPS, timers)
+    pipeline: FramePipeline | None = None
+    reader: VideoFrameReader | FrameRing | None = None
+    frame_ring: FrameRing | None = None
+    sharded: ShardedVideoRunner | None = None
+    slo: LatencySLOController | None = None
+    cascade: CascadeDetector | None = None
+    large_model = None
+    det_cache_writer = None
+    throughput = BatchThroughput(sink)
     _span = _start_span("load_model")
     with _span:
-        model = YOLO(MODEL_WEIGHT)
-        results_iter = _iter_frames_and_results(
-            model, VIDEO_SOURCE, MAX_FRAMES, SKIP_FRAMES, CONF, IMGSZ, DEVICE, USE_TRACKING
-        )
-    print(f"🎥 영상 추론 시작: {VIDEO_SOURCE} (최대 {MAX_FRAMES} frames, {SKIP_FRAMES}장마다 1장)")
+        model, backend_info = load_backend_model(MODEL_WEIGHT, BACKEND, IMGSZ, BATCH_SIZE, EXPORT_CACHE_DIR)
+        mlflow.log_params(backend_info.params())
+        mlflow.set_tag("export_cache", backend_info.cache_tag)
+        sink.log_metrics(backend_info.metrics())
+        print(f"✅ Backend: {BACKEND} ({backend_info.model_path}, export cache: {backend_info.cache_tag})")
+        if CASCADE_LARGE_WEIGHT:
+            # 큰 모델은 crop 묶음·단일 프레임 단위로 호출 (export 백엔드는 batch 1, 입력 크기 IMGSZ 고정)
+            large_model, large_info = load_backend_model(CASCADE_LARGE_WEIGHT, BACKEND, IMGSZ, 1, EXPORT_CACHE_DIR)
+            if large_model.names != model.names:
+                raise ValueError(f"cascade 두 모델의 클래스가 다릅니다: {MODEL_WEIGHT} vs {CASCADE_LARGE_WEIGHT}")
+            mlflow.log_params({f"cascade_large_{k}": v for k, v in large_info.params().items()})
+            print(f"✅ Cascade 큰 모델: {large_info.model_path}")
+        # detection·tracking 모두 OpenCV 디코딩 + grab 기반 skip (skip 프레임은 추론 안 함)
+        source = resolve_source(VIDEO_SOURCE, CACHE_VIDEO)
+        cap = cv2.VideoCapture(source)
+        if BACKEND != "pytorch" and PARITY_CHECK_FRAMES > 0:
+            parity_cap = cv2.VideoCapture(source)
+            parity_frames = [f for _, f in VideoFrameReader(parity_cap, PARITY_CHECK_FRAMES, SKIP_FRAMES)]
+            parity_cap.release()
+            if parity_frames:
+                parity = parity_check(YOLO(MODEL_WEIGHT), model, parity_frames, IMGSZ, CONF, DEVICE)
+                sink.log_metrics(parity)
+                print(f"✅ PyTorch 대비 parity: {parity}")
+        slo_enabled = SLO_TARGET_MS > 0 or SLO_TARGET_FPS > 0
+        if cap.isOpened() and SHARDS > 1 and Path(source).is_file():
+            # 구간별 워커가 디코딩·추론·annotate를 맡고 여기서는 검출만 받아 프레임 순서대로 로깅·평가
+            if PIPELINED:
+                print("⚠️ Sharded 모드: 워커별로 처리하므로 PIPELINED는 사용하지 않습니다.")
+            if slo_enabled:
+                print("⚠️ Sharded 모드: 구간마다 설정이 고정되므로 Latency SLO는 사용하지 않습니다.")
+            if large_model is not None:
+                print("⚠️ Sharded 모드: 워커는 MODEL_WEIGHT만 실행하므로 Cascade는 사용하지 않습니다.")
+            src_fps = cap.get(cv2.CAP_PROP_FPS) or FPS
+            keyframes = mp4_keyframes(source)
+            overlap = SHARD_OVERLAP_FRAMES if USE_TRACKING else 0
+            shards = plan_shards(
+                min(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), MAX_FRAMES * SKIP_FRAMES), SHARDS, SKIP_FRAMES, overlap, keyframes
+            )
+            shard_dir = Path(tempfile.mkdtemp(prefix="gaflow-shards-"))
+            sharded = ShardedVideoRunner(shards, ShardConfig(
+                source=source,
+                weights=MODEL_WEIGHT,
+                backend=BACKEND,
+                imgsz=IMGSZ,
+                conf=CONF,
+                device=DEVICE,
+                batch_size=BATCH_SIZE,
+                skip_frames=SKIP_FRAMES,
+                tracker=TRACKER if USE_TRACKING else None,
+                frame_rate=round(src_fps / SKIP_FRAMES),
+                export_cache_dir=str(EXPORT_CACHE_DIR),
+                work_dir=str(shard_dir),
+                fps=FPS,
+            ), SHARD_WORKERS, overlap)
+            mlflow.log_params({
+                "shard_count": len(shards),
+                "shard_workers": sharded.workers,
+                "shard_overlap_frames": overlap,
+                "shard_keyframes": "stss" if keyframes else "uniform",
+            })
+            results_iter = sharded.results(
+                model.names, (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))), VIDEO_SOURCE
+            )
+            print(f"✅ Sharded: {len(shards)}개 구간 × {sharded.workers} workers (keyframes: {'stss' if keyframes else '균등 분할'})")
+        elif cap.isOpened():
+            if slo_enabled:
+                # export 백엔드는 입력 크기가 export 시점에 고정 → stride만 조절
+                levels = imgsz_ladder(SLO_IMGSZ_MIN, IMGSZ, SLO_IMGSZ_STEP) if BACKEND == "pytorch" else [IMGSZ]
+                slo = LatencySLOController(
+                    levels,
+                    IMGSZ,
+                    SKIP_FRAMES,
+                    SLO_STRIDE_MIN,
+                    SLO_STRIDE_MAX,
+                    target_ms=SLO_TARGET_MS,
+                    target_fps=SLO_TARGET_FPS,
+                    window=SLO_WINDOW,
+                    quantile=SLO_QUANTILE,
+                    hysteresis=SLO_HYSTERESIS,
+                )
+                mlflow.log_params({
+                    "slo_imgsz_levels": ",".join(map(str, slo.levels)),
+                    "slo_stride_min": slo.stride_min,
+                    "slo_stride_max": slo.stride_max,
+                    "slo_window": SLO_WINDOW,
+                    "slo_quantile": SLO_QUANTILE,
+                    "slo_hysteresis": SLO_HYSTERESIS,
+                })
+                # writer fps는 첫 프레임에서 고정 → 시작 stride 기준 (원본 fps / stride). 실행 중 stride가 바뀐 구간은 재생 속도가 어긋남
+                video_out.fps = (cap.get(cv2.CAP_PROP_FPS) or FPS) / slo.stride
+                mlflow.log_param("output_video_fps", round(video_out.fps, 3))
+                sink.log_metrics(slo.state(), step=0)
+                print(
+                    f"✅ Latency SLO: 목표 {f'{SLO_TARGET_MS:g} ms/frame ' if SLO_TARGET_MS > 0 else ''}"
+                    f"{f'{SLO_TARGET_FPS:g} fps(원본 기준) ' if SLO_TARGET_FPS > 0 else ''}"
+                    f"→ imgsz {slo.levels}, stride {slo.stride_min}~{slo.stride_max} (시작 {slo.imgsz}, {slo.stride})"
+                )
+                if FRAME_RING:
+                    print("⚠️ Latency SLO: stride를 바꿔야 하므로 FRAME_RING은 사용하지 않습니다.")
+            if FRAME_RING and slo is None:
+                # 슬롯이 모자라면 디코더가 release를 기다리는 동안 배치가 차지 않아 멈추므로 동시에 잡힐 수 있는 프레임 수 이상
+                in_flight = BATCH_SIZE + 2 + (2 * PIPELINE_QUEUE_SIZE + 2 if PIPELINED else 0)
+                frame_ring = FrameRing(source, MAX_FRAMES, SKIP_FRAMES, slots=max(FRAME_RING_SLOTS, in_flight))
+                video_out.on_written = frame_ring.release
+                reader = frame_ring
+                print(f"✅ Frame ring: 디코더 프로세스 + 공유 메모리 {frame_ring.slots} 슬롯 ({frame_ring.shape[1]}x{frame_ring.shape[0]})")
+            else:
+                reader = VideoFrameReader(cap, MAX_FRAMES, slo.stride if slo is not None else SKIP_FRAMES)
+            frames = timers.wrap_iter("decode", reader)
+            if PIPELINED:
+                pipeline = FramePipeline(frames, video_out, PIPELINE_QUEUE_SIZE)
+                frames = pipeline
+            det_cache_key = None
+            if DETECTION_CACHE and slo is None and large_model is None and Path(source).is_file() and DETECTION_CACHE_CONF_FLOOR <= CONF:
+                det_cache = DetectionCache(DETECTION_CACHE_DIR, int(DETECTION_CACHE_MAX_GB * 1024**3))
+                det_cache_key = cache_key(
+                    video_hash=video_hash(source, DETECTION_CACHE_DIR),
+                    weights_hash=backend_info.weights_hash,
+                    imgsz=IMGSZ,
+                    backend=BACKEND,
+                    skip_frames=SKIP_FRAMES,
+                    max_frames=MAX_FRAMES,
+                    conf_floor=DETECTION_CACHE_CONF_FLOOR,
+                )
+            if det_cache_key is not None:
+                cached = det_cache.lookup(det_cache_key)
+                det_cache_writer = None if cached is not None else det_cache.writer(
+                    det_cache_key, {"source": VIDEO_SOURCE, "weights_hash": backend_info.weights_hash}
+                )
+                src_fps = cap.get(cv2.CAP_PROP_FPS) or FPS
+                results_iter = cached_results(
+                    frames,
+                    lambda fr: _infer_frames(
+                        model, fr, DETECTION_CACHE_CONF_FLOOR, IMGSZ, DEVICE, False,
+                        BATCH_SIZE, BATCH_MAX_WAIT_S, throughput, timers,
+                    ),
+                    CONF,
+                    model.names,
+                    cached=cached,
+                    writer=det_cache_writer,
+                    tracker=make_tracker(TRACKER, frame_rate=round(src_fps / SKIP_FRAMES)) if USE_TRACKING else None,
+                    path=VIDEO_SOURCE,
+                )
+                mlflow.set_tag("detection_cache", "hit" if cached is not None else "miss")
+                mlflow.log_param("detection_cache_key", det_cache_key)
+                sink.log_metric("detection_cache_hit", float(cached is not None))
+                print(f"✅ Detection cache {'hit → 추론 생략' if cached is not None else 'miss → 추론 후 저장'}: {det_cache_key}")
+            elif large_model is not None:
+                # 작은 모델은 CASCADE_LOW_CONF까지 검출 (애매한 박스 판단용), 최종 CONF 필터·트래킹은 병합 후에
+                src_fps = cap.get(cv2.CAP_PROP_FPS) or FPS
+                cascade = CascadeDetector(
+                    lambda images, size: _predict_images(large_model, images, CONF, size, DEVICE),
+                    model.names,
+                    CONF,
+                    low_conf=CASCADE_LOW_CONF,
+                    high_conf=CASCADE_HIGH_CONF,
+                    mode=CASCADE_MODE,
+                    imgsz=IMGSZ,
+                    crop_imgsz=CASCADE_CROP_IMGSZ if BACKEND == "pytorch" else IMGSZ,
+                    max_crops=CASCADE_MAX_CROPS,
+                    audit_every=CASCADE_AUDIT_EVERY,
+                    tracker=make_tracker(TRACKER, frame_rate=round(src_fps / SKIP_FRAMES)) if USE_TRACKING else None,
+                    path=VIDEO_SOURCE,
+                )
+                mlflow.log_params({
+                    "cascade_mode": CASCADE_MODE,
+                    "cascade_low_conf": CASCADE_LOW_CONF,
+                    "cascade_high_conf": CASCADE_HIGH_CONF,
+                    "cascade_crop_imgsz": cascade.crop_imgsz,
+                    "cascade_max_crops": CASCADE_MAX_CROPS,
+                    "cascade_audit_every": CASCADE_AUDIT_EVERY,
+                })
+                results_iter = cascade.run(_infer_frames(
+                    model, frames, CASCADE_LOW_CONF, IMGSZ, DEVICE, False, BATCH_SIZE, BATCH_MAX_WAIT_S, throughput, timers, slo
+                ))
+                print(
+                    f"✅ Cascade ({CASCADE_MODE}): conf {CASCADE_LOW_CONF:g}~{CASCADE_HIGH_CONF:g} 구간 검출이 있으면 "
+                    f"{CASCADE_LARGE_WEIGHT}로 확인"
+                )
+            else:
+                results_iter = _infer_frames(
+                    model, frames, CONF, IMGSZ, DEVICE, USE_TRACKING, BATCH_SIZE, BATCH_MAX_WAIT_S, throughput, timers, slo
+                )
+        else:
+            if USE_TRACKING:
+                print("⚠️ 트래킹 모드: 영상 열기 실패(로컬 파일 경로 권장). detection 모드로 진행.")
+            if PIPELINED or BATCH_SIZE > 1:
+                print("⚠️ Pipelined/배치 모드: 영상 열기 실패. 순차 모드로 진행.")
+            if large_model is not None:
+                print("⚠️ Cascade: 영상 열기 실패. 작은 모델만으로 진행.")
+            # fallback은 Ultralytics 로더가 디코딩+추론을 함께 하므로 decode_infer 한 스테이지로 측정
+            results_iter = timers.wrap_iter("decode_infer", _iter_frames_and_results(
+                model, VIDEO_SOURCE, MAX_FRAMES, SKIP_FRAMES, CONF, IMGSZ, DEVICE
+            ))
+    print(f"🎥 영상 추론 시작: {VIDEO_SOURCE} (최대 {MAX_FRAMES} frames, {SKIP_FRAMES}장마다 1장, batch={BATCH_SIZE})")
 
-    writer: cv2.VideoWriter | None = None
     frame_count = 0
     total_detections = 0
-    detections_per_class: dict[str, int] = {}
-    all_confidences: list[float] = []
-    speed_preprocess: list[float] = []
-    speed_inference: list[float] = []
-    speed_postprocess: list[float] = []
+    class_counter = ClassCounter()
+    # 상수 메모리 스트리밍 통계 (평균/분산/min/max + p50/p95/p99)
+    conf_stats = StreamSummary(hist_range=(0.0, 1.0))
+    speed_preprocess = StreamSummary()
+    speed_inference = StreamSummary()
+    speed_postprocess = StreamSummary()
+    store: DetectionStoreWriter | None = None
+    if DETECTION_STORE:
+        store = DetectionStoreWriter(
+            DETECTION_STORE_PATH,
+            source_id=VIDEO_SOURCE,
+            model_hash=backend_info.weights_hash,
+            row_group_size=DETECTION_ROW_GROUP_SIZE,
+        )
+    # 원본 영상 기준 시각: 처리 프레임 k(1-based)는 원본 (k-1)*SKIP_FRAMES번째 프레임
+    source_fps = (cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0.0) or FPS
     mot_file = None
+    mot_eval: StreamingMOTEvaluator | None = None
     if USE_TRACKING:
         MOT_PREDICTIONS_PATH.parent.mkdir(parents=True, exist_ok=True)
         mot_file = open(MOT_PREDICTIONS_PATH, "w")
-
-    # System metrics 수집 (step별 + 요약용)
-    sys_samples: list[dict[str, float]] = [] if LOG_SYSTEM_METRICS else []
+        gt_path = Path(MOT_GT_PATH).resolve() if MOT_GT_PATH else None
+        if gt_path and gt_path.exists():
+            # GT는 한 번 로드, 예측은 프레임마다 누적 평가 (실행 후 파일 재파싱 없음)
+            mot_eval = StreamingMOTEvaluator(MOTSequence.from_file(gt_path, min_confidence=1))
+            mlflow.log_param("mot_gt_path", str(gt_path))
+
+    # System metrics: 백그라운드 샘플러 (NVML은 GPU가 있을 때 한 번만 초기화)
+    sampler: SystemMetricsSampler | None = None
+    if LOG_SYSTEM_METRICS:
+        sampler = SystemMetricsSampler(
+            interval_s=SYSTEM_METRICS_INTERVAL_S,
+            device_id=int(DEVICE) if isinstance(DEVICE, int) else 0,
+            use_gpu=torch.cuda.is_available(),
+        )
+    last_sys_sample: dict[str, float] | None = None
 
     _inference_span = _start_span("inference_loop")
-    with _inference_span:
-        for frame, result in results_iter:
-            if frame_count >= MAX_FRAMES:
-                break
-            frame_count += 1
-            if hasattr(frame, "shape"):
-                h, w = frame.shape[:2]
-            else:
-                h, w = result.orig_img.shape[:2]
-                frame = result.orig_img.copy()
-            if writer is None:
-                OUTPUT_VIDEO.parent.mkdir(parents=True, exist_ok=True)
-                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-                writer = cv2.VideoWriter(str(OUTPUT_VIDEO), fourcc, FPS, (w, h))
-
-            # YOLO speed (ms): preprocess, inference, postprocess — step별 로깅으로 라인 차트
-            if getattr(result, "speed", None):
-                sp = result.speed
-                pre_ms = float(sp.get("preprocess", 0))
-                inf_ms = float(sp.get("inference", 0))
-                post_ms = float(sp.get("postprocess", 0))
-                speed_preprocess.append(pre_ms)
-                speed_inference.append(inf_ms)
-                speed_postprocess.append(post_ms)
-                inference_ms_this = inf_ms
-                mlflow.log_metric("inference_ms", inf_ms, step=frame_count)
-                mlflow.log_metric("inference_preprocess_ms", pre_ms, step=frame_count)
-                mlflow.log_metric("inference_postprocess_ms", post_ms, step=frame_count)
-                if inf_ms > 0:
-                    mlflow.log_metric("inference_fps", 1000.0 / inf_ms, step=frame_count)
-
-            boxes = result.boxes
-            detections_this_frame = 0
-            confidences_this_frame: list[float] = []
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                conf_val = box.conf.item()
-                cls = box.cls.item()
-                label = result.names[int(cls)]
-                total_detections += 1
-                detections_this_frame += 1
-                all_confidences.append(conf_val)
-                confidences_this_frame.append(conf_val)
-                detections_per_class[label] = detections_per_class.get(label, 0) + 1
-                if mot_file is not None:
-                    track_id = int(box.id) if getattr(box, "id", None) is not None else 0
-                    _write_mot_line(mot_file, frame_count, track_id, x1, y1, x2 - x1, y2 - y1, conf_val)
-                print(f"🔍 검출: {label} (Conf: {conf_val:.2f})")
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                cv2.putText(frame, label, (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-            # step별 메트릭 → MLflow에서 라인 차트로 표시
-            mlflow.log_metric("detections_per_frame", detections_this_frame, step=frame_count)
-            mlflow.log_metric("cumulative_detections", total_detections, step=frame_count)
-            if confidences_this_frame:
-                mean_conf = sum(confidences_this_frame) / len(confidences_this_frame)
-                mlflow.log_metric("confidence_mean_frame", mean_conf, step=frame_count)
-            # 프레임당 누적 평균 추론 시간 (추이 확인용)
-            if speed_inference:
-                running_avg_ms = sum(speed_inference) / len(speed_inference)
-                mlflow.log_metric("inference_forward_ms_running_avg", running_avg_ms, step=frame_count)
-
-            # System metrics: N프레임마다 샘플 → MLflow System metrics 탭에 라인 차트
-            if LOG_SYSTEM_METRICS and frame_count % SYSTEM_METRICS_EVERY_N_FRAMES == 0:
-                sm = _get_system_metrics(device_id=int(DEVICE) if isinstance(DEVICE, int) else 0)
-                if sm:
-                    sys_samples.append(sm)
-                    mlflow.log_metrics(sm, step=frame_count)
-
-            writer.write(frame)
-
-    _write_span = _start_span("write_output")
-    with _write_span:
-        if mot_file is not None:
-            mot_file.close()
-            print(f"✅ MOT 예측 저장: {MOT_PREDICTIONS_PATH}")
-        if writer is not None:
-            writer.release()
-            print(f"✅ 저장 완료: {OUTPUT_VIDEO} ({frame_count} frames)")
-
-    # YOLO 결과 지표 요약
-    def _avg(x: list[float]) -> float:
-        return sum(x) / len(x) if x else 0.0
-
+    # pipeline이 있으면 블록 종료 시 encode 큐를 모두 처리한 뒤 스레드 정리
+    # 스테이지 span은 루프 밖에서 한 번만 가져옴 (STAGE_TIMING=0이면 공유 no-op)
+    copy_span = timers.stage("copy")
+    post_span = timers.stage("postprocess")
+    log_span = timers.stage("log")
+    timers.reset_wall()
+    clock = EndToEndClock(E2E_WARMUP_FRAMES, BATCH_SIZE)
+    try:
+        with _inference_span, (sampler or nullcontext()), (pipeline or nullcontext()):
+            for frame, result in results_iter:
+                if frame_count >= MAX_FRAMES:
+                    break
+                frame_count += 1
+                # MOT·검출 저장 frame: SLO 모드는 stride가 바뀌므로 처리 순번 대신 원본 프레임 번호(1-based)
+                mot_frame = result.frame_idx + 1 if slo is not None else frame_count
+                if frame is not None and not hasattr(frame, "shape"):
+                    with copy_span:
+                        frame = result.orig_img.copy()
+
+                # 프레임당 한 번 배열로 변환 → 카운트·MOT 행을 배열 단위로 처리
+                with post_span:
+                    det = FrameDetections.from_result(result)
+                    detections_this_frame = len(det)
+                    total_detections += detections_this_frame
+                    conf_stats.update_many(det.conf)
+                    class_counter.update(det.cls)
+                    if mot_file is not None:
+                        write_mot_rows(mot_file, mot_frame, det)
+                    if mot_eval is not None:
+                        mot_eval.update_detections(mot_frame, det)
+                    if store is not None:
+                        store.append(mot_frame, det, getattr(result, "frame_idx", (frame_count - 1) * SKIP_FRAMES) / source_fps)
+                if VERBOSE_DETECTIONS:
+                    for cls_id, conf_val in zip(det.cls.tolist(), det.conf.tolist()):
+                        print(f"🔍 검출: {label_of(result.names, cls_id)} (Conf: {conf_val:.2f})")
+
+                with log_span:
+                    # YOLO speed (ms): preprocess, inference, postprocess — step별 로깅으로 라인 차트
+                    if getattr(result, "speed", None):
+                        sp = result.speed
+                        pre_ms = float(sp.get("preprocess", 0))
+                        inf_ms = float(sp.get("inference", 0))
+                        post_ms = float(sp.get("postprocess", 0))
+                        speed_preprocess.update(pre_ms)
+                        speed_inference.update(inf_ms)
+                        speed_postprocess.update(post_ms)
+                        sink.log_metric("inference_ms", inf_ms, step=frame_count)
+                        sink.log_metric("inference_preprocess_ms", pre_ms, step=frame_count)
+                        sink.log_metric("inference_postprocess_ms", post_ms, step=frame_count)
+                        if inf_ms > 0:
+                            sink.log_metric("inference_fps", 1000.0 / inf_ms, step=frame_count)
+                        # Latency SLO: 조정이 있을 때만 slo/* step 메트릭, stride는 디코더에 바로 반영
+                        if slo is not None:
+                            adjustment = slo.update(pre_ms + inf_ms + post_ms)
+                            if adjustment is not None:
+                                reader.skip_frames = slo.stride
+                                sink.log_metrics(adjustment, step=frame_count)
+                                print(
+                                    f"🔍 SLO 조정 (frame {frame_count}): p{SLO_QUANTILE * 100:g} {adjustment['slo/latency_ms']:.1f} ms "
+                                    f"(부하 {adjustment['slo/load_ratio']:.2f}) → imgsz {slo.imgsz}, stride {slo.stride}"
+                                )
+
+                    if cascade is not None:
+                        sink.log_metrics(cascade.step_metrics(), step=frame_count)
+                    # step별 메트릭 → MLflow에서 라인 차트로 표시
+                    sink.log_metric("detections_per_frame", detections_this_frame, step=frame_count)
+                    sink.log_metric("cumulative_detections", total_detections, step=frame_count)
+                    mean_conf = det.mean_conf()
+                    if mean_conf is not None:
+                        sink.log_metric("confidence_mean_frame", mean_conf, step=frame_count)
+                    # 프레임당 누적 평균 추론 시간 (추이 확인용, O(1))
+                    if speed_inference.count:
+                        sink.log_metric("inference_forward_ms_running_avg", speed_inference.mean, step=frame_count)
+                    # 스트리밍 MOT 평가 중간 값 (MOTA·MOTP·ID switch 추이)
+                    if mot_eval is not None and MOT_EVAL_LOG_EVERY and frame_count % MOT_EVAL_LOG_EVERY == 0:
+                        sink.log_metrics(mot_eval.running_metrics(), step=frame_count)
+
+                    # System metrics: N프레임마다 샘플러의 최신 스냅샷(새 샘플일 때만) → step 메트릭
+                    if sampler is not None and frame_count % SYSTEM_METRICS_EVERY_N_FRAMES == 0:
+                        sm = sampler.latest()
+                        if sm and sm is not last_sys_sample:
+                            last_sys_sample = sm
+                            sink.log_metrics(sm, step=frame_count)
+
+                # 박스 그리기 + 인코딩: pipelined면 encode 스레드로, 아니면 여기서 바로 (draw/encode 스테이지는 writer 안에서 측정)
+                # sharded면 워커가 구간 영상을 이미 기록 (frame 없음)
+                if frame is not None:
+                    if pipeline is not None:
+                        pipeline.submit((frame, det, result.names))
+                    else:
+                        video_out.write(frame, det, result.names)
+                clock.tick()
+        clock.stop()  # pipeline encode 큐까지 끝난 시점
+
+        if pipeline is not None:
+            sink.log_metrics(pipeline.metrics())
+            mlflow.set_tag("pipeline_bottleneck", pipeline.bottleneck())
+            print(f"✅ Pipeline 병목 스테이지: {pipeline.bottleneck()} {pipeline.metrics()}")
+
+        # 구간별 처리량 (step = 구간 번호) → 코어 수에 따른 확장성 확인
+        if sharded is not None:
+            for res in sharded.shard_results:
+                sink.log_metrics(res.metrics(), step=res.index)
+                print(f"   shard {res.index}: {res.emitted} frames, {res.metrics()['shard/fps']:.1f} fps ({res.wall_s:.1f}s)")
+
+        # 스테이지별 p50/p99·wall time 비중 → stage/* 메트릭 + Chrome trace 아티팩트
+        if STAGE_TIMING:
+            stage_metrics = timers.log_to_mlflow(sink, "stats/stage_trace.json" if STAGE_TRACE_EVENTS else None)
+            shares = {k[len("stage/"):-len("_share")]: v for k, v in stage_metrics.items() if k.endswith("_share")}
+            print("✅ Stage 비중: " + ", ".join(f"{k} {v:.0%}" for k, v in sorted(shares.items(), key=lambda kv: -kv[1])))
+
+        _write_span = _start_span("write_output")
+        with _write_span:
+            if det_cache_writer is not None:
+                det_cache_writer.commit(model.names)
+                print(f"✅ Detection cache 저장: {det_cache_writer.frames} frames → {DETECTION_CACHE_DIR}")
+            if store is not None:
+                store.close()
+                sink.log_metrics(store.metrics())
+                print(f"✅ 검출 저장: {DETECTION_STORE_PATH} ({store.rows} rows, {store.row_groups} row groups)")
+            if mot_file is not None:
+                mot_file.close()
+                print(f"✅ MOT 예측 저장: {MOT_PREDICTIONS_PATH}")
+            if video_out.writer is not None:
+                video_out.release()
+                print(f"✅ 저장 완료: {OUTPUT_VIDEO} ({video_out.frames} frames)")
+            if sharded is not None:
+                n_video = concat_videos(sharded.segments(), OUTPUT_VIDEO, FPS)
+                print(f"✅ 저장 완료: {OUTPUT_VIDEO} ({n_video} frames, {len(sharded.segments())}개 구간 병합)")
+    finally:
+        # 예외로 끝나도 디코더·공유 메모리 링·샤드 임시 디렉터리(FFV1 구간·프레임별 결과 pickle)를 남기지 않음
+        cap.release()
+        if frame_ring is not None:
+            frame_ring.close()
+        if sharded is not None:
+            shutil.rmtree(sharded.cfg.work_dir, ignore_errors=True)
+
+    # 검출 모델이 실제로 처리한 프레임 수: 검출 캐시 hit이면 0, cascade는 작은 모델 기준 (큰 모델은 cascade/large_frames·crops),
+    # 배치 모드는 MAX_FRAMES에서 멈추기 전에 추론한 마지막 배치까지 포함
+    frames_inferred = throughput.frames if reader is not None else frame_count
+    # YOLO 결과 지표 요약 (스트리밍 통계 → mean/std/min/max/p50/p95/p99)
     summary: dict[str, float] = {
         "frames_processed": float(frame_count),
+        "frames_inferred": float(frames_inferred),
         "total_detections": float(total_detections),
         "detections_per_frame": total_detections / frame_count if frame_count else 0.0,
+        **clock.metrics(),
     }
-    if speed_inference:
-        summary["inference_preprocess_ms"] = _avg(speed_preprocess)
-        summary["inference_forward_ms"] = _avg(speed_inference)
-        summary["inference_postprocess_ms"] = _avg(speed_postprocess)
-        summary["inference_fps"] = 1000.0 / _avg(speed_inference) if _avg(speed_inference) > 0 else 0.0
-    if all_confidences:
-        summary["confidence_mean"] = _avg(all_confidences)
-        summary["confidence_max"] = max(all_confidences)
-        summary["confidence_min"] = min(all_confidences)
-
-    mlflow.log_metrics(summary)
-    for label, count in detections_per_class.items():
-        mlflow.log_metric(f"detections/{label}", count)
+    if speed_inference.count:
+        summary["inference_preprocess_ms"] = speed_preprocess.mean
+        summary["inference_forward_ms"] = speed_inference.mean
+        summary["inference_postprocess_ms"] = speed_postprocess.mean
+        summary["inference_fps"] = 1000.0 / speed_inference.mean if speed_inference.mean > 0 else 0.0
+        summary.update(speed_preprocess.summary("inference_preprocess_ms"))
+        summary.update(speed_inference.summary("inference_forward_ms"))
+        summary.update(speed_postprocess.summary("inference_postprocess_ms"))
+    if conf_stats.count:
+        summary.update(conf_stats.summary("confidence"))
+        mlflow.log_dict(conf_stats.hist.as_dict(), "stats/confidence_histogram.json")
+
+    if slo is not None:
+        summary.update(slo.metrics())
+        print(
+            f"✅ Latency SLO: 조정 {slo.adjustments}회, 최종 imgsz {slo.imgsz} / stride {slo.stride}, "
+            f"목표 초과 프레임 {summary['slo/violation_rate']:.1%}"
+        )
+    if cascade is not None:
+        cascade_summary = cascade.metrics()
+        summary.update(cascade_summary)
+        print(
+            f"✅ Cascade: escalation {cascade.escalated}/{cascade.frames} frames ({cascade_summary['cascade/escalation_rate']:.1%}), "
+            f"프레임당 {cascade_summary['cascade/cost_ms_per_frame']:.1f} ms "
+            f"(작은 모델 {cascade.small_ms.mean:.1f} ms + escalation당 큰 모델 {cascade.large_ms.mean:.1f} ms), "
+            f"accepted {cascade.accepted} / relabeled {cascade.relabeled} / rejected {cascade.rejected}"
+        )
+    if reader is not None:
+        summary.update(reader.metrics())
+        summary.update(throughput.metrics())
+        print(f"✅ 디코딩 {reader.grabbed} frames → 추론 {frames_inferred} frames (skip={slo.stride if slo is not None else SKIP_FRAMES})")
+    elif sharded is not None:
+        shard_summary = sharded.metrics()
+        summary.update(shard_summary)
+        print(
+            f"✅ Sharded: {len(sharded.shards)}개 구간, {shard_summary['shard/throughput_fps']:.1f} fps 전체, "
+            f"병렬 효율 {shard_summary['shard/parallel_efficiency']:.0%}, 경계 track 연결 {sharded.stitched}"
+        )
+    else:
+        # fallback: Ultralytics 로더가 처리 프레임마다 grab SKIP_FRAMES번(vid_stride) + retrieve 1번
+        summary["frames_decoded"] = float(frame_count * SKIP_FRAMES)
+        summary["frames_retrieved"] = float(frame_count)
+        print(f"✅ 디코딩 약 {frame_count * SKIP_FRAMES} frames → 추론 {frames_inferred} frames (skip={SKIP_FRAMES})")
+    sink.log_metrics(summary)
+    for label, count in class_counter.as_dict(model.names).items():
+        sink.log_metric(f"detections/{label}", count)
 
     # System metrics 요약 (max/mean) → MLflow
-    if sys_samples:
-        keys = list(sys_samples[0].keys())
-        for k in keys:
-            vals = [s[k] for s in sys_samples if k in s and s[k] is not None]
-            if vals:
-                mlflow.log_metric(f"{k}_max", max(vals))
-                mlflow.log_metric(f"{k}_mean", sum(vals) / len(vals))
-        print(f"✅ System metrics 로깅: {len(sys_samples)} 샘플, {keys}")
+    if sampler is not None and sampler.samples:
+        sink.log_metrics(sampler.summary())
+        print(f"✅ System metrics 로깅: {len(sampler.samples)} 샘플 (GPU: {sampler.has_gpu})")
 
     if OUTPUT_VIDEO.exists():
         mlflow.log_artifact(str(OUTPUT_VIDEO), "output")
         mlflow.log_param("output_video_path", str(OUTPUT_VIDEO))
 
-    # MOT 평가: Ground truth가 있고 예측 MOT 파일이 있으면 motmetrics로 MOTA/IDF1 등 계산 후 MLflow 로깅
-    gt_path = Path(MOT_GT_PATH).resolve() if MOT_GT_PATH else None
+    # MOT 평가: 루프에서 누적한 스트리밍 평가 마무리 (남은 GT 프레임은 miss) → MOTA/IDF1/HOTA 등 MLflow 로깅
     _mot_span = _start_span("mot_evaluation")
     with _mot_span:
-        if gt_path and gt_path.exists() and MOT_PREDICTIONS_PATH.exists():
-            try:
-                import motmetrics as mm
-
-                gt_df = mm.io.loadtxt(str(gt_path), fmt="mot15-2D", min_confidence=1)
-                pred_df = mm.io.loadtxt(str(MOT_PREDICTIONS_PATH), fmt="mot15-2D")
-                acc = mm.utils.compare_to_groundtruth(gt_df, pred_df, "iou", distth=0.5)
-                mh = mm.metrics.create()
-                summary = mh.compute(acc, metrics=mm.metrics.motchallenge_metrics, name="yolo")
-                mot_metrics = {f"mot/{k}": float(v) for k, v in summary.items() if k != "name"}
-                mlflow.log_metrics(mot_metrics)
-                mlflow.log_param("mot_gt_path", str(gt_path))
-                print(f"✅ MOT 메트릭 로깅: {list(mot_metrics.keys())}")
-            except Exception as e:
-                print(f"⚠️ motmetrics 평가 실패: {e}")
+        if mot_eval is not None:
+            mot_eval.finish()
+            mot_metrics = mot_eval.summary()
+            sink.log_metrics(mot_metrics)
+            print(
+                f"✅ MOT 메트릭 로깅: MOTA {mot_metrics['mot/mota']:.4f}, IDF1 {mot_metrics['mot/idf1']:.4f}, "
+                f"HOTA {mot_metrics['mot/hota']:.4f} ({len(mot_metrics)}개)"
+            )
 
         if MOT_PREDICTIONS_PATH.exists():
             mlflow.log_artifact(str(MOT_PREDICTIONS_PATH), "mot")
 
+    if store is not None and DETECTION_STORE_PATH.exists():
+        mlflow.log_artifact(str(DETECTION_STORE_PATH), "detections")
+
     # .pt 파일을 아티팩트로 로깅 (로컬에 있을 때) → Artifacts/weights/ 에 저장
     _pt_path = Path(MODEL_WEIGHT).resolve() if Path(MODEL_WEIGHT).exists() else Path.cwd() / MODEL_WEIGHT
     if _pt_path.exists():
         mlflow.log_artifact(str(_pt_path), "weights")
         mlflow.log_param("weights_artifact", _pt_path.name)
 
+    # export 백엔드: 캐시된 모델 파일(또는 OpenVINO 디렉터리)도 아티팩트로
+    if BACKEND != "pytorch":
+        _exported = Path(backend_info.model_path)
+        if _exported.is_dir():
+            mlflow.log_artifacts(str(_exported), f"weights/{_exported.name}")
+        elif _exported.exists():
+            mlflow.log_artifact(str(_exported), "weights")
+
     # Model Registry: Run의 모델을 "Models"에 등록 → MLflow UI Models 탭에서 버전·스테이징 관리
-    if REGISTER_MODEL:
+    # (export 백엔드면 model.model이 PyTorch 모듈이 아니므로 등록 생략)
+    if REGISTER_MODEL and BACKEND != "pytorch":
+        print(f"⚠️ Model Registry 등록 생략: BACKEND={BACKEND} (PyTorch 백엔드에서만 등록)")
+    elif REGISTER_MODEL:
         try:
             mlflow.pytorch.log_model(
                 model.model,
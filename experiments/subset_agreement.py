@@ -0,0 +1,137 @@
+"""
+부분집합 학습 결과의 순위가 전체 데이터 순위와 얼마나 맞는지 (utils/dataset_subset.py ranking_agreement).
+부분집합 sweep으로 걸러낸 설정을 믿어도 되는지, 몇 %면 충분한지 판단할 때 실행.
+
+- sweep 모드: 같은 탐색 공간의 전체 데이터 sweep 부모 Run과 부분집합 sweep 부모 Run(들)의 sweep/results.json을
+  trial 파라미터로 맞춰 비교. 비용은 부모 Run의 sweep_wall_s 비율
+- 실험 모드: 한 MLflow 실험의 Run들을 data_subset_fraction 태그(없으면 1.0 = 전체)로 묶고 --keys 파라미터로 맞춰 비교
+  (exp_hyperparams.py·exp_model_size.py 등을 DATA_SUBSET=0.1로 한 번 더 돌린 경우). 같은 설정이 여러 번이면 최근 Run.
+  비용은 Run 소요 시간 합 비율
+- 지표: spearman·kendall, top1_match, topk_overlap, subset_best_full_rank, regret (부분집합 1위 설정을 골랐을 때
+  전체 데이터 지표 손실), cost_ratio
+
+사용:
+  python experiments/subset_agreement.py --full <전체 sweep run_id> --subset <p10 sweep run_id> <p25 sweep run_id>
+  python experiments/subset_agreement.py --experiment yolo-hyperparams --keys model_size learning_rate --metric val/mAP50-95
+  python experiments/subset_agreement.py --full <run_id> --subset <run_id> --top-k 5 --mlflow
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import mlflow
+
+from utils.dataset_subset import ranking_agreement
+
+EXPERIMENT_NAME = "benchmarks"
+
+
+def _fraction(tag: Any) -> float:
+    return float(tag) if isinstance(tag, str) and tag else 1.0
+
+
+def sweep_values(run_id: str) -> tuple[dict[str, float], dict[str, Any]]:
+    """sweep 부모 Run → ({trial 파라미터 JSON: 지표}, 부모 Run 정보). 완료·조기 중단 trial만."""
+    run = mlflow.get_run(run_id)
+    rows = mlflow.artifacts.load_dict(f"runs:/{run_id}/sweep/results.json")["rows"]
+    values = {
+        json.dumps(r["params"], sort_keys=True): float(r["value"])
+        for r in rows
+        if r["status"] in ("completed", "stopped") and r["value"] is not None
+    }
+    return values, {
+        "fraction": _fraction(run.data.tags.get("data_subset_fraction")),
+        "mode": run.data.params.get("mode", "max"),
+        "metric": run.data.params.get("metric"),
+        "cost_s": run.data.metrics.get("sweep_wall_s", math.nan),
+    }
+
+
+def experiment_values(experiment: str, keys: list[str], metric: str) -> dict[float, tuple[dict[str, float], float]]:
+    """실험의 끝난 Run들 → {부분집합 비율: ({--keys 파라미터 JSON: 지표}, 소요 시간 합)}."""
+    runs = mlflow.search_runs(experiment_names=[experiment], filter_string="attributes.status = 'FINISHED'")
+    groups: dict[float, tuple[dict[str, float], float]] = {}
+    for _, r in runs.iterrows():  # 최근 Run부터
+        value = r.get(f"metrics.{metric}")
+        if value is None or math.isnan(value):
+            continue
+        fraction = _fraction(r.get("tags.data_subset_fraction"))
+        key = json.dumps({k: r.get(f"params.{k}") for k in keys}, sort_keys=True)
+        values, cost = groups.get(fraction, ({}, 0.0))
+        if key not in values:
+            values[key] = float(value)
+            cost += (r["end_time"] - r["start_time"]).total_seconds()
+        groups[fraction] = (values, cost)
+    return groups
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="부분집합 vs 전체 데이터 학습 결과 순위 일치도 (sweep 또는 MLflow 실험)")
+    p.add_argument("--full", help="전체 데이터 sweep 부모 Run ID")
+    p.add_argument("--subset", nargs="+", default=[], help="부분집합 sweep 부모 Run ID (여러 개 가능)")
+    p.add_argument("--experiment", help="실험 모드: MLflow 실험 이름")
+    p.add_argument("--keys", nargs="+", default=["model_size"], help="실험 모드: 설정을 구분하는 파라미터")
+    p.add_argument("--metric", default="val/mAP50-95", help="실험 모드: 비교 지표")
+    p.add_argument("--mode", choices=("max", "min"), default=None, help="지표 방향 (sweep 모드 기본: 부모 Run의 mode)")
+    p.add_argument("--top-k", type=int, default=3)
+    p.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    p.add_argument("--mlflow", action="store_true", help=f"MLflow '{EXPERIMENT_NAME}' 실험에 기록")
+    args = p.parse_args()
+
+    if args.experiment:
+        groups = experiment_values(args.experiment, args.keys, args.metric)
+        if 1.0 not in groups:
+            raise SystemExit(f"'{args.experiment}'에 전체 데이터 Run(data_subset_fraction=1.0 또는 태그 없음)이 없습니다")
+        full, full_cost = groups.pop(1.0)
+        subsets = [(fraction, values, cost) for fraction, (values, cost) in sorted(groups.items())]
+        mode, source = args.mode or "max", {"experiment": args.experiment, "keys": args.keys, "metric": args.metric}
+    elif args.full and args.subset:
+        full, info = sweep_values(args.full)
+        full_cost = info["cost_s"]
+        subsets = []
+        for run_id in args.subset:
+            values, sub_info = sweep_values(run_id)
+            subsets.append((sub_info["fraction"], values, sub_info["cost_s"]))
+        mode, source = args.mode or info["mode"], {"full": args.full, "subset": args.subset, "metric": info["metric"]}
+    else:
+        p.error("--full과 --subset (sweep 모드) 또는 --experiment (실험 모드)가 필요합니다")
+    if not subsets:
+        raise SystemExit("비교할 부분집합 결과가 없습니다")
+
+    results: dict[str, dict[str, float]] = {}
+    for fraction, values, cost in subsets:
+        agreement = ranking_agreement(full, values, mode, args.top_k)
+        agreement["cost_ratio"] = cost / full_cost if full_cost else math.nan
+        results[f"p{fraction * 100:g}"] = agreement
+    if args.json:
+        print(json.dumps({"source": source, "mode": mode, "results": results}, ensure_ascii=False, indent=2))
+    else:
+        print(f"🔍 전체 데이터 {len(full)}개 설정 기준 ({mode}, top-{args.top_k})")
+        for name, a in results.items():
+            print(
+                f"  {name:<6} {a['configs']:>3.0f}개  spearman {a['spearman']:6.3f}  kendall {a['kendall']:6.3f}  "
+                f"1위 일치 {a['top1_match']:.0f}  top-k 겹침 {a['topk_overlap']:5.1%}  "
+                f"부분집합 1위의 전체 순위 {a['subset_best_full_rank']:.0f}  regret {a['regret']:.4f}  비용 {a['cost_ratio']:5.1%}"
+            )
+
+    if args.mlflow:
+        mlflow.set_experiment(EXPERIMENT_NAME)
+        with mlflow.start_run(run_name=f"subset-agreement-{time.strftime('%Y%m%d-%H%M%S')}") as run:
+            mlflow.set_tag("benchmark", "subset_agreement")
+            mlflow.log_params({k: ",".join(v) if isinstance(v, list) else v for k, v in source.items()} | {"mode": mode, "top_k": args.top_k})
+            mlflow.log_metrics({
+                f"subset_agreement/{name}/{k}": v for name, a in results.items() for k, v in a.items() if not math.isnan(v)
+            })
+            print(f"✅ MLflow Run: {run.info.run_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Tracker 파라미터 sweep (저장된 검출 재생 + MOT 평가, 프로세스 풀).
+검출기·영상·네트워크 없이 저장된 프레임별 검출을 ByteTrack / BoT-SORT에 바로 넣고 ground truth와 비교.
+설정 하나당 비용은 tracker 갱신 + 스트리밍 MOT 평가(CPU)뿐이라 여러 조합을 병렬로 시험할 수 있음.
+
+- 검출 입력: 검출 캐시 엔트리 디렉터리(~/.cache/gaflow/detections/<key>, conf floor로 저장된 원시 검출)
+  또는 detection store Parquet(experiments/detections.parquet, 저장 시 CONF로 이미 필터됨)
+- --param name=v1,v2,...  값 목록 (grid: 전체 조합 / random: 조합 중 --trials개 샘플)
+  --param name=lo:hi      연속 범위 (random 전용, 둘 다 정수면 정수 샘플, lo:hi:log면 로그 균등)
+  trial 목록은 utils/search_space.py (학습 sweep과 공용)
+- MLflow "tracker-sweep" 실험: 부모 Run + 설정별 nested Run (mot/mota, mot/idf1, mot/hota 등 + replay 속도)
+  가장 좋은 설정(--objective 기준)은 부모 Run에 best/* 메트릭과 best_tracker.yaml 아티팩트로
+
+사용:
+  python experiments/sweep_tracker.py --detections ~/.cache/gaflow/detections/<key> --gt gt/gt.txt \\
+      --param track_high_thresh=0.4,0.5,0.6 --param match_thresh=0.7,0.8,0.9
+  python experiments/sweep_tracker.py --detections experiments/detections.parquet --gt gt/gt.txt \\
+      --search random --trials 50 --param track_buffer=15:120 --param new_track_thresh=0.3:0.8
+  python experiments/sweep_tracker.py --tracker botsort.yaml --detections ... --gt ... --param proximity_thresh=0.3,0.5
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+import mlflow
+import yaml
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.search_space import SEARCH_METHODS, expand_search_space
+from utils.tracking import load_tracker_cfg
+
+EXPERIMENT_NAME = "tracker-sweep"
+
+# 워커 프로세스마다 한 번 로드 (_init_worker)
+_DETECTIONS: Any = None
+_GT: Any = None
+
+
+def parse_param(spec: str) -> tuple[str, list[Any] | dict[str, Any]]:
+    """'name=v1,v2' → (name, [값...]) / 'name=lo:hi[:log]' → (name, {low, high, log}). 값은 YAML 스칼라로 해석."""
+    name, sep, values = spec.partition("=")
+    if not sep or not name or not values:
+        raise argparse.ArgumentTypeError(f"--param 형식은 name=v1,v2 또는 name=lo:hi[:log]: {spec}")
+    if ":" in values and "," not in values:
+        lo, hi, *rest = (yaml.safe_load(v) for v in values.split(":"))
+        if not all(isinstance(v, (int, float)) for v in (lo, hi)) or lo > hi or rest not in ([], ["log"]):
+            raise argparse.ArgumentTypeError(f"범위는 숫자 lo:hi (lo <= hi) 또는 lo:hi:log: {spec}")
+        if rest and lo <= 0:
+            raise argparse.ArgumentTypeError(f"log 범위는 lo > 0: {spec}")
+        return name.strip(), {"low": lo, "high": hi, "log": bool(rest)}
+    return name.strip(), [yaml.safe_load(v) for v in values.split(",")]
+
+
+def _init_worker(detections: str, gt: str, source_id: str | None, frames: int | None) -> None:
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from utils.mot_eval import MOTSequence
+    from utils.tracker_replay import load_detections
+
+    global _DETECTIONS, _GT
+    _DETECTIONS = load_detections(detections, source_id=source_id, frames=frames)
+    _GT = MOTSequence.from_file(gt, min_confidence=1)
+
+
+def run_trial(trial: dict[str, Any], tracker: str, frame_rate: int, conf: float) -> dict[str, float]:
+    """설정 하나: 재생하며 프레임마다 스트리밍 MOT 평가 (워커 프로세스에서 실행)."""
+    from utils.mot_eval import StreamingMOTEvaluator
+    from utils.tracker_replay import track_frames
+
+    ev = StreamingMOTEvaluator(_GT)
+    track_ids: set[int] = set()
+    boxes = 0
+    t0 = time.perf_counter()
+    for n, tracked in track_frames(_DETECTIONS, tracker, trial, frame_rate, conf):
+        ev.update_detections(n, tracked)
+        track_ids.update(tracked.ids.tolist() if tracked.ids is not None else ())
+        boxes += len(tracked)
+    ev.finish()
+    replay_s = time.perf_counter() - t0
+    metrics = ev.summary()
+    metrics.update({
+        "replay_s": replay_s,
+        "replay_fps": len(_DETECTIONS) / replay_s if replay_s > 0 else 0.0,
+        "eval_s": time.perf_counter() - t0 - replay_s,
+        "num_tracks": float(len(track_ids)),
+        "num_track_boxes": float(boxes),
+    })
+    return metrics
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="저장된 검출로 tracker 파라미터 sweep (MOTA/IDF1)")
+    p.add_argument("--detections", type=Path, required=True, help="검출 캐시 엔트리 디렉터리 또는 detection store Parquet")
+    p.add_argument("--gt", type=Path, required=True, help="Ground truth (MOT Challenge 텍스트)")
+    p.add_argument("--tracker", default="bytetrack.yaml", help="기준 tracker yaml (내장 이름 또는 경로)")
+    p.add_argument("--param", type=parse_param, action="append", default=[], help="name=v1,v2 또는 name=lo:hi[:log]")
+    p.add_argument("--search", choices=SEARCH_METHODS, default="grid")
+    p.add_argument("--trials", type=int, default=20, help="random sweep 설정 수")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--conf", type=float, default=0.25, help="tracker 입력 전 신뢰도 필터 (저장된 검출 기준)")
+    p.add_argument("--frame-rate", type=int, default=30, help="처리 프레임 기준 fps (원본 fps / SKIP_FRAMES)")
+    p.add_argument("--source-id", default=None, help="Parquet에 여러 영상이 있을 때 source_id 선택")
+    p.add_argument("--frames", type=int, default=None, help="전체 프레임 수 (Parquet 입력, 기본: 마지막 검출 프레임)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--objective", default="mot/idf1", help="best 설정 선택 기준 메트릭 (클수록 좋음)")
+    args = p.parse_args()
+
+    base_cfg = vars(load_tracker_cfg(args.tracker))
+    unknown = [n for n, _ in args.param if n not in base_cfg]
+    if unknown:
+        raise SystemExit(f"{args.tracker}에 없는 파라미터: {unknown} (사용 가능: {sorted(base_cfg)})")
+    try:
+        trials = expand_search_space(dict(args.param), args.search, args.trials, args.seed)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"🔍 {len(trials)}개 설정 × {args.tracker} ({args.search}), workers={args.workers}")
+
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    results: list[tuple[int, dict[str, Any], dict[str, float]]] = []
+    with mlflow.start_run(run_name=f"sweep-{Path(args.tracker).stem}-{time.strftime('%Y%m%d-%H%M%S')}") as parent:
+        mlflow.log_params({
+            "tracker": args.tracker, "detections": str(args.detections), "gt": str(args.gt), "search": args.search,
+            "num_trials": len(trials), "conf": args.conf, "frame_rate": args.frame_rate, "objective": args.objective,
+            "seed": args.seed,
+        })
+        mlflow.log_dict(dict(args.param), "sweep/search_space.json")
+        t0 = time.perf_counter()
+        # 검출·GT는 워커마다 한 번 로드하고 설정만 전달 (spawn: fork된 MLflow/torch 상태를 물려받지 않도록)
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(args.workers, len(trials))),
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(args.detections), str(args.gt), args.source_id, args.frames),
+        ) as pool:
+            futures = {pool.submit(run_trial, t, args.tracker, args.frame_rate, args.conf): i for i, t in enumerate(trials)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                trial = trials[i]
+                metrics = fut.result()
+                results.append((i, trial, metrics))
+                with mlflow.start_run(run_name=f"trial-{i:03d}", nested=True):
+                    mlflow.set_tag("trial", str(i))
+                    mlflow.log_params({"tracker": args.tracker, **trial})
+                    mlflow.log_metrics(metrics)
+                desc = ", ".join(f"{k}={v}" for k, v in trial.items()) or "기본 설정"
+                print(f"  [{i:03d}] MOTA {metrics['mot/mota']:.4f}  IDF1 {metrics['mot/idf1']:.4f}  HOTA {metrics['mot/hota']:.4f}  ({desc})")
+        wall_s = time.perf_counter() - t0
+
+        # 동점이면 먼저 정의된 설정 (완료 순서와 무관하게 결정적)
+        results.sort(key=lambda r: (-r[2].get(args.objective, float("-inf")), r[0]))
+        _, best_trial, best = results[0]
+        mlflow.log_metrics({
+            "sweep_wall_s": wall_s,
+            "trials_per_s": len(results) / wall_s if wall_s > 0 else 0.0,
+            **{f"best/{k.split('/', 1)[-1]}": v for k, v in best.items() if k.startswith("mot/")},
+        })
+        mlflow.log_params({f"best_{k}": v for k, v in best_trial.items()})
+        mlflow.log_dict({**base_cfg, **best_trial}, "best_tracker.yaml")
+        mlflow.log_dict(
+            {"rows": [{"trial": i, **t, **m} for i, t, m in results]},
+            "sweep/results.json",
+        )
+        print(f"✅ {len(results)}개 설정 {wall_s:.1f}s, best {args.objective}={best.get(args.objective, float('nan')):.4f}: {best_trial}")
+        print(f"✅ MLflow Run: {parent.info.run_id} (best_tracker.yaml 아티팩트)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
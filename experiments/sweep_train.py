@@ -0,0 +1,342 @@
+"""
+YOLO 학습 하이퍼파라미터 sweep (병렬 trial + ASHA/median 조기 종료 + 재개).
+YAML 탐색 공간을 trial 목록으로 펼쳐 코어·메모리에 맞춘 수만큼 동시에 학습하고, 각 trial이
+MLflowYOLOCallback.on_train_epoch_end에서 보고하는 val/mAP50-95로 스케줄러가 약한 trial을 일찍 중단.
+
+- trial은 `python experiments/sweep_train.py --trial <trial_dir>` 워커 프로세스 (torch 스레드는 코어 / 동시 trial 수)
+- 에포크마다 워커가 trial_dir/reports.jsonl에 보고 → 이 프로세스가 스케줄러로 판단해 decisions.jsonl에 응답 →
+  중단이면 워커가 trainer.stop (그 에포크 검증·저장 후 정상 종료)
+- MLflow: sweep 부모 Run + trial별 nested Run (에포크 메트릭은 MLflowYOLOCallback이 기록, sweep_status 태그)
+  부모 Run에는 best/* 메트릭, 중단·완료 trial 수, 절약한 에포크, sweep/results.json, best trial의 best.pt
+- 상태는 --sweep-dir(기본 mlflow_runs/sweeps/<이름>)/state.json → 같은 명령을 다시 실행하면 끝나지 않은 trial부터 이어서
+  (학습 중이던 trial은 last.pt에서 resume, 같은 nested Run에 이어서 기록). 처음부터는 --fresh
+- 초기 탐색은 --subset 0.1(또는 설정의 subset / dataset.subset)로 train을 계층 샘플한 부분집합에서
+  (utils/dataset_subset.py, 기본 sweep 디렉터리 <이름>-p10). 전체 데이터 sweep과의 순위 일치는 experiments/subset_agreement.py
+
+탐색 공간 예: experiments/sweep_train.yaml. lab/exp_bdd100k/config.yaml처럼 training.model_sizes 목록이 있는
+lab 설정도 그대로 받음 (목록 값이 grid 축).
+
+사용:
+  python experiments/sweep_train.py --config experiments/sweep_train.yaml
+  python experiments/sweep_train.py --config lab/exp_bdd100k/config.yaml --workers 2
+  python experiments/sweep_train.py --config experiments/sweep_train.yaml --subset 0.1
+  python experiments/sweep_train.py --config experiments/sweep_train.yaml --dry-run
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import mlflow
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.dataset_manifest import load_manifest, log_dataset_version, resolve_data_yaml
+from utils.dataset_subset import subset_data_yaml
+from utils.train_sweep import (
+    SweepState,
+    append_jsonl,
+    expand_trials,
+    load_sweep_spec,
+    make_scheduler,
+    plan_workers,
+    read_reports,
+)
+
+DEFAULT_EPOCHS = 100  # Ultralytics train 기본값 (base·탐색 공간에 epochs가 없을 때 ASHA rung 계산용)
+DECISION_TIMEOUT_S = 600.0  # 스케줄러 응답을 기다리는 최대 시간 (부모가 죽었으면 계속 학습)
+POLL_S = 0.5
+
+
+def _result_key(metric: str) -> str:
+    """MLflowYOLOCallback 이름(val/mAP50-95) → trainer.metrics 키(metrics/mAP50-95(B))."""
+    return metric.replace("val/", "metrics/", 1) + "(B)"
+
+
+# ---------------------------------------------------------------- trial 워커
+
+def _wait_decision(path: Path, epoch: int, timeout_s: float) -> bool:
+    """decisions.jsonl에서 epoch에 대한 응답을 기다림 → 중단 여부 (시간 초과면 계속)."""
+    deadline = time.monotonic() + timeout_s
+    offset = 0
+    while time.monotonic() < deadline:
+        rows, offset = read_reports(path, offset)
+        for row in rows:
+            if row["epoch"] == epoch:
+                return bool(row["stop"])
+        time.sleep(0.1)
+    print(f"⚠️ epoch {epoch}: 스케줄러 응답 없음 ({timeout_s:.0f}s) → 계속 학습")
+    return False
+
+
+def run_trial(trial_dir: Path) -> None:
+    """trial 하나 학습 (워커 프로세스). trial.json → MLflow nested Run에서 학습 → result.json."""
+    import torch
+    from ultralytics import YOLO
+
+    from lab.exp_bdd100k.base.mlflow_yolo import MLflowYOLOCallback
+    from utils.dataset_manifest import manifest_trainer
+    from utils.image_cache import image_cache_trainer_from_env
+
+    with open(trial_dir / "trial.json", encoding="utf-8") as f:
+        cfg = json.load(f)
+    torch.set_num_threads(cfg["threads"])
+    metric = cfg["metric"]
+    reports, decisions = trial_dir / "reports.jsonl", trial_dir / "decisions.jsonl"
+    last_pt = trial_dir / "train" / "weights" / "last.pt"
+    resume = last_pt.exists()
+    stopped_at: list[int] = []
+
+    def on_epoch(epoch: int, metrics: dict[str, float], trainer: Any) -> None:
+        # on_train_epoch_end 시점의 val 메트릭은 직전 검증 결과 = 지금까지 끝난 에포크 수(epoch)의 값. epoch 0은 아직 검증 전
+        if epoch < 1 or metric not in metrics:
+            return
+        append_jsonl(reports, {"epoch": epoch, "value": float(metrics[metric])})
+        if _wait_decision(decisions, epoch, DECISION_TIMEOUT_S):
+            stopped_at.append(epoch)
+            trainer.stop = True
+
+    params = dict(cfg["params"])
+    model_weight = params.pop("model")
+    with mlflow.start_run(run_id=cfg["run_id"]):
+        if not resume:
+            mlflow.log_params({"model": model_weight, "data_yaml": cfg["data"], **params})
+        callback = MLflowYOLOCallback(log_model=False, on_epoch=on_epoch)
+        model = YOLO(str(last_pt) if resume else model_weight)
+        model.add_callback("on_pretrain_routine_start", callback.on_pretrain_routine_start)
+        model.add_callback("on_train_epoch_end", callback.on_train_epoch_end)
+        model.add_callback("on_train_end", callback.on_train_end)
+        # 데이터셋은 부모가 갱신해 둔 manifest로 열고, IMAGE_CACHE=1이면 trial들이 같은 이미지 저장소를 공유
+        # (첫 trial만 빌드, 나머지는 락 대기 후 읽기)
+        manifest = load_manifest(cfg["data"])
+        log_dataset_version(manifest)
+        trainer_cls = manifest_trainer(manifest, image_cache_trainer_from_env())
+        try:
+            if resume:
+                model.train(resume=True, trainer=trainer_cls)
+            else:
+                model.train(data=cfg["data"], project=str(trial_dir), name="train", exist_ok=True, trainer=trainer_cls, **params)
+        finally:
+            callback.close()
+        trainer = model.trainer
+        value = float(trainer.metrics.get(_result_key(metric), math.nan))
+        status = "stopped" if stopped_at else "completed"
+        mlflow.log_metric(f"final/{metric.split('/', 1)[-1]}", value)
+        mlflow.set_tag("sweep_status", status)
+    result = {"status": status, "epochs": int(trainer.epoch) + 1, "value": value, "best_pt": str(trainer.best)}
+    with open(trial_dir / "result.json", "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+# ---------------------------------------------------------------- sweep
+
+def _better(a: float | None, b: float | None, mode: str) -> bool:
+    if a is None or math.isnan(a):
+        return False
+    if b is None or math.isnan(b):
+        return True
+    return a > b if mode == "max" else a < b
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="YOLO 학습 하이퍼파라미터 sweep (병렬 + ASHA/median 조기 종료 + 재개)")
+    p.add_argument("--config", type=Path, help="탐색 공간 YAML (sweep 형식 또는 lab 설정)")
+    p.add_argument("--sweep-dir", type=Path, default=None, help="상태·trial 출력 디렉터리 (기본 mlflow_runs/sweeps/<이름>)")
+    p.add_argument("--workers", type=int, default=0, help="동시 trial 수 (0이면 resources 설정과 코어·메모리로 자동)")
+    p.add_argument("--fresh", action="store_true", help="기존 상태를 지우고 처음부터")
+    p.add_argument("--subset", type=float, default=None, help="train 계층 샘플 비율 (설정의 subset 대신, 0이면 전체 데이터)")
+    p.add_argument("--dry-run", action="store_true", help="trial 목록과 워커 수만 출력")
+    p.add_argument("--trial", type=Path, default=None, help=argparse.SUPPRESS)  # 워커 프로세스 모드
+    args = p.parse_args()
+    if args.trial is not None:
+        run_trial(args.trial)
+        return 0
+    if args.config is None:
+        p.error("--config가 필요합니다")
+
+    spec = load_sweep_spec(args.config)
+    if args.subset is not None:
+        spec.subset = args.subset
+    data_yaml = resolve_data_yaml(spec.data, PROJECT_ROOT)
+    trials = expand_trials(spec)
+    workers, threads = plan_workers(spec.resources, len(trials))
+    if args.workers > 0:
+        workers, threads = args.workers, max(1, (os.cpu_count() or 1) // args.workers)
+    max_epochs = max(int({**spec.base, **t}.get("epochs", DEFAULT_EPOCHS)) for t in trials)
+    scheduler = make_scheduler(spec, max_epochs)
+    print(
+        f"🔍 {spec.name}: {len(trials)}개 trial ({spec.method}), 동시 {workers}개 × torch {threads} 스레드, "
+        f"scheduler {spec.scheduler.get('type', 'asha')} on {spec.metric}"
+        + (f", train {spec.subset:.0%} 부분집합" if spec.subset else "")
+        + (f" (rungs {scheduler.rungs})" if hasattr(scheduler, "rungs") else "")
+    )
+    if args.dry_run:
+        for i, t in enumerate(trials):
+            print(f"  [{i:03d}] {t}")
+        return 0
+    if not data_yaml.exists():
+        raise SystemExit(f"데이터 YAML이 없습니다: {data_yaml}")
+    # 부분집합이면 trial 시작 전에 만들어 두고, 한 번 스캔 → trial들은 manifest를 그대로 사용
+    data_yaml = subset_data_yaml(data_yaml, spec.subset)
+    manifest = load_manifest(data_yaml)
+
+    name = f"{spec.name}-p{spec.subset * 100:g}" if spec.subset else spec.name
+    sweep_dir = (args.sweep_dir or PROJECT_ROOT / "mlflow_runs" / "sweeps" / name).resolve()
+    if args.fresh and sweep_dir.exists():
+        shutil.rmtree(sweep_dir)
+    state = SweepState(sweep_dir)
+    resumed = state.exists()
+    if resumed:
+        state.load()
+        if state.data["fingerprint"] != spec.fingerprint():
+            raise SystemExit(f"{sweep_dir}의 sweep과 탐색 공간이 다릅니다 (처음부터: --fresh, 또는 다른 --sweep-dir)")
+
+    from mlflow.tracking import MlflowClient
+    from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+
+    client = MlflowClient()
+    experiment_id = mlflow.set_experiment(spec.experiment).experiment_id
+    parent_kwargs = {"run_id": state.data["parent_run_id"]} if resumed else {"run_name": f"sweep-{name}-{time.strftime('%Y%m%d-%H%M%S')}"}
+    with mlflow.start_run(**parent_kwargs) as parent:
+        if not resumed:
+            state.init(spec.fingerprint(), parent.info.run_id, trials)
+            mlflow.set_tag("sweep", spec.name)
+            mlflow.log_params({
+                "config": str(args.config), "data_yaml": str(data_yaml), "search": spec.method, "num_trials": len(trials),
+                "scheduler": spec.scheduler.get("type", "asha"), "metric": spec.metric, "mode": spec.mode,
+                "workers": workers, "threads_per_trial": threads, "sweep_dir": str(sweep_dir),
+                **{f"base_{k}": v for k, v in spec.base.items()},
+            })
+            mlflow.log_dict({"base": spec.base, "params": spec.params, "scheduler": spec.scheduler}, "sweep/search_space.json")
+        log_dataset_version(manifest)
+
+        # 스케줄러 상태 복원: 지금까지의 보고를 trial 순서대로 재생 (decisions는 같은 판단을 다시 냄)
+        for t in state.trials:
+            for row in read_reports(state.trial_dir(t["id"]) / "reports.jsonl")[0]:
+                scheduler.report(t["id"], row["epoch"], row["value"])
+        queue = [t for t in state.trials if t["status"] in ("pending", "running")]
+        if resumed:
+            c = state.counts()
+            print(f"🔁 재개: 완료 {c['completed']}, 중단 {c['stopped']}, 실패 {c['failed']}, 남음 {len(queue)} ({sweep_dir})")
+
+        running: dict[int, tuple[subprocess.Popen, int]] = {}
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in (str(PROJECT_ROOT), os.environ.get("PYTHONPATH")) if p)}
+
+        def launch(t: dict[str, Any]) -> None:
+            tdir = state.trial_dir(t["id"])
+            tdir.mkdir(parents=True, exist_ok=True)
+            if t["run_id"] is None:
+                run = client.create_run(
+                    experiment_id, run_name=f"trial-{t['id']:03d}",
+                    tags={MLFLOW_PARENT_RUN_ID: parent.info.run_id, "trial": str(t["id"]), "sweep": spec.name},
+                )
+                t["run_id"] = run.info.run_id
+            with open(tdir / "trial.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "run_id": t["run_id"], "params": {**spec.base, **t["params"]}, "data": str(data_yaml),
+                    "metric": spec.metric, "threads": threads,
+                }, f)
+            (tdir / "decisions.jsonl").unlink(missing_ok=True)
+            (tdir / "result.json").unlink(missing_ok=True)
+            reports = tdir / "reports.jsonl"
+            with open(tdir / "train.log", "ab") as log:
+                proc = subprocess.Popen(
+                    [sys.executable, str(Path(__file__).resolve()), "--trial", str(tdir)], env=env, stdout=log, stderr=subprocess.STDOUT
+                )
+            running[t["id"]] = (proc, reports.stat().st_size if reports.exists() else 0)
+            t["status"] = "running"
+            state.save()
+            print(f"  ▶ trial-{t['id']:03d} 시작{' (resume)' if (tdir / 'train' / 'weights' / 'last.pt').exists() else ''}: {t['params']}")
+
+        def poll(t: dict[str, Any]) -> None:
+            proc, offset = running[t["id"]]
+            tdir = state.trial_dir(t["id"])
+            done = proc.poll() is not None  # 종료 확인 후 남은 보고까지 읽음
+            rows, offset = read_reports(tdir / "reports.jsonl", offset)
+            for row in rows:
+                stop = scheduler.report(t["id"], row["epoch"], row["value"])
+                append_jsonl(tdir / "decisions.jsonl", {"epoch": row["epoch"], "stop": stop})
+                t["epochs"] = max(t["epochs"], row["epoch"])
+                if _better(row["value"], t["value"], spec.mode):
+                    t["value"] = row["value"]
+                if stop:
+                    print(f"  ✂ trial-{t['id']:03d} 중단 (epoch {row['epoch']}, {spec.metric} {row['value']:.4f})")
+            running[t["id"]] = (proc, offset)
+            if not done:
+                return
+            del running[t["id"]]
+            result_path = tdir / "result.json"
+            if result_path.exists():
+                with open(result_path, encoding="utf-8") as f:
+                    res = json.load(f)
+                t.update(status=res["status"], epochs=res["epochs"], best_pt=res["best_pt"])
+                if _better(res["value"], t["value"], spec.mode):
+                    t["value"] = res["value"]
+                print(f"  ✅ trial-{t['id']:03d} {res['status']}: {res['epochs']} epochs, {spec.metric} {t['value']}")
+            else:
+                t["status"] = "failed"
+                client.set_terminated(t["run_id"], "FAILED")
+                print(f"  ⚠️ trial-{t['id']:03d} 실패 (exit {proc.returncode}, 로그: {tdir / 'train.log'})")
+            state.save()
+
+        t0 = time.perf_counter()
+        try:
+            while queue or running:
+                while queue and len(running) < workers:
+                    launch(queue.pop(0))
+                for t in [t for t in state.trials if t["id"] in running]:
+                    poll(t)
+                time.sleep(POLL_S)
+        except KeyboardInterrupt:
+            print(f"⚠️ 중단됨: 같은 명령을 다시 실행하면 이어서 진행합니다 ({sweep_dir})")
+            raise
+        finally:
+            for proc, _ in running.values():
+                if proc.poll() is None:
+                    proc.terminate()
+                    proc.wait()
+            state.save()
+        wall_s = time.perf_counter() - t0
+
+        counts = state.counts()
+        finished = [t for t in state.trials if t["status"] in ("completed", "stopped") and t["value"] is not None]
+        trial_epochs = {t["id"]: int({**spec.base, **t["params"]}.get("epochs", DEFAULT_EPOCHS)) for t in state.trials}
+        summary = {
+            "trials_completed": float(counts["completed"]),
+            "trials_stopped": float(counts["stopped"]),
+            "trials_failed": float(counts["failed"]),
+            "epochs_run": float(sum(t["epochs"] for t in finished)),
+            "epochs_saved": float(sum(trial_epochs[t["id"]] - t["epochs"] for t in finished if t["status"] == "stopped")),
+            "sweep_wall_s": wall_s,
+        }
+        best = None
+        for t in finished:
+            if best is None or _better(t["value"], best["value"], spec.mode):
+                best = t
+        if best is not None:
+            summary[f"best/{spec.metric.split('/', 1)[-1]}"] = best["value"]
+            mlflow.log_params({f"best_{k}": v for k, v in best["params"].items()})
+            mlflow.set_tag("best_trial_run_id", best["run_id"])
+            if best.get("best_pt") and Path(best["best_pt"]).exists():
+                mlflow.log_artifact(best["best_pt"], "weights")
+        mlflow.log_metrics(summary)
+        mlflow.log_dict({"rows": state.trials}, "sweep/results.json")
+        print(
+            f"✅ sweep {wall_s:.1f}s: 완료 {counts['completed']}, 중단 {counts['stopped']}, 실패 {counts['failed']}, "
+            f"절약 {summary['epochs_saved']:.0f} epochs"
+        )
+        if best is not None:
+            print(f"✅ best trial-{best['id']:03d} {spec.metric}={best['value']:.4f}: {best['params']}")
+        print(f"✅ MLflow Run: {parent.info.run_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
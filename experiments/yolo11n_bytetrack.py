@@ -3,8 +3,9 @@ YOLOv11n + ByteTrack으로 영상 객체 추적 후 mp4 저장
 MLflow로 파라미터·메트릭·아티팩트 로깅
 """
 import os
-import subprocess
 import sys
+import time
+from contextlib import nullcontext
 from pathlib import Path
 
 import cv2
@@ -14,44 +15,99 @@ from ultralytics import YOLO
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 MLRUNS_DIR = PROJECT_ROOT / "mlruns"
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.backends import DEFAULT_CACHE_DIR, load_backend_model, parity_check
+from utils.detection_cache import (
+    DEFAULT_CACHE_DIR as DEFAULT_DETECTION_CACHE_DIR,
+    DEFAULT_CONF_FLOOR,
+    DetectionCache,
+    cache_key,
+    cached_results,
+    video_hash,
+)
+from utils.detection_store import DetectionStoreWriter
+from utils.detections import ClassCounter, FrameDetections
+from utils.keyframe import FullRateReference, KeyframeTracker
+from utils.metric_sink import BufferedMetricSink
+from utils.stage_timer import EndToEndClock, StageTimers
+from utils.streaming_stats import StreamSummary
+from utils.tracking import make_tracker
+from utils.video_pipeline import (
+    BatchThroughput,
+    FramePipeline,
+    VideoFrameReader,
+    iter_batches,
+    resolve_source,
+)
 
 VIDEO_URL = "https://www.youtube.com/watch?v=Fb1e6ytEniA"
-INPUT_VIDEO: str | Path = VIDEO_URL
-OUTPUT_VIDEO = SCRIPT_DIR / "output_tracked.mp4"
-MODEL_WEIGHT = "yolo11n.pt"
-CONF = 0.25
+# 입력·출력·모델 설정 (bench_inference.py가 조합마다 환경 변수로 지정). 예: VIDEO_SOURCE=clip.mp4 IMGSZ=320
+INPUT_VIDEO: str | Path = os.environ.get("VIDEO_SOURCE", VIDEO_URL)
+OUTPUT_VIDEO = Path(os.environ.get("OUTPUT_VIDEO", str(SCRIPT_DIR / "output_tracked.mp4")))
+MODEL_WEIGHT = os.environ.get("MODEL_WEIGHT", "yolo11n.pt")
+CONF = float(os.environ.get("CONF", "0.25"))
+IMGSZ = int(os.environ.get("IMGSZ", "640"))
+# 처리할 최대 프레임 (0이면 영상 끝까지)
+MAX_FRAMES = int(os.environ.get("MAX_FRAMES", "0"))
+# 추론 백엔드: pytorch | onnx | openvino | torchscript. 예: BACKEND=openvino
+# pytorch 외에는 (가중치 해시, 백엔드, imgsz, batch)별로 한 번만 export → EXPORT_CACHE_DIR에 캐시
+BACKEND = os.environ.get("BACKEND", "pytorch")
+EXPORT_CACHE_DIR = Path(os.environ.get("EXPORT_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+# export 백엔드일 때 처음 N프레임에서 PyTorch 출력과 비교 (parity/* 메트릭). 0이면 생략
+PARITY_CHECK_FRAMES = int(os.environ.get("PARITY_CHECK_FRAMES", "0"))
+# N장마다 1장만 추적 (건너뛴 프레임은 grab만 → BGR 변환·추론 생략). 예: SKIP_FRAMES=2
+SKIP_FRAMES = int(os.environ.get("SKIP_FRAMES", "1"))
 TRACKER = "bytetrack.yaml"
 CACHE_VIDEO = SCRIPT_DIR / "input_video.mp4"
 
-EXPERIMENT_NAME = "yolo-bytetrack"
+EXPERIMENT_NAME = os.environ.get("MLFLOW_EXPERIMENT", "yolo-bytetrack")
 REGISTER_MODEL = False
 REGISTERED_MODEL_NAME = "yolo-bytetrack"
+# step 메트릭은 버퍼에 모아 백그라운드에서 log_batch (N개 또는 N초마다 flush)
+METRIC_FLUSH_SIZE = 500
+METRIC_FLUSH_INTERVAL_S = 5.0
+# Pipelined: decode 스레드 → track → plot/encode 스레드 (bounded queue). 예: PIPELINED=1
+PIPELINED = os.environ.get("PIPELINED", "0") == "1"
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "8"))
+# Micro-batch: BATCH_SIZE장(또는 BATCH_MAX_WAIT_S초)씩 한 번에 track → 결과는 프레임 순서대로 tracker·로깅
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "1"))
+BATCH_MAX_WAIT_S = float(os.environ.get("BATCH_MAX_WAIT_S", "0.5"))
+# Stage timing: decode/track/postprocess/log/draw/encode 구간별 p50/p99·비중 → stage/* + Chrome trace. 끄려면 STAGE_TIMING=0
+STAGE_TIMING = os.environ.get("STAGE_TIMING", "1") == "1"
+STAGE_TRACE_EVENTS = int(os.environ.get("STAGE_TRACE_EVENTS", "100000"))
+# e2e/fps에서 뺄 처음 프레임 수 (배치 경계로 올림). 예: E2E_WARMUP_FRAMES=10
+E2E_WARMUP_FRAMES = int(os.environ.get("E2E_WARMUP_FRAMES", "0"))
+# Detection store: 모든 검출(track_id 포함)을 Parquet으로 백그라운드 저장 → detections/ 아티팩트. 끄려면 DETECTION_STORE=0
+DETECTION_STORE = os.environ.get("DETECTION_STORE", "1") == "1"
+DETECTION_STORE_PATH = SCRIPT_DIR / "detections_tracked.parquet"
+DETECTION_ROW_GROUP_SIZE = int(os.environ.get("DETECTION_ROW_GROUP_SIZE", "50000"))
+# Detection cache: 같은 (영상 해시, 가중치 해시, imgsz, backend, skip)이면 검출기 대신 캐시 재생 → tracker만 다시 실행
+# CONF·TRACKER 설정만 바꾼 반복 실험은 추론 없음. 기본 꺼짐 (켜면 miss에도 floor conf로 추론하고
+# 트래킹이 model.track 대신 캐시 검출 + apply_tracker 경로) → 반복 실험에서만 명시적으로
+# 예: DETECTION_CACHE=1
+DETECTION_CACHE = os.environ.get("DETECTION_CACHE", "0") == "1"
+DETECTION_CACHE_DIR = Path(os.environ.get("DETECTION_CACHE_DIR", str(DEFAULT_DETECTION_CACHE_DIR)))
+DETECTION_CACHE_MAX_GB = float(os.environ.get("DETECTION_CACHE_MAX_GB", "5"))
+DETECTION_CACHE_CONF_FLOOR = float(os.environ.get("DETECTION_CACHE_CONF_FLOOR", str(DEFAULT_CONF_FLOOR)))
+# Keyframe 검출: KEYFRAME_INTERVAL 프레임마다(또는 장면 전환·전파 품질 저하 시)만 검출기 실행, 사이 프레임은 track 박스 전파
+# 전파 방식 flow(sparse optical flow) | motion(검출기 프레임 사이 중심 이동량으로 등속 외삽, tracker Kalman 미사용). 1이면 매 프레임 검출 (기존 동작)
+KEYFRAME_INTERVAL = int(os.environ.get("KEYFRAME_INTERVAL", "1"))
+KEYFRAME_PROPAGATION = os.environ.get("KEYFRAME_PROPAGATION", "flow")
+KEYFRAME_SCENE_THRESH = float(os.environ.get("KEYFRAME_SCENE_THRESH", "0.15"))  # 축소 grayscale 평균 절대 차 (0~1), 0이면 끔
+KEYFRAME_MIN_CONFIDENCE = float(os.environ.get("KEYFRAME_MIN_CONFIDENCE", "0.5"))  # flow 전파 품질이 이보다 낮으면 검출 강제
+# 정확도 비용 측정: 매 프레임 검출한 full-rate tracking을 기준으로 keyframe/vs_full/mota·idf1 (검출기를 매 프레임 추가 실행)
+KEYFRAME_EVAL = os.environ.get("KEYFRAME_EVAL", "0") == "1"
+KEYFRAME_EVAL_LOG_EVERY = int(os.environ.get("KEYFRAME_EVAL_LOG_EVERY", "100"))
 
 
 def _resolve_source(source: str | Path) -> str:
     """URL이면 OpenCV로 열고, 실패 시 yt-dlp로 다운로드 후 로컬 경로 반환."""
-    path_str = str(source)
-    if not path_str.startswith(("http://", "https://")):
-        return path_str
-
-    cap = cv2.VideoCapture(path_str)
-    if cap.isOpened():
-        cap.release()
-        return path_str
-
-    if not CACHE_VIDEO.exists():
-        print("YouTube URL은 OpenCV로 직접 열 수 없어 yt-dlp로 다운로드합니다...", file=sys.stderr)
-        ok = subprocess.run(
-            ["yt-dlp", "-f", "best[ext=mp4]/best", "-o", str(CACHE_VIDEO), "--newline", path_str],
-            timeout=300,
-        ).returncode == 0
-        if not ok:
-            print(
-                "오류: yt-dlp로 다운로드 실패. yt-dlp 설치 후 재시도: pip install yt-dlp",
-                file=sys.stderr,
-            )
-            sys.exit(1)
-    return str(CACHE_VIDEO)
+    try:
+        return resolve_source(source, CACHE_VIDEO)
+    except RuntimeError as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 def main() -> None:
@@ -70,7 +126,7 @@ def main() -> None:
         sys.exit(1)
 
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    output = cv2.VideoWriter(str(OUTPUT_VIDEO), fourcc, fps, (w, h))
+    output = cv2.VideoWriter(str(OUTPUT_VIDEO), fourcc, fps / SKIP_FRAMES, (w, h))
     if not output.isOpened():
         print(f"오류: 출력 파일을 생성할 수 없습니다: {OUTPUT_VIDEO}", file=sys.stderr)
         cap.release()
@@ -79,92 +135,264 @@ def main() -> None:
     if not os.environ.get("MLFLOW_TRACKING_URI"):
         mlflow.set_tracking_uri(MLRUNS_DIR.as_uri())
     mlflow.set_experiment(EXPERIMENT_NAME)
-    with mlflow.start_run(run_name="yolo11n-bytetrack", log_system_metrics=True):
+    with (
+        mlflow.start_run(run_name="yolo11n-bytetrack", log_system_metrics=True) as run,
+        BufferedMetricSink(
+            run.info.run_id, flush_size=METRIC_FLUSH_SIZE, flush_interval_s=METRIC_FLUSH_INTERVAL_S
+        ) as sink,
+    ):
         mlflow.log_params({
             "model": MODEL_WEIGHT,
             "source": str(INPUT_VIDEO)[:200],
             "conf": CONF,
+            "imgsz": IMGSZ,
             "tracker": TRACKER,
+            "skip_frames": SKIP_FRAMES,
             "fps": fps,
             "width": w,
             "height": h,
+            "pipelined": PIPELINED,
+            "batch_size": BATCH_SIZE,
+            "batch_max_wait_s": BATCH_MAX_WAIT_S,
+            "keyframe_interval": KEYFRAME_INTERVAL,
+            "max_frames": MAX_FRAMES,
+            "e2e_warmup_frames": E2E_WARMUP_FRAMES,
+            "metric_flush_size": METRIC_FLUSH_SIZE,
+            "metric_flush_interval_s": METRIC_FLUSH_INTERVAL_S,
         })
 
-        model = YOLO(MODEL_WEIGHT)
+        model, backend_info = load_backend_model(MODEL_WEIGHT, BACKEND, IMGSZ, BATCH_SIZE, EXPORT_CACHE_DIR)
+        mlflow.log_params(backend_info.params())
+        mlflow.set_tag("export_cache", backend_info.cache_tag)
+        sink.log_metrics(backend_info.metrics())
+        print(f"Backend: {BACKEND} ({backend_info.model_path}, export cache: {backend_info.cache_tag})")
+        if BACKEND != "pytorch" and PARITY_CHECK_FRAMES > 0:
+            parity_cap = cv2.VideoCapture(source)
+            parity_frames = [f for _, f in VideoFrameReader(parity_cap, PARITY_CHECK_FRAMES, SKIP_FRAMES)]
+            parity_cap.release()
+            if parity_frames:
+                sink.log_metrics(parity_check(YOLO(MODEL_WEIGHT), model, parity_frames, IMGSZ, CONF))
         frame_count = 0
         total_detections = 0
-        speed_inference: list[float] = []
-        all_confidences: list[float] = []
-        detections_per_class: dict[str, int] = {}
+        # 상수 메모리 스트리밍 통계 (평균/분산/min/max + p50/p95/p99)
+        speed_inference = StreamSummary()
+        conf_stats = StreamSummary(hist_range=(0.0, 1.0))
+        class_counter = ClassCounter()
+        store = DetectionStoreWriter(
+            DETECTION_STORE_PATH,
+            source_id=str(INPUT_VIDEO),
+            model_hash=backend_info.weights_hash,
+            row_group_size=DETECTION_ROW_GROUP_SIZE,
+        ) if DETECTION_STORE else None
+        timers = StageTimers(enabled=STAGE_TIMING, trace_events=STAGE_TRACE_EVENTS)
+        track_span = timers.stage("track")
+        post_span = timers.stage("postprocess")
+        log_span = timers.stage("log")
+        draw_span = timers.stage("draw")
+        encode_span = timers.stage("encode")
 
-        try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                results = model.track(
-                    frame,
-                    tracker=TRACKER,
-                    persist=True,
-                    conf=CONF,
+        # plot + write: pipelined면 encode 스레드에서, 아니면 루프 안에서 바로
+        def _encode(r) -> None:
+            with draw_span:
+                plotted = r.plot()
+            with encode_span:
+                output.write(plotted)
+
+        reader = VideoFrameReader(cap, max_frames=MAX_FRAMES or sys.maxsize, skip_frames=SKIP_FRAMES)
+        decoded = timers.wrap_iter("decode", reader)
+        pipeline = FramePipeline(decoded, _encode, PIPELINE_QUEUE_SIZE) if PIPELINED else None
+        throughput = BatchThroughput(sink)
+        frames = pipeline if pipeline is not None else decoded
+        def _infer_batches(items, conf: float, track: bool):
+            """BATCH_SIZE장씩 track(persist) 또는 predict → (frame, result) 프레임 순서대로."""
+            for batch in iter_batches(items, BATCH_SIZE, BATCH_MAX_WAIT_S):
+                imgs = [frame for _, frame in batch]
+                t0 = time.perf_counter()
+                with track_span:
+                    if track:
+                        results = model.track(
+                            imgs if len(imgs) > 1 else imgs[0],
+                            tracker=TRACKER,
+                            persist=True,
+                            conf=conf,
+                            imgsz=IMGSZ,
+                        )
+                    else:
+                        results = model.predict(imgs, conf=conf, imgsz=IMGSZ, verbose=False)
+                throughput.record(len(imgs), time.perf_counter() - t0)
+                yield from zip(imgs, results)
+
+        det_cache_writer = None
+        keyframe = None
+        full_ref = None
+        if KEYFRAME_INTERVAL > 1:
+            # 다음 프레임의 검출 여부가 전파 품질에 달려 있어 프레임 단위로 실행 (BATCH_SIZE·검출 캐시 미사용)
+            def _detect(frame):
+                t0 = time.perf_counter()
+                with track_span:
+                    r = model.predict(frame, conf=CONF, imgsz=IMGSZ, verbose=False)[0]
+                throughput.record(1, time.perf_counter() - t0)
+                return r
+
+            keyframe = KeyframeTracker(
+                _detect,
+                make_tracker(TRACKER, frame_rate=round(fps / SKIP_FRAMES)),
+                model.names,
+                interval=KEYFRAME_INTERVAL,
+                propagation=KEYFRAME_PROPAGATION,
+                scene_thresh=KEYFRAME_SCENE_THRESH,
+                min_confidence=KEYFRAME_MIN_CONFIDENCE,
+                path=source,
+            )
+            if KEYFRAME_EVAL:
+                full_ref = FullRateReference(
+                    lambda frame: model.predict(frame, conf=CONF, imgsz=IMGSZ, verbose=False)[0],
+                    make_tracker(TRACKER, frame_rate=round(fps / SKIP_FRAMES)),
                 )
-                annotated = results[0].plot()
-                output.write(annotated)
-
-                frame_count += 1
-                r = results[0]
-                if getattr(r, "speed", None):
-                    inf_ms = float(r.speed.get("inference", 0))
-                    speed_inference.append(inf_ms)
-                    mlflow.log_metric("inference_ms", inf_ms, step=frame_count)
-                    if inf_ms > 0:
-                        mlflow.log_metric("inference_fps", 1000.0 / inf_ms, step=frame_count)
-                boxes = r.boxes
-                n_this = len(boxes)
-                total_detections += n_this
-                mlflow.log_metric("detections_per_frame", n_this, step=frame_count)
-                mlflow.log_metric("cumulative_detections", total_detections, step=frame_count)
-                for box in boxes:
-                    conf_val = box.conf.item()
-                    all_confidences.append(conf_val)
-                    cls_id = int(box.cls.item())
-                    names = getattr(r, "names", {})
-                    label = names.get(cls_id, str(cls_id)) if isinstance(names, dict) else (
-                        names[cls_id] if 0 <= cls_id < len(names) else str(cls_id)
-                    )
-                    detections_per_class[label] = detections_per_class.get(label, 0) + 1
-                if boxes and hasattr(boxes, "conf"):
-                    mean_conf = sum(b.conf.item() for b in boxes) / len(boxes)
-                    mlflow.log_metric("confidence_mean_frame", mean_conf, step=frame_count)
+            mlflow.log_params({
+                "keyframe_propagation": KEYFRAME_PROPAGATION,
+                "keyframe_scene_thresh": KEYFRAME_SCENE_THRESH,
+                "keyframe_min_confidence": KEYFRAME_MIN_CONFIDENCE,
+                "keyframe_eval": KEYFRAME_EVAL,
+            })
+            if BATCH_SIZE > 1 or DETECTION_CACHE:
+                print("⚠️ Keyframe 모드: BATCH_SIZE·검출 캐시를 사용하지 않습니다 (프레임 단위 검출)")
+            print(f"Keyframe 검출: {KEYFRAME_INTERVAL}프레임마다 + 장면 전환·전파 품질 저하 시 ({KEYFRAME_PROPAGATION} 전파)")
+            results_iter = keyframe.run(frames)
+        elif DETECTION_CACHE and Path(source).is_file() and DETECTION_CACHE_CONF_FLOOR <= CONF:
+            det_cache = DetectionCache(DETECTION_CACHE_DIR, int(DETECTION_CACHE_MAX_GB * 1024**3))
+            det_cache_key = cache_key(
+                video_hash=video_hash(source, DETECTION_CACHE_DIR),
+                weights_hash=backend_info.weights_hash,
+                imgsz=IMGSZ,
+                backend=BACKEND,
+                skip_frames=SKIP_FRAMES,
+                max_frames=reader.max_frames,
+                conf_floor=DETECTION_CACHE_CONF_FLOOR,
+            )
+            cached = det_cache.lookup(det_cache_key)
+            if cached is None:
+                det_cache_writer = det_cache.writer(
+                    det_cache_key, {"source": str(INPUT_VIDEO), "weights_hash": backend_info.weights_hash}
+                )
+            # 캐시 경로: 검출(conf floor)과 tracker를 분리 → hit/miss 모두 같은 tracker 입력
+            results_iter = cached_results(
+                frames,
+                lambda items: _infer_batches(items, DETECTION_CACHE_CONF_FLOOR, False),
+                CONF,
+                model.names,
+                cached=cached,
+                writer=det_cache_writer,
+                tracker=make_tracker(TRACKER, frame_rate=round(fps / SKIP_FRAMES)),
+                path=source,
+            )
+            mlflow.set_tag("detection_cache", "hit" if cached is not None else "miss")
+            mlflow.log_param("detection_cache_key", det_cache_key)
+            sink.log_metric("detection_cache_hit", float(cached is not None))
+            print(f"Detection cache {'hit (추론 생략)' if cached is not None else 'miss (추론 후 저장)'}: {det_cache_key}")
+        else:
+            results_iter = _infer_batches(frames, CONF, True)
+
+        timers.reset_wall()
+        clock = EndToEndClock(E2E_WARMUP_FRAMES, BATCH_SIZE)
+        try:
+            with (pipeline or nullcontext()):
+                for _, r in results_iter:
+                    if pipeline is not None:
+                        pipeline.submit(r)
+                    else:
+                        _encode(r)
+                    frame_count += 1
+                    # 프레임당 한 번 배열로 변환 → 카운트·평균을 배열 단위로
+                    with post_span:
+                        det = FrameDetections.from_result(r)
+                        n_this = len(det)
+                        total_detections += n_this
+                        conf_stats.update_many(det.conf)
+                        class_counter.update(det.cls)
+                        if store is not None:
+                            store.append(frame_count, det, (frame_count - 1) * SKIP_FRAMES / fps)
+                    with log_span:
+                        if getattr(r, "speed", None):
+                            inf_ms = float(r.speed.get("inference", 0))
+                            speed_inference.update(inf_ms)
+                            sink.log_metric("inference_ms", inf_ms, step=frame_count)
+                            if inf_ms > 0:
+                                sink.log_metric("inference_fps", 1000.0 / inf_ms, step=frame_count)
+                        sink.log_metric("detections_per_frame", n_this, step=frame_count)
+                        sink.log_metric("cumulative_detections", total_detections, step=frame_count)
+                        mean_conf = det.mean_conf()
+                        if mean_conf is not None:
+                            sink.log_metric("confidence_mean_frame", mean_conf, step=frame_count)
+                        if keyframe is not None:
+                            sink.log_metric("keyframe_step/detector_call", float(keyframe.last_reason is not None), step=frame_count)
+                            if keyframe.last_reason is None:
+                                sink.log_metric("keyframe_step/propagation_quality", keyframe.last_quality, step=frame_count)
+                    if full_ref is not None:
+                        full_ref.update(frame_count, r.orig_img, r)
+                        if KEYFRAME_EVAL_LOG_EVERY > 0 and frame_count % KEYFRAME_EVAL_LOG_EVERY == 0:
+                            sink.log_metrics(full_ref.running_metrics(), step=frame_count)
+                    clock.tick()
+            clock.stop()  # pipeline encode 큐까지 끝난 시점
+            if det_cache_writer is not None:
+                det_cache_writer.commit(model.names)
+                print(f"✅ Detection cache 저장: {det_cache_writer.frames} frames → {DETECTION_CACHE_DIR}")
         finally:
             cap.release()
             output.release()
-
-        def _avg(x: list[float]) -> float:
-            return sum(x) / len(x) if x else 0.0
+            if store is not None:
+                store.close()
+        if pipeline is not None:
+            sink.log_metrics(pipeline.metrics())
+            mlflow.set_tag("pipeline_bottleneck", pipeline.bottleneck())
+        if STAGE_TIMING:
+            timers.log_to_mlflow(sink, "stats/stage_trace.json" if STAGE_TRACE_EVENTS else None)
 
         summary: dict[str, float] = {
             "frames_processed": float(frame_count),
+            # 검출기가 실제로 처리한 프레임 수 (keyframe 모드는 검출 호출만, 검출 캐시 hit이면 0)
+            "frames_inferred": float(throughput.frames),
             "total_detections": float(total_detections),
             "detections_per_frame_avg": total_detections / frame_count if frame_count else 0.0,
+            **clock.metrics(),
         }
-        if speed_inference:
-            summary["inference_ms_avg"] = _avg(speed_inference)
-            summary["inference_fps_avg"] = 1000.0 / _avg(speed_inference) if _avg(speed_inference) > 0 else 0.0
-        if all_confidences:
-            summary["confidence_mean"] = _avg(all_confidences)
-            summary["confidence_max"] = max(all_confidences)
-            summary["confidence_min"] = min(all_confidences)
-        mlflow.log_metrics(summary)
-        for label, count in detections_per_class.items():
-            mlflow.log_metric(f"detections/{label}", count)
+        if speed_inference.count:
+            summary["inference_ms_avg"] = speed_inference.mean
+            summary["inference_fps_avg"] = 1000.0 / speed_inference.mean if speed_inference.mean > 0 else 0.0
+            summary.update(speed_inference.summary("inference_ms"))
+        if conf_stats.count:
+            summary.update(conf_stats.summary("confidence"))
+            mlflow.log_dict(conf_stats.hist.as_dict(), "stats/confidence_histogram.json")
+        summary.update(reader.metrics())
+        summary.update(throughput.metrics())
+        if keyframe is not None:
+            summary.update(keyframe.metrics())
+            print(
+                f"Keyframe: 검출기 {summary['keyframe/detector_calls']:.0f}/{frame_count} 프레임 "
+                f"({summary['keyframe/detector_rate']:.1%})"
+            )
+        if full_ref is not None:
+            summary.update(full_ref.metrics())
+            print(
+                f"Keyframe vs full-rate: MOTA {summary['keyframe/vs_full/mota']:.4f}  "
+                f"IDF1 {summary['keyframe/vs_full/idf1']:.4f}"
+            )
+        sink.log_metrics(summary)
+        for label, count in class_counter.as_dict(model.names).items():
+            sink.log_metric(f"detections/{label}", count)
+
+        if store is not None:
+            sink.log_metrics(store.metrics())
+            if DETECTION_STORE_PATH.exists():
+                mlflow.log_artifact(str(DETECTION_STORE_PATH), "detections")
 
         if OUTPUT_VIDEO.exists():
             mlflow.log_artifact(str(OUTPUT_VIDEO), "output")
             mlflow.log_param("output_video_path", str(OUTPUT_VIDEO))
 
-        if REGISTER_MODEL:
+        if REGISTER_MODEL and BACKEND != "pytorch":
+            print(f"⚠️ Model Registry 등록 생략: BACKEND={BACKEND} (PyTorch 백엔드에서만 등록)")
+        elif REGISTER_MODEL:
             try:
                 mlflow.pytorch.log_model(
                     model.model,
@@ -3,23 +3,52 @@ MLflow-YOLO 통합 유틸리티
 Ultralytics YOLO의 학습 결과를 MLflow에 자동으로 로깅
 """
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Optional
 import mlflow
 from ultralytics import YOLO
 from ultralytics.utils.callbacks.base import add_integration_callbacks
 
+from utils.dataset_manifest import load_manifest, log_dataset_version, manifest_trainer
+from utils.image_cache import image_cache_trainer_from_env
+from utils.metric_sink import BufferedMetricSink
+
 
 class MLflowYOLOCallback:
     """YOLO 학습 과정을 MLflow에 자동 로깅하는 콜백"""
     
-    def __init__(self, log_model: bool = True, log_plots: bool = True):
+    def __init__(
+        self,
+        log_model: bool = True,
+        log_plots: bool = True,
+        buffered: bool = True,
+        on_epoch: Optional[Callable[[int, Dict[str, float], Any], None]] = None,
+    ):
         self.log_model = log_model
         self.log_plots = log_plots
+        self.buffered = buffered
+        # 에포크 메트릭 구독 (epoch, metrics, trainer): sweep 스케줄러가 조기 종료 판단에 사용
+        self.on_epoch = on_epoch
         self.run_dir: Optional[Path] = None
+        self.sink: Optional[BufferedMetricSink] = None
+    
+    def _log_metrics(self, metrics: Dict[str, float], step: Optional[int] = None):
+        """메트릭 로깅: 버퍼(sink)가 열려 있으면 sink로, 아니면 mlflow 직접 호출"""
+        if self.sink is not None:
+            self.sink.log_metrics(metrics, step=step or 0)
+        else:
+            mlflow.log_metrics(metrics, step=step)
+    
+    def close(self):
+        """버퍼에 남은 메트릭 flush 후 sink 종료 (여러 번 호출해도 안전)"""
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
     
     def on_pretrain_routine_start(self, trainer):
-        """학습 시작 시 실행 디렉토리 저장"""
+        """학습 시작 시 실행 디렉토리 저장 + 메트릭 버퍼 시작"""
         self.run_dir = Path(trainer.save_dir)
+        if self.buffered and self.sink is None and mlflow.active_run():
+            self.sink = BufferedMetricSink()
     
     def on_train_epoch_end(self, trainer):
         """에포크 종료 시 메트릭 로깅"""
@@ -43,10 +72,13 @@ class MLflowYOLOCallback:
                 metrics[clean_key] = trainer.metrics[key]
         
         if metrics:
-            mlflow.log_metrics(metrics, step=epoch)
+            self._log_metrics(metrics, step=epoch)
+            if self.on_epoch is not None:
+                self.on_epoch(epoch, metrics, trainer)
     
     def on_train_end(self, trainer):
-        """학습 종료 시 아티팩트 로깅"""
+        """학습 종료 시 버퍼 flush + 아티팩트 로깅"""
+        self.close()
         if not mlflow.active_run() or not self.run_dir:
             return
         
@@ -79,7 +111,7 @@ class MLflowYOLOCallback:
                 "val/mAP50": validator.metrics.get("metrics/mAP50(B)", 0),
                 "val/mAP50-95": validator.metrics.get("metrics/mAP50-95(B)", 0),
             }
-            mlflow.log_metrics(val_metrics)
+            self._log_metrics(val_metrics)
 
 
 def train_with_mlflow(
@@ -94,6 +126,7 @@ def train_with_mlflow(
     extra_params: Optional[Dict[str, Any]] = None,
     log_model_registry: bool = False,
     registered_model_name: Optional[str] = None,
+    trainer: Optional[type] = None,
 ) -> YOLO:
     """
     MLflow 통합 YOLO 학습 함수
@@ -110,6 +143,8 @@ def train_with_mlflow(
         extra_params: 추가 파라미터 (MLflow에 로깅)
         log_model_registry: 모델 레지스트리 등록 여부
         registered_model_name: 등록할 모델 이름
+        trainer: Ultralytics trainer 클래스 (None이면 IMAGE_CACHE 환경 변수에 따라 이미지 캐시 trainer 또는 기본).
+            데이터셋은 항상 manifest(utils/dataset_manifest.py)로 열고 fingerprint를 dataset_version 태그로 기록
     
     Returns:
         학습된 YOLO 모델
@@ -129,7 +164,12 @@ def train_with_mlflow(
         }
         if extra_params:
             params.update(extra_params)
+        trainer = trainer or image_cache_trainer_from_env()
+        params["image_cache"] = trainer is not None
         mlflow.log_params(params)
+        manifest = load_manifest(data_yaml)
+        log_dataset_version(manifest)
+        trainer = manifest_trainer(manifest, trainer)
         
         # 콜백 설정
         callback = MLflowYOLOCallback()
@@ -145,14 +185,19 @@ def train_with_mlflow(
         if project_dir is None:
             project_dir = Path("mlflow_runs") / experiment_name
         
-        results = model.train(
-            data=str(data_yaml),
-            epochs=epochs,
-            batch=batch_size,
-            imgsz=imgsz,
-            project=str(project_dir),
-            name=run.info.run_id,  # MLflow run_id로 동기화
-        )
+        try:
+            results = model.train(
+                data=str(data_yaml),
+                epochs=epochs,
+                batch=batch_size,
+                imgsz=imgsz,
+                project=str(project_dir),
+                name=run.info.run_id,  # MLflow run_id로 동기화
+                trainer=trainer,
+            )
+        finally:
+            # 예외로 on_train_end가 호출되지 않아도 버퍼 메트릭 flush
+            callback.close()
         
         # Final validation
         val_results = model.val()
@@ -175,37 +220,3 @@ def train_with_mlflow(
             )
         
         return model
-
-
-def resolve_data_yaml(data_path: str, base_dir: Path) -> Path:
-    """
-    데이터셋 YAML 경로 자동 탐색
-    
-    Args:
-        data_path: 데이터셋 경로 (상대/절대)
-        base_dir: 기준 디렉토리
-    
-    Returns:
-        data.yaml 절대 경로
-    """
-    p = Path(data_path)
-    if not p.is_absolute():
-        p = (base_dir / p).resolve()
-    
-    # 이미 YAML 파일인 경우
-    if p.suffix.lower() in (".yaml", ".yml"):
-        return p
-    
-    # 표준 이름 검색
-    for name in ("data.yaml", "dataset.yaml", "train.yaml"):
-        candidate = p / name
-        if candidate.exists():
-            return candidate
-    
-    # 재귀 검색
-    for f in p.rglob("*.yaml"):
-        if "data" in f.stem.lower() or f.name == "dataset.yaml":
-            return f
-    
-    # 기본값 반환
-    return p / "data.yaml"
\ No newline at end of file
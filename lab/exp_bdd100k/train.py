@@ -10,7 +10,9 @@ import sys
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from experiments.base.mlflow_yolo import train_with_mlflow, resolve_data_yaml
+from lab.exp_bdd100k.base.mlflow_yolo import train_with_mlflow
+from utils.dataset_manifest import resolve_data_yaml
+from utils.dataset_subset import subset_data_yaml
 
 
 def main():
@@ -37,6 +39,8 @@ def main():
             f"Data YAML not found: {data_yaml}\n"
             f"Run download script or check DATA_PATH environment variable."
         )
+    # DATA_SUBSET=0.1 등이면 train split을 계층 샘플한 부분집합으로 (sweep 초기 탐색용)
+    data_yaml = subset_data_yaml(data_yaml)
     
     print(f"=== BDD100k Training Configuration ===")
     print(f"Model: {model_size}")
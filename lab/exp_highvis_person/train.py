@@ -2,29 +2,20 @@
 YOLO 실험: High-Vis Person Detection (tudorhirtopanu/yolo-highvis-and-person-detection-dataset)
 """
 import os
+import sys
 from pathlib import Path
 
 import mlflow
 from ultralytics import YOLO
 
 
-def _resolve_data_yaml(data_path: str, base_dir: Path) -> Path:
-    p = Path(data_path)
-    if not p.is_absolute():
-        p = (base_dir / p).resolve()
-    if p.suffix.lower() in (".yaml", ".yml"):
-        return p
-    for name in ("data.yaml", "dataset.yaml", "train.yaml"):
-        candidate = p / name
-        if candidate.exists():
-            return candidate
-    for f in p.rglob("*.yaml"):
-        if "data" in f.stem.lower() or f.name == "dataset.yaml":
-            return f
-    return p / "data.yaml"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
 
+from utils.dataset_manifest import load_manifest, log_dataset_version, manifest_trainer, resolve_data_yaml  # noqa: E402
+from utils.dataset_subset import subset_data_yaml  # noqa: E402
+from utils.image_cache import image_cache_trainer_from_env  # noqa: E402
 
-PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 mlflow.set_experiment("lab-highvis-person")
 
 data_path = os.getenv("data_path", "datasets/tudorhirtopanu/yolo-highvis-and-person-detection-dataset")
@@ -32,9 +23,10 @@ epochs = int(os.getenv("epochs", "5"))
 batch_size = int(os.getenv("batch_size", "16"))
 model_size = os.getenv("model_size", "yolov8n")
 
-data_yaml = _resolve_data_yaml(data_path, PROJECT_ROOT)
+data_yaml = resolve_data_yaml(data_path, PROJECT_ROOT)
 if not data_yaml.exists():
     raise FileNotFoundError(f"Data YAML not found: {data_yaml}. Run test.py or download_datasets.py first.")
+data_yaml = subset_data_yaml(data_yaml)  # DATA_SUBSET=0.1 등이면 train 계층 샘플 부분집합
 
 run_name = f"highvis-{model_size}-e{epochs}"
 project_dir = PROJECT_ROOT / "mlflow_runs" / "lab_highvis_person"
@@ -47,6 +39,8 @@ with mlflow.start_run(run_name=run_name):
         "model_size": model_size,
         "dataset": "yolo-highvis-and-person-detection-dataset",
     })
+    manifest = load_manifest(data_yaml)
+    log_dataset_version(manifest)
     model = YOLO(f"{model_size}.pt")
     results = model.train(
         data=str(data_yaml),
@@ -55,6 +49,8 @@ with mlflow.start_run(run_name=run_name):
         imgsz=640,
         project=str(project_dir),
         name=run_name,
+        # 이미지 목록·라벨 캐시는 manifest에서, IMAGE_CACHE=1이면 이미지도 미리 디코딩한 memmap에서
+        trainer=manifest_trainer(manifest, image_cache_trainer_from_env()),
     )
     val_results = model.val()
     box = getattr(val_results, "box", None)
@@ -19,6 +19,14 @@ model_size = os.getenv("model_size", "yolov8m")
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_PATH = BASE_DIR / "datasets" / "coco8" / "coco8.yaml"
 
+# DATA_SUBSET=0.1 등이면 train split을 계층 샘플한 부분집합으로 학습 (utils/dataset_subset.py)
+sys.path.insert(0, str(BASE_DIR))
+from utils.dataset_manifest import load_manifest, log_dataset_version  # noqa: E402
+from utils.dataset_subset import DATA_SUBSET, subset_data_yaml  # noqa: E402
+
+if DATA_SUBSET:
+    DATA_PATH = subset_data_yaml(DATA_PATH, DATA_SUBSET)
+
 # 모델 크기별 특성
 model_specs = {
     "yolov8n": {"params": "3.2M", "size": "nano"},
@@ -39,6 +47,8 @@ with mlflow.start_run(run_name=f"model-size-{model_size}-e{epochs}"):
         "model_category": spec["size"],
         "experiment_type": "model_size"
     })
+    if DATA_SUBSET:
+        log_dataset_version(load_manifest(DATA_PATH))
     
     # 모델 초기화
     model = YOLO(f"{model_size}.pt")
@@ -0,0 +1,109 @@
+"""
+BDD100k 라벨 JSON → YOLO 라벨 + data.yaml 변환 (utils/bdd100k.py).
+JSON을 스트리밍으로 파싱하고 프로세스 풀로 라벨 파일을 씀. 다시 실행하면 라벨이 바뀐 이미지만 다시 씀.
+
+- 라벨 JSON(bdd100k_labels_images_<split>.json / det_<split>.json)과 이미지(images/100k/<split>)는 --src에서 자동 탐색,
+  다른 위치면 --labels train=<json> --images train=<dir>
+- --class-map: yaml 경로 또는 lab/exp_bdd100k/class_maps의 이름 (bdd10, vehicle8)
+- 출력 --out(기본 <src>/yolo)의 data.yaml은 resolve_data_yaml(<src>)가 찾으므로
+  lab/exp_bdd100k(DATA_PATH=datasets/solesensei/solesensei_bdd100k)가 그대로 사용
+
+사용:
+  python scripts/convert_bdd100k.py
+  python scripts/convert_bdd100k.py --class-map vehicle8 --out datasets/bdd100k_vehicle8 --workers 8
+  python scripts/convert_bdd100k.py --labels val=/data/det_val.json --images val=/data/images/100k/val --splits val
+"""
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.bdd100k import (
+    BDD_IMAGE_SIZE,
+    class_map_digest,
+    convert_split,
+    converted_class_maps,
+    find_split_sources,
+    write_data_yaml,
+)
+
+CLASS_MAP_DIR = PROJECT_ROOT / "lab" / "exp_bdd100k" / "class_maps"
+
+
+def _pairs(values: list[str], flag: str) -> dict[str, Path]:
+    out = {}
+    for v in values:
+        split, sep, path = v.partition("=")
+        if not sep:
+            raise SystemExit(f"{flag}는 split=경로 형식입니다: {v}")
+        out[split] = Path(path)
+    return out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="BDD100k 라벨 JSON → YOLO 라벨 + data.yaml (스트리밍·병렬·증분)")
+    p.add_argument("--src", type=Path, default=PROJECT_ROOT / "datasets" / "solesensei" / "solesensei_bdd100k")
+    p.add_argument("--out", type=Path, default=None, help="출력 루트 (기본 <src>/yolo)")
+    p.add_argument("--class-map", default="bdd10", help="클래스 맵 yaml 또는 class_maps 이름")
+    p.add_argument("--splits", nargs="+", default=["train", "val"])
+    p.add_argument("--labels", nargs="*", default=[], help="split=라벨 JSON (자동 탐색 대신)")
+    p.add_argument("--images", nargs="*", default=[], help="split=이미지 디렉터리 (자동 탐색 대신)")
+    p.add_argument("--workers", type=int, default=0, help="변환 프로세스 수 (0이면 코어 수)")
+    p.add_argument("--image-size", type=int, nargs=2, default=list(BDD_IMAGE_SIZE), metavar=("W", "H"))
+    p.add_argument("--force", action="store_true", help="JSON이 그대로여도 모든 이미지를 다시 비교 (나중에 추가된 이미지 링크 포함)")
+    args = p.parse_args()
+
+    class_map = Path(args.class_map)
+    if not class_map.exists():
+        class_map = CLASS_MAP_DIR / f"{args.class_map}.yaml"
+    if not class_map.exists():
+        raise SystemExit(f"클래스 맵이 없습니다: {args.class_map} (예: {', '.join(x.stem for x in sorted(CLASS_MAP_DIR.glob('*.yaml')))})")
+    out = (args.out or args.src / "yolo").resolve()
+    labels, images = _pairs(args.labels, "--labels"), _pairs(args.images, "--images")
+    found = find_split_sources(args.src, tuple(args.splits), skip=out) if args.src.exists() else {}
+    sources = {}
+    for split in args.splits:
+        label_json = labels.get(split) or (found[split][0] if split in found else None)
+        image_dir = images.get(split) or (found[split][1] if split in found else None)
+        if label_json is None or image_dir is None:
+            print(f"⚠️ {split}: 라벨 JSON 또는 이미지 디렉터리를 찾지 못했습니다 (--labels/--images로 지정)")
+            continue
+        sources[split] = (label_json, image_dir)
+    if not sources:
+        return 1
+    # data.yaml은 split들이 공유 → 이번에 변환하지 않는 split이 다른 클래스 맵이면 중단
+    digest = class_map_digest(class_map)
+    others = [s for s, d in converted_class_maps(out).items() if s not in sources and d != digest]
+    if others:
+        raise SystemExit(f"{out}의 {', '.join(others)}는 다른 클래스 맵으로 변환되어 있습니다 (같이 변환하거나 다른 --out 사용)")
+
+    t0 = time.perf_counter()
+    names: list[str] = []
+    for split, (label_json, image_dir) in sources.items():
+        print(f"🔍 {split}: {label_json} → {out / 'labels' / split}")
+        stats = convert_split(split, label_json, image_dir, out, class_map, args.workers, tuple(args.image_size), args.force)
+        names = stats["names"]
+        if stats["status"] == "skipped":
+            print(f"  ✅ 변경 없음: {stats['frames']}장, 박스 {stats['boxes']}")
+            continue
+        print(
+            f"  ✅ {stats['frames']}장 ({stats['frames_per_s']:.0f} img/s, {stats['elapsed_s']:.1f}s), 박스 {stats['boxes']}, "
+            f"새로 씀 {stats['written']}, 그대로 {stats['unchanged']}, 삭제 {stats['removed']}"
+        )
+        for name, n in sorted(stats["class_hist"].items(), key=lambda kv: -kv[1]):
+            print(f"      {name:<16} {n:>9}")
+    # 이전 실행에서 변환한 split(state.sqlite)도 포함 → --splits val만 다시 변환해도 train이 data.yaml에 남음
+    splits = [*sources, *(s for s in converted_class_maps(out) if s not in sources)]
+    data_yaml = write_data_yaml(out, names, splits, class_map)
+    # ru_maxrss: Linux KB (파싱 메모리가 JSON 크기와 무관한지 확인용)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"✅ {data_yaml} ({time.perf_counter() - t0:.1f}s, 최대 메모리 {peak_mb:.0f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+추론 백엔드 선택 (PyTorch / ONNX Runtime / OpenVINO / TorchScript) + export 결과 디스크 캐시.
+export는 (가중치 파일 해시, 백엔드, imgsz, batch) 조합마다 한 번만 하고, 이후에는 캐시된 모델을 바로 로드.
+Ultralytics YOLO()는 export된 파일/디렉터리도 그대로 열 수 있으므로 predict/track 호출 코드는 동일.
+"""
+import hashlib
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from ultralytics import YOLO
+
+from utils.detections import FrameDetections
+
+# 백엔드 이름 → Ultralytics export format (pytorch는 export 없음)
+BACKEND_FORMATS = {
+    "pytorch": None,
+    "onnx": "onnx",
+    "openvino": "openvino",
+    "torchscript": "torchscript",
+}
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "gaflow" / "exports"
+
+
+@dataclass
+class BackendInfo:
+    """로드한 백엔드 정보 (MLflow 로깅용)."""
+
+    backend: str
+    model_path: str
+    weights_hash: str
+    cache_hit: bool | None = None  # pytorch는 None (캐시 대상 아님)
+    export_s: float = 0.0
+
+    def params(self) -> dict[str, Any]:
+        return {"backend": self.backend, "backend_model": Path(self.model_path).name, "weights_hash": self.weights_hash}
+
+    def metrics(self) -> dict[str, float]:
+        if self.cache_hit is None:
+            return {}
+        return {"export_cache_hit": float(self.cache_hit), "export_s": self.export_s}
+
+    @property
+    def cache_tag(self) -> str:
+        return "n/a" if self.cache_hit is None else ("hit" if self.cache_hit else "miss")
+
+
+def file_hash(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """파일 sha256 앞 16자리 (가중치 버전 식별용)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def _resolve_weights(weights: str | Path) -> Path:
+    """로컬에 없으면 YOLO()로 한 번 로드해 Ultralytics 자동 다운로드 경로 사용."""
+    path = Path(weights)
+    if path.exists():
+        return path.resolve()
+    ckpt = getattr(YOLO(str(weights)), "ckpt_path", None)
+    if not ckpt or not Path(ckpt).exists():
+        raise FileNotFoundError(f"가중치 파일을 찾을 수 없습니다: {weights}")
+    return Path(ckpt).resolve()
+
+
+class ExportCache:
+    """
+    export 결과 캐시. 키 디렉터리 <root>/<stem>-<hash>-<backend>-<imgsz>-b<batch>/ 안에 export 산출물 하나.
+    export는 임시 디렉터리에 가중치를 복사해 수행한 뒤 rename으로 옮기므로, 원본 가중치 옆에 파일이 생기지 않고
+    중단되더라도 반쪽짜리 캐시가 남지 않음.
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+
+    def key(self, weights: Path, weights_hash: str, backend: str, imgsz: int, batch: int) -> str:
+        return f"{weights.stem}-{weights_hash}-{backend}-{imgsz}-b{batch}"
+
+    def lookup(self, key: str) -> Path | None:
+        entry = self.root / key
+        if not entry.is_dir():
+            return None
+        found = [p for p in entry.iterdir() if not p.name.startswith(".")]
+        return found[0] if found else None
+
+    def get_or_export(self, weights: Path, weights_hash: str, backend: str, imgsz: int, batch: int) -> tuple[Path, bool, float]:
+        """(export된 모델 경로, cache hit 여부, export 소요 초)."""
+        key = self.key(weights, weights_hash, backend, imgsz, batch)
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached, True, 0.0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=self.root, prefix=".export-") as tmp:
+            tmp_weights = Path(tmp) / weights.name
+            shutil.copy2(weights, tmp_weights)
+            exported = YOLO(str(tmp_weights)).export(
+                format=BACKEND_FORMATS[backend],
+                imgsz=imgsz,
+                batch=batch,
+                dynamic=batch > 1 and backend in ("onnx", "openvino"),  # 마지막 배치가 작아도 동작하도록
+                device="cpu",
+            )
+            staged = Path(tmp) / key
+            staged.mkdir()
+            shutil.move(str(exported), staged / Path(exported).name)
+            entry = self.root / key
+            try:
+                staged.rename(entry)
+            except OSError:
+                if self.lookup(key) is None:  # 동시에 다른 프로세스가 먼저 만든 경우만 허용
+                    raise
+        return self.lookup(key), False, time.perf_counter() - t0
+
+
+def load_backend_model(
+    weights: str | Path,
+    backend: str = "pytorch",
+    imgsz: int = 640,
+    batch: int = 1,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> tuple[YOLO, BackendInfo]:
+    """백엔드에 맞는 YOLO 모델 로드. pytorch가 아니면 export 캐시에서 가져오거나 export."""
+    if backend not in BACKEND_FORMATS:
+        raise ValueError(f"지원하지 않는 backend: {backend} ({', '.join(BACKEND_FORMATS)})")
+    path = _resolve_weights(weights)
+    digest = file_hash(path)
+    if backend == "pytorch":
+        return YOLO(str(path)), BackendInfo(backend, str(path), digest)
+    # torchscript는 dynamic export가 없어 export batch가 입력 shape에 고정될 수 있음 → batch 1로 trace.
+    # trace된 그래프는 입력 batch 크기를 따르므로 BATCH_SIZE 배치와 짧은 마지막 배치 모두 그대로 동작 (onnx·openvino는 dynamic export)
+    export_batch = 1 if backend == "torchscript" else max(1, batch)
+    model_path, hit, export_s = ExportCache(cache_dir).get_or_export(path, digest, backend, imgsz, export_batch)
+    model = YOLO(str(model_path), task="detect")
+    return model, BackendInfo(backend, str(model_path), digest, cache_hit=hit, export_s=export_s)
+
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N,4) x (M,4) xyxy → (N,M) IoU."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def parity_check(
+    reference: YOLO,
+    candidate: YOLO,
+    frames: list[np.ndarray],
+    imgsz: int,
+    conf: float,
+    device: int | str = "cpu",
+    iou_thresh: float = 0.5,
+) -> dict[str, float]:
+    """
+    같은 프레임에서 PyTorch(reference)와 export 모델(candidate) 검출 비교.
+    같은 클래스끼리 IoU 기준 greedy 매칭 → 매칭률, 매칭 박스의 평균 IoU·최대 conf 차이, 박스 수 차이.
+    """
+    matched = ref_total = cand_total = 0
+    ious: list[float] = []
+    conf_diff_max = 0.0
+    for frame in frames:
+        ref = FrameDetections.from_result(reference.predict(frame, imgsz=imgsz, conf=conf, device=device, verbose=False)[0])
+        cand = FrameDetections.from_result(candidate.predict(frame, imgsz=imgsz, conf=conf, device=device, verbose=False)[0])
+        ref_total += len(ref)
+        cand_total += len(cand)
+        if not len(ref) or not len(cand):
+            continue
+        iou = _box_iou(ref.xyxy, cand.xyxy)
+        iou[ref.cls[:, None] != cand.cls[None, :]] = 0.0
+        while True:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            if iou[i, j] < iou_thresh:
+                break
+            matched += 1
+            ious.append(float(iou[i, j]))
+            conf_diff_max = max(conf_diff_max, abs(float(ref.conf[i]) - float(cand.conf[j])))
+            iou[i, :] = 0.0
+            iou[:, j] = 0.0
+    return {
+        "parity/frames": float(len(frames)),
+        "parity/match_rate": matched / max(ref_total, cand_total) if max(ref_total, cand_total) else 1.0,
+        "parity/mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "parity/max_conf_diff": conf_diff_max,
+        "parity/box_count_diff": float(cand_total - ref_total),
+    }
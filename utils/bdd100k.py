@@ -0,0 +1,318 @@
+"""
+BDD100k 라벨 JSON → YOLO txt 라벨 + data yaml 변환 (스트리밍, 증분).
+
+- 라벨 JSON(bdd100k_labels_images_<split>.json, det_<split>.json: 이미지 객체의 배열)을 통째로 읽지 않고
+  iter_json_array()로 이미지 하나씩 파싱 → 메모리는 파일 크기와 무관 (버퍼 1 청크 + 처리 중인 배치)
+- 클래스 맵(yaml): names(YOLO 클래스 순서) + map(BDD category → names 중 하나). names에 그대로 있는 category는
+  자동 매핑, 나머지(drivable area, lane 등)는 제외. 예: lab/exp_bdd100k/class_maps/
+- 변환·쓰기는 프로세스 풀 (부모는 파싱만, 대기 작업 수를 제한해 메모리 일정)
+- 증분: 출력 디렉터리의 state.sqlite에 이미지별 라벨 내용 해시 → 내용이 바뀐 이미지만 파일을 다시 씀.
+  JSON에서 사라진 이미지의 라벨은 삭제. JSON·클래스 맵·이미지 크기가 모두 그대로면 split을 통째로 건너뜀
+- 출력 레이아웃 (Ultralytics images/ → labels/ 규칙, resolve_data_yaml이 찾는 data.yaml)
+  <out>/data.yaml, <out>/labels/<split>/<이름>.txt, <out>/images/<split>/<이름>.jpg = 원본 하드 링크
+  (다른 파일 시스템이면 파일별 심볼릭 링크. Ultralytics가 split 경로를 resolve하므로 디렉터리 링크는 쓰지 않음)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Iterator
+
+import yaml
+
+BDD_IMAGE_SIZE = (1280, 720)  # BDD100k 이미지는 모두 1280x720
+LABEL_JSON_PATTERNS = ("bdd100k_labels_images_{split}.json", "det_{split}.json")
+IMAGE_DIR_PARTS = ("images", "100k")  # <root>/.../images/100k/<split>
+BATCH_SIZE = 256  # 워커 작업 하나의 이미지 수 (sqlite IN 쿼리 변수 수 제한보다 작게)
+_TMP_PREFIX = ".tmp-"
+
+
+def iter_json_array(path: str | Path, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    최상위 JSON 배열의 원소(객체·배열·문자열·숫자 등 모든 값)를 하나씩 반환.
+    버퍼에는 읽는 중인 청크와 걸쳐 있는 원소 하나만 유지.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, eof, started = "", 0, False, False
+        while True:
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+            if pos >= len(buf):
+                raise ValueError(f"{path}: JSON 배열이 끝나지 않았습니다")
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: 최상위가 JSON 배열이 아닙니다")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # 숫자는 잘린 앞부분("12", "1.", "1e")도 숫자로 파싱됨 → 객체·배열·문자열이 아닌 값은
+                # 뒤에 구분자가 보일 때만 확정, 아니면 다음 청크와 이어서 다시
+                if not eof and buf[pos] not in "{[\"" and (end == len(buf) or buf[end] not in " \t\r\n,]"):
+                    raise json.JSONDecodeError("청크 경계에 걸친 값", buf, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # 원소가 청크 경계에 걸침 → 남은 부분 + 다음 청크로 다시
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            pos = end
+            yield obj
+
+
+def load_class_map(path: str | Path) -> tuple[list[str], dict[str, int]]:
+    """클래스 맵 yaml → (YOLO 클래스 이름 목록, BDD category → 클래스 번호)."""
+    with open(path, encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    names = list(cfg.get("names") or [])
+    if not names:
+        raise ValueError(f"{path}: names가 비어 있습니다")
+    index = {n: i for i, n in enumerate(names)}
+    mapping = dict(index)
+    for category, target in (cfg.get("map") or {}).items():
+        if target is None:
+            mapping.pop(category, None)  # names와 같은 이름이어도 제외
+        elif target not in index:
+            raise ValueError(f"{path}: map의 {category} → {target}가 names에 없습니다")
+        else:
+            mapping[category] = index[target]
+    return names, mapping
+
+
+def frame_boxes(frame: dict[str, Any]) -> list[tuple[str, float, float, float, float]]:
+    """이미지 객체에서 box2d 라벨만 (category, x1, y1, x2, y2). poly2d(차선·주행 영역)는 버림."""
+    boxes = []
+    for lb in frame.get("labels") or []:
+        b = lb.get("box2d")
+        if b:
+            boxes.append((lb.get("category", ""), float(b["x1"]), float(b["y1"]), float(b["x2"]), float(b["y2"])))
+    return boxes
+
+
+def yolo_lines(
+    boxes: list[tuple[str, float, float, float, float]], mapping: dict[str, int], width: int, height: int
+) -> tuple[str, dict[int, int]]:
+    """box2d 목록 → (YOLO 라벨 텍스트, 클래스별 박스 수). 이미지 밖은 잘라내고 크기가 0인 박스는 제외."""
+    lines = []
+    counts: dict[int, int] = {}
+    for category, x1, y1, x2, y2 in boxes:
+        c = mapping.get(category)
+        if c is None:
+            continue
+        x1, x2 = max(0.0, min(x1, x2)), min(float(width), max(x1, x2))
+        y1, y2 = max(0.0, min(y1, y2)), min(float(height), max(y1, y2))
+        if x2 - x1 < 1 or y2 - y1 < 1:
+            continue
+        lines.append(
+            f"{c} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} {(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f}"
+        )
+        counts[c] = counts.get(c, 0) + 1
+    return "".join(f"{line}\n" for line in lines), counts
+
+
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(label_dir: str, image_src: str, image_dst: str, mapping: dict[str, int], width: int, height: int) -> None:
+    _worker.update(label_dir=label_dir, image_src=image_src, image_dst=image_dst, mapping=mapping, width=width, height=height)
+
+
+def _link_image(name: str) -> None:
+    dst = os.path.join(_worker["image_dst"], name)
+    src = os.path.join(_worker["image_src"], name)
+    if os.path.lexists(dst) or not os.path.exists(src):
+        return
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass
+    except OSError:
+        os.symlink(src, dst)
+
+
+def _convert_batch(
+    batch: list[tuple[str, list[tuple[str, float, float, float, float]]]], old: dict[str, str]
+) -> tuple[list[tuple[str, str, int]], int, dict[int, int]]:
+    """이미지 배치 변환. 내용 해시가 old와 같고 파일이 있으면 쓰지 않음 → ([(이름, 해시, 박스 수)], 쓴 파일 수, 클래스별 수)."""
+    rows, written, hist = [], 0, {}
+    for name, boxes in batch:
+        text, counts = yolo_lines(boxes, _worker["mapping"], _worker["width"], _worker["height"])
+        digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        path = os.path.join(_worker["label_dir"], f"{os.path.splitext(name)[0]}.txt")
+        if old.get(name) != digest or not os.path.exists(path):
+            # 임시 파일 후 교체: 중간에 끊겨도 반쯤 쓴 라벨이 남지 않고, 디렉터리 mtime이 바뀌어 manifest가 감지
+            tmp = os.path.join(_worker["label_dir"], f"{_TMP_PREFIX}{os.getpid()}.txt")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            written += 1
+        _link_image(name)
+        rows.append((name, digest, sum(counts.values())))
+        for c, n in counts.items():
+            hist[c] = hist.get(c, 0) + n
+    return rows, written, hist
+
+
+def _open_state(path: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE IF NOT EXISTS labels (split TEXT, name TEXT, digest TEXT, boxes INTEGER, gen INTEGER, PRIMARY KEY (split, name))")
+    db.execute("CREATE TABLE IF NOT EXISTS sources (split TEXT PRIMARY KEY, source TEXT, class_map TEXT, gen INTEGER)")
+    return db
+
+
+def class_map_digest(path: str | Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
+
+def converted_class_maps(out: Path) -> dict[str, str]:
+    """출력 디렉터리에 이미 변환된 split → 클래스 맵 해시 (data.yaml은 split들이 같은 클래스 맵이어야 함)."""
+    if not (out / "state.sqlite").exists():
+        return {}
+    db = _open_state(out / "state.sqlite")
+    rows = dict(db.execute("SELECT split, class_map FROM sources").fetchall())
+    db.close()
+    return rows
+
+
+def find_split_sources(
+    root: str | Path, splits: tuple[str, ...] = ("train", "val"), skip: Path | None = None
+) -> dict[str, tuple[Path, Path]]:
+    """BDD100k 루트에서 split별 (라벨 JSON, 이미지 디렉터리). 없는 split은 빠짐. skip(변환 출력 등) 아래는 보지 않음."""
+    root = Path(root)
+    skip = skip.resolve() if skip is not None else None
+    jsons: dict[str, Path] = {}
+    images: dict[str, Path] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        d = Path(dirpath)
+        for split in splits:
+            for pattern in LABEL_JSON_PATTERNS:
+                if split not in jsons and pattern.format(split=split) in filenames:
+                    jsons[split] = d / pattern.format(split=split)
+            if split not in images and d.parts[-2:] == IMAGE_DIR_PARTS and split in dirnames:
+                images[split] = d / split
+        # 이미지 디렉터리 안(파일 수만 개)으로는 내려가지 않음
+        dirnames[:] = sorted(x for x in dirnames if d.parts[-2:] != IMAGE_DIR_PARTS and (d / x).resolve() != skip)
+    return {s: (jsons[s], images[s]) for s in splits if s in jsons and s in images}
+
+
+def convert_split(
+    split: str,
+    label_json: Path,
+    image_dir: Path,
+    out: Path,
+    class_map: Path,
+    workers: int = 0,
+    image_size: tuple[int, int] = BDD_IMAGE_SIZE,
+    force: bool = False,
+) -> dict[str, Any]:
+    """split 하나 변환 (증분). → 통계 dict (status: skipped / converted, frames, written, removed, ...)."""
+    names, mapping = load_class_map(class_map)
+    out.mkdir(parents=True, exist_ok=True)
+    label_dir = out / "labels" / split
+    label_dir.mkdir(parents=True, exist_ok=True)
+    out_image_dir = out / "images" / split
+    out_image_dir.mkdir(parents=True, exist_ok=True)
+
+    st = label_json.stat()
+    map_digest = class_map_digest(class_map)
+    source = f"{label_json.resolve()}|{st.st_size}|{st.st_mtime_ns}|{map_digest}|{image_size[0]}x{image_size[1]}"
+    db = _open_state(out / "state.sqlite")
+    row = db.execute("SELECT source, gen FROM sources WHERE split = ?", (split,)).fetchone()
+    if row is not None and row[0] == source and not force:
+        n = db.execute("SELECT COUNT(*), COALESCE(SUM(boxes), 0) FROM labels WHERE split = ?", (split,)).fetchone()
+        db.close()
+        return {"split": split, "status": "skipped", "frames": n[0], "boxes": n[1], "names": names}
+    gen = (row[1] if row is not None else 0) + 1
+
+    t0 = time.perf_counter()
+    frames = boxes_total = written = 0
+    hist: dict[int, int] = {}
+    workers = workers or os.cpu_count() or 1
+    pending: deque = deque()
+
+    def collect(result: Any) -> None:
+        nonlocal boxes_total, written
+        rows, w, h = result.get()
+        db.executemany(
+            "INSERT OR REPLACE INTO labels (split, name, digest, boxes, gen) VALUES (?, ?, ?, ?, ?)",
+            [(split, name, digest, nb, gen) for name, digest, nb in rows],
+        )
+        db.commit()
+        written += w
+        boxes_total += sum(nb for _, _, nb in rows)
+        for c, n in h.items():
+            hist[c] = hist.get(c, 0) + n
+
+    with Pool(workers, initializer=_init_worker, initargs=(str(label_dir), str(image_dir.resolve()), str(out_image_dir), mapping, *image_size)) as pool:
+        batch: list[tuple[str, list]] = []
+
+        def submit() -> None:
+            names_in_batch = [name for name, _ in batch]
+            q = f"SELECT name, digest FROM labels WHERE split = ? AND name IN ({','.join('?' * len(names_in_batch))})"
+            old = dict(db.execute(q, (split, *names_in_batch)).fetchall())
+            pending.append(pool.apply_async(_convert_batch, (list(batch), old)))
+            batch.clear()
+            # 대기 작업 수 제한 → 파싱이 변환보다 빨라도 메모리 일정
+            while len(pending) >= 2 * workers:
+                collect(pending.popleft())
+
+        for frame in iter_json_array(label_json):
+            batch.append((frame["name"], frame_boxes(frame)))
+            frames += 1
+            if len(batch) >= BATCH_SIZE:
+                submit()
+        if batch:
+            submit()
+        while pending:
+            collect(pending.popleft())
+
+    # JSON에서 사라진 이미지의 라벨·이미지 링크 삭제
+    removed = 0
+    for (name,) in db.execute("SELECT name FROM labels WHERE split = ? AND gen < ?", (split, gen)).fetchall():
+        (label_dir / f"{os.path.splitext(name)[0]}.txt").unlink(missing_ok=True)
+        (out_image_dir / name).unlink(missing_ok=True)
+        removed += 1
+    db.execute("DELETE FROM labels WHERE split = ? AND gen < ?", (split, gen))
+    db.execute("INSERT OR REPLACE INTO sources (split, source, class_map, gen) VALUES (?, ?, ?, ?)", (split, source, map_digest, gen))
+    db.commit()
+    db.close()
+    elapsed = time.perf_counter() - t0
+    return {
+        "split": split, "status": "converted", "frames": frames, "boxes": boxes_total, "written": written,
+        "unchanged": frames - written, "removed": removed, "elapsed_s": elapsed,
+        "frames_per_s": frames / elapsed if elapsed > 0 else 0.0,
+        "class_hist": {names[c]: n for c, n in sorted(hist.items())}, "names": names,
+    }
+
+
+def write_data_yaml(out: Path, names: list[str], splits: list[str], class_map: Path) -> Path:
+    """<out>/data.yaml 작성. 내용이 같으면 쓰지 않음 (mtime 유지 → dataset manifest가 다시 스캔하지 않음)."""
+    data: dict[str, Any] = {"path": str(out.resolve())}
+    for split in ("train", "val", "test"):
+        if split in splits:
+            data[split] = f"images/{split}"
+    if "val" not in data and "train" in data:
+        data["val"] = data["train"]
+    data["names"] = dict(enumerate(names))
+    text = f"# BDD100k → YOLO (scripts/convert_bdd100k.py, class map {class_map.name})\n" + yaml.safe_dump(
+        data, allow_unicode=True, sort_keys=False
+    )
+    path = out / "data.yaml"
+    if not path.exists() or path.read_text(encoding="utf-8") != text:
+        path.write_text(text, encoding="utf-8")
+    return path
@@ -0,0 +1,270 @@
+"""
+Cascade 추론: 작은 모델(nano)은 매 프레임, 큰 모델은 작은 모델 결과가 애매할 때만.
+
+- 애매한 검출: 작은 모델 conf가 [low_conf, high_conf) 구간 (CONF 경계 근처), 또는 같은 자리(IoU ≥ confusion_iou)에
+  다른 클래스 박스가 함께 있음 (클래스 혼동)
+- mode="crop": 애매한 박스 주변(pad만큼 넓힌 영역)만 잘라 큰 모델에 한 번에 입력 → 박스별로 큰 모델 검출과
+  IoU 매칭되면 그 박스·클래스·conf로 교체(accepted/relabeled), 없으면 제거(rejected). 확실한 박스는 그대로.
+  애매한 박스가 max_crops개를 넘으면 crop 여러 번보다 프레임 한 번이 싸므로 그 프레임은 frame 방식으로
+- mode="frame": 프레임 전체를 큰 모델로 → 큰 모델 검출 + 큰 모델과 겹치지 않는 작은 모델의 확실한 검출
+- audit_every=N: N 프레임마다 큰 모델을 프레임 전체에 추가로 실행해 작은 모델과의 일치도만 측정 (출력에는 영향 없음).
+  에스컬레이션하지 않은 프레임의 일치도 = cascade가 놓치는 정확도의 추정치
+"""
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from ultralytics.engine.results import Results
+
+from utils.detection_cache import detections_to_result
+from utils.detections import FrameDetections
+from utils.mot_eval import box_iou_xywh
+from utils.streaming_stats import RunningStats, StreamSummary
+from utils.tracking import apply_tracker
+
+CASCADE_MODES = ("crop", "frame")
+MATCH_IOU = 0.5
+
+
+def _xywh(xyxy: np.ndarray) -> np.ndarray:
+    return np.concatenate([xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+
+
+def match_detections(a: FrameDetections, b: FrameDetections, iou_thresh: float = MATCH_IOU, same_class: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """IoU 최대 1:1 매칭 (same_class면 클래스가 같은 쌍만) → (a 인덱스, b 인덱스)."""
+    if not len(a) or not len(b):
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    iou = box_iou_xywh(_xywh(a.xyxy), _xywh(b.xyxy))
+    if same_class:
+        iou[a.cls[:, None] != b.cls[None, :]] = 0.0
+    rows, cols = linear_sum_assignment(-iou)
+    keep = iou[rows, cols] >= iou_thresh
+    return rows[keep], cols[keep]
+
+
+def agreement_f1(a: FrameDetections, b: FrameDetections) -> float:
+    """두 검출 집합의 일치도 F1 = 2 × 매칭 수 / (|a| + |b|). 둘 다 비면 1."""
+    if not len(a) and not len(b):
+        return 1.0
+    rows, _ = match_detections(a, b)
+    return 2.0 * len(rows) / (len(a) + len(b))
+
+
+def _concat(dets: list[FrameDetections]) -> FrameDetections:
+    dets = [d for d in dets if len(d)]
+    if not dets:
+        return FrameDetections.empty()
+    return FrameDetections(
+        xyxy=np.concatenate([d.xyxy for d in dets]).astype(np.float32),
+        conf=np.concatenate([d.conf for d in dets]).astype(np.float32),
+        cls=np.concatenate([d.cls for d in dets]).astype(np.int64),
+    )
+
+
+class CascadeDetector:
+    """
+    작은 모델 결과(낮은 conf floor로 추론한 Results)를 받아 필요하면 큰 모델로 확인하고 합친 결과 반환.
+    large(images, imgsz) → 이미지별 Results 리스트. 출력은 conf 필터 후의 Results (tracker가 있으면 ID까지).
+    """
+
+    def __init__(
+        self,
+        large: Callable[[list[np.ndarray], int], list[Results]],
+        names: dict[int, str],
+        conf: float,
+        low_conf: float = 0.25,
+        high_conf: float = 0.6,
+        mode: str = "crop",
+        imgsz: int = 640,
+        crop_imgsz: int = 320,
+        crop_pad: float = 0.5,
+        max_crops: int = 8,
+        confusion_iou: float = 0.7,
+        audit_every: int = 0,
+        tracker: Any = None,
+        path: str = "",
+    ):
+        if mode not in CASCADE_MODES:
+            raise ValueError(f"지원하지 않는 cascade 모드: {mode} ({'/'.join(CASCADE_MODES)})")
+        if not low_conf <= conf <= high_conf:
+            raise ValueError(f"low_conf <= conf <= high_conf 이어야 합니다: {low_conf}, {conf}, {high_conf}")
+        self.large = large
+        self.names = names
+        self.conf = conf
+        self.low_conf = low_conf
+        self.high_conf = high_conf
+        self.mode = mode
+        self.imgsz = imgsz
+        self.crop_imgsz = crop_imgsz
+        self.crop_pad = crop_pad
+        self.max_crops = max_crops
+        self.confusion_iou = confusion_iou
+        self.audit_every = audit_every
+        self.tracker = tracker
+        self.path = path
+        self.frames = 0
+        self.escalated = 0
+        self.crops = 0
+        self.frame_fallbacks = 0
+        self.accepted = 0
+        self.relabeled = 0
+        self.rejected = 0
+        self.last_escalated = False
+        self.last_ambiguous = 0
+        self.last_large_ms = 0.0
+        self.small_ms = StreamSummary()
+        self.large_ms = StreamSummary()       # 에스컬레이션한 프레임의 큰 모델 시간
+        self.large_frame_ms = StreamSummary()  # 프레임 전체 큰 모델 시간 (frame 모드·audit) → large 단독 비용 추정
+        self.agreement_escalated = RunningStats()
+        self.agreement_audit = RunningStats()
+        self.agreement_audit_skipped = RunningStats()
+
+    def ambiguous(self, det: FrameDetections) -> np.ndarray:
+        """애매한 검출 mask: conf가 [low, high) 또는 다른 클래스 박스와 confusion_iou 이상 겹침."""
+        mask = (det.conf >= self.low_conf) & (det.conf < self.high_conf)
+        if len(det) > 1:
+            iou = box_iou_xywh(_xywh(det.xyxy), _xywh(det.xyxy))
+            confused = (iou >= self.confusion_iou) & (det.cls[:, None] != det.cls[None, :])
+            mask |= confused.any(axis=1)
+        return mask
+
+    def _crop_boxes(self, xyxy: np.ndarray, shape: tuple[int, ...]) -> np.ndarray:
+        """박스를 crop_pad 비율만큼 넓히고(최소 64px) 프레임 안으로 자른 정수 영역 (N,4)."""
+        h, w = shape[:2]
+        wh = xyxy[:, 2:] - xyxy[:, :2]
+        pad = np.maximum(wh * self.crop_pad, (64 - wh) / 2)
+        out = np.concatenate([xyxy[:, :2] - pad, xyxy[:, 2:] + pad], axis=1)
+        out[:, [0, 2]] = out[:, [0, 2]].clip(0, w)
+        out[:, [1, 3]] = out[:, [1, 3]].clip(0, h)
+        return out.round().astype(int)
+
+    def _resolve_crops(self, frame: np.ndarray, det: FrameDetections, amb: np.ndarray) -> FrameDetections:
+        """
+        애매한 박스마다 crop → 큰 모델 → 같은 자리(클래스 무관 IoU 매칭) 검출로 교체, 없으면 제거.
+        crop이 겹치면 같은 물체가 여러 crop에서 검출되므로, 앞 박스가 받아들인 검출과 IoU ≥ MATCH_IOU인 검출은 제외 (중복 방지).
+        """
+        idx = np.flatnonzero(amb)
+        regions = self._crop_boxes(det.xyxy[idx], frame.shape)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        self.crops += len(crops)
+        resolved: list[FrameDetections] = []
+        for i, (x1, y1, _, _), r in zip(idx, regions, self.large(crops, self.crop_imgsz)):
+            big = FrameDetections.from_result(r)
+            big = big.select(big.conf >= self.conf)
+            if len(big):
+                big.xyxy = big.xyxy + np.array([x1, y1, x1, y1], dtype=np.float32)
+            if len(big) and resolved:
+                taken = _concat(resolved)
+                big = big.select(box_iou_xywh(_xywh(big.xyxy), _xywh(taken.xyxy)).max(axis=1) < MATCH_IOU)
+            rows, cols = match_detections(det.select([i]), big, same_class=False)
+            if len(rows):
+                hit = big.select(cols[:1])
+                self.accepted += 1
+                self.relabeled += int(hit.cls[0] != det.cls[i])
+                resolved.append(hit)
+            else:
+                self.rejected += 1
+        kept = det.select(~amb & (det.conf >= self.conf))
+        return _concat([kept, *resolved])
+
+    def _merge_frame(self, det: FrameDetections, big: FrameDetections) -> FrameDetections:
+        """큰 모델 검출 + 큰 모델과 겹치지 않는 작은 모델의 확실한(≥ high_conf) 검출."""
+        sure = det.select(det.conf >= self.high_conf)
+        rows, _ = match_detections(sure, big, same_class=False)
+        extra = np.ones(len(sure), dtype=bool)
+        extra[rows] = False
+        return _concat([big, sure.select(extra)])
+
+    def _large_frame(self, frame: np.ndarray) -> FrameDetections:
+        t0 = time.perf_counter()
+        r = self.large([frame], self.imgsz)[0]
+        self.large_frame_ms.update((time.perf_counter() - t0) * 1000.0)
+        big = FrameDetections.from_result(r)
+        return big.select(big.conf >= self.conf)
+
+    def step(self, frame: np.ndarray, small: Results) -> Results:
+        det = FrameDetections.from_result(small)
+        det = det.select(det.conf >= self.low_conf)
+        speed = dict(small.speed or {})
+        self.small_ms.update(sum(float(v) for v in speed.values()))
+        small_out = det.select(det.conf >= self.conf)
+        amb = self.ambiguous(det)
+        self.frames += 1
+        self.last_ambiguous = int(amb.sum())
+        self.last_escalated = bool(amb.any())
+        self.last_large_ms = 0.0
+
+        big_full = None
+        if self.last_escalated:
+            t0 = time.perf_counter()
+            if self.mode == "crop" and self.last_ambiguous <= self.max_crops:
+                out = self._resolve_crops(frame, det, amb)
+            else:
+                self.frame_fallbacks += int(self.mode == "crop")
+                big_full = self._large_frame(frame)
+                out = self._merge_frame(det, big_full)
+            self.last_large_ms = (time.perf_counter() - t0) * 1000.0
+            self.large_ms.update(self.last_large_ms)
+            self.escalated += 1
+            self.agreement_escalated.update(agreement_f1(small_out, out))
+        else:
+            out = small_out
+        if self.audit_every > 0 and self.frames % self.audit_every == 0:
+            f1 = agreement_f1(small_out, big_full if big_full is not None else self._large_frame(frame))
+            self.agreement_audit.update(f1)
+            if not self.last_escalated:
+                self.agreement_audit_skipped.update(f1)
+
+        result = detections_to_result(frame, out, self.names, self.path)
+        # inference_ms 등 기존 속도 메트릭이 cascade 전체 비용을 나타내도록 큰 모델 시간을 inference에 더함
+        speed["inference"] = float(speed.get("inference", 0.0)) + self.last_large_ms
+        result.speed = speed
+        if self.tracker is not None:
+            result = apply_tracker(self.tracker, result)
+            result.speed = speed
+        if hasattr(small, "frame_idx"):
+            result.frame_idx = small.frame_idx
+        return result
+
+    def run(self, results: Iterable[tuple[np.ndarray, Results]]) -> Iterator[tuple[np.ndarray, Results]]:
+        """작은 모델의 (frame, result) → (frame, cascade result) 프레임 순서대로."""
+        for frame, small in results:
+            yield frame, self.step(frame, small)
+
+    def step_metrics(self) -> dict[str, float]:
+        out = {"cascade_step/escalated": float(self.last_escalated), "cascade_step/ambiguous": float(self.last_ambiguous)}
+        if self.last_escalated:
+            out["cascade_step/large_ms"] = self.last_large_ms
+        return out
+
+    def metrics(self) -> dict[str, float]:
+        n = self.frames
+        small_total = self.small_ms.mean * self.small_ms.count if self.small_ms.count else 0.0
+        large_total = self.large_ms.mean * self.large_ms.count if self.large_ms.count else 0.0
+        out = {
+            "cascade/frames": float(n),
+            "cascade/escalations": float(self.escalated),
+            "cascade/escalation_rate": self.escalated / n if n else 0.0,
+            "cascade/crops": float(self.crops),
+            "cascade/large_frames": float(self.large_frame_ms.count),
+            "cascade/frame_fallbacks": float(self.frame_fallbacks),
+            "cascade/accepted": float(self.accepted),
+            "cascade/relabeled": float(self.relabeled),
+            "cascade/rejected": float(self.rejected),
+            "cascade/cost_ms_per_frame": (small_total + large_total) / n if n else 0.0,
+            **self.small_ms.summary("cascade/small_ms"),
+            **self.large_ms.summary("cascade/large_ms"),
+        }
+        if self.large_frame_ms.count:
+            out["cascade/large_frame_ms_mean"] = self.large_frame_ms.mean
+            if out["cascade/cost_ms_per_frame"] > 0:
+                out["cascade/speedup_vs_large"] = self.large_frame_ms.mean / out["cascade/cost_ms_per_frame"]
+        for name, stats in (
+            ("agreement_escalated", self.agreement_escalated),
+            ("agreement_audit", self.agreement_audit),
+            ("agreement_audit_not_escalated", self.agreement_audit_skipped),
+        ):
+            if stats.count:
+                out[f"cascade/{name}"] = stats.mean
+        return out
@@ -0,0 +1,441 @@
+"""
+데이터셋 manifest: data yaml 탐색과 이미지·라벨 파일 목록을 인덱스로 저장해 학습 시작 때 데이터셋 스캔을 생략.
+lab/*/train.py, sweep trial, build_image_cache.py가 모두 이 모듈로 data yaml을 찾고 데이터셋을 읽음.
+
+- resolve_data_yaml(): 표준 이름(data.yaml 등) → 없으면 재귀 탐색 (images/labels 디렉터리는 건너뜀).
+  재귀 탐색 결과는 resolve.json에 저장해 다음부터 바로 반환
+- load_manifest(): data yaml의 split(train/val/test)마다
+  - 이미지 목록 (Ultralytics get_img_files와 같은 순서), 파일별 크기·mtime
+  - 라벨 파일별 크기·mtime·내용 해시·클래스별 인스턴스 수 → split별 클래스 히스토그램
+  - 감시 경로: 스캔한 디렉터리·이미지 목록 파일·라벨 디렉터리의 mtime
+  - fingerprint: 이미지 (상대 경로, 크기) + 라벨 (상대 경로, 내용 해시) 해시 = 데이터셋 버전.
+    mtime과 데이터셋 위치에 무관해 복사·touch로는 바뀌지 않음
+- 무효화 (DATASET_MANIFEST_VALIDATE)
+  - dirs (기본): data yaml·감시 디렉터리 mtime + 라벨 파일 크기·mtime 비교 → 파일 추가·삭제·이름 변경(임시 파일 후
+    교체 포함)과 라벨 제자리 수정 감지. 이미지는 stat하지 않음
+  - stat: 매번 이미지까지 모든 파일을 stat → 이미지 제자리 수정까지 감지
+  바뀌었으면 목록을 다시 만들되 크기·mtime이 같은 라벨은 이전 해시·카운트를 재사용 (증분)
+- 학습: model.train(trainer=manifest_trainer(manifest)) → 데이터셋이 이미지 목록을 glob 대신 manifest에서 받고,
+  Ultralytics 라벨 캐시(labels.cache)의 유효성도 파일별 stat 대신 manifest 상태 해시로 판단. 라벨 캐시는 manifest
+  디렉터리에 저장 (읽기 전용 데이터셋도 매번 라벨 검증을 다시 하지 않음)
+- 저장: DATASET_MANIFEST_DIR/<데이터셋 디렉터리 이름>-<yaml 경로 해시>/{manifest.json, <split>.cache}
+"""
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.data.utils import IMG_FORMATS, check_det_dataset, img2label_paths
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+DEFAULT_MANIFEST_DIR = Path.home() / ".cache" / "gaflow" / "datasets"
+VALIDATE_MODES = ("dirs", "stat")
+MANIFEST_VERSION = 1
+SPLITS = ("train", "val", "test")
+YAML_NAMES = ("data.yaml", "dataset.yaml", "train.yaml")
+_SKIP_DIRS = {"images", "labels"}  # yaml 재귀 탐색에서 건너뜀 (이미지·라벨 파일 수만 개)
+_TMP_PREFIX = ".tmp-"
+
+# manifest 저장 위치·무효화 기준
+# 예: DATASET_MANIFEST_DIR=/mnt/nvme/manifests DATASET_MANIFEST_VALIDATE=stat
+DATASET_MANIFEST_DIR = Path(os.getenv("DATASET_MANIFEST_DIR") or DEFAULT_MANIFEST_DIR)
+DATASET_MANIFEST_VALIDATE = os.getenv("DATASET_MANIFEST_VALIDATE", "dirs")
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path: Path, obj: dict[str, Any]) -> None:
+    tmp = path.with_name(f"{_TMP_PREFIX}{path.name}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    tmp.replace(path)
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _find_yaml(root: Path) -> Path | None:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d.lower() not in _SKIP_DIRS and not d.startswith("."))
+        for name in sorted(filenames):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() == ".yaml" and ("data" in stem.lower() or name == "dataset.yaml"):
+                return Path(dirpath) / name
+    return None
+
+
+def resolve_data_yaml(data_path: str | Path, base_dir: Path, manifest_dir: Path | None = None) -> Path:
+    """data_path(디렉터리 또는 yaml 파일, 상대 경로면 base_dir 기준)에서 YOLO data yaml 경로 반환."""
+    p = Path(data_path)
+    if not p.is_absolute():
+        p = (base_dir / p).resolve()
+    if p.suffix.lower() in (".yaml", ".yml"):
+        return p
+    for name in YAML_NAMES:
+        candidate = p / name
+        if candidate.exists():
+            return candidate
+    index_path = (manifest_dir or DATASET_MANIFEST_DIR) / "resolve.json"
+    index = _read_json(index_path) or {}
+    hit = index.get(str(p))
+    if hit and Path(hit).exists():
+        return Path(hit)
+    found = _find_yaml(p) if p.is_dir() else None
+    if found is None:
+        return p / "data.yaml"
+    index[str(p)] = str(found)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_json(index_path, index)
+    return found
+
+
+def _as_list(source: str | list[str]) -> list[str]:
+    return [str(s) for s in source] if isinstance(source, (list, tuple)) else [str(source)]
+
+
+def _list_images(source: str | list[str]) -> tuple[list[str], dict[str, int]]:
+    """Ultralytics get_img_files와 같은 이미지 목록 (glob '**/*.*'처럼 숨김 파일 제외, 정렬) + 감시 경로 mtime."""
+    files: list[str] = []
+    watch: dict[str, int] = {}
+    for src in _as_list(source):
+        p = Path(src)
+        if p.is_dir():
+            for dirpath, dirnames, filenames in os.walk(src, followlinks=True):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                watch[dirpath] = _mtime(dirpath)
+                files += [os.path.join(dirpath, n) for n in filenames if not n.startswith(".") and "." in n]
+        elif p.is_file():
+            watch[src] = _mtime(src)
+            with open(p, encoding="utf-8") as t:
+                parent = str(p.parent) + os.sep
+                files += [x.replace("./", parent, 1) if x.startswith("./") else x for x in t.read().strip().splitlines()]
+        else:
+            raise FileNotFoundError(f"{src} does not exist")
+    im_files = sorted(x.replace("/", os.sep) for x in files if x.rpartition(".")[-1].lower() in IMG_FORMATS)
+    return im_files, watch
+
+
+def _labels_unchanged(split: dict[str, Any]) -> bool:
+    """manifest split의 라벨 파일 크기·mtime이 지금과 같은지 (제자리 수정 감지, 이미지는 stat하지 않음)."""
+    label_files = img2label_paths([f for f, *_ in split["images"]])
+    for lf, lb in zip(label_files, split["labels"]):
+        try:
+            st = os.stat(lf)
+        except OSError:
+            if lb is not None:
+                return False
+            continue
+        if lb is None or lb[0] != st.st_size or lb[1] != st.st_mtime_ns:
+            return False
+    return True
+
+
+def _label_counts(data: bytes) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for line in data.decode("utf-8", errors="ignore").splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            c = str(int(float(parts[0])))
+        except ValueError:
+            continue
+        counts[c] = counts.get(c, 0) + 1
+    return counts
+
+
+def _scan_split(source: str | list[str], root: str, old: dict[str, Any] | None) -> tuple[dict[str, Any], int]:
+    """split 하나 스캔 → (manifest split 항목, 새로 읽은 라벨 수). old의 라벨은 크기·mtime이 같으면 재사용."""
+    t0 = time.perf_counter()
+    im_files, watch = _list_images(source)
+    label_files = img2label_paths(im_files)
+    prev: dict[str, list[Any]] = {}
+    if old is not None:
+        old_label_files = img2label_paths([f for f, *_ in old["images"]])
+        prev = {lf: lb for lf, lb in zip(old_label_files, old["labels"]) if lb is not None}
+    images: list[list[Any]] = []
+    labels: list[list[Any] | None] = []
+    hist: dict[str, int] = {}
+    state = hashlib.sha256()
+    fingerprint = hashlib.blake2b(digest_size=16)
+    read = missing = 0
+    for f, lf in zip(im_files, label_files):
+        try:
+            st = os.stat(f)
+            size, mtime = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime = -1, -1
+        images.append([f, size, mtime])
+        try:
+            st = os.stat(lf)
+        except OSError:
+            lb = None
+            missing += 1
+        else:
+            lb = prev.get(lf)
+            if lb is None or lb[0] != st.st_size or lb[1] != st.st_mtime_ns:
+                with open(lf, "rb") as fh:
+                    data = fh.read()
+                lb = [st.st_size, st.st_mtime_ns, hashlib.blake2b(data, digest_size=16).hexdigest(), _label_counts(data)]
+                read += 1
+            for c, n in lb[3].items():
+                hist[c] = hist.get(c, 0) + n
+        labels.append(lb)
+        state.update(f"{f}\0{size}:{mtime}\0{lf}\0{lb[0] if lb else -1}:{lb[1] if lb else -1}\0".encode())
+        fingerprint.update(f"{os.path.relpath(f, root)}\0{size}\0{lb[2] if lb else '-'}\0".encode())
+    for d in {os.path.dirname(lf) for lf in label_files}:
+        watch[d] = _mtime(d)
+    return {
+        "source": source,
+        "watch": watch,
+        "images": images,
+        "labels": labels,
+        "class_hist": dict(sorted(hist.items(), key=lambda kv: int(kv[0]))),
+        "instances": sum(hist.values()),
+        "missing_labels": missing,
+        "state": state.hexdigest(),
+        "fingerprint": fingerprint.hexdigest(),
+        "scan_s": time.perf_counter() - t0,
+    }, read
+
+
+class DatasetManifest:
+    """load_manifest() 결과. split별 이미지 목록·라벨 캐시 위치·클래스 히스토그램과 데이터셋 fingerprint."""
+
+    def __init__(self, path: Path, info: dict[str, Any], stats: dict[str, float]):
+        self.path = path
+        self.info = info
+        self.stats = stats
+
+    @property
+    def fingerprint(self) -> str:
+        return self.info["fingerprint"]
+
+    @property
+    def data_yaml(self) -> Path:
+        return Path(self.info["data_yaml"])
+
+    @property
+    def names(self) -> dict[int, str]:
+        return {int(k): v for k, v in self.info["names"].items()}
+
+    @property
+    def splits(self) -> list[str]:
+        return list(self.info["splits"])
+
+    def split_for(self, img_path: str | list[str]) -> str | None:
+        """Ultralytics가 넘기는 img_path(data[split] 값)에 해당하는 split 이름."""
+        key = _as_list(img_path)
+        for name, split in self.info["splits"].items():
+            if _as_list(split["source"]) == key:
+                return name
+        return None
+
+    def im_files(self, split: str) -> list[str]:
+        return [f for f, *_ in self.info["splits"][split]["images"]]
+
+    def cache_hash(self, split: str) -> str:
+        """split 이미지·라벨 파일 상태(경로·크기·mtime) 해시. Ultralytics get_hash와 같은 기준, stat 없이."""
+        return self.info["splits"][split]["state"]
+
+    def label_cache_path(self, split: str) -> Path:
+        return self.path / f"{split}.cache"
+
+    def summary(self) -> dict[str, Any]:
+        names = self.names
+        return {
+            "fingerprint": self.fingerprint,
+            "data_yaml": self.info["data_yaml"],
+            "splits": {
+                name: {
+                    "images": len(split["images"]),
+                    "instances": split["instances"],
+                    "missing_labels": split["missing_labels"],
+                    "fingerprint": split["fingerprint"],
+                    "class_hist": {names.get(int(c), c): n for c, n in split["class_hist"].items()},
+                }
+                for name, split in self.info["splits"].items()
+            },
+        }
+
+
+def load_manifest(
+    data_yaml: str | Path, validate: str = DATASET_MANIFEST_VALIDATE, manifest_dir: Path | None = None, verbose: bool = True
+) -> DatasetManifest:
+    """
+    data yaml의 manifest를 열거나 (증분) 갱신. 같은 데이터셋을 동시에 여는 run들은 파일 락으로 한 번만 스캔.
+    stats: dataset_manifest/status (0 = 그대로 사용, 1 = 새로 스캔, 2 = 갱신), open_s, labels_read.
+    """
+    if validate not in VALIDATE_MODES:
+        raise ValueError(f"지원하지 않는 validate: {validate} ({'/'.join(VALIDATE_MODES)})")
+    data_yaml = Path(data_yaml).resolve()
+    if not data_yaml.exists():
+        raise FileNotFoundError(f"Data YAML not found: {data_yaml}")
+    key = hashlib.sha256(str(data_yaml).encode()).hexdigest()[:12]
+    path = (manifest_dir or DATASET_MANIFEST_DIR) / f"{data_yaml.parent.name}-{key}"
+    path.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    st = data_yaml.stat()
+    yaml_state = f"{st.st_size}:{st.st_mtime_ns}"
+    with open(path / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        old = _read_json(path / "manifest.json")
+        if old is not None and old.get("version") != MANIFEST_VERSION:
+            old = None
+        if (
+            old is not None and validate == "dirs" and old["yaml_state"] == yaml_state
+            and all(_mtime(p) == m for split in old["splits"].values() for p, m in split["watch"].items())
+            and all(_labels_unchanged(split) for split in old["splits"].values())
+        ):
+            manifest = DatasetManifest(path, old, {
+                "dataset_manifest/status": 0.0,
+                "dataset_manifest/open_s": time.perf_counter() - t0,
+                "dataset_manifest/labels_read": 0.0,
+            })
+        else:
+            data = check_det_dataset(str(data_yaml))
+            splits: dict[str, Any] = {}
+            labels_read = 0
+            for name in SPLITS:
+                source = data.get(name)
+                if not source:
+                    continue
+                prev = old["splits"].get(name) if old is not None else None
+                splits[name], read = _scan_split(source, str(data["path"]), prev)
+                labels_read += read
+            fingerprint = hashlib.blake2b(digest_size=16)
+            for name, split in splits.items():
+                fingerprint.update(f"{name}\0{split['fingerprint']}\0".encode())
+            fingerprint.update(json.dumps(data["names"], sort_keys=True).encode())
+            info = {
+                "version": MANIFEST_VERSION,
+                "data_yaml": str(data_yaml),
+                "yaml_state": yaml_state,
+                "root": str(data["path"]),
+                "names": {str(k): v for k, v in data["names"].items()},
+                "fingerprint": fingerprint.hexdigest(),
+                "subset": data.get("subset"),  # utils/dataset_subset.py가 만든 부분집합이면 비율·원본 버전
+                "splits": splits,
+                "updated": time.time(),
+            }
+            _write_json(path / "manifest.json", info)
+            # stat 검증에서 다시 스캔했어도 파일 상태가 모두 같으면 "그대로 사용"
+            unchanged = old is not None and {n: sp["state"] for n, sp in old["splits"].items()} == {
+                n: sp["state"] for n, sp in splits.items()
+            }
+            manifest = DatasetManifest(path, info, {
+                "dataset_manifest/status": 1.0 if old is None else 0.0 if unchanged else 2.0,
+                "dataset_manifest/open_s": time.perf_counter() - t0,
+                "dataset_manifest/labels_read": float(labels_read),
+            })
+    if verbose:
+        status = {0: "그대로 사용", 1: "새로 스캔", 2: "갱신"}[int(manifest.stats["dataset_manifest/status"])]
+        counts = ", ".join(f"{name} {len(s['images'])}장" for name, s in manifest.info["splits"].items())
+        print(
+            f"✅ 데이터셋 manifest ({status}, {manifest.stats['dataset_manifest/open_s'] * 1000:.0f} ms): {counts}, "
+            f"버전 {manifest.fingerprint[:12]} ({data_yaml})"
+        )
+    return manifest
+
+
+def log_dataset_version(manifest: DatasetManifest) -> None:
+    """
+    활성 MLflow Run에 dataset_version 태그(fingerprint)와 split별 요약(dataset/manifest.json) 기록.
+    부분집합이면 data_subset_fraction·seed·원본 데이터셋 버전 태그도 (전체 데이터는 data_subset_fraction=1.0).
+    """
+    import mlflow
+
+    if not mlflow.active_run():
+        return
+    subset = manifest.info.get("subset") or {}
+    tags = {
+        "dataset_version": manifest.fingerprint,
+        "dataset_yaml": str(manifest.data_yaml),
+        "data_subset_fraction": str(float(subset.get("fraction", 1.0))),
+    }
+    if subset:
+        tags.update({"data_subset_seed": str(subset.get("seed")), "data_subset_source_version": subset.get("source_version")})
+    mlflow.set_tags(tags)
+    mlflow.log_dict(manifest.summary(), "dataset/manifest.json")
+
+
+class ManifestYOLODataset(YOLODataset):
+    """이미지 목록·라벨 캐시 검증을 manifest로 하는 YOLODataset. manifest는 manifest_dataset()으로 지정."""
+
+    manifest: DatasetManifest | None = None
+    plain_images = True  # load_image·라벨 형식은 YOLODataset 그대로 (이미지 캐시 사용 가능)
+
+    def get_img_files(self, img_path: str | list[str]) -> list[str]:
+        self.manifest_split = self.manifest.split_for(img_path) if self.manifest is not None else None
+        if self.manifest_split is None:
+            return super().get_img_files(img_path)
+        im_files = self.manifest.im_files(self.manifest_split)
+        count = self.fraction if isinstance(self.fraction, int) else max(1, round(len(im_files) * self.fraction))
+        if not im_files or count < len(im_files):
+            # 비어 있으면 Ultralytics 오류 메시지, 일부만 쓰면 라벨 캐시가 manifest split과 달라 원래 방식
+            self.manifest_split = None
+            return super().get_img_files(img_path)
+        return im_files
+
+    def get_cache_hash(self) -> str:
+        if self.manifest_split is None:
+            return super().get_cache_hash()
+        nc = self.data.get("bg_class_idx") or len(self.data["names"])
+        scan_args = (self.use_keypoints, nc, self.data.get("kpt_shape"), self.single_cls)
+        return hashlib.sha256(f"{self.manifest.cache_hash(self.manifest_split)}{scan_args}".encode()).hexdigest()
+
+    def _load_or_scan_cache(self, cache_path: Path, cache_hash: str) -> tuple[dict, bool]:
+        if self.manifest_split is not None:
+            cache_path = self.manifest.label_cache_path(self.manifest_split)
+        return super()._load_or_scan_cache(cache_path, cache_hash)
+
+
+def manifest_dataset(manifest: DatasetManifest) -> type[ManifestYOLODataset]:
+    """YOLODataset 대신 쓸 데이터셋 클래스 (생성 인자는 YOLODataset과 같음)."""
+    return type("ManifestYOLODataset", (ManifestYOLODataset,), {"manifest": manifest})
+
+
+@contextmanager
+def _build_with(dataset_cls: type[YOLODataset]) -> Iterator[None]:
+    # build_yolo_dataset은 모듈의 YOLODataset을 그대로 생성 → 그 동안만 교체 (멀티모달·semantic 등 다른 분기는 영향 없음)
+    import ultralytics.data.build as build
+
+    original = build.YOLODataset
+    build.YOLODataset = dataset_cls
+    try:
+        yield
+    finally:
+        build.YOLODataset = original
+
+
+class ManifestTrainer(DetectionTrainer):
+    """train/val 데이터셋을 manifest로 여는 DetectionTrainer. manifest_trainer()로 생성."""
+
+    dataset_manifest: DatasetManifest | None = None
+
+    def build_dataset(self, img_path: str, mode: str = "train", batch: int | None = None):
+        if self.dataset_manifest is None:
+            return super().build_dataset(img_path, mode, batch)
+        with _build_with(manifest_dataset(self.dataset_manifest)):
+            return super().build_dataset(img_path, mode, batch)
+
+
+def manifest_trainer(manifest: DatasetManifest, base: type[DetectionTrainer] | None = None) -> type[ManifestTrainer]:
+    """model.train(trainer=...)에 넘길 trainer 클래스. base(예: image_cache_trainer())가 있으면 그 기능과 함께."""
+    bases = (base, ManifestTrainer) if base is not None else (ManifestTrainer,)
+    return type("ManifestTrainer", bases, {"dataset_manifest": manifest})
@@ -0,0 +1,286 @@
+"""
+계층 샘플 부분집합: 큰 데이터셋의 5~25%를 클래스별 인스턴스 수·박스 크기 분포를 유지해 뽑아, sweep 초기 탐색을
+전체 데이터의 일부 비용으로 돌리고 유망한 설정만 전체 데이터로 다시 학습.
+
+- 층(stratum) = (클래스, 박스 크기 구간). 크기 = 정규화 sqrt(w*h), SIZE_BINS 경계로 small/medium/large
+  (640 입력 기준 COCO의 32²/96² 경계와 비슷)
+- 선택: 희귀한 층부터 그 층을 가진 이미지를 (seed 고정 무작위 순서로) 목표 인스턴스 수(전체 × 비율)까지 채우고,
+  남은 자리는 어느 층도 목표를 넘기지 않는 이미지로 채움. 라벨 없는 배경 이미지는 같은 비율로
+- 출력: <data yaml 디렉터리>/subsets/<yaml 이름>-p<비율%>-s<seed>/ 에 images/labels 하드 링크 (복사 없음,
+  다른 파일 시스템이면 심볼릭 링크) + data.yaml. 기본은 train split만 부분집합, val은 원본 그대로
+  (부분집합 run의 지표도 같은 검증셋 기준이라 전체 데이터 run과 비교 가능)
+- data.yaml의 subset 블록(fraction, seed, 원본 yaml, 원본 데이터셋 버전)은 manifest에 들어가 학습 Run의
+  data_subset_* 태그로 기록. 원본 버전·비율·seed·샘플러 버전이 같으면 다시 만들지 않음
+- ranking_agreement(): 같은 설정들의 부분집합 결과 순위가 전체 데이터 순위와 얼마나 맞는지 (Spearman·Kendall,
+  1위 일치, 상위 k 겹침, 부분집합 1위를 전체 데이터에서 골랐을 때의 손실)
+"""
+import fcntl
+import json
+import math
+import os
+import random
+import shutil
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from utils.dataset_manifest import _TMP_PREFIX, load_manifest
+
+SIZE_BINS = (0.05, 0.15)  # 정규화 sqrt(w*h) 경계
+SIZE_NAMES = ("small", "medium", "large")
+SAMPLER_VERSION = 2  # stratified_sample 선택 규칙이 바뀌면 올림 (같은 비율·seed의 기존 부분집합을 다시 만듦)
+
+# 학습 진입점이 쓸 부분집합 비율 (0이면 전체 데이터)과 샘플 seed
+# 예: DATA_SUBSET=0.1 DATA_SUBSET_SEED=1
+DATA_SUBSET = float(os.getenv("DATA_SUBSET", "0"))
+DATA_SUBSET_SEED = int(os.getenv("DATA_SUBSET_SEED", "0"))
+
+
+def _size_bin(w: float, h: float) -> int:
+    s = math.sqrt(max(w, 0.0) * max(h, 0.0))
+    return sum(s >= b for b in SIZE_BINS)
+
+
+def image_strata(label_file: str) -> dict[tuple[int, int], int]:
+    """YOLO 라벨 파일 → {(클래스, 크기 구간): 인스턴스 수}. 파일이 없으면 빈 dict (배경 이미지)."""
+    strata: dict[tuple[int, int], int] = {}
+    try:
+        with open(label_file, encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return strata
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 5:
+            continue
+        try:
+            key = (int(float(parts[0])), _size_bin(float(parts[3]), float(parts[4])))
+        except ValueError:
+            continue
+        strata[key] = strata.get(key, 0) + 1
+    return strata
+
+
+def stratified_sample(strata: list[dict[tuple[int, int], int]], fraction: float, seed: int = 0) -> list[int]:
+    """이미지별 층 카운트 → 고른 이미지 인덱스 (정렬). 층별 인스턴스 수가 전체 × fraction에 가깝도록."""
+    if not 0 < fraction < 1:
+        raise ValueError(f"fraction은 0과 1 사이: {fraction}")
+    rng = random.Random(seed)
+    order = list(range(len(strata)))
+    rng.shuffle(order)
+    n_target = max(1, round(len(strata) * fraction))
+    total: Counter = Counter()
+    by_stratum: dict[tuple[int, int], list[int]] = defaultdict(list)
+    for i in order:
+        total.update(strata[i])
+        for key in strata[i]:
+            by_stratum[key].append(i)
+    target = {key: n * fraction for key, n in total.items()}
+    # 배경 이미지 자리는 먼저 떼어 둠 (라벨 있는 이미지가 목표를 다 채워 배경이 밀려나지 않도록)
+    backgrounds = [i for i in order if not strata[i]]
+    selected: set[int] = set(backgrounds[: min(n_target, round(len(backgrounds) * fraction))])
+    got: Counter = Counter()
+
+    def fits(i: int) -> bool:
+        return all(got[key] + n <= target[key] + 1 for key, n in strata[i].items())
+
+    # 희귀한 층부터: 목표가 1 미만인 층도 최소 한 이미지는 들어감. 두 번째 이미지부터는 어느 층도 목표를
+    # 넘기지 않는 이미지만 (같이 찍힌 다른 층 인스턴스로 중간 빈도 층이 넘치지 않도록)
+    for key in sorted(total, key=lambda k: (total[k], k)):
+        for i in by_stratum[key]:
+            if got[key] >= target[key] or len(selected) >= n_target:
+                break
+            if i not in selected and (not got[key] or fits(i)):
+                selected.add(i)
+                got.update(strata[i])
+    # 남은 자리: 어느 층도 목표를 넘기지 않는 이미지만 (넘치는 층이 생기면 분포가 틀어짐)
+    for i in order:
+        if len(selected) >= n_target:
+            break
+        if i in selected or not strata[i]:
+            continue
+        if fits(i):
+            selected.add(i)
+            got.update(strata[i])
+    return sorted(selected)
+
+
+def distribution_report(
+    strata: list[dict[tuple[int, int], int]], selected: list[int], names: dict[int, str]
+) -> dict[str, Any]:
+    """전체 vs 부분집합 분포: 클래스별 인스턴스 수·비율, 크기 구간 비중, 비중 최대 편차(%p)."""
+    full: Counter = Counter()
+    for s in strata:
+        full.update(s)
+    sub: Counter = Counter()
+    for i in selected:
+        sub.update(strata[i])
+
+    def share(counter: Counter, index: int) -> dict[int, float]:
+        agg: Counter = Counter()
+        for key, n in counter.items():
+            agg[key[index]] += n
+        total = max(1, sum(agg.values()))
+        return {k: n / total for k, n in agg.items()}
+
+    full_cls, sub_cls = Counter(), Counter()
+    for (c, _), n in full.items():
+        full_cls[c] += n
+    for (c, _), n in sub.items():
+        sub_cls[c] += n
+    full_share, sub_share = share(full, 0), share(sub, 0)
+    full_size, sub_size = share(full, 1), share(sub, 1)
+    n_full, n_sub = sum(full.values()), sum(sub.values())
+    return {
+        "images": len(selected),
+        "images_full": len(strata),
+        "instances": n_sub,
+        "instances_full": n_full,
+        "classes": {
+            names.get(c, str(c)): {"full": n, "subset": sub_cls[c], "ratio": sub_cls[c] / n}
+            for c, n in sorted(full_cls.items())
+        },
+        "size_share": {
+            SIZE_NAMES[b]: {"full": full_size.get(b, 0.0), "subset": sub_size.get(b, 0.0)} for b in range(len(SIZE_NAMES))
+        },
+        "class_share_max_dev": max((abs(sub_share.get(c, 0.0) - p) for c, p in full_share.items()), default=0.0),
+        "size_share_max_dev": max((abs(sub_size.get(b, 0.0) - p) for b, p in full_size.items()), default=0.0),
+        "classes_missing": sum(1 for c in full_cls if not sub_cls[c]),
+    }
+
+
+def _link(src: str, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        os.symlink(os.path.abspath(src), dst)
+
+
+def subset_dir(data_yaml: Path, fraction: float, seed: int = 0) -> Path:
+    return data_yaml.parent / "subsets" / f"{data_yaml.stem}-p{fraction * 100:g}-s{seed}"
+
+
+def build_subset(
+    data_yaml: str | Path,
+    fraction: float,
+    seed: int = 0,
+    out: Path | None = None,
+    splits: tuple[str, ...] = ("train",),
+    verbose: bool = True,
+) -> tuple[Path, dict[str, Any]]:
+    """
+    data yaml의 splits를 계층 샘플한 부분집합 → (부분집합 data.yaml, split별 distribution_report).
+    같은 원본 버전·비율·seed·splits·샘플러 버전으로 이미 만든 부분집합이 있으면 그대로 반환. 동시 실행은 파일 락으로 한 번만.
+    """
+    from ultralytics.data.utils import check_det_dataset, img2label_paths
+
+    data_yaml = Path(data_yaml).resolve()
+    out = Path(out or subset_dir(data_yaml, fraction, seed)).resolve()
+    manifest = load_manifest(data_yaml, verbose=verbose)
+    meta = {
+        "fraction": fraction,
+        "seed": seed,
+        "splits": list(splits),
+        "source": str(data_yaml),
+        "source_version": manifest.fingerprint,
+        "sampler_version": SAMPLER_VERSION,
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out.parent / f".{out.name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(out / "data.yaml", encoding="utf-8") as f:
+                existing = (yaml.safe_load(f) or {}).get("subset") or {}
+            with open(out / "report.json", encoding="utf-8") as f:
+                report = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, yaml.YAMLError):
+            existing, report = {}, {}
+        if report and all(existing.get(k) == v for k, v in meta.items()):
+            if verbose:
+                print(f"✅ 부분집합 그대로 사용 ({fraction:.0%}, seed {seed}): {out / 'data.yaml'}")
+            return out / "data.yaml", report
+
+        data = check_det_dataset(str(data_yaml))
+        tmp = out.with_name(f"{_TMP_PREFIX}{out.name}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        subset_yaml: dict[str, Any] = {"path": str(out)}
+        report = {}
+        for split in ("train", "val", "test"):
+            if split not in manifest.splits:
+                continue
+            if split not in splits:
+                subset_yaml[split] = data[split]  # 원본 그대로 (절대 경로)
+                continue
+            im_files = manifest.im_files(split)
+            label_files = img2label_paths(im_files)
+            strata = [image_strata(lf) for lf in label_files]
+            selected = stratified_sample(strata, fraction, seed)
+            root = os.path.commonpath([os.path.dirname(f) for f in im_files])
+            for i in selected:
+                rel = os.path.relpath(im_files[i], root)
+                _link(im_files[i], tmp / "images" / split / rel)
+                if os.path.exists(label_files[i]):
+                    _link(label_files[i], (tmp / "labels" / split / rel).with_suffix(".txt"))
+            subset_yaml[split] = f"images/{split}"
+            report[split] = distribution_report(strata, selected, manifest.names)
+        missing = [s for s in splits if s not in report]
+        if missing:
+            raise ValueError(f"{data_yaml}에 없는 split: {', '.join(missing)}")
+        subset_yaml["names"] = data["names"]
+        subset_yaml["subset"] = {**meta, "images": {s: r["images"] for s, r in report.items()}}
+        with open(tmp / "data.yaml", "w", encoding="utf-8") as f:
+            yaml.safe_dump(subset_yaml, f, allow_unicode=True, sort_keys=False)
+        with open(tmp / "report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        shutil.rmtree(out, ignore_errors=True)
+        tmp.rename(out)
+    if verbose:
+        for split, r in report.items():
+            print(
+                f"✂ 부분집합 {split} {fraction:.0%} (seed {seed}): {r['images']}/{r['images_full']}장, "
+                f"인스턴스 {r['instances']}/{r['instances_full']}, 클래스 비중 편차 최대 {r['class_share_max_dev'] * 100:.2f}%p, "
+                f"크기 비중 편차 최대 {r['size_share_max_dev'] * 100:.2f}%p → {out / 'data.yaml'}"
+            )
+    return out / "data.yaml", report
+
+
+def subset_data_yaml(data_yaml: str | Path, fraction: float = DATA_SUBSET, seed: int = DATA_SUBSET_SEED) -> Path:
+    """학습 진입점용: fraction이 0(또는 1 이상)이면 data_yaml 그대로, 아니면 train 부분집합 yaml (없으면 생성)."""
+    if not fraction or fraction >= 1:
+        return Path(data_yaml)
+    return build_subset(data_yaml, fraction, seed)[0]
+
+
+def ranking_agreement(
+    full: dict[str, float], subset: dict[str, float], mode: str = "max", top_k: int = 3
+) -> dict[str, float]:
+    """
+    같은 설정(키)들의 전체 데이터 지표 vs 부분집합 지표 → 순위 일치도.
+    spearman·kendall, top1_match, topk_overlap (상위 k 설정 겹침 비율), subset_best_full_rank (부분집합 1위의
+    전체 데이터 순위), regret (전체 데이터 1위 지표와 부분집합 1위 설정의 전체 데이터 지표 차이, 0이면 손실 없음).
+    """
+    from scipy.stats import kendalltau, spearmanr
+
+    keys = sorted(k for k in set(full) & set(subset) if not math.isnan(full[k]) and not math.isnan(subset[k]))
+    if len(keys) < 2:
+        raise ValueError(f"비교할 공통 설정이 2개 미만입니다 ({len(keys)}개)")
+    a = [full[k] for k in keys]
+    b = [subset[k] for k in keys]
+    sign = 1.0 if mode == "max" else -1.0
+    rank_full = sorted(keys, key=lambda k: -sign * full[k])
+    rank_sub = sorted(keys, key=lambda k: -sign * subset[k])
+    k = min(top_k, len(keys))
+    best = rank_sub[0]
+    constant = len(set(a)) < 2 or len(set(b)) < 2  # 순위 상관이 정의되지 않음
+    return {
+        "configs": float(len(keys)),
+        "spearman": math.nan if constant else float(spearmanr(a, b)[0]),
+        "kendall": math.nan if constant else float(kendalltau(a, b)[0]),
+        "top1_match": float(best == rank_full[0]),
+        "topk_overlap": len(set(rank_full[:k]) & set(rank_sub[:k])) / k,
+        "subset_best_full_rank": float(rank_full.index(best) + 1),
+        "regret": abs(full[rank_full[0]] - full[best]),
+    }
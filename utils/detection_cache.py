@@ -0,0 +1,212 @@
+"""
+검출 결과 캐시 (content-addressed, LRU 크기 제한).
+(영상 내용 해시, 가중치 해시, imgsz, backend, 프레임 선택)이 같으면 검출기를 다시 돌리지 않고
+디스크에 저장된 프레임별 원시 검출(낮은 conf floor)을 재생. CONF·클래스 필터·tracker·MOT 평가처럼
+검출기 뒤쪽만 바꾸는 반복 실험은 추론 없이 디코딩 + 후처리 시간만 듦.
+
+엔트리 = <root>/<key>/{detections.parquet, meta.json}. meta.json의 last_used 기준 LRU로 max_bytes 초과분 삭제.
+"""
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from utils.backends import file_hash
+from utils.detection_store import DetectionStoreWriter, StoredDetections
+from utils.detections import FrameDetections
+from utils.tracking import apply_tracker
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "gaflow" / "detections"
+DEFAULT_CONF_FLOOR = 0.001  # 캐시에 저장하는 최소 신뢰도 (실제 CONF 필터는 재생 시 적용)
+_TMP_PREFIX = ".tmp-"
+_STALE_TMP_S = 3600.0
+
+
+def video_hash(path: str | Path, memo_dir: Path = DEFAULT_CACHE_DIR) -> str:
+    """영상 파일 sha256 (16자리). (절대 경로, 크기, mtime)이 같으면 memo에서 바로 반환."""
+    path = Path(path).resolve()
+    st = path.stat()
+    memo_path = memo_dir / "video_hashes.json"
+    memo_key = f"{path}|{st.st_size}|{st.st_mtime_ns}"
+    try:
+        memo = json.loads(memo_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        memo = {}
+    if memo_key in memo:
+        return memo[memo_key]
+    digest = file_hash(path)
+    memo[memo_key] = digest
+    memo_dir.mkdir(parents=True, exist_ok=True)
+    tmp = memo_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(memo), encoding="utf-8")
+    tmp.replace(memo_path)
+    return digest
+
+
+def cache_key(**fields: Any) -> str:
+    """키 필드(dict) → 안정적인 16자리 해시 (필드 순서 무관)."""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class CachedDetections(StoredDetections):
+    """캐시 엔트리 하나를 메모리로 로드 → 처리 프레임 번호(1-based)별 FrameDetections."""
+
+    def __init__(self, entry: Path):
+        self.entry = Path(entry)
+        self.meta = json.loads((self.entry / "meta.json").read_text(encoding="utf-8"))
+        self.names = {int(k): v for k, v in self.meta.get("names", {}).items()}
+        super().__init__(self.entry / "detections.parquet", frames=int(self.meta["frames"]))
+
+
+class DetectionCacheWriter:
+    """miss일 때 임시 디렉터리에 기록하다가 commit()에서 엔트리로 rename. commit 전 중단되면 버려짐."""
+
+    def __init__(self, cache: "DetectionCache", key: str, meta: dict[str, Any]):
+        self.cache = cache
+        self.key = key
+        self.meta = dict(meta)
+        cache.root.mkdir(parents=True, exist_ok=True)
+        self._tmp = Path(tempfile.mkdtemp(dir=cache.root, prefix=_TMP_PREFIX))
+        self._store = DetectionStoreWriter(
+            self._tmp / "detections.parquet",
+            source_id=str(meta.get("video_hash", "")),
+            model_hash=str(meta.get("weights_hash", "")),
+        )
+        self.frames = 0
+
+    def append(self, n: int, det: FrameDetections) -> None:
+        self.frames = max(self.frames, n)
+        self._store.append(n, det)
+
+    def commit(self, names: dict[int, str] | None = None) -> Path | None:
+        self._store.close()
+        self.meta.update({
+            "frames": self.frames,
+            "names": {str(k): v for k, v in (names or {}).items()},
+            "created": time.time(),
+            "last_used": time.time(),
+        })
+        (self._tmp / "meta.json").write_text(json.dumps(self.meta, ensure_ascii=False), encoding="utf-8")
+        entry = self.cache.root / self.key
+        try:
+            self._tmp.rename(entry)
+        except OSError:  # 다른 프로세스가 같은 키를 먼저 기록
+            shutil.rmtree(self._tmp, ignore_errors=True)
+        self.cache.evict()
+        return entry if entry.exists() else None
+
+    def discard(self) -> None:
+        try:
+            self._store.close()
+        finally:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+class DetectionCache:
+    """검출 캐시 디렉터리 (LRU, max_bytes 상한)."""
+
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR, max_bytes: int = 5 * 1024**3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def lookup(self, key: str) -> CachedDetections | None:
+        entry = self.root / key
+        if not (entry / "meta.json").exists():
+            return None
+        cached = CachedDetections(entry)
+        cached.meta["last_used"] = time.time()
+        (entry / "meta.json").write_text(json.dumps(cached.meta, ensure_ascii=False), encoding="utf-8")
+        return cached
+
+    def writer(self, key: str, meta: dict[str, Any]) -> DetectionCacheWriter:
+        return DetectionCacheWriter(self, key, meta)
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+    def evict(self) -> list[str]:
+        """오래된 임시 디렉터리 삭제 + last_used가 오래된 엔트리부터 max_bytes 이하가 될 때까지 삭제."""
+        if not self.root.is_dir():
+            return []
+        entries: list[tuple[float, int, Path]] = []
+        for p in self.root.iterdir():
+            if not p.is_dir():
+                continue
+            if p.name.startswith(_TMP_PREFIX):
+                if time.time() - p.stat().st_mtime > _STALE_TMP_S:
+                    shutil.rmtree(p, ignore_errors=True)
+                continue
+            try:
+                last_used = float(json.loads((p / "meta.json").read_text(encoding="utf-8"))["last_used"])
+            except (OSError, ValueError, KeyError):
+                last_used = 0.0
+            entries.append((last_used, self._size(p), p))
+        total = sum(size for _, size, _ in entries)
+        removed: list[str] = []
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(p, ignore_errors=True)
+            total -= size
+            removed.append(p.name)
+        return removed
+
+
+def detections_to_result(frame: np.ndarray, det: FrameDetections, names: dict[int, str], path: str = "") -> Results:
+    """FrameDetections → Ultralytics Results (tracker·plot·FrameDetections.from_result에서 그대로 사용). ids가 있으면 track 박스(N,7)."""
+    boxes = np.empty((len(det), 6 if det.ids is None else 7), dtype=np.float32)
+    boxes[:, :4] = det.xyxy
+    if det.ids is not None:
+        boxes[:, 4] = det.ids
+    boxes[:, -2] = det.conf
+    boxes[:, -1] = det.cls
+    result = Results(frame, path=path, names=names, boxes=torch.from_numpy(boxes))
+    result.speed = {}
+    return result
+
+
+def cached_results(
+    frames: Iterable[tuple[int, np.ndarray]],
+    infer: Callable[[Iterable[tuple[int, np.ndarray]]], Iterator[tuple[np.ndarray, Any]]],
+    conf: float,
+    names: dict[int, str],
+    cached: CachedDetections | None = None,
+    writer: DetectionCacheWriter | None = None,
+    tracker: Any = None,
+    path: str = "",
+) -> Iterator[tuple[np.ndarray, Results]]:
+    """
+    (frame, result)를 프레임 순서대로 반환.
+    - cached가 있으면 추론 없이 캐시에서 재생
+    - 없으면 infer(conf floor로 추론)를 돌리며 writer에 원시 검출 기록
+    두 경우 모두 conf 필터 → (tracker 갱신) 순서가 같으므로 hit/miss 결과가 동일.
+    """
+    if cached is not None:
+        def _source() -> Iterator[tuple[np.ndarray, FrameDetections, dict]]:
+            for n, (_, frame) in enumerate(frames, start=1):
+                if n > cached.frames:
+                    return
+                yield frame, cached.frame(n), {}
+    else:
+        def _source() -> Iterator[tuple[np.ndarray, FrameDetections, dict]]:
+            for n, (frame, result) in enumerate(infer(frames), start=1):
+                det = FrameDetections.from_result(result)
+                if writer is not None:
+                    writer.append(n, det)
+                yield frame, det, result.speed or {}
+
+    for frame, det, speed in _source():
+        result = detections_to_result(frame, det.select(det.conf >= conf), names, path)
+        result.speed = speed
+        if tracker is not None:
+            result = apply_tracker(tracker, result)
+            result.speed = speed
+        yield frame, result
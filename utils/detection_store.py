@@ -0,0 +1,255 @@
+"""
+검출 결과 컬럼 저장소 (Parquet).
+프레임 루프는 FrameDetections 배열을 큐에 넣기만 하고, 백그라운드 스레드가 row_group_size행씩 모아
+Parquet row group으로 기록. 이후 클래스 히스토그램·신뢰도 분포·MOT export는 영상을 다시 돌리지 않고
+파일에 대한 벡터 연산으로 처리.
+"""
+import queue
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from utils.detections import MOT_ROW_FMT, FrameDetections, label_of
+
+# frame_idx: 처리한 프레임 번호(1-based, MOT frame과 동일), timestamp_s: 원본 영상 기준 시각
+# track_id: 트래킹이 아니거나 ID 미할당이면 null
+DETECTION_SCHEMA = pa.schema([
+    ("frame_idx", pa.int64()),
+    ("timestamp_s", pa.float64()),
+    ("track_id", pa.int64()),
+    ("x1", pa.float32()),
+    ("y1", pa.float32()),
+    ("x2", pa.float32()),
+    ("y2", pa.float32()),
+    ("conf", pa.float32()),
+    ("cls", pa.int32()),
+    ("source_id", pa.dictionary(pa.int32(), pa.string())),
+    ("model_hash", pa.dictionary(pa.int32(), pa.string())),
+])
+
+_END = object()
+
+
+class DetectionStoreWriter:
+    """
+    검출 → Parquet 백그라운드 writer.
+
+    - append()는 배열 참조만 큐에 넣음 (큐가 가득 찬 경우에만 대기 → blocked 카운트)
+    - row_group_size행이 모이면 row group 하나로 기록 → writer 메모리는 row group 하나 크기로 제한
+    - close()에서 남은 행 기록 후 파일 닫음. writer 스레드 예외는 close()에서 다시 발생
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        source_id: str = "",
+        model_hash: str = "",
+        row_group_size: int = 50_000,
+        queue_size: int = 1024,
+        compression: str = "zstd",
+    ):
+        self.path = Path(path)
+        self.source_id = source_id
+        self.model_hash = model_hash
+        self.row_group_size = max(1, row_group_size)
+        self.compression = compression
+        self.rows = 0
+        self.frames = 0
+        self.row_groups = 0
+        self.blocked = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._error: BaseException | None = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="detection-store-writer", daemon=True)
+        self._thread.start()
+
+    def append(
+        self,
+        frame_idx: int,
+        det: FrameDetections,
+        timestamp_s: float = 0.0,
+        source_id: str | None = None,
+    ) -> None:
+        """한 프레임의 검출 추가 (검출 0개 프레임은 행 없음)."""
+        if self._closed:
+            raise RuntimeError("DetectionStoreWriter가 이미 닫혔습니다")
+        self.frames += 1
+        if not len(det):
+            return
+        item = (frame_idx, timestamp_s, source_id if source_id is not None else self.source_id, det)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.blocked += 1
+            self._queue.put(item)
+
+    def _to_table(self, items: list[Any]) -> pa.Table:
+        """큐 항목(+ 이전 flush에서 남은 Table) → 하나의 Table."""
+        carry = [t for t in items if isinstance(t, pa.Table)]
+        items = [t for t in items if not isinstance(t, pa.Table)]
+        table = self._frames_to_table(items) if items else None
+        if not carry:
+            return table
+        return pa.concat_tables(carry + ([table] if table is not None else [])).unify_dictionaries().combine_chunks()
+
+    def _frames_to_table(self, items: list[tuple[int, float, str, FrameDetections]]) -> pa.Table:
+        counts = np.array([len(d) for _, _, _, d in items])
+        xyxy = np.concatenate([d.xyxy for _, _, _, d in items]).astype(np.float32, copy=False)
+        ids = [d.ids if d.ids is not None else np.full(len(d), -1, dtype=np.int64) for _, _, _, d in items]
+        track_id = np.concatenate(ids)
+        sources = [s for _, _, s, _ in items]
+        source_dict = pa.array(sorted(set(sources)), pa.string())
+        source_index = {s: i for i, s in enumerate(source_dict.to_pylist())}
+        n = int(counts.sum())
+        return pa.Table.from_arrays(
+            [
+                pa.array(np.repeat([f for f, _, _, _ in items], counts).astype(np.int64)),
+                pa.array(np.repeat([t for _, t, _, _ in items], counts).astype(np.float64)),
+                pa.array(track_id, mask=track_id < 0),
+                pa.array(xyxy[:, 0]),
+                pa.array(xyxy[:, 1]),
+                pa.array(xyxy[:, 2]),
+                pa.array(xyxy[:, 3]),
+                pa.array(np.concatenate([d.conf for _, _, _, d in items]).astype(np.float32, copy=False)),
+                pa.array(np.concatenate([d.cls for _, _, _, d in items]).astype(np.int32)),
+                pa.DictionaryArray.from_arrays(
+                    pa.array(np.repeat([source_index[s] for s in sources], counts).astype(np.int32)), source_dict
+                ),
+                pa.DictionaryArray.from_arrays(
+                    pa.array(np.zeros(n, dtype=np.int32)), pa.array([self.model_hash], pa.string())
+                ),
+            ],
+            schema=DETECTION_SCHEMA,
+        )
+
+    def _run(self) -> None:
+        writer: pq.ParquetWriter | None = None
+        pending: list[Any] = []
+        pending_rows = 0
+        item: Any = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(str(self.path), DETECTION_SCHEMA, compression=self.compression)
+            while True:
+                item = self._queue.get()
+                if item is not _END:
+                    pending.append(item)
+                    pending_rows += len(item[3])  # (frame_idx, timestamp_s, source_id, det)
+                if pending_rows >= self.row_group_size or (item is _END and pending_rows):
+                    table = self._to_table(pending)
+                    # row_group_size 단위로만 기록하고 나머지는 다음 row group으로 (마지막만 작을 수 있음)
+                    n_write = table.num_rows if item is _END else table.num_rows // self.row_group_size * self.row_group_size
+                    for start in range(0, n_write, self.row_group_size):
+                        writer.write_table(table.slice(start, min(self.row_group_size, n_write - start)))
+                        self.row_groups += 1
+                    self.rows += n_write
+                    carry = table.slice(n_write)
+                    pending = [carry] if carry.num_rows else []
+                    pending_rows = carry.num_rows
+                if item is _END:
+                    break
+        except BaseException as e:  # close()에서 다시 발생
+            self._error = e
+            # 프레임 루프가 put에서 멈추지 않도록 남은 항목 소진
+            while item is not _END:
+                item = self._queue.get()
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_END)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"검출 저장 실패: {self.path}") from self._error
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "detection_store/rows": float(self.rows),
+            "detection_store/frames": float(self.frames),
+            "detection_store/row_groups": float(self.row_groups),
+            "detection_store/blocked": float(self.blocked),
+        }
+
+    def __enter__(self) -> "DetectionStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def read_detections(path: str | Path, columns: list[str] | None = None, filters: Any = None) -> pa.Table:
+    """Parquet 검출 파일 로드 (필요한 컬럼만, pyarrow filters로 row group pruning)."""
+    return pq.read_table(str(path), columns=columns, filters=filters)
+
+
+class StoredDetections:
+    """
+    Parquet 검출 파일을 메모리로 로드 → 처리 프레임 번호(1-based)별 FrameDetections.
+    검출이 없는 프레임은 행이 없으므로 전체 프레임 수는 frames로 지정 (없으면 마지막 검출 프레임).
+    """
+
+    def __init__(self, path: str | Path, source_id: str | None = None, frames: int | None = None):
+        self.path = Path(path)
+        filters = [("source_id", "=", source_id)] if source_id is not None else None
+        t = read_detections(self.path, ["frame_idx", "x1", "y1", "x2", "y2", "conf", "cls"], filters)
+        t = t.sort_by([("frame_idx", "ascending")])
+        frame_idx = t["frame_idx"].to_numpy()
+        self.frames = int(frames) if frames is not None else (int(frame_idx[-1]) if len(frame_idx) else 0)
+        self._xyxy = np.column_stack([t[c].to_numpy() for c in ("x1", "y1", "x2", "y2")]).astype(np.float32)
+        self._conf = t["conf"].to_numpy().astype(np.float32)
+        self._cls = t["cls"].to_numpy().astype(np.int64)
+        # frame_idx가 정렬돼 있으므로 프레임별 [start, end) 구간은 searchsorted로
+        self._bounds = np.searchsorted(frame_idx, np.arange(1, self.frames + 2))
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def frame(self, n: int) -> FrameDetections:
+        start, end = self._bounds[n - 1], self._bounds[n]
+        return FrameDetections(self._xyxy[start:end], self._conf[start:end], self._cls[start:end])
+
+    def __iter__(self):
+        """(프레임 번호, FrameDetections)를 1..frames 순서로."""
+        for n in range(1, self.frames + 1):
+            yield n, self.frame(n)
+
+
+def class_histogram(path: str | Path, names: dict[int, str] | list[str] | None = None) -> dict[str, int]:
+    """{라벨: 검출 수} (많은 순)."""
+    counts = pc.value_counts(read_detections(path, ["cls"])["cls"])
+    pairs = [(c["values"].as_py(), c["counts"].as_py()) for c in counts]
+    return {label_of(names, cls_id): n for cls_id, n in sorted(pairs, key=lambda p: -p[1])}
+
+
+def confidence_histogram(path: str | Path, bins: int = 20) -> dict[str, list[float]]:
+    """신뢰도 0~1 고정 bin 히스토그램 {edges, counts}."""
+    conf = read_detections(path, ["conf"])["conf"].to_numpy()
+    counts, edges = np.histogram(conf, bins=bins, range=(0.0, 1.0))
+    return {"edges": edges.tolist(), "counts": counts.astype(float).tolist()}
+
+
+def export_mot(path: str | Path, out_path: str | Path, source_id: str | None = None) -> int:
+    """MOT Challenge 텍스트로 export (frame,id,x,y,w,h,conf,-1,-1,-1). 기록한 행 수 반환."""
+    filters = [("source_id", "=", source_id)] if source_id is not None else None
+    t = read_detections(path, ["frame_idx", "track_id", "x1", "y1", "x2", "y2", "conf"], filters)
+    t = t.sort_by([("frame_idx", "ascending")])
+    xyxy = np.column_stack([t[c].to_numpy().astype(np.float64) for c in ("x1", "y1", "x2", "y2")])
+    rows = np.empty((t.num_rows, 7), dtype=np.float64)
+    rows[:, 0] = t["frame_idx"].to_numpy()
+    rows[:, 1] = t["track_id"].fill_null(0).to_numpy()
+    rows[:, 2:4] = xyxy[:, :2] + 1.0
+    rows[:, 4:6] = xyxy[:, 2:4] - xyxy[:, :2]
+    rows[:, 6] = t["conf"].to_numpy()
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w") as f:
+        np.savetxt(f, rows, fmt=MOT_ROW_FMT)
+    return t.num_rows
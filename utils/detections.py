@@ -0,0 +1,112 @@
+"""
+프레임 단위 검출 결과 후처리 (벡터화).
+박스마다 .tolist()/.item()을 부르지 않고 프레임당 한 번 Boxes.data를 NumPy로 옮긴 뒤
+클래스 카운트(bincount)·MOT 행 쓰기(savetxt)를 배열 단위로 처리.
+"""
+from dataclasses import dataclass
+from typing import Any, TextIO
+
+import numpy as np
+
+# MOT Challenge 포맷: frame,id,x,y,w,h,conf,-1,-1,-1 (x,y는 1-based)
+MOT_ROW_FMT = "%d,%d,%.2f,%.2f,%.2f,%.2f,%.4f,-1,-1,-1"
+
+
+@dataclass
+class FrameDetections:
+    """한 프레임의 검출 결과 배열. ids는 트래킹 ID (트래킹이 아니거나 미할당이면 None)."""
+
+    xyxy: np.ndarray  # (N, 4) float32
+    conf: np.ndarray  # (N,) float32
+    cls: np.ndarray   # (N,) int64
+    ids: np.ndarray | None = None  # (N,) int64
+
+    def __len__(self) -> int:
+        return int(self.conf.shape[0])
+
+    @classmethod
+    def empty(cls) -> "FrameDetections":
+        return cls(
+            xyxy=np.zeros((0, 4), dtype=np.float32),
+            conf=np.zeros((0,), dtype=np.float32),
+            cls=np.zeros((0,), dtype=np.int64),
+        )
+
+    @classmethod
+    def from_result(cls, result: Any) -> "FrameDetections":
+        """Ultralytics Results → 배열. Boxes.data (N,6|7)을 한 번만 CPU/NumPy로 전송."""
+        boxes = getattr(result, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return cls.empty()
+        data = boxes.data
+        data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+        # (N,6): x1,y1,x2,y2,conf,cls / (N,7): x1,y1,x2,y2,track_id,conf,cls
+        ids = data[:, 4].astype(np.int64) if data.shape[1] == 7 else None
+        return cls(
+            xyxy=data[:, :4].astype(np.float32, copy=False),
+            conf=data[:, -2].astype(np.float32, copy=False),
+            cls=data[:, -1].astype(np.int64),
+            ids=ids,
+        )
+
+    def mean_conf(self) -> float | None:
+        return float(self.conf.mean()) if len(self) else None
+
+    def select(self, mask: np.ndarray) -> "FrameDetections":
+        """mask(bool 또는 인덱스)에 해당하는 검출만."""
+        return FrameDetections(
+            xyxy=self.xyxy[mask],
+            conf=self.conf[mask],
+            cls=self.cls[mask],
+            ids=self.ids[mask] if self.ids is not None else None,
+        )
+
+
+class ClassCounter:
+    """클래스별 누적 검출 수 (np.bincount). 클래스 수를 몰라도 필요 시 배열을 늘림."""
+
+    def __init__(self, num_classes: int = 0):
+        self.counts = np.zeros(num_classes, dtype=np.int64)
+
+    def update(self, cls: np.ndarray) -> None:
+        if cls.size == 0:
+            return
+        c = np.bincount(cls, minlength=self.counts.size)
+        if c.size > self.counts.size:
+            self.counts = np.pad(self.counts, (0, c.size - self.counts.size))
+        self.counts += c
+
+    def as_dict(self, names: dict[int, str] | list[str] | None) -> dict[str, int]:
+        """{라벨: 개수} (0개 클래스 제외)."""
+        out: dict[str, int] = {}
+        for i in np.flatnonzero(self.counts):
+            out[label_of(names, int(i))] = int(self.counts[i])
+        return out
+
+
+def label_of(names: dict[int, str] | list[str] | None, cls_id: int) -> str:
+    """클래스 ID → 라벨 (names가 dict/list 어느 쪽이든, 없으면 숫자 문자열)."""
+    if isinstance(names, dict):
+        return names.get(cls_id, str(cls_id))
+    if names is not None and 0 <= cls_id < len(names):
+        return names[cls_id]
+    return str(cls_id)
+
+
+def mot_rows(frame_id: int, det: FrameDetections) -> np.ndarray:
+    """MOT 행 배열 (N,7): frame,id,x,y,w,h,conf. x,y는 1-based, ID 없으면 0."""
+    n = len(det)
+    xyxy = det.xyxy.astype(np.float64)  # 좌표 연산은 float64 (기존 박스별 포맷과 동일한 반올림)
+    rows = np.empty((n, 7), dtype=np.float64)
+    rows[:, 0] = frame_id
+    rows[:, 1] = det.ids if det.ids is not None else 0
+    rows[:, 2:4] = xyxy[:, :2] + 1.0
+    rows[:, 4:6] = xyxy[:, 2:4] - xyxy[:, :2]
+    rows[:, 6] = det.conf
+    return rows
+
+
+def write_mot_rows(f: TextIO, frame_id: int, det: FrameDetections) -> None:
+    """프레임의 모든 검출을 MOT 포맷으로 한 번에 기록."""
+    if len(det):
+        np.savetxt(f, mot_rows(frame_id, det), fmt=MOT_ROW_FMT)
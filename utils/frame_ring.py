@@ -0,0 +1,191 @@
+"""
+디코더 프로세스 → 공유 메모리 프레임 링 버퍼.
+
+디코딩(cv2.VideoCapture)을 별도 프로세스로 옮겨 추론 프로세스와 GIL·CPU를 나누지 않고,
+디코더는 미리 할당한 고정 크기 슬롯에 BGR 프레임을 바로 기록(cap.retrieve(슬롯 view)) → 프레임마다 배열 할당·복사 없음.
+추론 쪽은 슬롯을 복사 없는 NumPy view로 읽고, encode가 끝나면 release(frame)으로 슬롯을 돌려줌.
+슬롯이 모두 사용 중이면 디코더가 release를 기다림 (backpressure).
+
+제어 메시지는 디코더 stdin/stdout 파이프: 디코더 → (slot, frame_idx), 추론 → 반환할 slot.
+워커는 `python -m utils.frame_ring ...` 프로세스 (run_yolo.py는 main guard가 없는 스크립트라 spawn을 쓰지 않음).
+"""
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_MSG = struct.Struct("<iq")   # 디코더 → (slot, frame_idx). slot = -1이면 끝 (frame_idx 자리에 grab 수)
+_SLOT = struct.Struct("<i")   # 추론 → 반환할 slot
+
+
+class FrameRing:
+    """
+    VideoFrameReader와 같은 (원본 프레임 인덱스, BGR 프레임) 이터레이터 + grabbed/retrieved/metrics().
+    반환되는 프레임은 링 슬롯 view이므로 release(frame) 전까지만 유효 (release 후에는 디코더가 덮어씀).
+    """
+
+    def __init__(self, source: str, max_frames: int, skip_frames: int = 1, slots: int = 8, start_frame: int = 0):
+        cap = cv2.VideoCapture(source)
+        w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        if w <= 0 or h <= 0:
+            raise RuntimeError(f"프레임 크기를 알 수 없습니다: {source}")
+        self.shape = (h, w, 3)
+        self.slots = max(2, slots)
+        self._slot_bytes = h * w * 3
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self._slot_bytes)
+        self.frames = np.ndarray((self.slots, *self.shape), dtype=np.uint8, buffer=self._shm.buf)
+        self._base = self.frames.ctypes.data
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in (str(PROJECT_ROOT), os.environ.get("PYTHONPATH")) if p)}
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "utils.frame_ring", self._shm.name, str(h), str(w), str(self.slots),
+             source, str(max_frames), str(skip_frames), str(start_frame)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+        )
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.max_in_use = 0
+        self.grabbed = 0
+        self.retrieved = 0
+        self.released = 0
+        self.wait_s = 0.0  # 소비자가 디코더를 기다린 시간 (링이 비어 있음)
+        self._closed = False
+
+    def __iter__(self) -> Iterator[tuple[int, np.ndarray]]:
+        pipe = self._proc.stdout
+        while True:
+            t0 = time.perf_counter()
+            data = pipe.read(_MSG.size)
+            self.wait_s += time.perf_counter() - t0
+            if len(data) < _MSG.size:
+                break
+            slot, value = _MSG.unpack(data)
+            if slot < 0:
+                self.grabbed = value
+                break
+            with self._lock:
+                self._in_use += 1
+                self.max_in_use = max(self.max_in_use, self._in_use)
+            self.retrieved += 1
+            yield value, self.frames[slot]
+        if self._proc.wait() != 0 and not self._closed:
+            raise RuntimeError(f"디코더 프로세스 오류 (exit {self._proc.returncode})")
+
+    def slot_of(self, frame: np.ndarray) -> int:
+        """프레임 view → 슬롯 번호 (링 밖의 배열이면 -1)."""
+        offset = frame.ctypes.data - self._base
+        if offset < 0 or offset % self._slot_bytes or offset // self._slot_bytes >= self.slots:
+            return -1
+        return offset // self._slot_bytes
+
+    def release(self, frame: np.ndarray) -> None:
+        """encode까지 끝난 프레임의 슬롯을 디코더에 반환 (다른 스레드에서 호출해도 됨)."""
+        slot = self.slot_of(frame)
+        if slot < 0:
+            return
+        with self._lock:
+            self._in_use -= 1
+            self.released += 1
+            try:
+                self._proc.stdin.write(_SLOT.pack(slot))
+                self._proc.stdin.flush()
+            except (BrokenPipeError, ValueError):  # 디코더가 이미 끝남
+                pass
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "frames_decoded": float(self.grabbed),
+            "frames_retrieved": float(self.retrieved),
+            "frame_ring/slots": float(self.slots),
+            "frame_ring/max_in_use": float(self.max_in_use),
+            "frame_ring/consumer_wait_s": self.wait_s,
+        }
+
+    def close(self) -> None:
+        """디코더 종료 + 공유 메모리 해제. 아직 남은 view가 있으면 unlink만 (프로세스 종료 시 해제)."""
+        if self._closed:
+            return
+        self._closed = True
+        for f in (self._proc.stdin, self._proc.stdout):
+            try:
+                f.close()
+            except OSError:
+                pass
+        if self._proc.poll() is None:
+            self._proc.terminate()
+        self._proc.wait()
+        self.frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        self._shm.unlink()
+
+    def __enter__(self) -> "FrameRing":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def decoder_main(
+    shm_name: str, h: int, w: int, slots: int, source: str, max_frames: int, skip_frames: int, start_frame: int
+) -> None:
+    """디코더 프로세스: skip 프레임은 grab만, 처리할 프레임은 빈 슬롯에 바로 retrieve."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # 생성한 쪽(추론 프로세스)이 unlink → 이 프로세스의 resource_tracker가 종료 시 지우지 않도록
+    resource_tracker.unregister(shm._name, "shared_memory")
+    ring = np.ndarray((slots, h, w, 3), dtype=np.uint8, buffer=shm.buf)
+    out, inp = sys.stdout.buffer, sys.stdin.buffer
+    cap = cv2.VideoCapture(source)
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    free = list(range(slots - 1, -1, -1))
+    grabbed = retrieved = 0
+    try:
+        while retrieved < max_frames:
+            frame_idx = start_frame + grabbed
+            if not cap.grab():
+                break
+            grabbed += 1
+            if frame_idx % max(1, skip_frames) != 0:
+                continue
+            if not free:
+                data = inp.read(_SLOT.size)
+                if len(data) < _SLOT.size:  # 추론 쪽이 먼저 닫음
+                    return
+                free.append(_SLOT.unpack(data)[0])
+            slot = free.pop()
+            view = ring[slot]
+            ok, frame = cap.retrieve(view)
+            if not ok:
+                break
+            if frame.ctypes.data != view.ctypes.data:  # 크기가 같으면 view에 바로 기록됨
+                view[...] = frame
+            retrieved += 1
+            out.write(_MSG.pack(slot, frame_idx))
+            out.flush()
+        out.write(_MSG.pack(-1, grabbed))
+        out.flush()
+    except BrokenPipeError:
+        pass
+    finally:
+        cap.release()
+        del ring
+        shm.close()
+
+
+if __name__ == "__main__":
+    from utils.frame_ring import decoder_main as _decoder_main
+
+    a = sys.argv[1:]
+    _decoder_main(a[0], int(a[1]), int(a[2]), int(a[3]), a[4], int(a[5]), int(a[6]), int(a[7]))
@@ -0,0 +1,396 @@
+"""
+학습 이미지 캐시: data yaml의 이미지 세트를 imgsz별로 미리 디코딩·리사이즈해 uint8 memmap 하나에 저장.
+학습 run·sweep trial이 매번 JPEG를 디코딩·리사이즈하는 대신 page cache를 거쳐 복사 없이 읽음.
+
+- 저장소 = (split, imgsz, 이미지 경로 목록 해시)마다 디렉터리 하나
+  - images.u8:   (N, Hs, Ws, 3) uint8 raw memmap. 이미지마다 Ultralytics와 같은 방식(긴 변 = imgsz, INTER_LINEAR)으로
+                 리사이즈해 슬롯 가운데에 letterbox (패딩 114). 슬롯 크기는 데이터셋의 최대 리사이즈 크기라
+                 BDD100k처럼 비율이 같은 데이터셋은 패딩이 없음
+  - meta.npy:    (N, 6) int32 = 원본 h0, w0, 리사이즈 h, w, 슬롯 안 top, left
+  - labels.npz:  cls, bboxes(정규화 xywh), offsets (이미지 j의 라벨 = offsets[j]:offsets[j+1])
+  - index.json:  파일 목록, 파일별 지문(크기·mtime_ns 또는 내용 해시), 빌드 시간·처리량
+- 무효화: 열 때마다 파일 지문을 비교 → 바뀐 파일·새 파일만 다시 디코딩하고 나머지는 이전 저장소에서 복사 (증분 빌드)
+- 빌드는 `python -m utils.image_cache <build_dir> <worker> <num_workers>` 워커 프로세스로 병렬
+  (학습 스크립트가 모듈 최상위에서 실행되는 경우가 있어 spawn 풀 대신 sharding과 같은 방식)
+- 같은 저장소를 동시에 여는 run들(sweep trial 등)은 파일 락으로 한 번만 빌드하고 나머지는 기다렸다 읽음
+- 학습: model.train(trainer=image_cache_trainer()) 또는 IMAGE_CACHE=1 (lab/*/train.py, sweep) → 데이터셋의 load_image가 저장소 슬롯의 view를 반환.
+  memmap은 copy-on-write로 열어 augmentation이 제자리에서 써도 공유 파일은 바뀌지 않음
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+from PIL import Image
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.data.utils import exif_size
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils.patches import imread
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "gaflow" / "train_images"
+PAD_VALUE = 114  # Ultralytics letterbox 패딩과 같은 회색
+VALIDATE_MODES = ("mtime", "hash")
+_TMP_PREFIX = ".tmp-"
+
+# 학습 진입점(lab/*/train.py, sweep trial)에서 캐시 사용 여부·설정 (image_cache_trainer_from_env)
+# 예: IMAGE_CACHE=1 IMAGE_CACHE_DIR=/mnt/nvme/cache IMAGE_CACHE_WORKERS=8 IMAGE_CACHE_VALIDATE=hash
+IMAGE_CACHE = os.getenv("IMAGE_CACHE", "0") == "1"
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR") or None
+IMAGE_CACHE_WORKERS = int(os.getenv("IMAGE_CACHE_WORKERS", "0"))
+IMAGE_CACHE_VALIDATE = os.getenv("IMAGE_CACHE_VALIDATE", "mtime")
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def resized_shape(h0: int, w0: int, imgsz: int) -> tuple[int, int]:
+    """Ultralytics BaseDataset.load_image(rect_mode=True)와 같은 리사이즈 크기 (긴 변 = imgsz)."""
+    r = imgsz / max(h0, w0)
+    if r == 1:
+        return h0, w0
+    return min(int(np.ceil(h0 * r)), imgsz), min(int(np.ceil(w0 * r)), imgsz)
+
+
+def image_shape(label: dict[str, Any]) -> tuple[int, int]:
+    """원본 (h, w). rect 데이터셋은 라벨에서 shape를 빼므로 이미지 헤더에서 (EXIF 회전 반영, Ultralytics 검증과 같은 방식)."""
+    if "shape" in label:
+        return int(label["shape"][0]), int(label["shape"][1])
+    with Image.open(label["im_file"]) as im:
+        w, h = exif_size(im)
+    return h, w
+
+
+def file_fingerprint(path: str, validate: str = "mtime") -> str:
+    """무효화 기준: mtime = 크기·mtime_ns (stat만), hash = 내용 blake2b (파일 전체를 읽음)."""
+    if validate == "hash":
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def store_key(img_path: str | list[str], imgsz: int) -> str:
+    paths = img_path if isinstance(img_path, list) else [img_path]
+    payload = json.dumps([[str(Path(p).resolve()) for p in paths], imgsz])
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
+class ImageStore:
+    """빌드된 저장소 읽기. memmap은 프로세스마다 처음 접근할 때 열림 (pickle에는 경로만 → DataLoader 워커로 복사 안 됨)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "index.json", encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.files: list[str] = self.info["files"]
+        self.index = {f: j for j, f in enumerate(self.files)}
+        self.meta = np.load(path / "meta.npy")
+        self._images: np.memmap | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    @property
+    def images(self) -> np.memmap:
+        if self._images is None:
+            self._images = np.memmap(self.path / "images.u8", dtype=np.uint8, mode="c", shape=tuple(self.info["shape"]))
+        return self._images
+
+    def image(self, j: int) -> tuple[np.ndarray, tuple[int, int]]:
+        """j번째 이미지의 리사이즈된 영역 view (복사 없음)와 원본 (h0, w0)."""
+        h0, w0, h, w, top, left = self.meta[j].tolist()
+        return self.images[j, top:top + h, left:left + w], (h0, w0)
+
+    def labels(self, j: int) -> tuple[np.ndarray, np.ndarray]:
+        """j번째 이미지의 (cls (n,), bboxes (n, 4) 정규화 xywh)."""
+        with np.load(self.path / "labels.npz") as z:
+            a, b = z["offsets"][j], z["offsets"][j + 1]
+            return z["cls"][a:b], z["bboxes"][a:b]
+
+    def size_bytes(self) -> int:
+        return (self.path / "images.u8").stat().st_size
+
+
+def _label_arrays(labels: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    counts = [len(lb["cls"]) for lb in labels]
+    return {
+        "cls": np.concatenate([np.asarray(lb["cls"], np.float32).reshape(-1) for lb in labels] or [np.zeros(0, np.float32)]),
+        "bboxes": np.concatenate([np.asarray(lb["bboxes"], np.float32).reshape(-1, 4) for lb in labels] or [np.zeros((0, 4), np.float32)]),
+        "offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+    }
+
+
+def _sync_labels(path: Path, labels: list[dict[str, Any]]) -> None:
+    """labels.npz를 현재 라벨로 (라벨 파일만 바뀐 경우 이미지는 그대로 두고 라벨만 다시 씀)."""
+    arrays = _label_arrays(labels)
+    if path.exists():
+        with np.load(path) as z:
+            if all(k in z and np.array_equal(z[k], v) for k, v in arrays.items()):
+                return
+    tmp = path.with_name(f"{_TMP_PREFIX}{path.name}")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    tmp.replace(path)
+
+
+def _letterbox_into(slot: np.ndarray, im: np.ndarray, top: int, left: int) -> None:
+    slot[:] = PAD_VALUE
+    slot[top:top + im.shape[0], left:left + im.shape[1]] = im
+
+
+def worker_main(build_dir: Path, worker: int, num_workers: int) -> None:
+    """빌드 워커: 맡은 구간(연속 청크)의 이미지를 디코딩·리사이즈해 images.u8의 슬롯에 직접 기록."""
+    cv2.setNumThreads(1)
+    with open(build_dir / "task.json", encoding="utf-8") as f:
+        task = json.load(f)
+    meta = np.load(build_dir / "meta.npy")
+    images = np.memmap(build_dir / "images.u8", dtype=np.uint8, mode="r+", shape=tuple(task["shape"]))
+    todo = np.array_split(np.asarray(task["todo"], dtype=np.int64), num_workers)[worker]
+    for j in todo.tolist():
+        im = imread(task["files"][j], flags=cv2.IMREAD_COLOR)
+        if im is None:
+            raise FileNotFoundError(f"이미지를 읽을 수 없습니다: {task['files'][j]}")
+        _, _, h, w, top, left = meta[j].tolist()
+        if im.shape[:2] != (h, w):
+            im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        _letterbox_into(images[j], im, top, left)
+    images.flush()
+
+
+def _run_workers(build_dir: Path, workers: int) -> None:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in (str(PROJECT_ROOT), os.environ.get("PYTHONPATH")) if p)}
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "utils.image_cache", str(build_dir), str(w), str(workers)], env=env)
+        for w in range(workers)
+    ]
+    try:
+        codes = [p.wait() for p in procs]
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+                p.wait()
+    if any(codes):
+        raise RuntimeError(f"이미지 캐시 빌드 워커 실패 (exit {codes})")
+
+
+def open_image_store(
+    labels: list[dict[str, Any]],
+    imgsz: int,
+    name: str,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    workers: int = 0,
+    validate: str = "mtime",
+) -> tuple[ImageStore, dict[str, float]]:
+    """
+    Ultralytics 라벨 목록(im_file, shape, cls, bboxes)에 맞는 저장소를 열거나 (증분) 빌드.
+    → (ImageStore, image_cache/* 통계). status: 0 = 그대로 사용, 1 = 새로 빌드, 2 = 일부만 다시 디코딩.
+    """
+    if validate not in VALIDATE_MODES:
+        raise ValueError(f"지원하지 않는 validate: {validate} ({'/'.join(VALIDATE_MODES)})")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    files = [lb["im_file"] for lb in labels]
+    t0 = time.perf_counter()
+    fingerprints = [file_fingerprint(f, validate) for f in files]
+    fingerprint_s = time.perf_counter() - t0
+    store_dir = cache_dir / name
+    with open(cache_dir / f"{name}.lock", "w") as lock:
+        # 같은 저장소를 여는 다른 run은 빌드가 끝날 때까지 대기
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        old = ImageStore(store_dir) if (store_dir / "index.json").exists() else None
+        # 파일 순서는 무관 (rect 데이터셋은 종횡비 순으로 정렬) → 파일별 지문이 모두 같으면 그대로 사용
+        if (
+            old is not None and old.info["validate"] == validate
+            and dict(zip(old.files, old.info["fingerprints"])) == dict(zip(files, fingerprints))
+        ):
+            by_file = {lb["im_file"]: lb for lb in labels}
+            _sync_labels(store_dir / "labels.npz", [by_file[f] for f in old.files])
+            return old, {
+                "image_cache/status": 0.0,
+                "image_cache/images": float(len(files)),
+                "image_cache/decoded": 0.0,
+                "image_cache/fingerprint_s": fingerprint_s,
+                "image_cache/size_gb": old.size_bytes() / 1024**3,
+            }
+
+        t0 = time.perf_counter()
+        n = len(files)
+        meta = np.zeros((n, 6), dtype=np.int32)
+        for j, lb in enumerate(labels):
+            h0, w0 = image_shape(lb)
+            meta[j, :4] = (h0, w0, *resized_shape(h0, w0, imgsz))
+        hs, ws = (int(meta[:, 2].max()), int(meta[:, 3].max())) if n else (imgsz, imgsz)
+        meta[:, 4] = (hs - meta[:, 2]) // 2
+        meta[:, 5] = (ws - meta[:, 3]) // 2
+        shape = (n, hs, ws, 3)
+
+        build_dir = cache_dir / f"{_TMP_PREFIX}{name}"
+        shutil.rmtree(build_dir, ignore_errors=True)
+        build_dir.mkdir(parents=True)
+        np.save(build_dir / "meta.npy", meta)
+        images = np.memmap(build_dir / "images.u8", dtype=np.uint8, mode="w+", shape=shape)
+        # 지문이 같은 파일은 이전 저장소에서 복사 (슬롯 크기가 바뀌었으면 새 위치로 다시 letterbox)
+        todo: list[int] = []
+        reused = 0
+        old_fp = dict(zip(old.files, old.info["fingerprints"])) if old is not None and old.info["validate"] == validate else {}
+        for j, (f, fp) in enumerate(zip(files, fingerprints)):
+            k = old.index.get(f) if old_fp.get(f) == fp else None
+            if k is not None and old.info["imgsz"] == imgsz:
+                im, _ = old.image(k)
+                _letterbox_into(images[j], im, int(meta[j, 4]), int(meta[j, 5]))
+                reused += 1
+            else:
+                todo.append(j)
+        images.flush()
+        del images
+        if todo:
+            with open(build_dir / "task.json", "w", encoding="utf-8") as f:
+                json.dump({"files": files, "shape": shape, "todo": todo}, f)
+            _run_workers(build_dir, max(1, min(workers or os.cpu_count() or 1, len(todo))))
+            (build_dir / "task.json").unlink()
+        build_s = time.perf_counter() - t0
+        _sync_labels(build_dir / "labels.npz", labels)
+        with open(build_dir / "index.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "imgsz": imgsz, "shape": shape, "validate": validate, "files": files, "fingerprints": fingerprints,
+                "build_s": build_s, "decoded": len(todo), "created": time.time(),
+            }, f)
+        shutil.rmtree(store_dir, ignore_errors=True)
+        build_dir.replace(store_dir)
+    store = ImageStore(store_dir)
+    return store, {
+        "image_cache/status": 1.0 if old is None else 2.0,
+        "image_cache/images": float(n),
+        "image_cache/decoded": float(len(todo)),
+        "image_cache/reused": float(reused),
+        "image_cache/fingerprint_s": fingerprint_s,
+        "image_cache/build_s": build_s,
+        "image_cache/build_ips": len(todo) / build_s if build_s > 0 else 0.0,
+        "image_cache/size_gb": store.size_bytes() / 1024**3,
+    }
+
+
+def read_benchmark(store: ImageStore, imgsz: int, sample: int = 200, seed: int = 0) -> dict[str, float]:
+    """
+    같은 이미지 sample장을 JPEG 디코딩+리사이즈(캐시 없는 학습의 load_image) vs 저장소 읽기로 비교 → 초당 이미지 수.
+    저장소 읽기는 연속 배열로 복사까지 (page cache에서 실제로 읽게). 단일 프로세스 기준.
+    """
+    if not len(store):
+        return {}
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(store), size=min(sample, len(store)), replace=False).tolist()
+    t0 = time.perf_counter()
+    for j in idx:
+        im = imread(store.files[j], flags=cv2.IMREAD_COLOR)
+        h, w = resized_shape(*im.shape[:2], imgsz)
+        if (h, w) != im.shape[:2]:
+            cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    jpeg_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for j in idx:
+        np.ascontiguousarray(store.image(j)[0])
+    cache_s = time.perf_counter() - t0
+    jpeg_ips = len(idx) / jpeg_s if jpeg_s > 0 else 0.0
+    cache_ips = len(idx) / cache_s if cache_s > 0 else 0.0
+    return {
+        "image_cache/jpeg_ips": jpeg_ips,
+        "image_cache/cache_ips": cache_ips,
+        "image_cache/ips_gained": cache_ips - jpeg_ips,
+        "image_cache/speedup": cache_ips / jpeg_ips if jpeg_ips > 0 else 0.0,
+    }
+
+
+class CachedYOLODataset(YOLODataset):
+    """load_image만 저장소 view로 바꾼 YOLODataset (augmentation·라벨 처리는 그대로). 저장소에 없는 파일은 원래 경로."""
+
+    store: ImageStore
+
+    def load_image(self, i: int, rect_mode: bool = True, resize_short: bool = False):
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+        j = self.store.index.get(self.im_files[i]) if rect_mode and not resize_short else None
+        if j is None:
+            return super().load_image(i, rect_mode, resize_short)
+        im, hw0 = self.store.image(j)
+        # mosaic이 고르는 buffer는 원래 load_image와 같은 규칙으로 유지 (view라 메모리 추가 없음)
+        if self.augment and self.cache != "ram":
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                k = self.buffer.pop(0)
+                self.ims[k], self.im_hw0[k], self.im_hw[k] = None, None, None
+        return im, hw0, im.shape[:2]
+
+
+class ImageCacheTrainer(DetectionTrainer):
+    """train/val 데이터셋을 이미지 캐시 저장소로 읽는 DetectionTrainer. 설정은 image_cache_trainer()로."""
+
+    # BaseTrainer 속성(validate 등)과 겹치지 않게 image_cache_ 접두사
+    image_cache_dir: Path = DEFAULT_CACHE_DIR
+    image_cache_workers: int = 0
+    image_cache_validate: str = "mtime"
+    image_cache_bench: int = 200
+
+    def build_dataset(self, img_path: str, mode: str = "train", batch: int | None = None):
+        dataset = super().build_dataset(img_path, mode, batch)
+        # YOLODataset 또는 파일 목록만 바꾼 하위 클래스 (plain_images, 예: ManifestYOLODataset)
+        plain = type(dataset) is YOLODataset or getattr(dataset, "plain_images", False)
+        if not plain or dataset.channels != 3 or self.args.cache:
+            print(f"⚠️ 이미지 캐시: {type(dataset).__name__} (channels={dataset.channels}, cache={self.args.cache})는 지원하지 않아 원래 로더 사용")
+            return dataset
+        name = f"{mode}-{dataset.imgsz}-{store_key(img_path, dataset.imgsz)}"
+        store, stats = open_image_store(
+            dataset.labels, dataset.imgsz, name, self.image_cache_dir, self.image_cache_workers, self.image_cache_validate
+        )
+        if self.image_cache_bench > 0:
+            stats.update(read_benchmark(store, dataset.imgsz, self.image_cache_bench))
+        dataset.__class__ = CachedYOLODataset
+        dataset.store = store
+        status = {0: "그대로 사용", 1: "새로 빌드", 2: "증분 빌드"}[int(stats["image_cache/status"])]
+        print(
+            f"✅ 이미지 캐시 ({mode}, {status}): {len(store)}장 {stats['image_cache/size_gb']:.2f} GB {store.path}"
+            + (f", 빌드 {stats['image_cache/build_s']:.1f}s ({stats['image_cache/build_ips']:.0f} img/s)" if "image_cache/build_s" in stats else "")
+            + (f", 읽기 {stats['image_cache/cache_ips']:.0f} vs JPEG {stats['image_cache/jpeg_ips']:.0f} img/s" if "image_cache/cache_ips" in stats else "")
+        )
+        import mlflow
+
+        if mlflow.active_run():
+            mlflow.log_metrics({k.replace("image_cache/", f"image_cache/{mode}/"): v for k, v in stats.items()})
+        return dataset
+
+
+def image_cache_trainer(
+    cache_dir: Path | None = None, workers: int = 0, validate: str = "mtime", bench_sample: int = 200
+) -> type[ImageCacheTrainer]:
+    """model.train(trainer=...)에 넘길 trainer 클래스 (저장소 위치·빌드 워커 수·무효화 기준 설정)."""
+    return type("ImageCacheTrainer", (ImageCacheTrainer,), {
+        "image_cache_dir": Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR,
+        "image_cache_workers": workers,
+        "image_cache_validate": validate,
+        "image_cache_bench": bench_sample,
+    })
+
+
+def image_cache_trainer_from_env() -> type[ImageCacheTrainer] | None:
+    """IMAGE_CACHE=1이면 환경 변수 설정으로 만든 trainer, 아니면 None (model.train 기본 trainer)."""
+    if not IMAGE_CACHE:
+        return None
+    return image_cache_trainer(IMAGE_CACHE_DIR, IMAGE_CACHE_WORKERS, IMAGE_CACHE_VALIDATE)
+
+
+if __name__ == "__main__":
+    worker_main(Path(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))
@@ -0,0 +1,298 @@
+"""
+Keyframe 검출: 검출기는 k 프레임마다(또는 장면 전환·전파 신뢰도 저하 시)만 실행하고,
+사이 프레임은 이전 프레임의 track 박스를 전파해 tracker에 pseudo 검출로 넣음 → 같은 ID가 이어짐.
+
+- 전파 방식 flow: track 박스 안의 특징점을 sparse optical flow(Lucas-Kanade, forward-backward 검사)로 따라가
+  박스를 이동·확대. 박스별 품질 = 일관되게 추적된 특징점 비율, 프레임 품질 = 박스 품질 평균
+- 전파 방식 motion: 등속 모델. track별 속도 = 검출기 프레임 사이 중심 이동량 / 프레임 수 (이미지 연산 없음).
+  박스 품질 = 1 / (1 + 마지막 검출 이후 외삽 거리 / 박스 대각선) → 박스 대각선만큼 외삽하면 0.5
+  tracker Kalman 속도는 쓰지 않음 (ByteTrack은 미확정 track을 predict 없이 갱신해 드문 검출로는 속도가 0에 머묾)
+- 검출 강제: 첫 프레임, interval 도달, 직전 검출에서 아직 확정되지 않은 새 track이 생김(두 번째 검출로 확정,
+  motion이면 속도를 모르는 track도 — 연속 두 프레임 검출로 속도 초기화),
+  축소 grayscale 평균 절대 차가 scene_thresh 초과(장면 전환),
+  전파 품질이 min_confidence 미만
+- FullRateReference: 평가용으로 매 프레임 검출 + 별도 tracker를 같이 돌려 keyframe 결과를 full-rate tracking과
+  MOT 지표(MOTA/IDF1)로 비교 (full-rate 결과를 GT로 사용)
+"""
+import time
+from collections import Counter
+from typing import Any, Callable, Iterable, Iterator
+
+import cv2
+import numpy as np
+from ultralytics.engine.results import Results
+
+from utils.detection_cache import detections_to_result
+from utils.detections import FrameDetections, mot_rows
+from utils.mot_eval import StreamingMOTEvaluator
+from utils.tracking import apply_tracker
+
+PROPAGATION_MODES = ("flow", "motion")
+# 검출기를 실행한 이유 (metrics의 keyframe/reason_<이유>)
+REASONS = ("first", "interval", "new_track", "scene_change", "low_confidence")
+
+_THUMB_SIZE = (64, 36)
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=3, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class SceneChangeDetector:
+    """마지막 keyframe과 현재 프레임의 축소 grayscale 평균 절대 차 (0~1)."""
+
+    def __init__(self, threshold: float = 0.15, size: tuple[int, int] = _THUMB_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self._ref: np.ndarray | None = None
+        self.last_score = 0.0
+
+    def _thumb(self, gray: np.ndarray) -> np.ndarray:
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+
+    def changed(self, gray: np.ndarray) -> bool:
+        if self._ref is None:
+            return False
+        self.last_score = float(np.abs(self._thumb(gray) - self._ref).mean())
+        return self.threshold > 0 and self.last_score > self.threshold
+
+    def set_reference(self, gray: np.ndarray) -> None:
+        self._ref = self._thumb(gray)
+        self.last_score = 0.0
+
+
+class FlowPropagator:
+    """박스별 특징점 → LK optical flow (forward-backward 오차 fb_thresh px 이하만) → 중앙값 이동·확대."""
+
+    def __init__(self, max_corners: int = 20, fb_thresh: float = 1.0, min_points: int = 3):
+        self.max_corners = max_corners
+        self.fb_thresh = fb_thresh
+        self.min_points = min_points
+
+    def _features(self, gray: np.ndarray, xyxy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """박스마다 특징점 (전체 좌표) + 점이 속한 박스 인덱스."""
+        h, w = gray.shape
+        pts, owners = [], []
+        for i, (x1, y1, x2, y2) in enumerate(xyxy):
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(w, int(np.ceil(x2))), min(h, int(np.ceil(y2)))
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                continue
+            p = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.max_corners, 0.01, 3)
+            if p is None:
+                continue
+            p = p.reshape(-1, 2) + (x1, y1)
+            pts.append(p)
+            owners.append(np.full(len(p), i))
+        if not pts:
+            return np.zeros((0, 2), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return np.concatenate(pts).astype(np.float32), np.concatenate(owners)
+
+    def propagate(self, prev_gray: np.ndarray, gray: np.ndarray, xyxy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(N,4) 박스 → (이동한 박스, 박스별 품질 0~1). 추적된 점이 min_points 미만인 박스는 제자리·품질 0."""
+        out = xyxy.astype(np.float32, copy=True)
+        quality = np.zeros(len(xyxy), dtype=np.float32)
+        p0, owners = self._features(prev_gray, xyxy)
+        if len(p0) == 0:
+            return out, quality
+        p1, st1, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, p0.reshape(-1, 1, 2), None, **_LK_PARAMS)
+        p0r, st2, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, p1, None, **_LK_PARAMS)
+        p1, p0r = p1.reshape(-1, 2), p0r.reshape(-1, 2)
+        good = (st1.ravel() == 1) & (st2.ravel() == 1) & (np.linalg.norm(p0 - p0r, axis=1) <= self.fb_thresh)
+        total = np.bincount(owners, minlength=len(xyxy))
+        for i in np.unique(owners):
+            sel = (owners == i) & good
+            n = int(sel.sum())
+            if n < self.min_points:
+                continue
+            a, b = p0[sel], p1[sel]
+            shift = np.median(b - a, axis=0)
+            # 확대율: 중심에서의 거리 중앙값 비 (점이 모여 있으면 불안정하므로 범위 제한)
+            da = np.median(np.linalg.norm(a - np.median(a, axis=0), axis=1))
+            db = np.median(np.linalg.norm(b - np.median(b, axis=0), axis=1))
+            scale = float(np.clip(db / da, 0.9, 1.1)) if da > 1.0 else 1.0
+            cx, cy = (out[i, 0] + out[i, 2]) / 2 + shift[0], (out[i, 1] + out[i, 3]) / 2 + shift[1]
+            hw, hh = (out[i, 2] - out[i, 0]) * scale / 2, (out[i, 3] - out[i, 1]) * scale / 2
+            out[i] = (cx - hw, cy - hh, cx + hw, cy + hh)
+            quality[i] = n / total[i]
+        return out, quality
+
+
+def tracked_detections(result: Results) -> FrameDetections:
+    """ID가 붙은 track 박스만 (tracker에 track이 없으면 apply_tracker가 ID 없는 검출을 그대로 반환하므로 빈 결과)."""
+    det = FrameDetections.from_result(result)
+    return det if det.ids is not None else FrameDetections.empty()
+
+
+class KeyframeTracker:
+    """
+    프레임마다 검출기 실행 또는 track 전파 → tracker 갱신 → ID가 붙은 Results.
+    detect(frame)는 conf 필터까지 적용된 Ultralytics Results 한 장 (model.predict(...)[0]).
+    """
+
+    def __init__(
+        self,
+        detect: Callable[[np.ndarray], Results],
+        tracker: Any,
+        names: dict[int, str],
+        interval: int = 5,
+        propagation: str = "flow",
+        scene_thresh: float = 0.15,
+        min_confidence: float = 0.5,
+        path: str = "",
+    ):
+        if propagation not in PROPAGATION_MODES:
+            raise ValueError(f"지원하지 않는 전파 방식: {propagation} ({'/'.join(PROPAGATION_MODES)})")
+        self.detect = detect
+        self.tracker = tracker
+        self.names = names
+        self.interval = max(1, interval)
+        self.propagation = propagation
+        self.min_confidence = min_confidence
+        self.path = path
+        self.scene = SceneChangeDetector(scene_thresh)
+        self.flow = FlowPropagator()
+        self._prev_gray: np.ndarray | None = None
+        self._prev: FrameDetections = FrameDetections.empty()
+        self._since_key = 0
+        self._pending_new = False
+        # motion 전파: track ID → 마지막 검출기 프레임의 (프레임 번호, 중심), 속도 (px/프레임)
+        self._observed: dict[int, tuple[int, np.ndarray]] = {}
+        self._velocity: dict[int, np.ndarray] = {}
+        self.frames = 0
+        self.reasons: Counter = Counter()
+        self.last_reason: str | None = None
+        self.last_quality = 1.0
+        self._quality_sum = 0.0
+        self._propagated = 0
+        self.detect_s = 0.0
+        self.propagate_s = 0.0
+
+    def _reason(self, gray: np.ndarray | None) -> str | None:
+        if self.frames == 0:
+            return "first"
+        if self._since_key >= self.interval:
+            return "interval"
+        if self._pending_new:
+            return "new_track"
+        if gray is not None and self.scene.changed(gray):
+            return "scene_change"
+        return None
+
+    def step(self, frame: np.ndarray) -> Results:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if self.propagation == "flow" or self.scene.threshold > 0 else None
+        reason = self._reason(gray)
+        det = None
+        if reason is None:
+            t0 = time.perf_counter()
+            det, quality = self._propagate(gray)
+            self.propagate_s += time.perf_counter() - t0
+            self.last_quality = quality
+            if quality < self.min_confidence:
+                reason, det = "low_confidence", None
+        if det is None:
+            t0 = time.perf_counter()
+            result = self.detect(frame)
+            self.detect_s += time.perf_counter() - t0
+            self.reasons[reason] += 1
+            self._since_key = 1
+            if gray is not None:
+                self.scene.set_reference(gray)
+        else:
+            result = detections_to_result(frame, det, self.names, self.path)
+            self._quality_sum += self.last_quality
+            self._propagated += 1
+            self._since_key += 1
+        speed = result.speed
+        result = apply_tracker(self.tracker, result)
+        result.speed = speed
+        self.last_reason = reason
+        self._prev = tracked_detections(result)
+        # ByteTrack은 첫 프레임 이후 새 track을 연속 두 번 검출해야 확정 → 다음 프레임도 검출
+        self._pending_new = reason is not None and any(
+            not t.is_activated for t in getattr(self.tracker, "tracked_stracks", ())
+        )
+        if reason is not None and self.propagation == "motion":
+            self._observe()
+            ids = self._prev.ids.tolist() if self._prev.ids is not None else []
+            self._pending_new |= any(i not in self._velocity for i in ids)
+        self._prev_gray = gray
+        self.frames += 1
+        return result
+
+    def _propagate(self, gray: np.ndarray | None) -> tuple[FrameDetections, float]:
+        """이전 프레임 track 박스 → 현재 프레임 pseudo 검출 (conf·cls는 그대로) + 프레임 품질."""
+        prev = self._prev
+        if len(prev) == 0:
+            return prev, 1.0
+        if self.propagation == "motion":
+            shift = np.array([self._velocity.get(int(i), (0.0, 0.0)) for i in prev.ids], dtype=np.float32)
+            # 등속 가정의 오차는 외삽 거리에 비례해 커짐 → 박스 크기 대비 외삽 거리로 품질
+            diag = np.hypot(*(prev.xyxy[:, 2:] - prev.xyxy[:, :2]).T)
+            moved = np.hypot(*shift.T) * self._since_key
+            quality = 1.0 / (1.0 + moved / np.maximum(diag, 1.0))
+            return FrameDetections(xyxy=prev.xyxy + np.tile(shift, 2), conf=prev.conf, cls=prev.cls), float(quality.mean())
+        xyxy, quality = self.flow.propagate(self._prev_gray, gray, prev.xyxy)
+        keep = quality > 0
+        return FrameDetections(xyxy=xyxy, conf=prev.conf, cls=prev.cls).select(keep), float(quality.mean())
+
+    def _observe(self) -> None:
+        """검출기 프레임의 track 중심 기록 → 이전 검출기 프레임에서도 본 ID는 속도 갱신."""
+        prev = self._prev
+        if prev.ids is None:
+            return
+        centers = (prev.xyxy[:, :2] + prev.xyxy[:, 2:]) / 2
+        for tid, c in zip(prev.ids.tolist(), centers):
+            last = self._observed.get(tid)
+            if last is not None and self.frames > last[0]:
+                self._velocity[tid] = (c - last[1]) / (self.frames - last[0])
+            self._observed[tid] = (self.frames, c)
+        live = set(prev.ids.tolist())
+        for tid in [t for t in self._observed if t not in live and self.frames - self._observed[t][0] > 10 * self.interval]:
+            del self._observed[tid]
+            self._velocity.pop(tid, None)
+
+    def run(self, frames: Iterable[tuple[int, np.ndarray]]) -> Iterator[tuple[np.ndarray, Results]]:
+        """(프레임 인덱스, frame) → (frame, result) 프레임 순서대로."""
+        for _, frame in frames:
+            yield frame, self.step(frame)
+
+    def metrics(self) -> dict[str, float]:
+        calls = sum(self.reasons.values())
+        out = {
+            "keyframe/interval": float(self.interval),
+            "keyframe/frames": float(self.frames),
+            "keyframe/detector_calls": float(calls),
+            "keyframe/detector_rate": calls / self.frames if self.frames else 0.0,
+            "keyframe/propagated_frames": float(self._propagated),
+            "keyframe/propagation_quality_avg": self._quality_sum / self._propagated if self._propagated else 0.0,
+            "keyframe/detect_s": self.detect_s,
+            "keyframe/propagate_s": self.propagate_s,
+            "keyframe/propagate_ms_avg": self.propagate_s * 1000.0 / self._propagated if self._propagated else 0.0,
+        }
+        out.update({f"keyframe/reason_{r}": float(self.reasons[r]) for r in REASONS})
+        return out
+
+
+class FullRateReference:
+    """
+    정확도 비용 측정용: 같은 프레임에 검출기를 매 프레임 돌린 full-rate tracking(별도 tracker)을 GT로 두고
+    keyframe 결과를 스트리밍 MOT 평가. 검출기를 매 프레임 실행하므로 평가 실행에서만 사용.
+    """
+
+    def __init__(self, detect: Callable[[np.ndarray], Results], tracker: Any):
+        self.detect = detect
+        self.tracker = tracker
+        self.evaluator = StreamingMOTEvaluator(hota=False)
+
+    def update(self, frame_id: int, frame: np.ndarray, result: Results) -> None:
+        ref = tracked_detections(apply_tracker(self.tracker, self.detect(frame)))
+        gt, hyp = mot_rows(frame_id, ref), mot_rows(frame_id, tracked_detections(result))
+        gt[:, 2:4] -= 1.0
+        hyp[:, 2:4] -= 1.0
+        self.evaluator.update(frame_id, hyp[:, 1].astype(np.int64), hyp[:, 2:6], gt[:, 1].astype(np.int64), gt[:, 2:6])
+
+    def running_metrics(self) -> dict[str, float]:
+        return self.evaluator.running_metrics("keyframe_step/vs_full")
+
+    def metrics(self) -> dict[str, float]:
+        s = self.evaluator.summary("keyframe/vs_full")
+        keys = ("mota", "motp", "idf1", "num_switches", "num_false_positives", "num_misses", "recall", "precision")
+        return {f"keyframe/vs_full/{k}": s[f"keyframe/vs_full/{k}"] for k in keys}
@@ -0,0 +1,196 @@
+"""
+MLflow step 메트릭 버퍼링 + 백그라운드 flush.
+프레임 루프에서 mlflow.log_metric(동기 HTTP 왕복)을 직접 호출하지 않고,
+메모리에 모았다가 크기/시간 임계치마다 log_batch로 한 번에 전송.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import mlflow
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
+
+MAX_METRICS_PER_BATCH = 1000  # MLflow log_batch 한 번에 보낼 수 있는 최대 메트릭 수
+
+
+class BufferedMetricSink:
+    """
+    step 메트릭을 버퍼에 쌓고 백그라운드 스레드에서 log_batch로 flush.
+
+    - flush_size개가 쌓이거나 flush_interval_s가 지나면 전송
+    - with 블록 종료(예외 포함) 또는 close() 시 남은 메트릭을 모두 flush
+    - 버퍼가 max_buffer를 넘으면 새 메트릭은 버림(dropped), 전송 실패분은 재시도(delayed)
+
+    mlflow.log_metric / mlflow.log_metrics와 같은 시그니처라 그대로 치환 가능.
+    """
+
+    def __init__(
+        self,
+        run_id: str | None = None,
+        flush_size: int = 500,
+        flush_interval_s: float = 5.0,
+        max_buffer: int = 100_000,
+        max_retries: int = 3,
+        client: MlflowClient | None = None,
+    ):
+        if run_id is None:
+            run = mlflow.active_run()
+            if run is None:
+                raise RuntimeError("활성 MLflow run이 없습니다. run_id를 지정하세요.")
+            run_id = run.info.run_id
+        self.run_id = run_id
+        self.flush_size = max(1, min(flush_size, MAX_METRICS_PER_BATCH))
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self._client = client or MlflowClient()
+
+        # (metric, 버퍼 진입 시각, 재시도 횟수)
+        self._buf: deque[tuple[Metric, float, int]] = deque()
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._force = False
+        self._closed = False
+
+        self.logged = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.delayed = 0
+        self.batches = 0
+        self.failures = 0
+        self.max_delay_s = 0.0
+        self.last_error: Exception | None = None
+
+        self._thread = threading.Thread(target=self._worker, name="mlflow-metric-sink", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------ 기록
+    def log_metric(self, key: str, value: float, step: int = 0, timestamp: int | None = None) -> None:
+        """메트릭 1개를 버퍼에 추가 (네트워크 호출 없음)."""
+        ts = timestamp if timestamp is not None else int(time.time() * 1000)
+        self._enqueue([Metric(key, float(value), ts, int(step))])
+
+    def log_metrics(self, metrics: dict[str, float], step: int = 0) -> None:
+        """여러 메트릭을 같은 step/timestamp로 버퍼에 추가."""
+        ts = int(time.time() * 1000)
+        self._enqueue([Metric(k, float(v), ts, int(step)) for k, v in metrics.items()])
+
+    def _enqueue(self, metrics: list[Metric]) -> None:
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                self.dropped += len(metrics)
+                return
+            room = self.max_buffer - len(self._buf)
+            if room < len(metrics):
+                self.dropped += len(metrics) - max(room, 0)
+                metrics = metrics[:max(room, 0)]
+            self._buf.extend((m, now, 0) for m in metrics)
+            self.logged += len(metrics)
+            if len(self._buf) >= self.flush_size:
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------ flush
+    def _worker(self) -> None:
+        fail_streak = 0
+        while True:
+            with self._cond:
+                if not self._closed and not self._force and len(self._buf) < self.flush_size:
+                    self._cond.wait(timeout=self.flush_interval_s)
+                if not self._buf:
+                    self._force = False
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                    continue
+                n = min(self.flush_size, len(self._buf))
+                batch = [self._buf.popleft() for _ in range(n)]
+                self._inflight += n
+            ok = self._send(batch)
+            fail_streak = 0 if ok else fail_streak + 1
+            if fail_streak:
+                # 서버 장애 시 재시도 폭주 방지 (close 중에는 짧게)
+                time.sleep(0.1 if self._closed else min(self.flush_interval_s, 0.5 * fail_streak))
+
+    def _send(self, batch: list[tuple[Metric, float, int]]) -> bool:
+        try:
+            self._client.log_batch(self.run_id, metrics=[m for m, _, _ in batch])
+        except Exception as e:
+            with self._cond:
+                self.failures += 1
+                self.last_error = e
+                retry = [(m, t, a + 1) for m, t, a in batch if a + 1 <= self.max_retries]
+                self.dropped += len(batch) - len(retry)
+                self.delayed += len(retry)
+                # 순서 유지: 앞쪽에 되돌려 넣음
+                self._buf.extendleft(reversed(retry))
+                self._inflight -= len(batch)
+                self._cond.notify_all()
+            return False
+        now = time.monotonic()
+        with self._cond:
+            self.flushed += len(batch)
+            self.batches += 1
+            self.max_delay_s = max(self.max_delay_s, now - min(t for _, t, _ in batch))
+            self._inflight -= len(batch)
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """버퍼가 비고 전송 중인 배치가 끝날 때까지 대기. timeout 초과 시 False."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._force = True
+            self._cond.notify_all()
+            while self._buf or self._inflight:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+        return True
+
+    def close(self, log_stats: bool = True) -> dict[str, Any]:
+        """남은 메트릭을 모두 flush하고 스레드 종료. log_stats면 metric_sink/* 통계도 로깅."""
+        with self._cond:
+            already = self._closed
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        stats = self.stats()
+        if log_stats and not already:
+            try:
+                ts = int(time.time() * 1000)
+                self._client.log_batch(
+                    self.run_id,
+                    metrics=[Metric(f"metric_sink/{k}", float(v), ts, 0) for k, v in stats.items()],
+                )
+            except Exception as e:
+                print(f"⚠️ metric_sink 통계 로깅 실패: {e}")
+            if stats["dropped"] or stats["delayed"]:
+                print(f"⚠️ MLflow 메트릭 drop {stats['dropped']} / 지연(재시도) {stats['delayed']}"
+                      f" (last error: {self.last_error})")
+        return stats
+
+    def stats(self) -> dict[str, float]:
+        """누적 통계: logged/flushed/dropped/delayed/batches/failures/max_delay_s/pending."""
+        with self._cond:
+            return {
+                "logged": self.logged,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "delayed": self.delayed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "max_delay_s": round(self.max_delay_s, 3),
+                "pending": len(self._buf) + self._inflight,
+            }
+
+    def __enter__(self) -> "BufferedMetricSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,551 @@
+"""
+MOT 평가.
+
+- StreamingMOTEvaluator: 프레임마다 IoU 행렬(벡터화) + Hungarian 매칭으로 CLEAR MOT(MOTA/MOTP/ID switch 등)와
+  IDF1·HOTA 통계를 실행 중에 누적. 추론 루프에서 프레임별로 갱신하고 중간 값(mot_step/*)을 로깅할 수 있음.
+  매칭 규칙은 motmetrics MOTAccumulator와 동일(이전 매칭 유지 → 나머지 Hungarian)하고 결과도 같음.
+  HOTA는 TrackEval 방식 (α = 0.05~0.95 평균).
+- evaluate_files / evaluate_many: 파일 단위 평가, 여러 시퀀스는 프로세스 풀로 병렬 + OVERALL 합산
+- motmetrics_summary: motmetrics(pandas) 기준 구현 (비교·검증용)
+
+메트릭 이름은 motmetrics motchallenge_metrics와 같은 mot/<name> (+ mot/hota, mot/deta, mot/assa, mot/loca ...).
+"""
+import multiprocessing as mp
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from utils.detections import FrameDetections, mot_rows
+
+# motmetrics 기본 IoU 거리 임계값 (1 - IoU > 0.5면 매칭 불가)
+IOU_DISTANCE_THRESHOLD = 0.5
+# HOTA localization 임계값 α (TrackEval과 동일)
+HOTA_ALPHAS = np.arange(0.05, 0.99, 0.05)
+
+MOTCHALLENGE_METRICS = (
+    "idf1", "idp", "idr", "recall", "precision", "num_unique_objects", "mostly_tracked", "partially_tracked",
+    "mostly_lost", "num_false_positives", "num_misses", "num_switches", "num_fragmentations", "mota", "motp",
+    "num_transfer", "num_ascend", "num_migrate",
+)
+HOTA_METRICS = ("hota", "deta", "assa", "loca", "detre", "detpr", "assre", "asspr")
+
+# state()에서 시퀀스끼리 그대로 더할 수 있는 값
+_ADDITIVE = (
+    "num_frames", "num_matches", "num_switches", "num_false_positives", "num_misses", "num_transfer", "num_ascend",
+    "num_migrate", "num_objects", "num_predictions", "num_unique_objects", "mostly_tracked", "partially_tracked",
+    "mostly_lost", "num_fragmentations", "dist_sum", "idtp", "idfn", "idfp",
+)
+_HOTA_ADDITIVE = ("hota_tp", "hota_fn", "hota_fp", "hota_loc", "hota_assa", "hota_assre", "hota_asspr")
+
+
+def _div(a: float, b: float) -> float:
+    """motmetrics quiet_divide와 같이 0/0 → nan, x/0 → inf."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.true_divide(np.float64(a), np.float64(b)))
+
+
+def box_iou_xywh(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N,4)·(K,4) xywh → (N,K) IoU (motmetrics.distances.boxiou와 같은 계산, 겹침 0이면 0)."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    a_min, a_max = a[:, None, :2], a[:, None, :2] + a[:, None, 2:]
+    b_min, b_max = b[None, :, :2], b[None, :, :2] + b[None, :, 2:]
+    i_vol = np.prod(np.maximum(np.minimum(a_max, b_max) - np.maximum(a_min, b_min), 0), axis=-1)
+    a_vol = np.prod(np.maximum(a[:, 2:], 0), axis=-1)[:, None]
+    b_vol = np.prod(np.maximum(b[:, 2:], 0), axis=-1)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(i_vol == 0, 0.0, i_vol / (a_vol + b_vol - i_vol))
+
+
+def iou_distance(objs: np.ndarray, hyps: np.ndarray, max_iou: float = IOU_DISTANCE_THRESHOLD) -> np.ndarray:
+    """
+    xywh → 1 - IoU 거리 행렬 (max_iou 초과는 NaN = 매칭 불가).
+    motmetrics.distances.iou_matrix와 같은 계산 (1.4.0은 NumPy 2에서 제거된 np.asfarray를 사용).
+    """
+    if not np.size(objs) or not np.size(hyps):
+        return np.empty((0, 0))
+    dist = 1.0 - box_iou_xywh(objs, hyps)
+    return np.where(dist > max_iou, np.nan, dist)
+
+
+def _assign(costs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """NaN = 간선 없음인 최소 비용 매칭 (motmetrics.lap과 같이 큰 비용으로 채운 뒤 없는 간선 제외)."""
+    valid = np.isfinite(costs)
+    if not valid.any():
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    c = np.abs(costs[valid]).max() + 1
+    rows, cols = linear_sum_assignment(np.where(valid, costs, 2 * min(costs.shape) * c + 1))
+    keep = valid[rows, cols]
+    return rows[keep], cols[keep]
+
+
+def load_mot_array(path: str | Path, min_confidence: float = -1.0) -> np.ndarray:
+    """MOT Challenge 텍스트 → (N,7) float64 배열 frame,id,x,y,w,h,conf (conf < min_confidence 행 제외)."""
+    import pandas as pd
+
+    try:
+        df = pd.read_csv(path, header=None, sep=",", skipinitialspace=True)
+        if df.shape[1] < 7:  # 공백 구분 파일
+            df = pd.read_csv(path, header=None, sep=r"\s+")
+    except pd.errors.EmptyDataError:
+        return np.zeros((0, 7), dtype=np.float64)
+    rows = df.iloc[:, :7].to_numpy(dtype=np.float64)
+    return rows[rows[:, 6] >= min_confidence]
+
+
+class MOTSequence:
+    """MOT 행 배열 → 프레임별 (ids, xywh). x·y는 motmetrics와 같이 0-based (x - 1). 프레임 안 순서는 파일 순서."""
+
+    def __init__(self, rows: np.ndarray):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 7)
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        frames = rows[:, 0].astype(np.int64)
+        self.frame_ids = np.unique(frames)
+        self._start = np.searchsorted(frames, self.frame_ids, side="left")
+        self._end = np.searchsorted(frames, self.frame_ids, side="right")
+        self._ids = rows[:, 1].astype(np.int64)
+        self._xywh = rows[:, 2:6].copy()
+        self._xywh[:, :2] -= 1.0
+
+    @classmethod
+    def from_file(cls, path: str | Path, min_confidence: float = -1.0) -> "MOTSequence":
+        return cls(load_mot_array(path, min_confidence))
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+    def frame(self, frame_id: int) -> tuple[np.ndarray, np.ndarray]:
+        k = int(np.searchsorted(self.frame_ids, frame_id))
+        if k >= len(self.frame_ids) or self.frame_ids[k] != frame_id:
+            return self._ids[:0], self._xywh[:0]
+        s, e = self._start[k], self._end[k]
+        return self._ids[s:e], self._xywh[s:e]
+
+
+class StreamingMOTEvaluator:
+    """
+    프레임 단위 누적 MOT 평가기.
+
+    - update(frame_id, hyp_ids, hyp_xywh): 예측 한 프레임 (gt가 있으면 그 프레임 GT와 매칭, 건너뛴 GT 프레임은 전부 miss)
+    - update_detections(frame_id, det) / update_rows(frame_id, rows): MOT 파일에 쓰는 값(소수 둘째 자리)과 같게 변환 후 update
+    - running_metrics(): 지금까지의 MOTA·MOTP·ID switch 등 (프레임 step 로깅용, 가벼움)
+    - finish() 후 summary(): motchallenge_metrics + HOTA. state()는 시퀀스끼리 합산 가능한 누적값
+    프레임 번호는 증가 순서로만 입력.
+    """
+
+    def __init__(self, gt: MOTSequence | None = None, max_iou: float = IOU_DISTANCE_THRESHOLD, hota: bool = True):
+        self.gt = gt
+        self.max_iou = max_iou
+        self.hota = hota
+        self.counts: Counter = Counter()
+        self.dist_sum = 0.0
+        self._gt_pos = 0
+        self._last_frame: int | None = None
+        # motmetrics MOTAccumulator 상태: m (GT → 마지막 매칭 예측), res_m (예측 → GT), 마지막 매칭 프레임
+        self._m: dict[int, int] = {}
+        self._res_m: dict[int, int] = {}
+        self._last_match: dict[int, int] = {}
+        self._hyp_history: dict[int, int] = {}
+        self._obj_frames: Counter = Counter()
+        self._obj_tracked: Counter = Counter()
+        self._hyp_frames: Counter = Counter()
+        # IDF1의 IDFN/IDFP는 id별 등장 프레임 수(한 프레임 중복 id는 1회) 기준 (motmetrics와 동일)
+        self._obj_id_frames: Counter = Counter()
+        self._hyp_id_frames: Counter = Counter()
+        self._frag: dict[int, int] = {}  # GT id → 1: 추적 중, 2: 추적 후 miss 구간
+        self._pair_tp: Counter = Counter()  # (GT id, 예측 id) → IoU 임계값 이내로 겹친 프레임 수 (IDF1)
+        # HOTA는 전역 정렬 점수가 필요해 finish 후 계산 → 프레임별 (GT 인덱스, 예측 인덱스, IoU) 보관
+        self._oid_index: dict[int, int] = {}
+        self._hid_index: dict[int, int] = {}
+        self._hota_frames: list[tuple[np.ndarray, np.ndarray, np.ndarray | None]] = []
+
+    # ---- 입력 ----
+
+    def update(
+        self,
+        frame_id: int,
+        hyp_ids: np.ndarray,
+        hyp_xywh: np.ndarray,
+        gt_ids: np.ndarray | None = None,
+        gt_xywh: np.ndarray | None = None,
+    ) -> None:
+        frame_id = int(frame_id)
+        if self._last_frame is not None and frame_id <= self._last_frame:
+            raise ValueError(f"프레임 번호는 증가해야 합니다: {frame_id} (이전 {self._last_frame})")
+        if gt_ids is None:
+            if self.gt is None:
+                raise ValueError("gt 없이 생성한 evaluator에는 gt_ids/gt_xywh를 함께 전달해야 합니다")
+            self._flush_gt(frame_id)
+            gt_ids, gt_xywh = self.gt.frame(frame_id)
+            if self._gt_pos < len(self.gt.frame_ids) and self.gt.frame_ids[self._gt_pos] == frame_id:
+                self._gt_pos += 1
+        self._last_frame = frame_id
+        self._update(frame_id, np.asarray(gt_ids), gt_xywh, np.asarray(hyp_ids), hyp_xywh)
+
+    def update_rows(self, frame_id: int, rows: np.ndarray) -> None:
+        """mot_rows 배열 (N,7). MOT_ROW_FMT로 쓴 파일을 읽은 값과 같도록 좌표를 소수 둘째 자리 문자열 반올림."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 7)
+        xywh = np.char.mod("%.2f", rows[:, 2:6]).astype(np.float64) if len(rows) else rows[:, 2:6]
+        xywh[:, :2] -= 1.0
+        self.update(frame_id, rows[:, 1].astype(np.int64), xywh)
+
+    def update_detections(self, frame_id: int, det: FrameDetections) -> None:
+        self.update_rows(frame_id, mot_rows(frame_id, det))
+
+    def finish(self) -> None:
+        """아직 입력되지 않은 나머지 GT 프레임을 miss로 반영 (예측 파일이 끝난 뒤의 GT 프레임)."""
+        self._flush_gt(None)
+
+    def _flush_gt(self, before: int | None) -> None:
+        if self.gt is None:
+            return
+        empty_ids, empty_xywh = np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+        while self._gt_pos < len(self.gt.frame_ids):
+            fid = int(self.gt.frame_ids[self._gt_pos])
+            if before is not None and fid >= before:
+                break
+            gt_ids, gt_xywh = self.gt.frame(fid)
+            self._update(fid, gt_ids, gt_xywh, empty_ids, empty_xywh)
+            self._gt_pos += 1
+
+    def _update(self, fid: int, oids: np.ndarray, o_xywh: np.ndarray, hids: np.ndarray, h_xywh: np.ndarray) -> None:
+        no, nh = len(oids), len(hids)
+        if not no and not nh:  # GT·예측 모두 없는 프레임은 motmetrics에서도 집계되지 않음
+            return
+        c = self.counts
+        c["num_frames"] += 1
+        o_list, h_list = oids.tolist(), hids.tolist()
+        o_done = np.zeros(no, dtype=bool)
+        h_done = np.zeros(nh, dtype=bool)
+        iou = None
+        if no and nh:
+            iou = box_iou_xywh(o_xywh, h_xywh)
+            dist = 1.0 - iou
+            dists = np.where(dist > self.max_iou, np.nan, dist)
+            vi, vj = np.nonzero(np.isfinite(dists))
+            for i, j in zip(vi.tolist(), vj.tolist()):
+                self._pair_tp[(o_list[i], h_list[j])] += 1
+
+            # 1. 이전 프레임의 매칭이 여전히 유효하면 유지
+            for i, o in enumerate(o_list):
+                h_prev = self._m.get(o)
+                if h_prev is None:
+                    continue
+                js = np.flatnonzero(~h_done & (hids == h_prev))
+                if not len(js) or not np.isfinite(dists[i, js[0]]):
+                    continue
+                j = int(js[0])
+                o_done[i] = h_done[j] = True
+                c["num_matches"] += 1
+                self.dist_sum += float(dists[i, j])
+                self._last_match[o] = fid
+                self._hyp_history[h_prev] = fid
+
+            # 2. 나머지는 Hungarian (IoU 거리 최소)
+            rest = dists.copy()
+            rest[o_done, :] = np.nan
+            rest[:, h_done] = np.nan
+            for i, j in zip(*_assign(rest)):
+                o, h = o_list[i], h_list[j]
+                if o in self._m and self._m[o] != h:
+                    c["num_switches"] += 1
+                    if h not in self._hyp_history:
+                        c["num_ascend"] += 1
+                else:
+                    c["num_matches"] += 1
+                if h in self._res_m and self._res_m[h] != o:
+                    c["num_transfer"] += 1
+                    if o not in self._last_match:
+                        c["num_migrate"] += 1
+                self._hyp_history[h] = fid
+                self._last_match[o] = fid
+                self.dist_sum += float(rest[i, j])
+                o_done[i] = h_done[j] = True
+                self._m[o] = h
+                self._res_m[h] = o
+
+        c["num_misses"] += int(no - o_done.sum())
+        c["num_false_positives"] += int(nh - h_done.sum())
+        for i, o in enumerate(o_list):
+            self._obj_frames[o] += 1
+            state = self._frag.get(o)
+            if o_done[i]:
+                self._obj_tracked[o] += 1
+                if state == 2:  # 추적 → miss → 다시 추적: fragmentation 1회
+                    c["num_fragmentations"] += 1
+                self._frag[o] = 1
+            elif state == 1:
+                self._frag[o] = 2
+        for h in h_list:
+            self._hyp_frames[h] += 1
+        self._obj_id_frames.update(set(o_list))
+        self._hyp_id_frames.update(set(h_list))
+
+        if self.hota:
+            oi = np.fromiter((self._oid_index.setdefault(o, len(self._oid_index)) for o in o_list), np.int64, no)
+            hi = np.fromiter((self._hid_index.setdefault(h, len(self._hid_index)) for h in h_list), np.int64, nh)
+            self._hota_frames.append((oi, hi, iou))
+
+    # ---- 결과 ----
+
+    def _idtp(self) -> int:
+        """GT id ↔ 예측 id 전역 1:1 매칭으로 겹친 프레임 수 최대화 (motmetrics id_global_assignment와 같은 최적값)."""
+        if not self._pair_tp:
+            return 0
+        o_idx: dict[int, int] = {}
+        h_idx: dict[int, int] = {}
+        for o, h in self._pair_tp:
+            o_idx.setdefault(o, len(o_idx))
+            h_idx.setdefault(h, len(h_idx))
+        tp = np.zeros((len(o_idx), len(h_idx)))
+        for (o, h), n in self._pair_tp.items():
+            tp[o_idx[o], h_idx[h]] = n
+        rows, cols = linear_sum_assignment(tp, maximize=True)
+        return int(tp[rows, cols].sum())
+
+    def _hota_state(self) -> dict[str, np.ndarray]:
+        """TrackEval HOTA: IoU 기반 전역 정렬 점수로 프레임별 매칭 → α별 TP/FN/FP·연관 정확도 누적값."""
+        n_a = len(HOTA_ALPHAS)
+        out = {k: np.zeros(n_a) for k in _HOTA_ADDITIVE}
+        n_o, n_h = len(self._oid_index), len(self._hid_index)
+        gt_count = np.zeros(n_o)
+        tr_count = np.zeros(n_h)
+        potential = np.zeros((n_o, n_h))
+        for oi, hi, sim in self._hota_frames:
+            # 한 프레임에 같은 id가 여러 번 있어도 1회 (TrackEval의 fancy-index += 와 동일)
+            gt_count[oi] += 1
+            tr_count[hi] += 1
+            if sim is not None:
+                denom = sim.sum(0)[None, :] + sim.sum(1)[:, None] - sim
+                sim_iou = np.zeros_like(sim)
+                mask = denom > np.finfo(float).eps
+                sim_iou[mask] = sim[mask] / denom[mask]
+                potential[oi[:, None], hi[None, :]] += sim_iou
+        with np.errstate(divide="ignore", invalid="ignore"):
+            align = potential / (gt_count[:, None] + tr_count[None, :] - potential)
+
+        keys: list[np.ndarray] = []
+        for oi, hi, sim in self._hota_frames:
+            if sim is None:
+                out["hota_fn"] += len(oi)
+                out["hota_fp"] += len(hi)
+                continue
+            rows, cols = linear_sum_assignment(-(align[oi[:, None], hi[None, :]] * sim))
+            s = sim[rows, cols]
+            ok = s[None, :] >= HOTA_ALPHAS[:, None] - np.finfo(float).eps  # (α, 매칭)
+            n_match = ok.sum(1)
+            out["hota_tp"] += n_match
+            out["hota_fn"] += len(oi) - n_match
+            out["hota_fp"] += len(hi) - n_match
+            out["hota_loc"] += (ok * s[None, :]).sum(1)
+            a_idx, k_idx = np.nonzero(ok)
+            keys.append(np.unique((a_idx * n_o + oi[rows[k_idx]]) * n_h + hi[cols[k_idx]]))
+        if keys:
+            uniq, cnt = np.unique(np.concatenate(keys), return_counts=True)
+            a = uniq // (n_o * n_h)
+            o = (uniq // n_h) % n_o
+            h = uniq % n_h
+            ass_a = cnt / np.maximum(1, gt_count[o] + tr_count[h] - cnt)
+            out["hota_assa"] = np.bincount(a, weights=cnt * ass_a, minlength=n_a)
+            out["hota_assre"] = np.bincount(a, weights=cnt * cnt / np.maximum(1, gt_count[o]), minlength=n_a)
+            out["hota_asspr"] = np.bincount(a, weights=cnt * cnt / np.maximum(1, tr_count[h]), minlength=n_a)
+        return out
+
+    def state(self) -> dict[str, Any]:
+        """시퀀스끼리 더할 수 있는 누적값 (combine_states → metrics_from_state)."""
+        st: dict[str, Any] = {k: float(self.counts.get(k, 0)) for k in _ADDITIVE}
+        st["dist_sum"] = self.dist_sum
+        st["num_objects"] = float(sum(self._obj_frames.values()))
+        st["num_predictions"] = float(sum(self._hyp_frames.values()))
+        st["num_unique_objects"] = float(len(self._obj_frames))
+        ratios = np.array([self._obj_tracked[o] / n for o, n in self._obj_frames.items()])
+        st["mostly_tracked"] = float((ratios >= 0.8).sum())
+        st["partially_tracked"] = float(((ratios >= 0.2) & (ratios < 0.8)).sum())
+        st["mostly_lost"] = float((ratios < 0.2).sum())
+        tp = self._idtp()
+        st["idfn"] = float(sum(self._obj_id_frames.values()) - tp)
+        st["idfp"] = float(sum(self._hyp_id_frames.values()) - tp)
+        st["idtp"] = st["num_objects"] - st["idfn"]
+        if self.hota:
+            st.update({k: v.tolist() for k, v in self._hota_state().items()})
+        return st
+
+    def summary(self, prefix: str = "mot") -> dict[str, float]:
+        return metrics_from_state(self.state(), prefix)
+
+    def running_metrics(self, prefix: str = "mot_step", idf1: bool = False) -> dict[str, float]:
+        """지금까지의 CLEAR MOT 값 (프레임 step 로깅용). idf1=True면 전역 매칭까지 계산 (ID 수에 비례해 느려짐)."""
+        c = self.counts
+        num_objects = float(sum(self._obj_frames.values()))
+        num_det = c["num_matches"] + c["num_switches"]
+        out = {
+            f"{prefix}/mota": 1.0 - _div(c["num_misses"] + c["num_switches"] + c["num_false_positives"], num_objects),
+            f"{prefix}/motp": _div(self.dist_sum, num_det),
+            f"{prefix}/num_switches": float(c["num_switches"]),
+            f"{prefix}/num_false_positives": float(c["num_false_positives"]),
+            f"{prefix}/num_misses": float(c["num_misses"]),
+        }
+        if idf1:
+            idtp = num_objects - (sum(self._obj_id_frames.values()) - self._idtp())
+            out[f"{prefix}/idf1"] = _div(2 * idtp, num_objects + sum(self._hyp_frames.values()))
+        return out
+
+
+def combine_states(states: list[dict[str, Any]]) -> dict[str, Any]:
+    """여러 시퀀스 state 합산 (motmetrics OVERALL / TrackEval COMBINED와 같은 방식)."""
+    out: dict[str, Any] = {k: float(sum(s[k] for s in states)) for k in _ADDITIVE}
+    if states and all(_HOTA_ADDITIVE[0] in s for s in states):
+        for k in _HOTA_ADDITIVE:
+            out[k] = np.sum([s[k] for s in states], axis=0).tolist()
+    return out
+
+
+def metrics_from_state(st: dict[str, Any], prefix: str = "mot") -> dict[str, float]:
+    """누적값 → motchallenge_metrics (+ HOTA 평균)."""
+    num_det = st["num_matches"] + st["num_switches"]
+    idtp = st["idtp"]
+    m = {
+        "idf1": _div(2 * idtp, st["num_objects"] + st["num_predictions"]),
+        "idp": _div(idtp, idtp + st["idfp"]),
+        "idr": _div(idtp, idtp + st["idfn"]),
+        "recall": _div(num_det, st["num_objects"]),
+        "precision": _div(num_det, st["num_false_positives"] + num_det),
+        "mota": 1.0 - _div(st["num_misses"] + st["num_switches"] + st["num_false_positives"], st["num_objects"]),
+        "motp": _div(st["dist_sum"], num_det),
+    }
+    for k in MOTCHALLENGE_METRICS:
+        if k not in m:
+            m[k] = float(st[k])
+    out = {f"{prefix}/{k}": m[k] for k in MOTCHALLENGE_METRICS}
+    if "hota_tp" in st:
+        tp, fn, fp = (np.asarray(st[k]) for k in ("hota_tp", "hota_fn", "hota_fp"))
+        det_a = tp / np.maximum(1, tp + fn + fp)
+        ass_a = np.asarray(st["hota_assa"]) / np.maximum(1, tp)
+        h = {
+            "hota": np.sqrt(det_a * ass_a),
+            "deta": det_a,
+            "assa": ass_a,
+            "loca": np.maximum(1e-10, st["hota_loc"]) / np.maximum(1e-10, tp),
+            "detre": tp / np.maximum(1, tp + fn),
+            "detpr": tp / np.maximum(1, tp + fp),
+            "assre": np.asarray(st["hota_assre"]) / np.maximum(1, tp),
+            "asspr": np.asarray(st["hota_asspr"]) / np.maximum(1, tp),
+        }
+        out.update({f"{prefix}/{k}": float(np.mean(h[k])) for k in HOTA_METRICS})
+    return out
+
+
+def evaluate_sequence(gt: MOTSequence, pred: MOTSequence, hota: bool = True) -> StreamingMOTEvaluator:
+    """예측 프레임 순서대로 스트리밍 평가 (GT만 있는 프레임은 자동으로 miss)."""
+    ev = StreamingMOTEvaluator(gt, hota=hota)
+    for fid in pred.frame_ids.tolist():
+        ids, xywh = pred.frame(fid)
+        ev.update(fid, ids, xywh)
+    ev.finish()
+    return ev
+
+
+def evaluate_files(gt_path: str | Path, pred_path: str | Path, hota: bool = True) -> dict[str, Any]:
+    """GT·예측 MOT 텍스트 → state (GT는 motmetrics와 같이 conf < 1 행 제외)."""
+    gt = MOTSequence.from_file(gt_path, min_confidence=1)
+    pred = MOTSequence.from_file(pred_path)
+    return evaluate_sequence(gt, pred, hota).state()
+
+
+def _evaluate_pair(args: tuple[str, str, bool]) -> dict[str, Any]:
+    return evaluate_files(*args)
+
+
+def evaluate_many(
+    pairs: dict[str, tuple[str | Path, str | Path]],
+    workers: int = 1,
+    hota: bool = True,
+    prefix: str = "mot",
+) -> dict[str, dict[str, float]]:
+    """
+    {시퀀스 이름: (GT 경로, 예측 경로)} → {이름: 메트릭, ..., "OVERALL": 합산 메트릭}.
+    workers > 1이면 시퀀스별로 프로세스 풀에서 평가.
+    """
+    names = list(pairs)
+    jobs = [(str(pairs[n][0]), str(pairs[n][1]), hota) for n in names]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=mp.get_context("spawn")) as pool:
+            states = list(pool.map(_evaluate_pair, jobs))
+    else:
+        states = [_evaluate_pair(j) for j in jobs]
+    out = {n: metrics_from_state(s, prefix) for n, s in zip(names, states)}
+    out["OVERALL"] = metrics_from_state(combine_states(states), prefix)
+    return out
+
+
+# ---- motmetrics 기준 구현 (pandas) ----
+
+def load_mot_gt(path: str | Path) -> Any:
+    """Ground truth MOT 텍스트 → motmetrics DataFrame (conf < 1인 무시 영역 제외)."""
+    import motmetrics as mm
+
+    return mm.io.loadtxt(str(path), fmt="mot15-2D", min_confidence=1)
+
+
+def rows_to_dataframe(rows: np.ndarray) -> Any:
+    """
+    mot_rows 배열 (N,7: frame,id,x,y,w,h,conf, x·y는 1-based) → mm.io.loadtxt와 같은 형태의 DataFrame.
+    좌표는 MOT 텍스트(MOT_ROW_FMT)와 같이 소수 둘째 자리로 반올림 → 파일로 저장 후 평가한 값과 동일.
+    """
+    import pandas as pd
+
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, 7)
+    df = pd.DataFrame({
+        "FrameId": rows[:, 0].astype(np.int64),
+        "Id": rows[:, 1].astype(np.int64),
+        "X": np.round(rows[:, 2], 2) - 1.0,
+        "Y": np.round(rows[:, 3], 2) - 1.0,
+        "Width": np.round(rows[:, 4], 2),
+        "Height": np.round(rows[:, 5], 2),
+        "Confidence": np.round(rows[:, 6], 4),
+        "ClassId": -1,
+        "Visibility": -1,
+    })
+    return df.set_index(["FrameId", "Id"])
+
+
+def accumulate(gt: Any, pred: Any, max_iou: float = IOU_DISTANCE_THRESHOLD) -> Any:
+    """프레임별 IoU 매칭 → MOTAccumulator (motmetrics.utils.compare_to_groundtruth(..., "iou")와 동일)."""
+    import motmetrics as mm
+
+    acc = mm.MOTAccumulator()
+    fields = ["X", "Y", "Width", "Height"]
+    frame_ids = gt.index.union(pred.index).levels[0]
+    gt_frames = dict(iter(gt[fields].groupby("FrameId")))
+    pred_frames = dict(iter(pred[fields].groupby("FrameId")))
+    for fid in frame_ids:
+        oids, hids, dists = np.empty(0), np.empty(0), np.empty((0, 0))
+        if fid in gt_frames:
+            oids = gt_frames[fid].index.get_level_values("Id")
+        if fid in pred_frames:
+            hids = pred_frames[fid].index.get_level_values("Id")
+        if len(oids) and len(hids):
+            dists = iou_distance(gt_frames[fid].values, pred_frames[fid].values, max_iou)
+        acc.update(oids, hids, dists, frameid=fid)
+    return acc
+
+
+def motmetrics_summary(gt: Any, pred: Any, name: str = "yolo") -> dict[str, float]:
+    """
+    motmetrics로 평가 (비교·검증용). gt / pred: 파일 경로, motmetrics DataFrame, 또는 (pred만) mot_rows 배열.
+    반환: {"mot/mota": ..., "mot/idf1": ..., ...} (motchallenge_metrics 전체).
+    """
+    import motmetrics as mm
+
+    if isinstance(gt, (str, Path)):
+        gt = load_mot_gt(gt)
+    if isinstance(pred, (str, Path)):
+        pred = mm.io.loadtxt(str(pred), fmt="mot15-2D")
+    elif isinstance(pred, np.ndarray):
+        pred = rows_to_dataframe(pred)
+    summary = mm.metrics.create().compute(accumulate(gt, pred), metrics=mm.metrics.motchallenge_metrics, name=name)
+    return {f"mot/{k}": float(v) for k, v in summary.iloc[0].items()}
@@ -0,0 +1,129 @@
+"""
+여러 영상 소스를 하나의 모델로 처리하기 위한 스트림 상태 + 배치 스케줄러.
+각 스트림은 자기 VideoFrameReader·tracker·MOT 출력 파일을 갖고, 스케줄러가 라운드로빈
+(또는 우선순위 가중 라운드로빈)으로 프레임을 뽑아 공유 추론 배치를 구성.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import cv2
+
+from utils.streaming_stats import StreamSummary
+from utils.video_pipeline import VideoFrameReader
+
+
+@dataclass
+class StreamState:
+    """스트림 하나의 디코더·tracker·출력·통계 상태."""
+
+    stream_id: str
+    source: str
+    priority: int = 1
+    cap: Any = None
+    reader: VideoFrameReader | None = None
+    tracker: Any = None
+    mot_file: Any = None
+    run_id: str | None = None
+    sink: Any = None
+    frames: int = 0
+    detections: int = 0
+    done: bool = False
+    conf_stats: StreamSummary = field(default_factory=lambda: StreamSummary(hist_range=(0.0, 1.0)))
+    _it: Iterator | None = None
+
+    def open(self, max_frames: int, skip_frames: int) -> bool:
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            self.done = True
+            return False
+        self.reader = VideoFrameReader(self.cap, max_frames, skip_frames)
+        self._it = iter(self.reader)
+        return True
+
+    @property
+    def fps(self) -> float:
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap is not None else 0.0
+        return fps if fps and fps > 0 else 30.0
+
+    def next_frame(self) -> tuple[int, Any] | None:
+        if self.done or self._it is None:
+            return None
+        item = next(self._it, None)
+        if item is None:
+            self.done = True
+        return item
+
+    def close(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+        if self.mot_file is not None:
+            self.mot_file.close()
+
+
+class StreamScheduler:
+    """
+    활성 스트림에서 프레임을 뽑아 배치 구성.
+
+    - round_robin: 스트림마다 1장씩 차례로
+    - priority: 스트림마다 priority장씩 차례로 (가중 라운드로빈)
+    배치가 중간에 차면 남은 몫(credit)은 다음 배치로 이어짐. 스트림별 프레임 순서는 항상 유지.
+    """
+
+    POLICIES = ("round_robin", "priority")
+
+    def __init__(self, streams: list[StreamState], policy: str = "round_robin"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy는 {self.POLICIES} 중 하나: {policy}")
+        self.policy = policy
+        self._active = [s for s in streams if not s.done]
+        self._pos = 0
+        self._credit = 0
+
+    def _quota(self, s: StreamState) -> int:
+        return max(1, s.priority) if self.policy == "priority" else 1
+
+    @property
+    def exhausted(self) -> bool:
+        return not self._active
+
+    def next_batch(self, batch_size: int) -> list[tuple[StreamState, int, Any]]:
+        """(stream, frame_idx, frame) 최대 batch_size개. 모든 스트림이 끝나면 빈 리스트."""
+        batch: list[tuple[StreamState, int, Any]] = []
+        while len(batch) < batch_size and self._active:
+            self._pos %= len(self._active)
+            s = self._active[self._pos]
+            if self._credit <= 0:
+                self._credit = self._quota(s)
+            item = s.next_frame()
+            if item is None:
+                self._active.pop(self._pos)
+                self._credit = 0
+                continue
+            batch.append((s, item[0], item[1]))
+            self._credit -= 1
+            if self._credit <= 0:
+                self._pos += 1
+        return batch
+
+
+def parse_sources(sources: list[str], sources_file: Path | None = None) -> list[tuple[str, int]]:
+    """
+    소스 목록 → [(source, priority)]. 'path@3' 또는 파일의 'path 3' 형식으로 우선순위 지정 (기본 1).
+    sources_file은 한 줄에 하나, '#' 주석·빈 줄 무시.
+    """
+    items = list(sources)
+    if sources_file is not None:
+        for line in Path(sources_file).read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                parts = line.rsplit(maxsplit=1)
+                items.append(f"{parts[0]}@{parts[1]}" if len(parts) == 2 and parts[1].isdigit() else line)
+    out: list[tuple[str, int]] = []
+    for item in items:
+        src, sep, prio = item.rpartition("@")
+        if sep and prio.isdigit():
+            out.append((src, int(prio)))
+        else:
+            out.append((item, 1))
+    return out
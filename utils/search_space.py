@@ -0,0 +1,61 @@
+"""
+sweep 탐색 공간 → trial 목록. 학습 sweep(utils/train_sweep.py)과 tracker sweep(experiments/sweep_tracker.py)이 같이 사용.
+
+- 파라미터 값: 값 목록 [v1, v2, ...] 또는 범위 {low, high, log} (random 전용, 둘 다 정수면 정수, log면 로그 균등)
+- grid: 값 목록의 전체 조합
+- random: 범위가 없으면 전체 조합 중에서 중복 없이 trials개 (조합이 trials보다 적으면 전부),
+  범위가 있으면 파라미터마다 샘플해 같은 조합을 뺀 trials개. seed가 같으면 같은 목록
+"""
+import itertools
+import json
+import math
+import random
+from typing import Any
+
+SEARCH_METHODS = ("grid", "random")
+
+
+def is_range(v: Any) -> bool:
+    return isinstance(v, dict) and "low" in v and "high" in v
+
+
+def expand_search_space(params: dict[str, Any], method: str = "grid", trials: int = 20, seed: int = 0) -> list[dict[str, Any]]:
+    """{이름: 값 목록 또는 범위} → trial 파라미터 dict 목록. 파라미터가 없으면 기본 설정 trial 하나."""
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"search method는 {'/'.join(SEARCH_METHODS)}: {method}")
+    for name, v in params.items():
+        if not isinstance(v, list) and not is_range(v):
+            raise ValueError(f"탐색 파라미터 {name}: 값 목록 또는 {{low, high}} 범위여야 합니다: {v}")
+    names = list(params)
+    ranges = [n for n in names if is_range(params[n])]
+    if method == "grid":
+        if ranges:
+            raise ValueError(f"grid sweep에는 범위를 쓸 수 없습니다: {ranges}")
+        return [dict(zip(names, combo)) for combo in itertools.product(*(params[n] for n in names))]
+
+    rng = random.Random(seed)
+    if not ranges:
+        grid = list(itertools.product(*(params[n] for n in names)))
+        return [dict(zip(names, combo)) for combo in rng.sample(grid, min(trials, len(grid)))]
+
+    def sample(v: Any) -> Any:
+        if isinstance(v, list):
+            return rng.choice(v)
+        lo, hi = v["low"], v["high"]
+        if v.get("log"):
+            return float(f"{math.exp(rng.uniform(math.log(lo), math.log(hi))):.4g}")
+        if isinstance(lo, int) and isinstance(hi, int):
+            return rng.randint(lo, hi)
+        return round(rng.uniform(lo, hi), 4)
+
+    out: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for _ in range(trials * 20):
+        if len(out) >= trials:
+            break
+        trial = {n: sample(params[n]) for n in names}
+        key = json.dumps(trial, sort_keys=True, default=str)
+        if key not in seen:
+            seen.add(key)
+            out.append(trial)
+    return out
@@ -0,0 +1,458 @@
+"""
+긴 영상 샤딩 처리: keyframe 경계로 구간을 나눠 프로세스 풀에서 병렬 추론 → 프레임 순서대로 병합.
+
+- 구간마다 워커 프로세스가 자기 모델 인스턴스로 디코딩·추론하고 annotated 영상 구간을 따로 기록 (병합 시 이어 붙임)
+- skip 간격은 원본 프레임 인덱스 기준이라 샤딩 여부와 관계없이 같은 프레임을 처리하고 처리 프레임 번호도 같음
+- 트래킹이면 각 구간이 다음 구간 시작 뒤 overlap 프레임까지 더 처리하고, 다음 구간은 그 overlap을
+  tracker warm-up으로만 씀(출력 안 함). 겹치는 프레임에서 두 구간의 track을 IoU로 맞춰 ID를 이어 붙임.
+
+keyframe 위치는 MP4/MOV의 sync sample 테이블(stss)에서 읽음. 다른 컨테이너는 균등 분할
+(OpenCV seek은 이전 keyframe부터 다시 디코딩하므로 결과는 같고 seek 비용만 늘어남).
+
+워커는 `python -m utils.sharding <work_dir> <worker> <num_workers>` 프로세스 (모델은 워커당 한 번 로드).
+run_yolo.py는 모듈 최상위에서 실행되는 스크립트라 spawn 프로세스 풀을 쓰면 워커가 __main__(실험 전체)을
+다시 실행하므로, 작업·결과는 work_dir의 pickle 파일로 주고받음.
+"""
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from utils.detection_cache import detections_to_result
+from utils.detections import FrameDetections
+from utils.mot_eval import box_iou_xywh
+
+# 샤드 경계 track 연결: 겹침 프레임에서 같은 클래스·IoU >= 이 값이면 같은 물체로 투표
+STITCH_IOU = 0.5
+# 구간 영상은 무손실(FFV1)로 기록 → 병합 시 한 번만 mp4v로 인코딩 (화질 손실 1회)
+SEGMENT_FOURCC = "FFV1"
+
+_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+# ---------------------------------------------------------------- keyframe / 구간 계획
+
+def _iter_boxes(data: bytes, start: int = 0, end: int | None = None) -> Iterator[tuple[bytes, int, int]]:
+    """MP4 box (type, payload 시작, payload 끝)."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _read_moov(path: Path) -> bytes | None:
+    """최상위 moov box만 읽음 (mdat은 건너뜀)."""
+    with open(path, "rb") as f:
+        file_size = f.seek(0, os.SEEK_END)
+        pos = 0
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            header = f.read(16)
+            size, kind = struct.unpack(">I4s", header[:8])
+            if size == 1:
+                size = struct.unpack(">Q", header[8:16])[0]
+            elif size == 0:
+                size = file_size - pos
+            if kind == b"moov":
+                f.seek(pos)
+                return f.read(size)
+            if size < 8:
+                return None
+            pos += size
+    return None
+
+
+def mp4_keyframes(path: str | Path) -> list[int] | None:
+    """
+    비디오 트랙의 keyframe 프레임 인덱스(0-based). stss가 없으면(모든 프레임이 keyframe) None.
+    stss는 디코딩 순서 기준이라 B-frame이 있으면 표시 순서와 몇 프레임 어긋날 수 있음 (seek 결과에는 영향 없음).
+    """
+    try:
+        moov = _read_moov(Path(path))
+    except (OSError, struct.error):
+        return None
+    if not moov:
+        return None
+
+    def walk(start: int, end: int, is_video: bool) -> list[int] | None:
+        boxes = list(_iter_boxes(moov, start, end))
+        for kind, s, e in boxes:
+            if kind == b"hdlr":
+                is_video = moov[s + 8:s + 12] == b"vide"
+        for kind, s, e in boxes:
+            if kind == b"stss" and is_video:
+                n = struct.unpack(">I", moov[s + 4:s + 8])[0]
+                return [k - 1 for k in struct.unpack(f">{n}I", moov[s + 8:s + 8 + 4 * n])]
+            if kind in _CONTAINER_BOXES:
+                found = walk(s, e, is_video)
+                if found is not None:
+                    return found
+        return None
+
+    _, s, e = next(_iter_boxes(moov))
+    try:
+        return walk(s, e, False)
+    except struct.error:
+        return None
+
+
+@dataclass
+class Shard:
+    """구간 하나 (원본 프레임 인덱스). [start, emit_start)는 warm-up(출력 안 함), [emit_start, stop)을 출력."""
+
+    index: int
+    start: int
+    emit_start: int
+    stop: int
+
+    def num_processed(self, skip_frames: int) -> int:
+        """[start, stop)에서 skip 간격에 걸리는 프레임 수."""
+        first = -(-self.start // skip_frames) * skip_frames
+        return max(0, -(-(self.stop - first) // skip_frames))
+
+
+def plan_shards(
+    num_frames: int,
+    num_shards: int,
+    skip_frames: int = 1,
+    overlap: int = 0,
+    keyframes: list[int] | None = None,
+) -> list[Shard]:
+    """
+    원본 프레임 [0, num_frames)를 최대 num_shards개 구간으로. 경계는 균등 분할 지점에 가장 가까운 keyframe.
+    overlap: 다음 구간 시작 뒤 처리 프레임 몇 장을 앞 구간이 더 처리할지 (트래킹 ID 연결용, 0이면 겹침 없음).
+    keyframe이 부족하거나 구간이 너무 짧으면 구간 수가 줄어듦.
+    """
+    skip_frames = max(1, skip_frames)
+    min_len = (overlap + 1) * skip_frames
+    candidates = sorted(k for k in (keyframes if keyframes is not None else range(num_frames)) if 0 < k < num_frames)
+    bounds = [0]
+    for j in range(1, max(1, num_shards)):
+        target = j * num_frames / num_shards
+        valid = [k for k in candidates if k - bounds[-1] >= min_len and num_frames - k >= min_len]
+        if not valid:
+            break
+        best = min(valid, key=lambda k: abs(k - target))
+        if best > bounds[-1]:
+            bounds.append(best)
+    bounds.append(num_frames)
+
+    def emit_start(b: int) -> int:
+        return -(-b // skip_frames) * skip_frames + overlap * skip_frames
+
+    shards = []
+    for i in range(len(bounds) - 1):
+        stop = emit_start(bounds[i + 1]) if i + 2 < len(bounds) else num_frames
+        shards.append(Shard(i, bounds[i], emit_start(bounds[i]) if i > 0 else 0, min(stop, num_frames)))
+    return shards
+
+
+# ---------------------------------------------------------------- 워커
+
+@dataclass
+class ShardConfig:
+    """워커에 넘기는 실행 설정 (pickle 가능한 값만)."""
+
+    source: str
+    weights: str
+    backend: str = "pytorch"
+    imgsz: int = 640
+    conf: float = 0.5
+    device: int | str = "cpu"
+    batch_size: int = 1
+    skip_frames: int = 1
+    tracker: str | None = None  # None이면 detection만
+    frame_rate: int = 30
+    export_cache_dir: str = ""
+    work_dir: str = "shards"  # 작업·결과 pickle과 annotated 영상 구간 위치
+    write_video: bool = True
+    fps: float = 30.0
+
+
+@dataclass
+class ShardResult:
+    """구간 하나의 처리 결과. frames는 출력 구간, warmup은 ID 연결용 (둘 다 원본 프레임 인덱스 순)."""
+
+    index: int
+    frames: list[tuple[int, FrameDetections, dict[str, float]]] = field(default_factory=list)
+    warmup: list[tuple[int, FrameDetections]] = field(default_factory=list)
+    segment: str | None = None
+    emitted: int = 0
+    decoded: int = 0
+    retrieved: int = 0
+    wall_s: float = 0.0
+    infer_s: float = 0.0
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "shard/frames": float(self.emitted),
+            "shard/frames_retrieved": float(self.retrieved),
+            "shard/wall_s": self.wall_s,
+            "shard/infer_s": self.infer_s,
+            "shard/fps": self.retrieved / self.wall_s if self.wall_s > 0 else 0.0,
+        }
+
+
+def run_shard(model: Any, shard: Shard, cfg: ShardConfig) -> ShardResult:
+    """구간 하나: seek → 디코딩·추론(·tracker) → annotated 구간 영상 + 프레임별 검출."""
+    from utils.tracking import apply_tracker, make_tracker
+    from utils.video_pipeline import AnnotatedVideoWriter, VideoFrameReader, iter_batches
+
+    t_start = time.perf_counter()
+    out = ShardResult(shard.index)
+    cap = cv2.VideoCapture(cfg.source)
+    reader = VideoFrameReader(cap, shard.num_processed(cfg.skip_frames), cfg.skip_frames, start_frame=shard.start)
+    tracker = make_tracker(cfg.tracker, frame_rate=cfg.frame_rate) if cfg.tracker else None
+    writer = None
+    if cfg.write_video:
+        writer = AnnotatedVideoWriter(Path(cfg.work_dir) / f"shard{shard.index:03d}.avi", cfg.fps, fourcc=SEGMENT_FOURCC)
+    try:
+        for batch in iter_batches(reader, cfg.batch_size):
+            imgs = [frame for _, frame in batch]
+            t0 = time.perf_counter()
+            results = model.predict(
+                imgs if len(imgs) > 1 else imgs[0],
+                conf=cfg.conf, imgsz=cfg.imgsz, device=cfg.device, save=False, show=False, verbose=False,
+            )
+            out.infer_s += time.perf_counter() - t0
+            for (idx, frame), result in zip(batch, results or []):
+                result.orig_img = frame
+                if tracker is not None:
+                    result = apply_tracker(tracker, result)
+                det = FrameDetections.from_result(result)
+                if idx < shard.emit_start:
+                    out.warmup.append((idx, det))
+                    continue
+                out.frames.append((idx, det, dict(result.speed or {})))
+                if writer is not None:
+                    writer.write(frame, det, result.names)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    out.segment = str(writer.path) if writer is not None and writer.frames else None
+    out.emitted = len(out.frames)
+    out.decoded = reader.grabbed
+    out.retrieved = reader.retrieved
+    out.wall_s = time.perf_counter() - t_start
+    return out
+
+
+def _result_path(work_dir: Path, index: int) -> Path:
+    return work_dir / f"shard{index:03d}.pkl"
+
+
+def worker_main(work_dir: Path, worker: int, num_workers: int) -> None:
+    """워커 프로세스: 모델 한 번 로드 → 맡은 구간(index % num_workers == worker)을 순서대로 처리·저장."""
+    import torch
+
+    from utils.backends import load_backend_model
+
+    with open(work_dir / "task.pkl", "rb") as f:
+        cfg, shards, threads = pickle.load(f)
+    # 워커마다 전체 코어를 쓰면 서로 경쟁하므로 나눠 씀
+    torch.set_num_threads(max(1, threads))
+    cv2.setNumThreads(1)
+    model, _ = load_backend_model(cfg.weights, cfg.backend, cfg.imgsz, cfg.batch_size, cfg.export_cache_dir)
+    for shard in shards[worker::num_workers]:
+        res = run_shard(model, shard, cfg)
+        tmp = _result_path(work_dir, shard.index).with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(res, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(_result_path(work_dir, shard.index))
+
+
+# ---------------------------------------------------------------- 병합
+
+def _xywh(xyxy: np.ndarray) -> np.ndarray:
+    out = xyxy.astype(np.float64, copy=True)
+    out[:, 2:] -= out[:, :2]
+    return out
+
+
+def stitch_track_ids(
+    prev: dict[int, FrameDetections],
+    warmup: list[tuple[int, FrameDetections]],
+    iou_thresh: float = STITCH_IOU,
+    min_votes: int = 1,
+) -> dict[int, int]:
+    """
+    앞 구간의 겹침 프레임 track(전역 ID)과 다음 구간 warm-up track(로컬 ID)을 맞춰 {로컬 ID: 전역 ID}.
+    프레임마다 같은 클래스끼리 IoU Hungarian 매칭 → (로컬, 전역) 쌍 투표 → 투표 수 기준 1:1 매칭.
+    """
+    votes: Counter = Counter()
+    for idx, det in warmup:
+        p = prev.get(idx)
+        if p is None or p.ids is None or det.ids is None or not len(p) or not len(det):
+            continue
+        iou = box_iou_xywh(_xywh(p.xyxy), _xywh(det.xyxy))
+        iou[p.cls[:, None] != det.cls[None, :]] = 0.0
+        rows, cols = linear_sum_assignment(-iou)
+        for a, b in zip(rows, cols):
+            if iou[a, b] >= iou_thresh:
+                votes[(int(det.ids[b]), int(p.ids[a]))] += 1
+    if not votes:
+        return {}
+    local = sorted({k[0] for k in votes})
+    glob = sorted({k[1] for k in votes})
+    m = np.zeros((len(local), len(glob)))
+    for (lo, gl), v in votes.items():
+        m[local.index(lo), glob.index(gl)] = v
+    rows, cols = linear_sum_assignment(-m)
+    return {local[r]: glob[c] for r, c in zip(rows, cols) if m[r, c] >= min_votes}
+
+
+class ShardedVideoRunner:
+    """
+    구간들을 프로세스 풀에 제출하고 (원본 프레임 인덱스, 검출, speed)를 프레임 순서대로 반환.
+    앞 구간이 끝나는 대로 순서대로 내보내므로 뒤 구간이 도는 동안 호출자가 로깅·평가를 진행할 수 있음.
+    트래킹이면 구간마다 로컬 track ID를 전역 ID로 바꿔서 반환 (겹침 구간에서 이어지지 않은 track은 새 ID).
+    """
+
+    def __init__(self, shards: list[Shard], cfg: ShardConfig, workers: int, overlap: int = 0):
+        self.shards = shards
+        self.cfg = cfg
+        self.workers = max(1, min(workers, len(shards)))
+        self.overlap = overlap
+        self.shard_results: list[ShardResult] = []
+        self.stitched = 0    # 경계에서 이어 붙인 track 수
+        self.new_tracks = 0  # 경계 이후 새 전역 ID를 받은 track 수
+        self.wall_s = 0.0
+
+    def _start_workers(self) -> list[subprocess.Popen]:
+        work_dir = Path(self.cfg.work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        with open(work_dir / "task.pkl", "wb") as f:
+            pickle.dump((self.cfg, self.shards, (os.cpu_count() or 1) // self.workers), f)
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in (str(PROJECT_ROOT), os.environ.get("PYTHONPATH")) if p)}
+        return [
+            subprocess.Popen([sys.executable, "-m", "utils.sharding", str(work_dir), str(w), str(self.workers)], env=env)
+            for w in range(self.workers)
+        ]
+
+    def _wait(self, shard: Shard, proc: subprocess.Popen) -> ShardResult:
+        path = _result_path(Path(self.cfg.work_dir), shard.index)
+        while not path.exists():
+            if proc.poll() is not None and not path.exists():
+                raise RuntimeError(f"shard {shard.index} 워커가 결과 없이 종료 (exit {proc.returncode})")
+            time.sleep(0.05)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def __iter__(self) -> Iterator[tuple[int, FrameDetections, dict[str, float]]]:
+        t0 = time.perf_counter()
+        next_id = 1
+        prev_tail: dict[int, FrameDetections] = {}
+        procs = self._start_workers()
+        try:
+            for shard in self.shards:
+                res = self._wait(shard, procs[shard.index % self.workers])
+                self.shard_results.append(res)
+                id_map: dict[int, int] = {}
+                if shard.index > 0 and self.cfg.tracker:
+                    id_map = stitch_track_ids(prev_tail, res.warmup, min_votes=max(1, self.overlap // 2))
+                    self.stitched += len(id_map)
+                next_shard_start = self.shards[shard.index + 1].start if shard.index + 1 < len(self.shards) else None
+                prev_tail = {}
+                for idx, det, speed in res.frames:
+                    if det.ids is not None and len(det):
+                        ids = np.empty_like(det.ids)
+                        for k, local in enumerate(det.ids.tolist()):
+                            if local not in id_map:
+                                id_map[local] = next_id
+                                if shard.index > 0:
+                                    self.new_tracks += 1
+                            ids[k] = id_map[local]
+                            next_id = max(next_id, int(ids[k]) + 1)
+                        det = FrameDetections(det.xyxy, det.conf, det.cls, ids)
+                    if next_shard_start is not None and idx >= next_shard_start:
+                        prev_tail[idx] = det
+                    yield idx, det, speed
+                res.frames = []  # 내보낸 프레임은 메모리에서 해제
+            for p in procs:
+                p.wait()
+        finally:
+            for p in procs:
+                if p.poll() is None:
+                    p.terminate()
+                    p.wait()
+        self.wall_s = time.perf_counter() - t0
+
+    def results(
+        self, names: dict[int, str], shape: tuple[int, int], path: str = ""
+    ) -> Iterator[tuple[None, Any]]:
+        """(None, Results) — 단일 프로세스 프레임 루프용. 프레임 이미지는 워커에만 있으므로 크기만 맞춘 빈 이미지(복사 없는 view)."""
+        blank = np.broadcast_to(np.zeros((1, 1, 3), dtype=np.uint8), (*shape, 3))
+        for _, det, speed in self:
+            result = detections_to_result(blank, det, names, path)
+            result.speed = speed
+            yield None, result
+
+    def segments(self) -> list[str]:
+        return [r.segment for r in self.shard_results if r.segment]
+
+    def metrics(self) -> dict[str, float]:
+        """요약: 구간 수, 전체 wall time·처리량, 병렬 효율(구간 wall 합 / (workers × 전체 wall))."""
+        busy = sum(r.wall_s for r in self.shard_results)
+        retrieved = sum(r.retrieved for r in self.shard_results)
+        return {
+            "shard/count": float(len(self.shards)),
+            "shard/workers": float(self.workers),
+            "shard/total_wall_s": self.wall_s,
+            "shard/throughput_fps": retrieved / self.wall_s if self.wall_s > 0 else 0.0,
+            "shard/parallel_efficiency": busy / (self.workers * self.wall_s) if self.wall_s > 0 else 0.0,
+            "shard/stitched_tracks": float(self.stitched),
+            "shard/new_tracks": float(self.new_tracks),
+            "frames_decoded": float(sum(r.decoded for r in self.shard_results)),
+            "frames_retrieved": float(retrieved),
+        }
+
+
+def concat_videos(paths: list[str], out_path: Path, fps: float) -> int:
+    """구간 영상을 순서대로 하나의 mp4로 (mp4v 재인코딩). 기록한 프레임 수 반환."""
+    writer: cv2.VideoWriter | None = None
+    frames = 0
+    for p in paths:
+        cap = cv2.VideoCapture(p)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if writer is None:
+                h, w = frame.shape[:2]
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                writer = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+            writer.write(frame)
+            frames += 1
+        cap.release()
+    if writer is not None:
+        writer.release()
+    return frames
+
+
+if __name__ == "__main__":
+    # 패키지 모듈로 다시 import → pickle되는 클래스 경로가 부모 프로세스와 같음 (utils.sharding.*)
+    from utils.sharding import worker_main as _worker_main
+
+    _worker_main(Path(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))
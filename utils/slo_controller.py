@@ -0,0 +1,135 @@
+"""
+Latency SLO 컨트롤러: 실행 중 추론 지연을 보고 imgsz와 frame stride(SKIP_FRAMES)를 목표에 맞게 조절.
+
+목표는 둘 중 하나 또는 둘 다:
+- target_ms:  처리 프레임 하나의 추론 지연 (preprocess + inference + postprocess, 최근 window의 quantile)
+- target_fps: 원본 영상 기준 처리 속도 = stride × 1000 / 지연 (예: 30이면 30fps 입력을 실시간으로 따라감)
+
+부하 비율 r = max(지연 / target_ms, target_fps × 지연 / (stride × 1000))
+- r > 1 + hysteresis: 낮춤. imgsz 한 단계 ↓ (두 목표 모두에 효과), imgsz가 최소면 stride ↑ (target_fps만 해당)
+- r < 1 - hysteresis: 올림. 되돌리는 순서(stride ↓ → imgsz ↑)로, 바꾼 뒤 예상 r(지연 ∝ imgsz²)도 1 - hysteresis 미만일 때만
+- 그 사이는 유지 (dead band). 조정 후에는 window를 비우고 새 설정으로 window가 다시 찰 때까지 판단하지 않음 → 진동 방지
+"""
+from collections import deque
+
+import numpy as np
+
+
+def imgsz_ladder(lo: int, hi: int, step: int = 64, stride: int = 32) -> list[int]:
+    """lo~hi 사이 imgsz 단계 (모델 stride 배수로 맞춤, 양 끝 포함)."""
+    lo, hi = max(stride, lo // stride * stride), max(stride, hi // stride * stride)
+    levels = list(range(lo, hi, max(stride, step // stride * stride))) + [hi]
+    return sorted(set(levels))
+
+
+class LatencySLOController:
+    """프레임마다 update(지연 ms) → 조정이 있으면 slo/* 메트릭 dict, 없으면 None. 현재 설정은 imgsz / stride."""
+
+    def __init__(
+        self,
+        imgsz_levels: list[int],
+        imgsz: int,
+        stride: int = 1,
+        stride_min: int = 1,
+        stride_max: int = 8,
+        target_ms: float = 0.0,
+        target_fps: float = 0.0,
+        window: int = 30,
+        quantile: float = 0.9,
+        hysteresis: float = 0.15,
+        warmup: int = 2,
+    ):
+        if target_ms <= 0 and target_fps <= 0:
+            raise ValueError("target_ms 또는 target_fps 중 하나는 0보다 커야 합니다")
+        self.levels = sorted(imgsz_levels)
+        # 시작 imgsz는 그 이하의 가장 큰 단계
+        self._level = max([i for i, s in enumerate(self.levels) if s <= imgsz] or [0])
+        self.stride_min = max(1, stride_min)
+        self.stride_max = max(self.stride_min, stride_max)
+        self.stride = min(max(stride, self.stride_min), self.stride_max)
+        self.target_ms = target_ms
+        self.target_fps = target_fps
+        self.window = max(2, window)
+        self.quantile = quantile
+        self.hysteresis = hysteresis
+        self.warmup = warmup
+        self._lat: deque[float] = deque(maxlen=self.window)
+        self._skip = warmup  # 설정이 바뀐 직후 몇 프레임은 제외 (새 입력 크기 첫 실행 비용)
+        self.adjustments = 0
+        self.saturated = 0  # 목표를 넘었지만 더 낮출 수 없었던 판단 횟수
+        self.frames = 0
+        self.violations = 0
+        self._imgsz_sum = 0
+        self._stride_sum = 0
+
+    @property
+    def imgsz(self) -> int:
+        return self.levels[self._level]
+
+    def budget_ms(self, stride: int | None = None) -> float:
+        """현재(또는 주어진) stride에서 처리 프레임 하나에 허용되는 지연."""
+        budgets = []
+        if self.target_ms > 0:
+            budgets.append(self.target_ms)
+        if self.target_fps > 0:
+            budgets.append((stride or self.stride) * 1000.0 / self.target_fps)
+        return min(budgets)
+
+    def _ratio(self, latency_ms: float, stride: int) -> float:
+        return latency_ms / self.budget_ms(stride)
+
+    def state(self) -> dict[str, float]:
+        return {"slo/imgsz": float(self.imgsz), "slo/stride": float(self.stride)}
+
+    def update(self, latency_ms: float) -> dict[str, float] | None:
+        self.frames += 1
+        self._imgsz_sum += self.imgsz
+        self._stride_sum += self.stride
+        if latency_ms > self.budget_ms():
+            self.violations += 1
+        if self._skip > 0:
+            self._skip -= 1
+            return None
+        self._lat.append(latency_ms)
+        if len(self._lat) < self.window:
+            return None
+        lat = float(np.quantile(self._lat, self.quantile))
+        ratio = self._ratio(lat, self.stride)
+        direction = 0
+        if ratio > 1.0 + self.hysteresis:
+            if self._level > 0:
+                self._level -= 1
+                direction = -1
+            elif self.target_fps > 0 and self.stride < self.stride_max:
+                self.stride += 1
+                direction = -1
+            else:
+                self.saturated += 1
+        elif ratio < 1.0 - self.hysteresis:
+            ok = 1.0 - self.hysteresis
+            if self.stride > self.stride_min and self._ratio(lat, self.stride - 1) < ok:
+                self.stride -= 1
+                direction = 1
+            elif self._level + 1 < len(self.levels):
+                scale = (self.levels[self._level + 1] / self.imgsz) ** 2
+                if self._ratio(lat * scale, self.stride) < ok:
+                    self._level += 1
+                    direction = 1
+        if direction == 0:
+            return None
+        self.adjustments += 1
+        self._lat.clear()
+        self._skip = self.warmup
+        return {**self.state(), "slo/latency_ms": lat, "slo/load_ratio": ratio, "slo/direction": float(direction)}
+
+    def metrics(self) -> dict[str, float]:
+        n = self.frames
+        return {
+            "slo/adjustments": float(self.adjustments),
+            "slo/saturated": float(self.saturated),
+            "slo/violation_rate": self.violations / n if n else 0.0,
+            "slo/imgsz_avg": self._imgsz_sum / n if n else float(self.imgsz),
+            "slo/stride_avg": self._stride_sum / n if n else float(self.stride),
+            "slo/imgsz_final": float(self.imgsz),
+            "slo/stride_final": float(self.stride),
+        }
@@ -0,0 +1,240 @@
+"""
+스테이지별 타이머 레지스트리 (perf_counter_ns + 고정 로그 히스토그램).
+추론 루프의 decode / infer / postprocess / log / encode 등을 감싸 p50/p99와 wall time 대비 비중을 집계하고,
+MLflow 메트릭과 Chrome trace JSON(chrome://tracing, Perfetto)으로 내보냄.
+비활성화 시 stage()는 공유 no-op 객체를 반환하므로 호출 비용만 남음.
+"""
+import json
+import math
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+# 고정 로그 히스토그램: 1µs ~ 100s, bin 폭 약 2% (p50/p99 상대 오차 ~1%)
+_HIST_LO_NS = 1_000
+_HIST_HI_NS = 100_000_000_000
+_HIST_BINS = 1000
+_LOG_LO = math.log(_HIST_LO_NS)
+_BIN_SCALE = _HIST_BINS / (math.log(_HIST_HI_NS) - _LOG_LO)
+
+
+class _StageStats:
+    """스테이지 하나의 누적 시간·횟수 + 고정 로그 히스토그램."""
+
+    __slots__ = ("count", "total_ns", "max_ns", "counts")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.counts = [0] * _HIST_BINS  # 원소 단위 += 는 list가 ndarray보다 빠름
+
+    def add(self, dur_ns: int) -> None:
+        self.count += 1
+        self.total_ns += dur_ns
+        if dur_ns > self.max_ns:
+            self.max_ns = dur_ns
+        if dur_ns <= _HIST_LO_NS:
+            i = 0
+        else:
+            i = min(_HIST_BINS - 1, int((math.log(dur_ns) - _LOG_LO) * _BIN_SCALE))
+        self.counts[i] += 1
+
+    def quantile_ns(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        i = min(i, _HIST_BINS - 1)
+        # bin 중앙값 (로그 스케일)
+        return math.exp(_LOG_LO + (i + 0.5) / _BIN_SCALE)
+
+
+class _Span:
+    """stage()가 반환하는 context manager. 스테이지마다 하나를 재사용 (시작 시각은 스레드별 저장, 같은 스레드에서 같은 스테이지 중첩은 불가)."""
+
+    __slots__ = ("timers", "name", "_local")
+
+    def __init__(self, timers: "StageTimers", name: str):
+        self.timers = timers
+        self.name = name
+        self._local = threading.local()
+
+    def __enter__(self) -> "_Span":
+        self._local.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        t0 = self._local.t0
+        self.timers.record(self.name, time.perf_counter_ns() - t0, t0)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class StageTimers:
+    """
+    이름별 스테이지 타이머.
+
+    - with timers.stage("decode"): ...  또는 timers.record("infer", dur_ns)
+    - wrap_iter(name, it): 이터레이터의 next() 시간을 name 스테이지로 기록 (decode 등)
+    - summary(): stage/<name>_{count,mean_ms,p50_ms,p99_ms,max_ms,share} (share = 누적 시간 / wall time)
+    - trace_events개까지 Chrome trace 이벤트 보관 (넘으면 오래된 것부터 버림, 0이면 trace 생략)
+    """
+
+    def __init__(self, enabled: bool = True, trace_events: int = 100_000):
+        self.enabled = enabled
+        self._stats: dict[str, _StageStats] = {}
+        self._spans: dict[str, _Span] = {}
+        self._events: deque[tuple[str, int, int, int]] = deque(maxlen=trace_events) if trace_events else deque(maxlen=0)
+        self._lock = threading.Lock()
+        self._start_ns = time.perf_counter_ns()
+        self._end_ns = self._start_ns
+
+    def stage(self, name: str) -> Any:
+        if not self.enabled:
+            return _NULL_SPAN
+        span = self._spans.get(name)
+        if span is None:
+            span = self._spans.setdefault(name, _Span(self, name))
+        return span
+
+    def record(self, name: str, dur_ns: int, start_ns: int | None = None) -> None:
+        """측정된 구간 하나 기록. start_ns가 없으면 지금 끝난 구간으로 간주."""
+        if not self.enabled:
+            return
+        if start_ns is None:
+            start_ns = time.perf_counter_ns() - dur_ns
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = _StageStats()
+            st.add(dur_ns)
+            end_ns = start_ns + dur_ns
+            if end_ns > self._end_ns:
+                self._end_ns = end_ns
+            if self._events.maxlen:
+                self._events.append((name, start_ns, dur_ns, threading.get_ident()))
+
+    def wrap_iter(self, name: str, it: Iterable[Any]) -> Iterator[Any]:
+        """next() 호출마다 걸린 시간을 name 스테이지로 기록하며 그대로 전달."""
+        if not self.enabled:
+            yield from it
+            return
+        it = iter(it)
+        while True:
+            t0 = time.perf_counter_ns()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter_ns() - t0, t0)
+            yield item
+
+    def reset_wall(self) -> None:
+        """wall time 기준점을 지금으로 (모델 로드 등 준비 시간 제외)."""
+        self._start_ns = self._end_ns = time.perf_counter_ns()
+
+    @property
+    def wall_ns(self) -> int:
+        return max(1, self._end_ns - self._start_ns)
+
+    def summary(self, prefix: str = "stage") -> dict[str, float]:
+        out: dict[str, float] = {}
+        if not self.enabled:
+            return out
+        with self._lock:
+            items = list(self._stats.items())
+        wall = self.wall_ns
+        for name, st in items:
+            out[f"{prefix}/{name}_count"] = float(st.count)
+            out[f"{prefix}/{name}_mean_ms"] = st.total_ns / st.count / 1e6 if st.count else 0.0
+            out[f"{prefix}/{name}_p50_ms"] = st.quantile_ns(0.50) / 1e6
+            out[f"{prefix}/{name}_p99_ms"] = st.quantile_ns(0.99) / 1e6
+            out[f"{prefix}/{name}_max_ms"] = st.max_ns / 1e6
+            out[f"{prefix}/{name}_share"] = st.total_ns / wall
+        out[f"{prefix}/wall_s"] = wall / 1e9
+        return out
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Chrome trace event 포맷 (complete 이벤트 "X", µs 단위)."""
+        with self._lock:
+            events = list(self._events)
+        tids: dict[int, int] = {}
+        trace = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._start_ns) / 1e3,
+                "dur": dur / 1e3,
+                "pid": 0,
+                "tid": tids.setdefault(tid, len(tids)),
+            }
+            for name, start, dur, tid in events
+        ]
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.chrome_trace()), encoding="utf-8")
+        return path
+
+    def log_to_mlflow(self, sink: Any = None, trace_artifact: str | None = "stats/stage_trace.json") -> dict[str, float]:
+        """summary를 sink(또는 mlflow)에 로깅, trace_artifact가 있으면 Chrome trace JSON도 아티팩트로."""
+        import mlflow
+
+        metrics = self.summary()
+        if not metrics:
+            return metrics
+        (sink or mlflow).log_metrics(metrics)
+        if trace_artifact and self._events:
+            mlflow.log_dict(self.chrome_trace(), trace_artifact)
+        return metrics
+
+
+class EndToEndClock:
+    """
+    처음 warmup 프레임을 뺀 end-to-end FPS (디코딩부터 인코딩까지 루프 전체).
+    warmup은 배치 경계로 올림 → 마지막 warmup 프레임 처리가 끝난 시점(= 첫 측정 배치 직전)부터 측정.
+    루프에서 프레임마다 tick(), 루프(와 encode 큐)가 끝나면 stop().
+    """
+
+    def __init__(self, warmup: int = 0, batch: int = 1):
+        self.warmup = -(-max(0, warmup) // max(1, batch)) * max(1, batch)
+        self.frames = 0
+        self._t0: float | None = time.perf_counter() if self.warmup == 0 else None
+        self._t1 = self._t0
+
+    def tick(self) -> None:
+        self.frames += 1
+        now = time.perf_counter()
+        if self.frames == self.warmup:
+            self._t0 = now
+        self._t1 = now
+
+    def stop(self) -> None:
+        if self._t0 is not None:
+            self._t1 = time.perf_counter()
+
+    def metrics(self, prefix: str = "e2e") -> dict[str, float]:
+        measured = max(0, self.frames - self.warmup)
+        wall = self._t1 - self._t0 if self._t0 is not None and self._t1 is not None else 0.0
+        return {
+            f"{prefix}/frames": float(measured),
+            f"{prefix}/wall_s": wall,
+            f"{prefix}/fps": measured / wall if wall > 0 else 0.0,
+        }
@@ -0,0 +1,189 @@
+"""
+상수 메모리 스트리밍 통계: 온라인 평균/분산·min/max, 고정 구간 히스토그램, quantile sketch.
+프레임마다 값을 리스트에 쌓지 않고 O(1)로 갱신 → 수 시간 스트림에서도 메모리 일정,
+p50/p95/p99 지연·신뢰도 분포를 Run 종료 시 요약.
+"""
+import math
+from typing import Iterable
+
+import numpy as np
+
+
+class RunningStats:
+    """Welford 온라인 평균/분산 + min/max. update_many는 배치 병합(Chan)으로 O(배치 크기)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def update_many(self, xs: np.ndarray) -> None:
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        n = xs.size
+        if n == 0:
+            return
+        b_mean = float(xs.mean())
+        b_m2 = float(((xs - b_mean) ** 2).sum())
+        total = self.count + n
+        delta = b_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += b_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(xs.min()))
+        self.max = max(self.max, float(xs.max()))
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class FixedHistogram:
+    """[lo, hi) 구간을 bins개로 나눈 히스토그램. 범위 밖 값은 양 끝 bin에 포함."""
+
+    def __init__(self, lo: float, hi: float, bins: int = 100):
+        self.lo = lo
+        self.hi = hi
+        self.bins = bins
+        self._width = (hi - lo) / bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def _index(self, xs: np.ndarray) -> np.ndarray:
+        idx = ((xs - self.lo) / self._width).astype(np.int64)
+        return np.clip(idx, 0, self.bins - 1)
+
+    def update(self, x: float) -> None:
+        i = int((x - self.lo) / self._width)
+        self.counts[min(max(i, 0), self.bins - 1)] += 1
+
+    def update_many(self, xs: np.ndarray) -> None:
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        if xs.size:
+            self.counts += np.bincount(self._index(xs), minlength=self.bins)
+
+    def quantile(self, q: float) -> float:
+        """bin 내부 선형 보간 quantile (해상도 = bin 폭)."""
+        total = int(self.counts.sum())
+        if total == 0:
+            return 0.0
+        target = q * total
+        cum = np.cumsum(self.counts)
+        i = int(np.searchsorted(cum, target, side="left"))
+        i = min(i, self.bins - 1)
+        prev = cum[i - 1] if i > 0 else 0
+        frac = (target - prev) / self.counts[i] if self.counts[i] else 0.0
+        return self.lo + (i + frac) * self._width
+
+    def as_dict(self) -> dict[str, list[float]]:
+        """아티팩트 저장용 {edges, counts}."""
+        edges = [self.lo + i * self._width for i in range(self.bins + 1)]
+        return {"edges": edges, "counts": self.counts.tolist()}
+
+
+class QuantileSketch:
+    """
+    로그 구간 quantile sketch (DDSketch 방식). 상대 오차 relative_accuracy 이내,
+    bin 수가 max_bins를 넘으면 가장 작은 bin끼리 병합 → 메모리 상한 고정.
+    음수가 아닌 값(지연 시간 등) 전용.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048, min_value: float = 1e-9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, x: float) -> None:
+        self.count += 1
+        if x <= self.min_value:
+            self.zero_count += 1
+            return
+        k = math.ceil(math.log(x) / self._log_gamma)
+        self.bins[k] = self.bins.get(k, 0) + 1
+        if len(self.bins) > self.max_bins:
+            lo, nxt = sorted(self.bins)[:2]
+            self.bins[nxt] += self.bins.pop(lo)
+
+    def update_many(self, xs: Iterable[float]) -> None:
+        for x in xs:
+            self.update(float(x))
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        cum = self.zero_count
+        if rank < cum:
+            return 0.0
+        for k in sorted(self.bins):
+            cum += self.bins[k]
+            if cum > rank:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class StreamSummary:
+    """
+    RunningStats + 분포(quantile sketch 또는 고정 히스토그램) 조합.
+
+    - hist_range가 없으면 QuantileSketch (지연 ms처럼 범위를 모르는 양수 값)
+    - hist_range=(lo, hi)면 FixedHistogram (신뢰도 0~1처럼 범위가 정해진 값)
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, hist_range: tuple[float, float] | None = None, bins: int = 1000):
+        self.stats = RunningStats()
+        self.hist: FixedHistogram | None = FixedHistogram(*hist_range, bins=bins) if hist_range else None
+        self.sketch: QuantileSketch | None = None if hist_range else QuantileSketch()
+
+    def update(self, x: float) -> None:
+        self.stats.update(x)
+        (self.hist or self.sketch).update(x)
+
+    def update_many(self, xs: np.ndarray) -> None:
+        self.stats.update_many(xs)
+        (self.hist or self.sketch).update_many(xs)
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    def quantile(self, q: float) -> float:
+        return (self.hist or self.sketch).quantile(q)
+
+    def summary(self, prefix: str) -> dict[str, float]:
+        """{prefix}_mean/_std/_min/_max/_p50/_p95/_p99 (값이 없으면 빈 dict)."""
+        if self.stats.count == 0:
+            return {}
+        out = {
+            f"{prefix}_mean": float(self.stats.mean),
+            f"{prefix}_std": float(self.stats.std),
+            f"{prefix}_min": float(self.stats.min),
+            f"{prefix}_max": float(self.stats.max),
+        }
+        for q in self.QUANTILES:
+            out[f"{prefix}_p{round(q * 100)}"] = float(self.quantile(q))
+        return out
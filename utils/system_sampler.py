@@ -0,0 +1,136 @@
+"""
+시스템 메트릭(CPU/메모리/GPU) 백그라운드 샘플러.
+추론 스레드에서 매번 psutil/pynvml을 호출하지 않고, 전용 스레드가 고정 간격(wall time)으로
+샘플링해 ring buffer에 보관. 추론 루프는 latest()로 마지막 스냅샷만 읽음 (블로킹 없음).
+"""
+import threading
+import time
+from collections import deque
+from typing import Any
+
+
+class SystemMetricsSampler:
+    """
+    interval_s마다 sys/* 메트릭 샘플 → ring buffer(buffer_size개).
+
+    - psutil.Process는 한 번만 생성 (cpu_percent가 직전 샘플 대비 사용률을 반환)
+    - use_gpu면 NVML을 한 번만 초기화, 실패하거나 GPU가 없으면 CPU 전용으로 동작
+    - summary()는 버퍼 샘플 기준 {key}_max / {key}_mean
+    """
+
+    def __init__(self, interval_s: float = 1.0, device_id: int = 0, use_gpu: bool = True, buffer_size: int = 3600):
+        self.interval_s = interval_s
+        self.device_id = device_id
+        self.samples: deque[dict[str, float]] = deque(maxlen=buffer_size)
+        self._latest: dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._process: Any = None
+        self._nvml: Any = None
+        self._handle: Any = None
+        try:
+            import psutil
+            self._process = psutil.Process()
+            self._process.cpu_percent()  # 첫 호출은 기준점 (항상 0.0)
+        except Exception:
+            self._process = None
+        if use_gpu:
+            self._init_nvml()
+
+    def _init_nvml(self) -> None:
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+            if pynvml.nvmlDeviceGetCount() <= self.device_id:
+                pynvml.nvmlShutdown()
+                return
+            self._handle = pynvml.nvmlDeviceGetHandleByIndex(self.device_id)
+            self._nvml = pynvml
+        except Exception:
+            self._nvml = None
+            self._handle = None
+
+    @property
+    def has_gpu(self) -> bool:
+        return self._nvml is not None
+
+    def sample(self) -> dict[str, float]:
+        """현재 시점 메트릭 1회 수집 (sys/* 키)."""
+        out: dict[str, float] = {}
+        if self._process is not None:
+            try:
+                with self._process.oneshot():
+                    out["sys/cpu_percent"] = self._process.cpu_percent() or 0.0
+                    mem = self._process.memory_info()
+                out["sys/memory_rss_mb"] = mem.rss / (1024 * 1024)
+                out["sys/memory_vms_mb"] = mem.vms / (1024 * 1024)
+            except Exception:
+                pass
+        if self._nvml is not None:
+            nv, handle = self._nvml, self._handle
+            try:
+                mem = nv.nvmlDeviceGetMemoryInfo(handle)
+                util = nv.nvmlDeviceGetUtilizationRates(handle)
+                out["sys/gpu_memory_used_mb"] = mem.used / (1024 * 1024)
+                out["sys/gpu_memory_total_mb"] = mem.total / (1024 * 1024)
+                out["sys/gpu_utilization_pct"] = float(util.gpu)
+            except Exception:
+                pass
+            try:
+                out["sys/gpu_temperature_c"] = float(nv.nvmlDeviceGetTemperature(handle, nv.NVML_TEMPERATURE_GPU))
+            except Exception:
+                pass
+            try:
+                out["sys/gpu_power_w"] = nv.nvmlDeviceGetPowerUsage(handle) / 1000.0  # mW → W
+            except Exception:
+                pass
+        return out
+
+    def _loop(self) -> None:
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            sm = self.sample()
+            if sm:
+                self.samples.append(sm)
+                self._latest = sm  # dict 교체는 원자적 → 읽는 쪽 락 불필요
+            next_t += self.interval_s
+            self._stop.wait(max(0.0, next_t - time.monotonic()))
+
+    def latest(self) -> dict[str, float]:
+        """가장 최근 샘플 (아직 없으면 빈 dict). 블로킹 없음."""
+        return self._latest
+
+    def start(self) -> "SystemMetricsSampler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="system-metrics-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, 2 * self.interval_s))
+        if self._nvml is not None:
+            try:
+                self._nvml.nvmlShutdown()
+            except Exception:
+                pass
+            self._nvml = None
+
+    def summary(self) -> dict[str, float]:
+        """버퍼 샘플 기준 {key}_max / {key}_mean."""
+        samples = list(self.samples)
+        out: dict[str, float] = {}
+        keys = {k for s in samples for k in s}
+        for k in sorted(keys):
+            vals = [s[k] for s in samples if s.get(k) is not None]
+            if vals:
+                out[f"{k}_max"] = max(vals)
+                out[f"{k}_mean"] = sum(vals) / len(vals)
+        return out
+
+    def __enter__(self) -> "SystemMetricsSampler":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
@@ -0,0 +1,71 @@
+"""
+저장된 검출(검출 캐시 엔트리 또는 detection store Parquet)을 영상·모델 없이 tracker에 바로 입력.
+ByteTrack / BoT-SORT 설정 하나를 시험하는 비용이 검출기 한 번이 아니라 tracker 갱신(CPU)만으로 줄어듦.
+
+- 이미지가 없으므로 BoT-SORT의 GMC(카메라 모션 보정)와 ReID는 적용되지 않음 (gmc_method 무시)
+- 출력은 tracker가 ID를 부여한 박스만 (MOT 예측 파일과 같은 mot_rows 배열)
+"""
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+from ultralytics.engine.results import Boxes
+
+from utils.detection_cache import CachedDetections
+from utils.detection_store import StoredDetections
+from utils.detections import FrameDetections, mot_rows
+from utils.tracking import make_tracker
+
+
+def load_detections(path: str | Path, source_id: str | None = None, frames: int | None = None) -> StoredDetections:
+    """검출 캐시 엔트리 디렉터리(meta.json 포함) 또는 detection store Parquet 파일 로드."""
+    path = Path(path)
+    if path.is_dir():
+        return CachedDetections(path)
+    return StoredDetections(path, source_id=source_id, frames=frames)
+
+
+def track_frames(
+    frames: Iterable[tuple[int, FrameDetections]],
+    tracker: str = "bytetrack.yaml",
+    overrides: dict[str, Any] | None = None,
+    frame_rate: int = 30,
+    conf: float = 0.0,
+) -> Iterable[tuple[int, FrameDetections]]:
+    """(프레임 번호, 검출) → (프레임 번호, ID가 붙은 track 박스). conf 미만 검출은 tracker 입력 전에 제외."""
+    trk = make_tracker(tracker, frame_rate=frame_rate, overrides=overrides)
+    for n, det in frames:
+        if conf > 0.0:
+            det = det.select(det.conf >= conf)
+        data = np.empty((len(det), 6), dtype=np.float32)
+        data[:, :4] = det.xyxy
+        data[:, 4] = det.conf
+        data[:, 5] = det.cls
+        # orig_shape는 정규화 좌표(xyxyn 등)에만 쓰이고 tracker는 사용하지 않음
+        tracks = trk.update(Boxes(data, (1, 1)), None)
+        if len(tracks) == 0:
+            yield n, FrameDetections.empty()
+            continue
+        # tracks: x1,y1,x2,y2,track_id,score,cls,det_idx
+        yield n, FrameDetections(
+            xyxy=tracks[:, :4].astype(np.float32),
+            conf=tracks[:, 5].astype(np.float32),
+            cls=tracks[:, 6].astype(np.int64),
+            ids=tracks[:, 4].astype(np.int64),
+        )
+
+
+def replay_mot_rows(
+    detections: StoredDetections,
+    tracker: str = "bytetrack.yaml",
+    overrides: dict[str, Any] | None = None,
+    frame_rate: int = 30,
+    conf: float = 0.0,
+) -> np.ndarray:
+    """저장된 검출 전체를 tracker로 재생 → MOT 예측 행 배열 (N,7)."""
+    rows = [
+        mot_rows(n, tracked)
+        for n, tracked in track_frames(detections, tracker, overrides, frame_rate, conf)
+        if len(tracked)
+    ]
+    return np.concatenate(rows) if rows else np.zeros((0, 7), dtype=np.float64)
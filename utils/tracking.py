@@ -0,0 +1,67 @@
+"""
+Ultralytics tracker(ByteTrack / BoT-SORT)를 model.track() 없이 직접 사용.
+model.track(persist=True)는 predictor에 tracker 하나를 붙여 두므로, 여러 영상을 한 모델로
+처리하거나 검출 결과만으로 tracker를 돌릴 때는 스트림마다 tracker 객체를 따로 만들어 갱신.
+"""
+import inspect
+from typing import Any
+
+import torch
+from ultralytics.trackers.bot_sort import BOTSORT
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils import IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+try:
+    from ultralytics.utils import YAML
+    _yaml_load = YAML.load
+except ImportError:  # Ultralytics < 8.3.1xx
+    from ultralytics.utils import yaml_load as _yaml_load
+
+TRACKER_MAP = {"bytetrack": BYTETracker, "botsort": BOTSORT}
+
+
+def load_tracker_cfg(tracker: str = "bytetrack.yaml", overrides: dict[str, Any] | None = None) -> IterableSimpleNamespace:
+    """tracker yaml(Ultralytics 내장 이름 또는 경로) 로드 + overrides 적용."""
+    cfg = dict(_yaml_load(check_yaml(tracker)))
+    if overrides:
+        cfg.update(overrides)
+    if cfg.get("tracker_type") not in TRACKER_MAP:
+        raise ValueError(f"지원하지 않는 tracker_type: {cfg.get('tracker_type')} (bytetrack/botsort)")
+    return IterableSimpleNamespace(**cfg)
+
+
+def make_tracker(
+    tracker: str = "bytetrack.yaml",
+    frame_rate: int = 30,
+    overrides: dict[str, Any] | None = None,
+) -> BYTETracker:
+    """스트림 하나에 쓸 tracker 인스턴스 생성."""
+    cfg = load_tracker_cfg(tracker, overrides)
+    if cfg.tracker_type == "botsort" and getattr(cfg, "with_reid", False):
+        # ReID 모델은 predictor 없이 쓸 수 없으므로 모션+IoU만 사용
+        cfg.with_reid = False
+    tracker_cls = TRACKER_MAP[cfg.tracker_type]
+    if "frame_rate" in inspect.signature(tracker_cls.__init__).parameters:
+        return tracker_cls(args=cfg, frame_rate=frame_rate)
+    # 최신 Ultralytics는 frame_rate 인자 없이 track_buffer를 프레임 수로 사용 → 기존 동작(30fps 기준 환산)에 맞춤
+    cfg.track_buffer = max(1, int(frame_rate / 30.0 * cfg.track_buffer))
+    return tracker_cls(args=cfg)
+
+
+def apply_tracker(tracker: BYTETracker, result: Any) -> Any:
+    """
+    검출 결과(Ultralytics Results)로 tracker를 한 프레임 갱신하고 ID가 붙은 결과 반환.
+    ultralytics.trackers.track.on_predict_postprocess_end와 같은 동작.
+    """
+    det = result.boxes.cpu().numpy()
+    tracks = tracker.update(det, result.orig_img)
+    if len(tracks) == 0:
+        # 아직 확정되지 않은 새 track만 있으면 빈 결과 (model.track()과 동일)
+        if any(not t.is_activated for t in getattr(tracker, "tracked_stracks", ())):
+            return result[:0]
+        return result
+    idx = tracks[:, -1].astype(int)
+    tracked = result[idx]
+    tracked.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return tracked
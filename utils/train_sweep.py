@@ -0,0 +1,304 @@
+"""
+YOLO 학습 하이퍼파라미터 sweep: YAML 탐색 공간 → trial 목록, 조기 종료 스케줄러, 자원 기반 워커 수, 재개용 상태 파일.
+
+- 탐색 공간 YAML은 두 형식을 받음
+  - sweep 형식: base(모든 trial 공통 학습 인자) + search.params(name: [값...] 또는 {low, high, log}) + scheduler + resources
+  - lab 설정 형식(lab/exp_bdd100k/config.yaml): training의 목록 값(model_sizes 등)이 grid 축, 스칼라는 base
+- 스케줄러는 trial이 에포크마다 보고하는 값(기본 val/mAP50-95)으로 계속/중단을 결정
+  - asha:   에포크 grace × η^k 지점(rung)마다, 그 rung에 먼저 도달한 trial들 중 상위 1/η에 못 들면 중단 (비동기 successive halving)
+  - median: grace 이후 trial의 지금까지 최고값이 같은 에포크까지 다른 trial들의 running 평균의 중앙값보다 나쁘면 중단
+- 상태(state.json)는 trial마다 상태·MLflow run_id·보고 에포크를 기록 → 중단된 sweep을 같은 디렉터리로 다시 실행하면 이어서 진행.
+  스케줄러 상태는 저장하지 않고 trial들의 reports.jsonl을 다시 재생해 복원 (판단이 결정적이라 같은 결과)
+"""
+import hashlib
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import yaml
+
+from utils.search_space import SEARCH_METHODS, expand_search_space
+
+DEFAULT_METRIC = "val/mAP50-95"
+SCHEDULERS = ("asha", "median", "none")
+# lab 설정의 키 → Ultralytics train 인자
+_LAB_KEYS = {"model_sizes": "model", "model_size": "model", "batch_size": "batch"}
+
+
+@dataclass
+class SweepSpec:
+    """sweep 하나의 설정. trial 학습 인자 = base + 탐색 공간에서 뽑은 값."""
+
+    name: str
+    data: str
+    experiment: str
+    base: dict[str, Any]
+    params: dict[str, Any]
+    method: str = "grid"
+    trials: int = 20
+    seed: int = 0
+    scheduler: dict[str, Any] = field(default_factory=dict)
+    resources: dict[str, Any] = field(default_factory=dict)
+    subset: float = 0.0  # train 계층 샘플 비율 (0이면 전체 데이터, utils/dataset_subset.py)
+
+    @property
+    def metric(self) -> str:
+        return self.scheduler.get("metric", DEFAULT_METRIC)
+
+    @property
+    def mode(self) -> str:
+        return self.scheduler.get("mode", "max")
+
+    def fingerprint(self) -> str:
+        """재개 시 같은 sweep인지 확인하는 해시 (탐색 공간·base·스케줄러·부분집합 비율)."""
+        items = [self.data, self.base, self.params, self.method, self.trials, self.seed, self.scheduler]
+        if self.subset:
+            items.append(self.subset)  # 전체 데이터 sweep은 이전 해시 그대로 (기존 sweep 재개 가능)
+        payload = json.dumps(items, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _model_weight(v: Any) -> Any:
+    """lab 설정의 모델 크기(yolov8n) → 가중치 파일 이름(yolov8n.pt). 이미 확장자가 있으면 그대로."""
+    return f"{v}.pt" if isinstance(v, str) and not Path(v).suffix else v
+
+
+def load_sweep_spec(path: Path) -> SweepSpec:
+    """YAML → SweepSpec. search 섹션이 있으면 sweep 형식, 없으면 lab 설정 형식으로 해석."""
+    with open(path, encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    if "search" in cfg:
+        search = cfg["search"] or {}
+        params = dict(search.get("params") or {})
+        base = dict(cfg.get("base") or {})
+        spec = SweepSpec(
+            name=cfg.get("name", path.stem),
+            data=str(cfg.get("data", "")),
+            experiment=cfg.get("experiment", "yolo-sweep"),
+            base=base,
+            params=params,
+            method=search.get("method", "grid"),
+            trials=int(search.get("trials", 20)),
+            seed=int(search.get("seed", 0)),
+            scheduler=dict(cfg.get("scheduler") or {}),
+            resources=dict(cfg.get("resources") or {}),
+            subset=float(cfg.get("subset") or 0),
+        )
+    else:
+        training = cfg.get("training") or {}
+        base, params = {}, {}
+        for k, v in training.items():
+            key = _LAB_KEYS.get(k, k)
+            (params if isinstance(v, list) else base)[key] = v
+        spec = SweepSpec(
+            name=(cfg.get("dataset") or {}).get("name", path.stem),
+            data=str((cfg.get("dataset") or {}).get("path", "")),
+            experiment=(cfg.get("mlflow") or {}).get("experiment_name", "yolo-sweep"),
+            base=base,
+            params=params,
+            scheduler=dict(cfg.get("scheduler") or {}),
+            resources=dict(cfg.get("resources") or {}),
+            subset=float((cfg.get("dataset") or {}).get("subset") or 0),
+        )
+    if "model" in spec.params:
+        spec.params["model"] = [_model_weight(v) for v in spec.params["model"]]
+    if "model" in spec.base:
+        spec.base["model"] = _model_weight(spec.base["model"])
+    if not spec.data:
+        raise ValueError(f"{path}: 데이터셋 경로(data 또는 dataset.path)가 없습니다")
+    if not 0 <= spec.subset < 1:
+        raise ValueError(f"{path}: subset은 0(전체) 이상 1 미만: {spec.subset}")
+    if spec.method not in SEARCH_METHODS:
+        raise ValueError(f"{path}: search.method는 grid 또는 random: {spec.method}")
+    if spec.scheduler.get("type", "asha") not in SCHEDULERS:
+        raise ValueError(f"{path}: scheduler.type은 {'/'.join(SCHEDULERS)}: {spec.scheduler.get('type')}")
+    return spec
+
+
+def expand_trials(spec: SweepSpec) -> list[dict[str, Any]]:
+    """grid: 값 목록의 전체 조합 / random: 목록·범위({low, high, log})에서 중복 없이 spec.trials개 (seed 고정)."""
+    return expand_search_space(spec.params, spec.method, spec.trials, spec.seed)
+
+
+# ---------------------------------------------------------------- 조기 종료
+
+class NoStopping:
+    """모든 trial을 끝까지."""
+
+    def report(self, trial: int, epoch: int, value: float) -> bool:
+        return False
+
+
+class ASHAScheduler:
+    """
+    비동기 successive halving (ASHA). rung = grace_epochs × η^k (< max_epochs).
+    trial이 rung에 처음 도달하면 그 rung에 이미 기록된 값들의 (1 - 1/η) 분위수와 비교해 낮으면 중단.
+    먼저 도달한 trial은 비교 대상이 적어 통과하기 쉬움 (비동기 버전의 특성, 기다리지 않는 대신).
+    """
+
+    def __init__(self, max_epochs: int, grace_epochs: int = 1, reduction_factor: float = 3, mode: str = "max"):
+        self.rf = reduction_factor
+        self.sign = 1.0 if mode == "max" else -1.0
+        self.rungs: list[int] = []
+        r = max(1, grace_epochs)
+        while r < max_epochs:
+            self.rungs.append(int(r))
+            r = math.ceil(r * reduction_factor)
+        self.recorded: dict[int, dict[int, float]] = {r: {} for r in self.rungs}
+
+    def report(self, trial: int, epoch: int, value: float) -> bool:
+        for rung in reversed(self.rungs):
+            if epoch < rung or trial in self.recorded[rung]:
+                continue
+            values = list(self.recorded[rung].values())
+            cutoff = float(np.percentile(values, (1 - 1 / self.rf) * 100)) if values else -math.inf
+            self.recorded[rung][trial] = self.sign * value
+            return self.sign * value < cutoff
+        return False
+
+
+class MedianStoppingRule:
+    """
+    median stopping: grace_epochs 이후 trial의 지금까지 최고값이, 같은 에포크까지 보고한 다른 trial들의
+    running 평균의 중앙값보다 나쁘면 중단 (비교 trial이 min_samples개 이상일 때만).
+    """
+
+    def __init__(self, grace_epochs: int = 3, min_samples: int = 3, mode: str = "max"):
+        self.grace = grace_epochs
+        self.min_samples = min_samples
+        self.sign = 1.0 if mode == "max" else -1.0
+        self.history: dict[int, dict[int, float]] = {}
+
+    def report(self, trial: int, epoch: int, value: float) -> bool:
+        self.history.setdefault(trial, {})[epoch] = self.sign * value
+        if epoch < self.grace:
+            return False
+        best = max(v for e, v in self.history[trial].items() if e <= epoch)
+        others = [
+            float(np.mean([v for e, v in h.items() if e <= epoch]))
+            for t, h in self.history.items()
+            if t != trial and max(h) >= epoch
+        ]
+        if len(others) < self.min_samples:
+            return False
+        return best < float(np.median(others))
+
+
+def make_scheduler(spec: SweepSpec, max_epochs: int) -> NoStopping | ASHAScheduler | MedianStoppingRule:
+    cfg = spec.scheduler
+    kind = cfg.get("type", "asha")
+    if kind == "asha":
+        return ASHAScheduler(max_epochs, int(cfg.get("grace_epochs", 1)), float(cfg.get("reduction_factor", 3)), spec.mode)
+    if kind == "median":
+        return MedianStoppingRule(int(cfg.get("grace_epochs", 3)), int(cfg.get("min_samples", 3)), spec.mode)
+    return NoStopping()
+
+
+# ---------------------------------------------------------------- 자원
+
+def available_memory_gb() -> float | None:
+    """사용 가능한 메모리(GB). psutil이 없으면 /proc/meminfo, 그것도 없으면 None."""
+    try:
+        import psutil
+
+        return psutil.virtual_memory().available / 1024**3
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024**2
+    except OSError:
+        pass
+    return None
+
+
+def plan_workers(resources: dict[str, Any], num_trials: int) -> tuple[int, int]:
+    """
+    동시 trial 수와 trial당 torch 스레드 수.
+    workers = min(max_workers, 코어 / cpus_per_trial, 사용 가능 메모리 / mem_gb_per_trial, trial 수), 최소 1.
+    """
+    cpus = os.cpu_count() or 1
+    cpus_per_trial = max(1, int(resources.get("cpus_per_trial", 2)))
+    limits = [num_trials, max(1, cpus // cpus_per_trial)]
+    if resources.get("max_workers"):
+        limits.append(int(resources["max_workers"]))
+    mem = available_memory_gb()
+    if mem is not None and resources.get("mem_gb_per_trial"):
+        limits.append(max(1, int(mem // float(resources["mem_gb_per_trial"]))))
+    workers = max(1, min(limits))
+    return workers, max(1, cpus // workers)
+
+
+# ---------------------------------------------------------------- 상태
+
+TRIAL_STATES = ("pending", "running", "completed", "stopped", "failed")
+
+
+class SweepState:
+    """
+    sweep 디렉터리의 state.json: 부모 run_id, spec 해시, trial별 {params, run_id, status, epochs, value}.
+    trial 디렉터리(trial-XXX/)에는 trial.json(워커 입력), reports.jsonl(에포크 보고), decisions.jsonl(스케줄러 응답), result.json.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.path = root / "state.json"
+        self.data: dict[str, Any] = {}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> "SweepState":
+        with open(self.path, encoding="utf-8") as f:
+            self.data = json.load(f)
+        return self
+
+    def init(self, fingerprint: str, parent_run_id: str, trials: list[dict[str, Any]]) -> "SweepState":
+        self.data = {
+            "fingerprint": fingerprint,
+            "parent_run_id": parent_run_id,
+            "trials": [{"id": i, "params": t, "run_id": None, "status": "pending", "epochs": 0, "value": None} for i, t in enumerate(trials)],
+        }
+        self.save()
+        return self
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=1, default=str)
+        tmp.replace(self.path)
+
+    @property
+    def trials(self) -> list[dict[str, Any]]:
+        return self.data["trials"]
+
+    def trial_dir(self, trial_id: int) -> Path:
+        return self.root / f"trial-{trial_id:03d}"
+
+    def counts(self) -> dict[str, int]:
+        return {s: sum(t["status"] == s for t in self.trials) for s in TRIAL_STATES}
+
+
+def read_reports(path: Path, offset: int = 0) -> tuple[list[dict[str, Any]], int]:
+    """reports.jsonl에서 offset 이후의 완성된 줄만 → (보고 목록, 새 offset). 쓰는 중인 마지막 줄은 다음 번에."""
+    if not path.exists():
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1
+    lines = chunk[:end].decode().splitlines()
+    return [json.loads(line) for line in lines if line.strip()], offset + end
+
+
+def append_jsonl(path: Path, row: dict[str, Any]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(row) + "\n")
+        f.flush()
@@ -0,0 +1,352 @@
+"""
+영상 추론 파이프라인: decode 스레드 → 추론(호출자 스레드) → annotate/encode 스레드.
+스테이지 사이는 bounded queue로 연결해 backpressure와 프레임 순서를 보장하고,
+각 스테이지가 큐에서 기다린 시간을 집계해 병목 스테이지를 확인.
+"""
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import cv2
+
+from utils.detections import FrameDetections, label_of
+from utils.stage_timer import StageTimers
+
+_END = object()  # 스트림 종료 sentinel
+
+
+def resolve_source(source: str | Path, cache_path: Path) -> str:
+    """URL이면 OpenCV로 열고, 실패 시 yt-dlp로 cache_path에 다운로드 후 로컬 경로 반환."""
+    path_str = str(source)
+    if not path_str.startswith(("http://", "https://")):
+        return path_str
+
+    cap = cv2.VideoCapture(path_str)
+    if cap.isOpened():
+        cap.release()
+        return path_str
+
+    if not cache_path.exists():
+        print("YouTube URL은 OpenCV로 직접 열 수 없어 yt-dlp로 다운로드합니다...", file=sys.stderr)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        ok = subprocess.run(
+            ["yt-dlp", "-f", "best[ext=mp4]/best", "-o", str(cache_path), "--newline", path_str],
+            timeout=300,
+        ).returncode == 0
+        if not ok:
+            raise RuntimeError("yt-dlp로 다운로드 실패. yt-dlp 설치 후 재시도: pip install yt-dlp")
+    return str(cache_path)
+
+
+class VideoFrameReader:
+    """
+    (원본 프레임 인덱스, BGR 프레임) 스트리밍. skip_frames장마다 1장, 최대 max_frames장.
+
+    건너뛰는 프레임은 cap.grab()만 호출(BGR 변환·복사 없음)하고, 처리할 프레임만 retrieve().
+    grabbed / retrieved 카운터로 실제 디코딩·추론 대상 프레임 수 확인.
+    start_frame > 0이면 그 프레임으로 seek 후 시작 (skip 간격은 원본 프레임 인덱스 기준이라 구간을 나눠 읽어도 같은 프레임 선택).
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, max_frames: int, skip_frames: int = 1, start_frame: int = 0):
+        self.cap = cap
+        self.max_frames = max_frames
+        self.skip_frames = max(1, skip_frames)
+        self.start_frame = start_frame
+        self.grabbed = 0    # 디코더에서 꺼낸 프레임 수 (skip 포함)
+        self.retrieved = 0  # BGR로 가져온(= 추론 대상) 프레임 수
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    def __iter__(self) -> Iterator[tuple[int, Any]]:
+        while self.retrieved < self.max_frames:
+            frame_idx = self.start_frame + self.grabbed
+            if not self.cap.grab():
+                break
+            self.grabbed += 1
+            if frame_idx % self.skip_frames != 0:
+                continue
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                break
+            self.retrieved += 1
+            yield frame_idx, frame
+
+    def metrics(self) -> dict[str, float]:
+        return {"frames_decoded": float(self.grabbed), "frames_retrieved": float(self.retrieved)}
+
+
+class AnnotatedVideoWriter:
+    """
+    박스·라벨을 그린 뒤 VideoWriter.write. 첫 프레임 크기로 writer 생성 (encode 스레드에서도 사용).
+    on_written이 있으면 인코딩이 끝난 프레임으로 호출 (FrameRing.release 등 프레임 버퍼 반환).
+    """
+
+    def __init__(self, path: Path, fps: float, timers: StageTimers | None = None, fourcc: str = "mp4v"):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.writer: cv2.VideoWriter | None = None
+        self.frames = 0
+        self.timers = timers or StageTimers(enabled=False)
+        self.on_written: Callable[[Any], None] | None = None
+
+    def write(self, frame, det: FrameDetections, names: dict[int, str] | list[str] | None) -> None:
+        if self.writer is None:
+            h, w = frame.shape[:2]
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fourcc = cv2.VideoWriter_fourcc(*self.fourcc)
+            self.writer = cv2.VideoWriter(str(self.path), fourcc, self.fps, (w, h))
+        with self.timers.stage("draw"):
+            for (x1, y1, x2, y2), cls_id in zip(det.xyxy.astype(int).tolist(), det.cls.tolist()):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(frame, label_of(names, cls_id), (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        with self.timers.stage("encode"):
+            self.writer.write(frame)
+        self.frames += 1
+        if self.on_written is not None:
+            self.on_written(frame)
+
+    def __call__(self, item: tuple[object, FrameDetections, object]) -> None:
+        self.write(*item)
+
+    def release(self) -> None:
+        if self.writer is not None:
+            self.writer.release()
+
+
+def iter_batches(items: Iterable[Any], batch_size: int, max_wait_s: float | None = None) -> Iterator[list[Any]]:
+    """
+    items를 batch_size개씩 묶어 순서대로 반환 (마지막 배치는 작을 수 있음).
+    max_wait_s가 있으면 배치 첫 항목 이후 그 시간이 지나면 batch_size 미만이어도 반환
+    (새 항목이 도착할 때 검사 — 오프라인 영상에서는 사실상 batch_size 단위).
+    """
+    batch_size = max(1, batch_size)
+    batch: list[Any] = []
+    started = 0.0
+    for item in items:
+        if not batch:
+            started = time.perf_counter()
+        batch.append(item)
+        if len(batch) >= batch_size or (
+            max_wait_s is not None and time.perf_counter() - started >= max_wait_s
+        ):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchThroughput:
+    """배치 추론 호출별 지연·처리량 집계. sink(BufferedMetricSink 등)가 있으면 batch/* step 메트릭 로깅."""
+
+    def __init__(self, sink: Any = None):
+        self.sink = sink
+        self.batches = 0
+        self.frames = 0
+        self.seconds = 0.0
+
+    def record(self, n_frames: int, seconds: float) -> None:
+        self.batches += 1
+        self.frames += n_frames
+        self.seconds += seconds
+        if self.sink is not None:
+            self.sink.log_metrics({
+                "batch/size": n_frames,
+                "batch/latency_ms": seconds * 1000.0,
+                "batch/throughput_fps": n_frames / seconds if seconds > 0 else 0.0,
+            }, step=self.batches)
+
+    def metrics(self) -> dict[str, float]:
+        """요약: 배치 수, 평균 배치 지연, 추론 구간 처리량(frames / 추론 호출 시간 합)."""
+        return {
+            "batch/count": float(self.batches),
+            "batch/latency_ms_mean": self.seconds * 1000.0 / self.batches if self.batches else 0.0,
+            "throughput_fps": self.frames / self.seconds if self.seconds > 0 else 0.0,
+        }
+
+
+class StageTimes:
+    """스테이지별 누적 시간(초): busy(작업), wait_in(입력 큐 대기), wait_out(출력 큐 대기)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_s = 0.0
+        self.wait_in_s = 0.0
+        self.wait_out_s = 0.0
+
+    def as_metrics(self, prefix: str = "pipeline") -> dict[str, float]:
+        return {
+            f"{prefix}/{self.name}_items": float(self.items),
+            f"{prefix}/{self.name}_busy_s": self.busy_s,
+            f"{prefix}/{self.name}_wait_in_s": self.wait_in_s,
+            f"{prefix}/{self.name}_wait_out_s": self.wait_out_s,
+        }
+
+
+class FramePipeline:
+    """
+    3-스테이지 파이프라인. 추론 스테이지는 호출자 스레드(모델·MLflow가 있는 곳)에서 실행.
+
+    사용:
+        with FramePipeline(VideoFrameReader(cap, ...), encode_fn=writer) as pipe:
+            for item in pipe:            # decode 스레드가 채운 큐에서 꺼냄
+                result = model(item)
+                pipe.submit((item, result))   # encode 스레드로 넘김
+        pipe.metrics()  # pipeline/* 대기·작업 시간
+
+    decode_iter와 encode_fn은 각각 전용 스레드에서 실행되며, 어느 쪽이든 예외가 나면
+    호출자 스레드에서 다시 raise.
+    """
+
+    def __init__(self, decode_iter: Iterable[Any], encode_fn: Callable[[Any], None], queue_size: int = 8):
+        self._decode_iter = iter(decode_iter)
+        self._encode_fn = encode_fn
+        self._decoded: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._to_encode: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self.decode = StageTimes("decode")
+        self.infer = StageTimes("infer")
+        self.encode = StageTimes("encode")
+        self._t_wall = time.perf_counter()
+        self._last_get = None
+        self._decoder = threading.Thread(target=self._decode_loop, name="pipeline-decode", daemon=True)
+        self._encoder = threading.Thread(target=self._encode_loop, name="pipeline-encode", daemon=True)
+        self._decoder.start()
+        self._encoder.start()
+        self._closed = False
+
+    # ------------------------------------------------------------ worker 스레드
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """stop 신호를 확인하며 put. 중단되면 False."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode_loop(self) -> None:
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                item = next(self._decode_iter, _END)
+                t1 = time.perf_counter()
+                if item is _END:
+                    break
+                self.decode.busy_s += t1 - t0
+                ok = self._put(self._decoded, item)
+                self.decode.wait_out_s += time.perf_counter() - t1
+                if not ok:
+                    return
+                self.decode.items += 1
+        except BaseException as e:
+            self._error = e
+        self._put(self._decoded, _END)
+
+    def _encode_loop(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = self._to_encode.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                self.encode.wait_in_s += time.perf_counter() - t0
+                continue
+            t1 = time.perf_counter()
+            self.encode.wait_in_s += t1 - t0
+            if item is _END:
+                return
+            try:
+                self._encode_fn(item)
+            except BaseException as e:
+                self._error = e
+                self._stop.set()
+                return
+            self.encode.busy_s += time.perf_counter() - t1
+            self.encode.items += 1
+
+    # ------------------------------------------------------------ 추론 스테이지
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            t0 = time.perf_counter()
+            if self._last_get is not None:
+                self.infer.busy_s += t0 - self._last_get
+            while True:
+                if self._error is not None:
+                    raise self._error
+                try:
+                    item = self._decoded.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return
+            t1 = time.perf_counter()
+            self.infer.wait_in_s += t1 - t0
+            self._last_get = t1
+            if item is _END:
+                self._last_get = None
+                if self._error is not None:
+                    raise self._error
+                return
+            self.infer.items += 1
+            yield item
+
+    def submit(self, item: Any) -> None:
+        """추론 결과를 encode 스레드로 넘김. encode 큐가 가득 차면 대기(backpressure)."""
+        if self._error is not None:
+            raise self._error
+        t0 = time.perf_counter()
+        self._put(self._to_encode, item)
+        dt = time.perf_counter() - t0
+        self.infer.wait_out_s += dt
+        if self._last_get is not None:
+            self._last_get += dt  # 출력 대기는 busy에서 제외
+
+    def close(self) -> None:
+        """decode 중단, encode 큐를 모두 처리한 뒤 스레드 종료. 스테이지 예외가 있으면 raise."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._error is None:
+            self._put(self._to_encode, _END)
+            self._encoder.join()
+        self._stop.set()
+        self._decoder.join(timeout=5)
+        self._encoder.join(timeout=5)
+        self._wall_s = time.perf_counter() - self._t_wall
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "FramePipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            # 이미 예외 전파 중이면 encode 대기 없이 중단
+            self._stop.set()
+            self._closed = True
+            self._decoder.join(timeout=5)
+            self._encoder.join(timeout=5)
+            self._wall_s = time.perf_counter() - self._t_wall
+            return
+        self.close()
+
+    def bottleneck(self) -> str:
+        """busy 시간이 가장 긴 스테이지 (= 나머지 스테이지가 그 스테이지를 기다림)."""
+        return max((self.decode, self.infer, self.encode), key=lambda s: s.busy_s).name
+
+    def metrics(self, prefix: str = "pipeline") -> dict[str, float]:
+        out: dict[str, float] = {}
+        for stage in (self.decode, self.infer, self.encode):
+            out.update(stage.as_metrics(prefix))
+        wall = getattr(self, "_wall_s", time.perf_counter() - self._t_wall)
+        out[f"{prefix}/wall_s"] = wall
+        return out